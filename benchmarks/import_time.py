@@ -0,0 +1,65 @@
+"""
+Cold-import benchmark for ErrorTrace Pro
+
+Measures the wall time of `import errortrace_pro` in fresh interpreters,
+and the time to import the package and build the default handler (the
+work the package used to do at import time).
+
+Usage:
+    python benchmarks/import_time.py [--runs N]
+"""
+import os
+import sys
+import argparse
+import statistics
+import subprocess
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+
+SCENARIOS = [
+    ("import errortrace_pro", "import errortrace_pro"),
+    ("import + default_handler", "import errortrace_pro; errortrace_pro.default_handler"),
+    ("import + first render", (
+        "import errortrace_pro\n"
+        "h = errortrace_pro.default_handler\n"
+        "try:\n"
+        "    1 / 0\n"
+        "except ZeroDivisionError as e:\n"
+        "    h.visualizer.format_traceback(type(e), e, e.__traceback__)\n"
+    )),
+]
+
+TIMER = (
+    "import time\n"
+    "start = time.perf_counter()\n"
+    "{code}\n"
+    "print(time.perf_counter() - start)\n"
+)
+
+
+def measure(code, runs):
+    """Run code in fresh interpreters and return the timings in milliseconds"""
+    env = dict(os.environ, PYTHONPATH=ROOT)
+    timings = []
+    for _ in range(runs):
+        result = subprocess.run(
+            [sys.executable, "-c", TIMER.format(code=code)],
+            env=env, capture_output=True, text=True, check=True
+        )
+        timings.append(float(result.stdout.strip().splitlines()[-1]) * 1000)
+    return timings
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--runs", type=int, default=20, help="Interpreter runs per scenario")
+    args = parser.parse_args()
+
+    print(f"{'scenario':<28} {'median ms':>10} {'min ms':>10}")
+    for name, code in SCENARIOS:
+        timings = measure(code, args.runs)
+        print(f"{name:<28} {statistics.median(timings):>10.1f} {min(timings):>10.1f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,80 @@
+"""
+Traceback rendering benchmark for ErrorTrace Pro
+
+Renders the same traceback repeatedly with TracebackVisualizer and with
+a copy of the original Rich renderer, which built a new Console and
+loaded the syntax theme on every call.
+
+Usage:
+    python benchmarks/render.py [--number N]
+"""
+import os
+import sys
+import time
+import argparse
+from io import StringIO
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from rich.console import Console
+from rich.panel import Panel
+from rich.traceback import Traceback
+
+from errortrace_pro.visualizer import TracebackVisualizer
+
+
+def legacy_format(exc_type, exc_value, exc_traceback, theme="monokai"):
+    """The original per-call Rich rendering"""
+    output = StringIO()
+    console = Console(file=output, width=100, highlight=True)
+    rich_traceback = Traceback.from_exception(
+        exc_type, exc_value, exc_traceback,
+        show_locals=True, word_wrap=True, indent_guides=True, theme=theme
+    )
+    console.print()
+    console.print(Panel(
+        f"[bold white on red]{exc_type.__name__}: {exc_value}[/bold white on red]",
+        border_style="red", expand=False,
+        title="[bold yellow]💥 Exception Detected 💥[/bold yellow]", title_align="center",
+        subtitle="[italic cyan]ErrorTrace Pro[/italic cyan]", subtitle_align="right"
+    ))
+    console.print(rich_traceback)
+    return "\n" + output.getvalue()
+
+
+def sample_exception():
+    """Raise an exception a few frames deep and return its exc_info"""
+    def inner(data):
+        return data["missing"]
+
+    def outer():
+        data = {"present": 1}
+        return inner(data)
+
+    try:
+        outer()
+    except KeyError:
+        return sys.exc_info()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--number", type=int, default=10000, help="Tracebacks to render")
+    args = parser.parse_args()
+
+    exc_info = sample_exception()
+    visualizer = TracebackVisualizer(colored_output=True)
+
+    for name, render in [
+        ("before", lambda: legacy_format(*exc_info)),
+        ("after", lambda: visualizer.format_traceback(*exc_info, show_tip=False)),
+    ]:
+        start = time.perf_counter()
+        for _ in range(args.number):
+            render()
+        elapsed = time.perf_counter() - start
+        print(f"{name:<8} {args.number} renders: {elapsed:.2f} s ({elapsed / args.number * 1e3:.3f} ms each)")
+
+
+if __name__ == '__main__':
+    main()
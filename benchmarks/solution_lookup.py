@@ -0,0 +1,102 @@
+"""
+Micro-benchmark for SolutionProvider lookups
+
+Compares message-guidance lookups against a copy of the original
+implementation, which rebuilt its rule table and called re.search with
+raw pattern strings on every call, fuzzy exception-name matching
+against difflib.get_close_matches over a large custom database, and
+get_solutions() with and without its result cache.
+
+Usage:
+    python benchmarks/solution_lookup.py [--number N]
+"""
+import os
+import re
+import sys
+import random
+import argparse
+import timeit
+from difflib import get_close_matches
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from errortrace_pro.solutions import SolutionProvider, ExceptionNameIndex, MESSAGE_PATTERNS
+
+MESSAGES = [
+    ("TypeError", "handler() takes 2 positional arguments but 3 were given"),
+    ("TypeError", "unsupported operand type(s) for +: 'int' and 'str'"),
+    ("AttributeError", "'NoneType' object has no attribute 'split'"),
+    ("KeyError", "'user_id'"),
+    ("ValueError", "invalid literal for int() with base 10: 'abc'"),
+]
+
+
+def legacy_guidance(exc_name, message):
+    """The original per-call implementation"""
+    patterns = {name: dict(rules) for name, rules in MESSAGE_PATTERNS.items()}
+    if exc_name in patterns:
+        for pattern, template in patterns[exc_name].items():
+            match = re.search(pattern, message)
+            if match:
+                return template.format(*match.groups())
+    return None
+
+
+NAME_PARTS = ["Connection", "Timeout", "Value", "Key", "Index", "Http", "Json", "Decode",
+              "Auth", "Token", "Rate", "Limit", "Database", "Query", "Lock", "File", "Schema"]
+
+
+def synthetic_names(count, rng):
+    """Generate exception names for a large custom database"""
+    names = set()
+    while len(names) < count:
+        names.add("".join(rng.sample(NAME_PARTS, rng.randint(1, 3))) + rng.choice(["Error", "Exception"]))
+    return sorted(names)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--number", type=int, default=100000, help="Lookups per measurement")
+    args = parser.parse_args()
+
+    provider = SolutionProvider()
+    for exc_name, message in MESSAGES:
+        assert legacy_guidance(exc_name, message) == provider._get_message_specific_guidance(exc_name, message)
+
+    print(f"{'message guidance':<20} {'before us':>10} {'after us':>10}")
+    for exc_name, message in MESSAGES:
+        before = timeit.timeit(lambda: legacy_guidance(exc_name, message), number=args.number)
+        after = timeit.timeit(
+            lambda: provider._get_message_specific_guidance(exc_name, message), number=args.number
+        )
+        print(f"{exc_name:<20} {before / args.number * 1e6:>10.2f} {after / args.number * 1e6:>10.2f}")
+
+    context = {"traceback": {"last_frame": {"filename": "app.py", "lineno": 42, "line": "row[key]"}}}
+    uncached = SolutionProvider(cache_size=0)
+    print(f"\n{'get_solutions':<20} {'uncached us':>10} {'cached us':>10}")
+    for exc_type, message in [(KeyError, "'user_id'"), (ConnectionResetError, "peer reset")]:
+        exc_value = exc_type(message)
+        before = timeit.timeit(lambda: uncached.get_solutions(exc_type, exc_value, context), number=args.number)
+        after = timeit.timeit(lambda: provider.get_solutions(exc_type, exc_value, context), number=args.number)
+        print(f"{exc_type.__name__:<20} {before / args.number * 1e6:>10.2f} {after / args.number * 1e6:>10.2f}")
+
+    rng = random.Random(0)
+    names = synthetic_names(3000, rng)
+    words = [name.replace("Error", "Eror") for name in rng.sample(names, 50)] + ["UnrelatedFailure"] * 10
+    index = ExceptionNameIndex(names)
+    for word in words:
+        assert index.best_match(word) == (get_close_matches(word, names, n=1, cutoff=0.7) or [None])[0]
+
+    print(f"\n{'similar name (3000)':<20} {'before us':>10} {'after us':>10}")
+    before = timeit.timeit(lambda: [get_close_matches(w, names, n=1, cutoff=0.7) for w in words], number=1)
+    after = timeit.timeit(lambda: [index.best_match(w) for w in words], number=1)
+    print(f"{'uncached':<20} {before / len(words) * 1e6:>10.0f} {after / len(words) * 1e6:>10.0f}")
+
+    provider.solutions_db.update((name, []) for name in names)
+    provider._find_similar_exception(words[0])
+    after = timeit.timeit(lambda: provider._find_similar_exception(words[0]), number=args.number)
+    print(f"{'memoized':<20} {before / len(words) * 1e6:>10.0f} {after / args.number * 1e6:>10.2f}")
+
+
+if __name__ == '__main__':
+    main()
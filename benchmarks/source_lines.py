@@ -0,0 +1,69 @@
+"""
+Micro-benchmark for reading frame source lines
+
+Compares reading a window of lines around a frame from a large generated
+module with linecache (after checkcache, as every render did, so an
+edited file is re-read and split whole) against the SourceCache, which
+reads large files in bounded chunks only as far as the window.
+
+Usage:
+    python benchmarks/source_lines.py [--lines N] [--number N]
+"""
+import os
+import sys
+import argparse
+import linecache
+import tempfile
+import timeit
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from errortrace_pro.sources import SourceCache
+
+
+def linecache_window(filename, start, end):
+    """Window of lines through linecache, as the renderers read them before"""
+    linecache.checkcache(filename)
+    return [linecache.getline(filename, lineno).rstrip() for lineno in range(start, end + 1)]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--lines", type=int, default=200000, help="Lines in the generated module")
+    parser.add_argument("--number", type=int, default=200, help="Reads per measurement")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        filename = os.path.join(directory, "generated.py")
+        with open(filename, "w") as f:
+            for n in range(args.lines):
+                f.write(f"CONSTANT_{n} = {{'name': 'value_{n}', 'index': {n}}}\n")
+        size = os.path.getsize(filename)
+        print(f"module: {args.lines} lines, {size / 1024 / 1024:.1f} MB")
+
+        cache = SourceCache()
+        print(f"{'window':<12} {'cold linecache ms':>18} {'cold cache ms':>14} {'warm cache us':>14}")
+        for lineno in (10, args.lines // 2, args.lines - 10):
+            start, end = lineno - 2, lineno + 2
+            assert linecache_window(filename, start, end) == cache.getlines(filename, start, end)
+
+            def cold_linecache():
+                linecache.clearcache()
+                linecache_window(filename, start, end)
+
+            def cold_cache():
+                cache.clear()
+                cache.getlines(filename, start, end)
+
+            before = timeit.timeit(cold_linecache, number=args.number) / args.number
+            cold = timeit.timeit(cold_cache, number=args.number) / args.number
+            cache.getlines(filename, start, end)
+            warm = timeit.timeit(lambda: cache.getlines(filename, start, end), number=args.number) / args.number
+            print(f"line {lineno:<7} {before * 1e3:>18.2f} {cold * 1e3:>14.2f} {warm * 1e6:>14.1f}")
+
+        print(cache.stats())
+        cache.clear()
+
+
+if __name__ == "__main__":
+    main()
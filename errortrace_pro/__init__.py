@@ -14,25 +14,75 @@ __version__ = "0.3.0"
 __author__ = "Hamed Esam"
 
 import logging
+import os
 import sys
+import threading
+import weakref
 
-from .handler import ExceptionHandler
-from .visualizer import TracebackVisualizer
-from .solutions import SolutionProvider
-from .cloud_logger import CloudLogger
+# Public classes and the default handler are resolved on first access, so
+# importing the package doesn't import Rich, read the solutions database or
+# construct any handler
+_LAZY_ATTRIBUTES = {
+    "ExceptionHandler": ".handler",
+    "TracebackVisualizer": ".visualizer",
+    "SolutionProvider": ".solutions",
+    "CloudLogger": ".cloud_logger",
+    "LocalsPolicy": ".locals_capture",
+    "EventCollector": ".forwarding",
+}
 
-# Configure base logging
-logging.basicConfig(
-    level=logging.INFO,
-    format="%(asctime)s - %(name)s - %(levelname)s - %(message)s"
-)
+_default_handler_lock = threading.Lock()
 
-# Create default handler instance for easy import
-default_handler = ExceptionHandler()
+# Seconds the installed hook waits for background output before exiting
+_EXIT_FLUSH_TIMEOUT = 5.0
+
+# Hooks replaced by install(), restored by uninstall()
+_previous_hooks = {}
+_asyncio_loops = weakref.WeakKeyDictionary()
+
+logger = logging.getLogger(__name__)
+
+
+def __getattr__(name):
+    """Resolve lazily imported classes and the default handler"""
+    if name in _LAZY_ATTRIBUTES:
+        import importlib
+        value = getattr(importlib.import_module(_LAZY_ATTRIBUTES[name], __name__), name)
+        globals()[name] = value
+        return value
+    if name == "default_handler":
+        return _get_default_handler()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+def __dir__():
+    return sorted(set(globals()) | set(_LAZY_ATTRIBUTES) | {"default_handler"})
+
+
+def _configure_logging():
+    """Configure base logging (no-op if the application already did)"""
+    logging.basicConfig(
+        level=logging.INFO,
+        format="%(asctime)s - %(name)s - %(levelname)s - %(message)s"
+    )
+
+
+def _get_default_handler():
+    """Create the default handler instance on first use"""
+    handler = globals().get("default_handler")
+    if handler is None:
+        with _default_handler_lock:
+            handler = globals().get("default_handler")
+            if handler is None:
+                from .handler import ExceptionHandler
+                _configure_logging()
+                handler = ExceptionHandler()
+                globals()["default_handler"] = handler
+    return handler
 
 def init(solutions_path=None, cloud_logging=False, cloud_provider=None, 
          api_key=None, project_id=None, enable_suggestions=True,
-         colored_output=True, verbose=True):
+         colored_output=True, verbose=True, **kwargs):
     """
     Initialize ErrorTrace Pro with custom settings
     
@@ -45,10 +95,13 @@ def init(solutions_path=None, cloud_logging=False, cloud_provider=None,
         enable_suggestions (bool): Enable solution suggestions (default: True)
         colored_output (bool): Enable colored console output (default: True)
         verbose (bool): Enable verbose output (default: True)
+        **kwargs: Additional ExceptionHandler options (e.g. cloud_options)
         
     Returns:
         ExceptionHandler: Configured exception handler instance
     """
+    from .handler import ExceptionHandler
+    _configure_logging()
     handler = ExceptionHandler(
         solutions_path=solutions_path,
         cloud_logging=cloud_logging,
@@ -57,19 +110,28 @@ def init(solutions_path=None, cloud_logging=False, cloud_provider=None,
         project_id=project_id,
         enable_suggestions=enable_suggestions,
         colored_output=colored_output,
-        verbose=verbose
+        verbose=verbose,
+        **kwargs
     )
     return handler
 
-def install(handler=None):
+def install(handler=None, threads=True, unraisable=True, asyncio_loop=None):
     """
     Install ErrorTrace Pro as the global exception handler
     
+    Besides sys.excepthook, uncaught exceptions in threads, exceptions
+    Python can't raise (sys.unraisablehook) and unhandled asyncio errors
+    of the running event loop are routed to the handler.
+    
     Args:
         handler (ExceptionHandler, optional): Custom handler instance to use
+        threads (bool): Also replace threading.excepthook
+        unraisable (bool): Also replace sys.unraisablehook
+        asyncio_loop (AbstractEventLoop, optional): Event loop whose exception
+            handler is replaced (default: the running loop, if any)
     """
     if handler is None:
-        handler = default_handler
+        handler = _get_default_handler()
     
     def exception_hook(exc_type, exc_value, exc_traceback):
         # Handle the exception with our custom handler
@@ -80,18 +142,128 @@ def install(handler=None):
         if exc_type is not None:
             # If this is running in a script, exit with error code 1
             # This prevents the default traceback from showing
-            import os
             # Only exit if this is the main thread and not in interactive mode
             if os._exit and not hasattr(sys, 'ps1'):
+                # os._exit skips atexit hooks, so wait for output still being
+                # rendered or delivered in the background first
+                handler.flush(_EXIT_FLUSH_TIMEOUT)
                 # Use os._exit instead of sys.exit to avoid triggering exit handlers
                 # which might cause more exceptions
                 os._exit(1)
     
     # Set as the global exception hook
-    sys.excepthook = exception_hook
+    sys.excepthook = _replacing("excepthook", sys.excepthook, exception_hook)
+    
+    if threads and hasattr(threading, "excepthook"):
+        # Fall back to the hook the first install() replaced, not to the
+        # one an earlier call put in place
+        previous = _previous_hooks.get("threading", threading.excepthook)
+        
+        def thread_hook(args):
+            if args.exc_type is SystemExit:
+                return
+            try:
+                handler.handle(args.exc_type, args.exc_value, args.exc_traceback)
+            except Exception:
+                previous(args)
+        
+        threading.excepthook = _replacing("threading", threading.excepthook, thread_hook)
+    
+    if unraisable and hasattr(sys, "unraisablehook"):
+        previous_unraisable = _previous_hooks.get("unraisable", sys.unraisablehook)
+        
+        def unraisable_hook(unraisable):
+            if unraisable.exc_value is None:
+                previous_unraisable(unraisable)
+                return
+            try:
+                logger.error(f"{unraisable.err_msg or 'Exception ignored in'}: {unraisable.object!r}")
+                handler.handle(unraisable.exc_type, unraisable.exc_value, unraisable.exc_traceback)
+            except Exception:
+                previous_unraisable(unraisable)
+        
+        sys.unraisablehook = _replacing("unraisable", sys.unraisablehook, unraisable_hook)
+    
+    install_asyncio(handler, asyncio_loop)
     
     return handler
 
+def install_asyncio(handler=None, loop=None):
+    """
+    Route unhandled exceptions of an asyncio event loop to the handler
+    
+    Args:
+        handler (ExceptionHandler, optional): Handler instance to use
+        loop (AbstractEventLoop, optional): Event loop (default: the running
+            loop; nothing is done if there isn't one)
+    
+    Returns:
+        bool: True if a loop's exception handler was replaced
+    """
+    if loop is None:
+        # No loop can be running if asyncio was never imported
+        if "asyncio" not in sys.modules:
+            return False
+        try:
+            loop = sys.modules["asyncio"].get_running_loop()
+        except RuntimeError:
+            return False
+    if handler is None:
+        handler = _get_default_handler()
+    
+    # The loop only keeps weak references to tasks
+    tasks = set()
+    
+    def loop_exception_handler(loop, context):
+        exception = context.get("exception")
+        if exception is None:
+            loop.default_exception_handler(context)
+            return
+        
+        def handled(task):
+            tasks.discard(task)
+            if not task.cancelled() and task.exception() is not None:
+                loop.default_exception_handler(context)
+        
+        try:
+            if loop.is_running():
+                # ahandle() renders and logs off the loop, so the callback
+                # that reported the error isn't held up
+                task = loop.create_task(handler.ahandle(type(exception), exception, exception.__traceback__))
+                tasks.add(task)
+                task.add_done_callback(handled)
+            else:
+                handler.handle(type(exception), exception, exception.__traceback__)
+        except Exception:
+            loop.default_exception_handler(context)
+    
+    _asyncio_loops.setdefault(loop, loop.get_exception_handler())
+    loop.set_exception_handler(loop_exception_handler)
+    return True
+
+def _replacing(name, current, hook):
+    """Remember the hook being replaced, for uninstall()"""
+    # Only the first install() sees the original hook; later calls would
+    # record one of ours
+    _previous_hooks.setdefault(name, current)
+    return hook
+
 def uninstall():
-    """Restore the original sys.excepthook"""
-    sys.excepthook = sys.__excepthook__
+    """Restore the hooks replaced by install()"""
+    sys.excepthook = _previous_hooks.pop("excepthook", sys.__excepthook__)
+    if "threading" in _previous_hooks:
+        threading.excepthook = _previous_hooks.pop("threading")
+    if "unraisable" in _previous_hooks:
+        sys.unraisablehook = _previous_hooks.pop("unraisable")
+    for loop, previous in list(_asyncio_loops.items()):
+        if not loop.is_closed():
+            loop.set_exception_handler(previous)
+    _asyncio_loops.clear()
+
+def _reset_after_fork():
+    """Replace the module lock in a forked child"""
+    global _default_handler_lock
+    _default_handler_lock = threading.Lock()
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_reset_after_fork)
@@ -0,0 +1,451 @@
+"""
+Asyncio HTTP transport for ErrorTrace Pro
+"""
+import asyncio
+import logging
+import time
+from urllib.parse import urlsplit
+
+from .connection_pool import PooledResponse, get_ssl_context
+from .delivery import OVERFLOW_POLICIES
+
+logger = logging.getLogger(__name__)
+
+# Errors that mean a reused keep-alive socket was closed by the server
+_STALE_CONNECTION_ERRORS = (ConnectionError, asyncio.IncompleteReadError)
+
+
+class _Connection:
+    """One open stream pair and when it was last used"""
+
+    __slots__ = ("reader", "writer", "last_used")
+
+    def __init__(self, reader, writer):
+        self.reader = reader
+        self.writer = writer
+        self.last_used = time.monotonic()
+
+    def close(self):
+        self.writer.close()
+
+
+class AsyncConnectionPool:
+    """
+    Pool of persistent HTTP/HTTPS connections for one event loop
+
+    The asyncio counterpart of ConnectionPool. Idle streams are kept per
+    (scheme, host) and reused, and pipeline() writes several requests on
+    one connection before reading the responses in order, so a batch of
+    events costs one round trip instead of one per event. Requests left
+    unanswered when the server closes a connection are resent on a new
+    one. Streams belong to the loop they were opened on, so a pool must
+    only be used from one loop.
+    """
+
+    def __init__(self, max_idle_per_host=4, idle_timeout=30.0, timeout=10.0):
+        """
+        Initialize the connection pool
+
+        Args:
+            max_idle_per_host (int): Idle connections kept per host
+            idle_timeout (float): Seconds an idle connection may be reused for
+            timeout (float): Seconds allowed for connecting and for each
+                exchange of requests and responses
+        """
+        self.max_idle_per_host = max_idle_per_host
+        self.idle_timeout = idle_timeout
+        self.timeout = timeout
+
+        self._idle = {}
+        self._counters = {"created": 0, "reused": 0, "reconnects": 0, "pipelined": 0}
+
+    async def request(self, scheme, host, method, path, body=None, headers=None):
+        """
+        Send a request over a pooled connection
+
+        Args:
+            scheme (str): 'http' or 'https'
+            host (str): Host with optional port (URL netloc)
+            method (str): HTTP method
+            path (str): Request path
+            body (str or bytes, optional): Request body
+            headers (dict, optional): Request headers
+
+        Returns:
+            PooledResponse: Status, reason and body of the response
+        """
+        responses = await self.pipeline(scheme, host, [(method, path, body, headers)])
+        return responses[0]
+
+    async def pipeline(self, scheme, host, requests):
+        """
+        Send several requests to one host, writing them back to back on one
+        connection before reading the responses
+
+        Args:
+            scheme (str): 'http' or 'https'
+            host (str): Host with optional port (URL netloc)
+            requests (list): (method, path, body, headers) tuples
+
+        Returns:
+            list: PooledResponse for each request, in order
+        """
+        key = (scheme, host)
+        responses = []
+        retried = False
+        while len(responses) < len(requests):
+            conn, reused = await self._acquire(key)
+            answered = len(responses)
+            try:
+                closed = await asyncio.wait_for(
+                    self._exchange(conn, host, requests[answered:], responses),
+                    self.timeout
+                )
+            except _STALE_CONNECTION_ERRORS:
+                conn.close()
+                if len(responses) == answered:
+                    # Only a reused socket closed by the server gets a retry
+                    if not reused or retried:
+                        raise
+                    retried = True
+                self._counters["reconnects"] += 1
+                continue
+            except BaseException:
+                conn.close()
+                raise
+
+            if closed:
+                # The server stopped after some responses; the rest are
+                # sent again on a new connection
+                conn.close()
+                if len(responses) < len(requests):
+                    self._counters["reconnects"] += 1
+            else:
+                self._release(key, conn)
+        return responses
+
+    def stats(self):
+        """
+        Get pool counters
+
+        Returns:
+            dict: Connections created, requests on reused connections,
+                reconnects after closed sockets, requests written behind
+                another one in flight and currently idle connections
+        """
+        stats = dict(self._counters)
+        stats["idle"] = sum(len(conns) for conns in self._idle.values())
+        return stats
+
+    def close(self):
+        """Close every idle connection"""
+        idle, self._idle = self._idle, {}
+        for conns in idle.values():
+            for conn in conns:
+                conn.close()
+
+    async def _acquire(self, key):
+        """
+        Take an idle connection for the host or open a new one
+
+        Returns:
+            tuple: (connection, reused)
+        """
+        now = time.monotonic()
+        conns = self._idle.get(key)
+        while conns:
+            conn = conns.pop()
+            if now - conn.last_used <= self.idle_timeout and not conn.reader.at_eof():
+                self._counters["reused"] += 1
+                return conn, True
+            conn.close()
+
+        self._counters["created"] += 1
+        scheme, host = key
+        address = urlsplit(f"//{host}")
+        port = address.port or (443 if scheme == "https" else 80)
+        ssl_context = get_ssl_context() if scheme == "https" else None
+        reader, writer = await asyncio.wait_for(
+            asyncio.open_connection(address.hostname, port, ssl=ssl_context),
+            self.timeout
+        )
+        return _Connection(reader, writer), False
+
+    def _release(self, key, conn):
+        """Return a healthy connection to the idle list"""
+        conns = self._idle.setdefault(key, [])
+        if len(conns) < self.max_idle_per_host:
+            conn.last_used = time.monotonic()
+            conns.append(conn)
+            return
+        conn.close()
+
+    async def _exchange(self, conn, host, requests, responses):
+        """
+        Write requests on a connection and read their responses
+
+        Responses are appended to ``responses`` as they arrive, so the ones
+        read before an error are kept.
+
+        Returns:
+            bool: True if the connection can't be used again
+        """
+        for method, path, body, headers in requests:
+            conn.writer.write(_encode_request(host, method, path, body, headers))
+        self._counters["pipelined"] += len(requests) - 1
+        await conn.writer.drain()
+
+        for method, _, _, _ in requests:
+            response, will_close = await _read_response(conn.reader, method)
+            responses.append(response)
+            if will_close:
+                return True
+        return False
+
+
+def _encode_request(host, method, path, body, headers):
+    """Serialize one HTTP/1.1 request"""
+    if isinstance(body, str):
+        body = body.encode("utf-8")
+    body = body or b""
+    lines = [f"{method} {path} HTTP/1.1", f"Host: {host}", f"Content-Length: {len(body)}"]
+    for name, value in (headers or {}).items():
+        if name.lower() not in ("host", "content-length"):
+            lines.append(f"{name}: {value}")
+    return ("\r\n".join(lines) + "\r\n\r\n").encode("latin-1") + body
+
+
+async def _read_response(reader, method):
+    """
+    Read one HTTP/1.x response
+
+    Returns:
+        tuple: (PooledResponse, whether the server will close the connection)
+    """
+    while True:
+        line = await reader.readline()
+        if not line:
+            raise ConnectionResetError("Connection closed before the response")
+        version, _, rest = line.decode("latin-1").strip().partition(" ")
+        status_text, _, reason = rest.partition(" ")
+        try:
+            status = int(status_text)
+        except ValueError:
+            raise ConnectionError(f"Malformed status line: {line!r}") from None
+
+        headers = {}
+        while True:
+            line = await reader.readline()
+            if line in (b"\r\n", b"\n", b""):
+                break
+            name, _, value = line.decode("latin-1").partition(":")
+            headers[name.strip().lower()] = value.strip()
+        if status >= 200 or status == 101:
+            break
+        # Skip interim (1xx) responses
+
+    connection = headers.get("connection", "").lower()
+    will_close = "close" in connection or (version == "HTTP/1.0" and "keep-alive" not in connection)
+
+    if method == "HEAD" or status in (204, 304):
+        body = b""
+    elif "chunked" in headers.get("transfer-encoding", "").lower():
+        chunks = []
+        while True:
+            size_line = await reader.readline()
+            size = int(size_line.split(b";", 1)[0].strip() or b"0", 16)
+            if size == 0:
+                # Skip trailers up to the blank line
+                while (await reader.readline()) not in (b"\r\n", b"\n", b""):
+                    pass
+                break
+            chunks.append(await reader.readexactly(size))
+            await reader.readexactly(2)
+        body = b"".join(chunks)
+    elif "content-length" in headers:
+        body = await reader.readexactly(int(headers["content-length"]))
+    else:
+        # The body runs until the server closes the connection
+        body = await reader.read()
+        will_close = True
+
+    return PooledResponse(status, reason, body), will_close
+
+
+class AsyncDeliveryQueue:
+    """
+    Bounded queue drained by a task on the event loop
+
+    The asyncio counterpart of DeliveryQueue. Producers await put(), which
+    returns as soon as the payload is queued, and the worker task hands
+    ``send`` every payload that accumulated while the previous call was in
+    flight, so a slow endpoint produces larger batches rather than
+    blocking callers. Must be used from one event loop.
+    """
+
+    def __init__(self, send, maxsize=1000, overflow_policy="drop_oldest",
+                 block_timeout=0.1, max_batch=100, on_drop=None):
+        """
+        Initialize the delivery queue
+
+        Args:
+            send (coroutine function): Awaited by the worker with a list of
+                payloads, returns bool
+            maxsize (int): Maximum number of pending payloads
+            overflow_policy (str): 'drop_oldest', 'drop_newest' or 'block'
+            block_timeout (float): Seconds put() may wait under the 'block' policy
+            max_batch (int): Maximum payloads per send call
+            on_drop (callable, optional): Called with each payload the overflow
+                policy discards or that is still queued when the worker is
+                cancelled, e.g. to spool it to disk
+        """
+        if overflow_policy not in OVERFLOW_POLICIES:
+            logger.warning(f"Unsupported overflow policy: {overflow_policy}. Falling back to 'drop_oldest'")
+            overflow_policy = "drop_oldest"
+
+        self.send = send
+        self.maxsize = max(1, int(maxsize))
+        self.overflow_policy = overflow_policy
+        self.block_timeout = block_timeout
+        self.max_batch = max(1, int(max_batch))
+        self.on_drop = on_drop
+
+        self._queue = asyncio.Queue(self.maxsize)
+        self._in_flight = []
+        self._worker = None
+        self._closed = False
+
+        self._counters = {
+            "enqueued": 0,
+            "delivered": 0,
+            "failed": 0,
+            "dropped_oldest": 0,
+            "dropped_newest": 0,
+            "dropped_timeout": 0,
+        }
+
+    async def put(self, payload):
+        """
+        Queue a payload for delivery by the worker task
+
+        Args:
+            payload: Payload to hand to the send coroutine
+
+        Returns:
+            bool: True if the payload was queued, False if it was dropped
+        """
+        if self._closed:
+            self._counters["dropped_newest"] += 1
+            self._drop(payload)
+            return False
+
+        if self._queue.full():
+            if self.overflow_policy == "drop_newest":
+                self._counters["dropped_newest"] += 1
+                self._drop(payload)
+                return False
+            elif self.overflow_policy == "block":
+                try:
+                    await asyncio.wait_for(self._queue.put(payload), self.block_timeout or 0)
+                except asyncio.TimeoutError:
+                    self._counters["dropped_timeout"] += 1
+                    self._drop(payload)
+                    return False
+                self._counters["enqueued"] += 1
+                self._ensure_worker()
+                return True
+            else:  # drop_oldest
+                dropped = self._queue.get_nowait()
+                self._queue.task_done()
+                self._counters["dropped_oldest"] += 1
+                self._drop(dropped)
+
+        self._queue.put_nowait(payload)
+        self._counters["enqueued"] += 1
+        self._ensure_worker()
+        return True
+
+    def stats(self):
+        """
+        Get delivery counters
+
+        Returns:
+            dict: Counter values plus the current queue depth
+        """
+        stats = dict(self._counters)
+        stats["pending"] = self._queue.qsize() + len(self._in_flight)
+        return stats
+
+    async def flush(self, timeout=None):
+        """
+        Wait until every queued payload has been handed to the send coroutine
+
+        Args:
+            timeout (float, optional): Maximum seconds to wait
+
+        Returns:
+            bool: True if the queue drained, False on timeout
+        """
+        try:
+            await asyncio.wait_for(self._queue.join(), timeout)
+        except asyncio.TimeoutError:
+            return False
+        return True
+
+    async def close(self, timeout=None):
+        """
+        Stop accepting payloads, drain the queue and stop the worker
+
+        Args:
+            timeout (float, optional): Maximum seconds to wait for the drain
+        """
+        self._closed = True
+        await self.flush(timeout)
+        if self._worker is not None:
+            self._worker.cancel()
+            try:
+                await self._worker
+            except asyncio.CancelledError:
+                pass
+
+    def _ensure_worker(self):
+        """Start the worker task on first use"""
+        if self._worker is None or self._worker.done():
+            self._worker = asyncio.ensure_future(self._run())
+
+    def _drop(self, payload):
+        """Hand a discarded payload to on_drop"""
+        if self.on_drop is not None:
+            try:
+                self.on_drop(payload)
+            except Exception as e:
+                logger.error(f"Error handling dropped event: {e}")
+
+    async def _run(self):
+        """Worker task: deliver payloads until cancelled"""
+        try:
+            while True:
+                batch = [await self._queue.get()]
+                while len(batch) < self.max_batch and not self._queue.empty():
+                    batch.append(self._queue.get_nowait())
+                self._in_flight = batch
+
+                try:
+                    success = await self.send(batch)
+                except Exception as e:
+                    logger.error(f"Error delivering queued event: {e}")
+                    success = False
+
+                self._counters["delivered" if success else "failed"] += len(batch)
+                self._in_flight = []
+                for _ in batch:
+                    self._queue.task_done()
+        except asyncio.CancelledError:
+            # Keep what the loop is shutting down on, e.g. in the spool
+            pending = self._in_flight
+            self._in_flight = []
+            while not self._queue.empty():
+                pending.append(self._queue.get_nowait())
+            for payload in pending:
+                self._drop(payload)
+            raise
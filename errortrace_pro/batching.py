@@ -0,0 +1,147 @@
+"""
+Event batching for ErrorTrace Pro cloud transports
+"""
+import json
+import logging
+import time
+
+logger = logging.getLogger(__name__)
+
+# Per-request limits for each provider. The byte limits include the
+# per-event overhead the provider counts against the request size;
+# max_event_bytes is the largest single event the provider accepts.
+PROVIDER_LIMITS = {
+    # CloudWatch PutLogEvents: 10,000 events and 1,048,576 bytes per call,
+    # where each event counts as its UTF-8 message size plus 26 bytes, and
+    # 256 KB per event
+    "aws": {"max_events": 10000, "max_bytes": 1048576, "event_overhead": 26,
+            "max_event_bytes": 256 * 1024 - 26},
+    # Cloud Logging entries.write: 10 MB per request and 256 KB per entry;
+    # the overhead covers the logName/severity wrapper around each jsonPayload
+    "gcp": {"max_events": 1000, "max_bytes": 10 * 1024 * 1024, "event_overhead": 256,
+            "max_event_bytes": 256 * 1024 - 256},
+    # Application Insights track: kept well below the ingestion limits;
+    # telemetry items are limited to 64 KB
+    "azure": {"max_events": 500, "max_bytes": 3 * 1024 * 1024, "event_overhead": 512,
+              "max_event_bytes": 64 * 1024 - 512},
+    # Generic HTTP endpoints receive one event per request
+    "http": {"max_events": 1, "max_bytes": None, "event_overhead": 0,
+             "max_event_bytes": None},
+}
+
+
+def _json_size(event):
+    """Return the encoded JSON size of an event in bytes"""
+    return len(json.dumps(event, default=str).encode("utf-8"))
+
+
+class EventBatcher:
+    """
+    Collect events for a provider and release them in request-sized batches
+
+    A batch is released when it reaches the maximum event count, when the
+    next event would push it over the byte limit, or when the oldest event
+    in it has waited for the linger time.
+    """
+
+    def __init__(self, provider, max_events=None, max_bytes=None, linger=1.0, sizeof=None):
+        """
+        Initialize the batcher
+
+        Args:
+            provider (str): Provider name ('gcp', 'aws', 'azure', 'http')
+            max_events (int, optional): Maximum events per batch, capped at the provider limit
+            max_bytes (int, optional): Maximum bytes per batch, capped at the provider limit
+            linger (float): Seconds an event may wait for more events to join its batch
+            sizeof (callable, optional): Returns the size of an event in bytes
+        """
+        limits = PROVIDER_LIMITS.get(provider, PROVIDER_LIMITS["http"])
+
+        self.provider = provider
+        self.max_events = min(max_events or limits["max_events"], limits["max_events"])
+        self.max_bytes = limits["max_bytes"]
+        if max_bytes and (self.max_bytes is None or max_bytes < self.max_bytes):
+            self.max_bytes = max_bytes
+        self.event_overhead = limits["event_overhead"]
+        self.linger = linger
+        self.sizeof = sizeof or _json_size
+
+        self._events = []
+        self._bytes = 0
+        self._started = None
+
+    @property
+    def pending(self):
+        """int: Number of events waiting in the current batch"""
+        return len(self._events)
+
+    def add(self, event):
+        """
+        Add an event to the current batch
+
+        Args:
+            event (dict): Event to add
+
+        Returns:
+            list: Batches (lists of events) that are ready to be sent
+        """
+        ready = []
+        size = self.sizeof(event) + self.event_overhead
+
+        if self.max_bytes is not None and size > self.max_bytes:
+            logger.warning(f"Dropping event of {size} bytes: exceeds the {self.provider} request limit")
+            return ready
+
+        if self._events and self.max_bytes is not None and self._bytes + size > self.max_bytes:
+            ready.append(self.drain())
+
+        if not self._events:
+            self._started = time.monotonic()
+        self._events.append(event)
+        self._bytes += size
+
+        if len(self._events) >= self.max_events:
+            ready.append(self.drain())
+
+        return ready
+
+    def time_until_due(self, now=None):
+        """
+        Get the time left before the current batch must be sent
+
+        Args:
+            now (float, optional): Current time.monotonic() value
+
+        Returns:
+            float: Seconds until the linger time expires, or None if the batch is empty
+        """
+        if not self._events:
+            return None
+        now = time.monotonic() if now is None else now
+        return max(0.0, self._started + self.linger - now)
+
+    def due(self, now=None):
+        """
+        Check whether the current batch has lingered long enough
+
+        Args:
+            now (float, optional): Current time.monotonic() value
+
+        Returns:
+            bool: True if there are events and the linger time has expired
+        """
+        remaining = self.time_until_due(now)
+        return remaining is not None and remaining <= 0
+
+    def drain(self):
+        """
+        Take the current batch regardless of its size or age
+
+        Returns:
+            list: Events in the batch (possibly empty)
+        """
+        events = self._events
+        self._events = []
+        self._bytes = 0
+        self._started = None
+        return events
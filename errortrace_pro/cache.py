@@ -0,0 +1,98 @@
+"""
+Bounded caches for ErrorTrace Pro
+"""
+import collections
+import threading
+import time
+
+from . import forking
+
+# Returned by LRUCache.get() for a missing key when no default is given
+_MISSING = object()
+
+
+class LRUCache:
+    """
+    Thread-safe least-recently-used cache with a fixed number of entries
+
+    Entries can optionally expire a fixed time after they were stored.
+    """
+
+    def __init__(self, maxsize=1024, ttl=None):
+        """
+        Initialize the cache
+
+        Args:
+            maxsize (int): Maximum number of entries
+            ttl (float, optional): Seconds an entry stays valid (default: no expiry)
+        """
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data = collections.OrderedDict()
+        self._lock = threading.Lock()
+        self._counters = {"hits": 0, "misses": 0, "evictions": 0, "expirations": 0}
+        forking.register(self)
+
+    def __len__(self):
+        return len(self._data)
+
+    def get(self, key, default=None):
+        """
+        Get a cached value and mark it as recently used
+
+        Args:
+            key: Cache key
+            default: Value returned when the key isn't cached
+
+        Returns:
+            The cached value, or default
+        """
+        with self._lock:
+            entry = self._data.get(key, _MISSING)
+            if entry is not _MISSING and entry[1] is not None and entry[1] <= time.monotonic():
+                del self._data[key]
+                self._counters["expirations"] += 1
+                entry = _MISSING
+            if entry is _MISSING:
+                self._counters["misses"] += 1
+                return default
+            self._data.move_to_end(key)
+            self._counters["hits"] += 1
+            return entry[0]
+
+    def put(self, key, value):
+        """
+        Cache a value, evicting the least recently used entries beyond maxsize
+
+        Args:
+            key: Cache key
+            value: Value to cache
+        """
+        expires = time.monotonic() + self.ttl if self.ttl is not None else None
+        with self._lock:
+            self._data[key] = (value, expires)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+                self._counters["evictions"] += 1
+
+    def clear(self):
+        """Remove every entry"""
+        with self._lock:
+            self._data.clear()
+
+    def _after_fork(self):
+        """Replace the lock in a forked child; the entries stay valid"""
+        self._lock = threading.Lock()
+
+    def stats(self):
+        """
+        Get cache counters
+
+        Returns:
+            dict: hits, misses, evictions, expirations and current size
+        """
+        with self._lock:
+            stats = dict(self._counters)
+            stats["size"] = len(self._data)
+        return stats
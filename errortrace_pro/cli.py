@@ -7,6 +7,8 @@ import logging
 import traceback
 import json
 import importlib
+import signal
+import time
 from importlib.machinery import SourceFileLoader
 
 try:
@@ -17,9 +19,60 @@ except ImportError:
 from .handler import ExceptionHandler
 from .solutions import SolutionProvider
 from .cloud_logger import CloudLogger
+from .forwarding import default_collector_address
 
 logger = logging.getLogger(__name__)
 
+
+def _serve(listen, provider, endpoint, api_key, project_id, dedup_window, spool_dir, echo):
+    """
+    Run a local collector until interrupted
+    
+    Processes on this host send their events to it with provider="local";
+    it batches them into one connection to the cloud provider.
+    
+    Args:
+        listen (str): Collector address (unix:///path, tcp://host:port or udp://host:port)
+        provider (str): Cloud provider the collected events are sent to
+        endpoint (str): HTTP endpoint for logging
+        api_key (str): API key for cloud provider
+        project_id (str): Project ID (for GCP)
+        dedup_window (float): Seconds between summaries of a repeated error
+        spool_dir (str): Directory for events the provider doesn't accept
+        echo (callable): Prints a line of output
+    """
+    from .forwarding import EventCollector
+    
+    if endpoint:
+        os.environ["ERRORTRACE_ENDPOINT"] = endpoint
+    
+    cloud_logger = CloudLogger(
+        provider=provider,
+        api_key=api_key,
+        project_id=project_id,
+        async_delivery=True,
+        spool_dir=spool_dir,
+        # The collector is where forwarded events end up
+        forward_to=False
+    )
+    collector = EventCollector(cloud_logger, address=listen, dedup_window=dedup_window)
+    
+    # Shut down cleanly when a service manager stops the collector
+    signal.signal(signal.SIGTERM, lambda signum, frame: sys.exit(0))
+    try:
+        collector.start()
+        echo(f"Collecting events on {collector.address} for {cloud_logger.provider}")
+        while True:
+            time.sleep(1)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        collector.close()
+        cloud_logger.close(timeout=5)
+        stats = collector.stats()
+        echo(f"Received {stats['received']} events, delivered {stats['delivered']}, "
+             f"dropped {stats['duplicates']} duplicates, suppressed {stats['suppressed']} repeats")
+
 # Check if click is available, otherwise define a basic CLI
 if click:
     @click.group()
@@ -31,14 +84,16 @@ if click:
     @cli.command()
     @click.argument('script', type=click.Path(exists=True))
     @click.option('--cloud', is_flag=True, help='Enable cloud logging')
-    @click.option('--provider', type=click.Choice(['http', 'gcp', 'aws', 'azure']),
+    @click.option('--provider', type=click.Choice(['http', 'gcp', 'aws', 'azure', 'local']),
                   default='http', help='Cloud logging provider')
-    @click.option('--endpoint', help='HTTP endpoint for logging')
+    @click.option('--endpoint', help='HTTP endpoint for logging (collector address for local)')
     @click.option('--api-key', help='API key for cloud provider')
     @click.option('--project-id', help='Project ID (for GCP)')
     @click.option('--solutions', type=click.Path(exists=True), help='Custom solutions JSON file')
     @click.option('--no-color', is_flag=True, help='Disable colored output')
-    def run(script, cloud, provider, endpoint, api_key, project_id, solutions, no_color):
+    @click.option('--format', 'output_format', type=click.Choice(['console', 'json']),
+                  default='console', help='Error output format')
+    def run(script, cloud, provider, endpoint, api_key, project_id, solutions, no_color, output_format):
         """Run a Python script with ErrorTrace Pro error handling"""
         # Set up the environment variables for cloud logging
         if cloud:
@@ -57,7 +112,8 @@ if click:
             cloud_provider=provider,
             api_key=api_key,
             project_id=project_id,
-            colored_output=not no_color
+            colored_output=not no_color,
+            output_format=output_format
         )
         
         # Set up exception hook
@@ -103,6 +159,53 @@ if click:
         else:
             click.echo(json.dumps(solutions, indent=2))
     
+    @cli.command()
+    @click.option('--spool-dir', type=click.Path(), envvar='ERRORTRACE_SPOOL_DIR',
+                  required=True, help='Spool directory to replay')
+    @click.option('--provider', type=click.Choice(['http', 'gcp', 'aws', 'azure']),
+                  default='http', help='Cloud logging provider')
+    @click.option('--endpoint', help='HTTP endpoint for logging')
+    @click.option('--api-key', help='API key for cloud provider')
+    @click.option('--project-id', help='Project ID (for GCP)')
+    def replay(spool_dir, provider, endpoint, api_key, project_id):
+        """Send events left in the spool directory to the cloud provider"""
+        if endpoint:
+            os.environ["ERRORTRACE_ENDPOINT"] = endpoint
+            
+        cloud_logger = CloudLogger(
+            provider=provider,
+            api_key=api_key,
+            project_id=project_id,
+            async_delivery=False,
+            spool_dir=spool_dir,
+            replay_on_start=False
+        )
+        sent = cloud_logger.replay_spool()
+        # Segments other processes are still writing are skipped, not undelivered
+        remaining = cloud_logger.get_stats()["spool"]["undelivered_segments"]
+        cloud_logger.close()
+        
+        click.echo(f"Replayed {sent} events from {spool_dir}")
+        if remaining:
+            click.echo(f"{remaining} segment(s) could not be delivered and remain in the spool")
+            sys.exit(1)
+    
+    @cli.command()
+    @click.option('--listen', default=default_collector_address,
+                  show_default='a socket in the per-user runtime directory',
+                  help='Address to collect events on (unix:///path, tcp://host:port or udp://host:port)')
+    @click.option('--provider', type=click.Choice(['http', 'gcp', 'aws', 'azure']),
+                  default='http', help='Cloud logging provider')
+    @click.option('--endpoint', help='HTTP endpoint for logging')
+    @click.option('--api-key', help='API key for cloud provider')
+    @click.option('--project-id', help='Project ID (for GCP)')
+    @click.option('--dedup-window', type=float, help='Seconds between summaries of a repeated error')
+    @click.option('--spool-dir', type=click.Path(), envvar='ERRORTRACE_SPOOL_DIR',
+                  help='Spool directory for undelivered events')
+    def serve(listen, provider, endpoint, api_key, project_id, dedup_window, spool_dir):
+        """Collect events from local processes and send them to the cloud provider"""
+        _serve(listen, provider, endpoint, api_key, project_id, dedup_window, spool_dir, click.echo)
+    
     def main():
         """Main entry point for the CLI"""
         cli()
@@ -117,14 +220,20 @@ else:
             print("ErrorTrace Pro - Enhanced Exception Handling for Python")
             print("Usage: errortrace run <script> [options]")
             print("       errortrace init-solutions [--output FILE]")
+            print("       errortrace replay --spool-dir=DIR [options]")
+            print("       errortrace serve [--listen=ADDRESS] [options]")
             print("\nOptions:")
             print("  --cloud                  Enable cloud logging")
-            print("  --provider=PROVIDER      Cloud provider (http, gcp, aws, azure)")
+            print("  --provider=PROVIDER      Cloud provider (http, gcp, aws, azure, local)")
             print("  --endpoint=ENDPOINT      HTTP endpoint for logging")
             print("  --api-key=KEY            API key for cloud provider")
             print("  --project-id=ID          Project ID (for GCP)")
             print("  --solutions=FILE         Custom solutions JSON file")
             print("  --no-color               Disable colored output")
+            print("  --format=FORMAT          Error output format (console, json)")
+            print("  --spool-dir=DIR          Spool directory to replay")
+            print("  --listen=ADDRESS         Address to collect events on")
+            print("  --dedup-window=SECONDS   Seconds between summaries of a repeated error")
             return
             
         if args[0] == 'run' and len(args) > 1:
@@ -141,6 +250,7 @@ else:
             project_id = None
             solutions = None
             no_color = '--no-color' in args
+            output_format = 'console'
             
             for arg in args[2:]:
                 if arg.startswith('--provider='):
@@ -153,6 +263,8 @@ else:
                     project_id = arg.split('=')[1]
                 elif arg.startswith('--solutions='):
                     solutions = arg.split('=')[1]
+                elif arg.startswith('--format='):
+                    output_format = arg.split('=')[1]
             
             # Set up the environment variables for cloud logging
             if cloud:
@@ -171,7 +283,8 @@ else:
                 cloud_provider=provider,
                 api_key=api_key,
                 project_id=project_id,
-                colored_output=not no_color
+                colored_output=not no_color,
+                output_format=output_format
             )
             
             # Set up exception hook
@@ -219,6 +332,77 @@ else:
             else:
                 print(json.dumps(solutions, indent=2))
         
+        elif args[0] == 'replay':
+            spool_dir = os.getenv("ERRORTRACE_SPOOL_DIR")
+            provider = 'http'
+            endpoint = None
+            api_key = None
+            project_id = None
+            
+            for arg in args[1:]:
+                if arg.startswith('--spool-dir='):
+                    spool_dir = arg.split('=', 1)[1]
+                elif arg.startswith('--provider='):
+                    provider = arg.split('=')[1]
+                elif arg.startswith('--endpoint='):
+                    endpoint = arg.split('=', 1)[1]
+                elif arg.startswith('--api-key='):
+                    api_key = arg.split('=', 1)[1]
+                elif arg.startswith('--project-id='):
+                    project_id = arg.split('=', 1)[1]
+            
+            if not spool_dir:
+                print("Error: --spool-dir is required")
+                sys.exit(1)
+                
+            if endpoint:
+                os.environ["ERRORTRACE_ENDPOINT"] = endpoint
+                
+            cloud_logger = CloudLogger(
+                provider=provider,
+                api_key=api_key,
+                project_id=project_id,
+                async_delivery=False,
+                spool_dir=spool_dir,
+                replay_on_start=False
+            )
+            sent = cloud_logger.replay_spool()
+            # Segments other processes are still writing are skipped, not undelivered
+            remaining = cloud_logger.get_stats()["spool"]["undelivered_segments"]
+            cloud_logger.close()
+            
+            print(f"Replayed {sent} events from {spool_dir}")
+            if remaining:
+                print(f"{remaining} segment(s) could not be delivered and remain in the spool")
+                sys.exit(1)
+        
+        elif args[0] == 'serve':
+            listen = default_collector_address()
+            provider = 'http'
+            endpoint = None
+            api_key = None
+            project_id = None
+            dedup_window = None
+            spool_dir = os.getenv("ERRORTRACE_SPOOL_DIR")
+            
+            for arg in args[1:]:
+                if arg.startswith('--listen='):
+                    listen = arg.split('=', 1)[1]
+                elif arg.startswith('--provider='):
+                    provider = arg.split('=')[1]
+                elif arg.startswith('--endpoint='):
+                    endpoint = arg.split('=', 1)[1]
+                elif arg.startswith('--api-key='):
+                    api_key = arg.split('=', 1)[1]
+                elif arg.startswith('--project-id='):
+                    project_id = arg.split('=', 1)[1]
+                elif arg.startswith('--dedup-window='):
+                    dedup_window = float(arg.split('=', 1)[1])
+                elif arg.startswith('--spool-dir='):
+                    spool_dir = arg.split('=', 1)[1]
+            
+            _serve(listen, provider, endpoint, api_key, project_id, dedup_window, spool_dir, print)
+        
         else:
             print("Error: Unknown command or missing required argument")
             print("Use 'errortrace --help' for usage information")
@@ -6,17 +6,24 @@ import json
 import logging
 import uuid
 import datetime
-import platform
-import socket
-import sys
-import traceback
+import threading
+import weakref
+import functools
 from urllib.parse import urlparse
-import http.client
-import ssl
-import base64
+
+from .delivery import DeliveryQueue
+from .batching import EventBatcher
+from .spool import Spool
+from .payload import (PROVIDER_ENCODINGS, COMPRESSION_MIN_BYTES, cap_event, compress_body,
+                      provider_event_limit)
+from . import forking, metadata
 
 logger = logging.getLogger(__name__)
 
+# Most requests written on one connection before reading responses, when
+# coroutines log to a generic HTTP endpoint
+PIPELINE_DEPTH = 32
+
 class CloudLogger:
     """
     Log exceptions to cloud services
@@ -26,16 +33,54 @@ class CloudLogger:
     - Google Cloud Logging
     - AWS CloudWatch
     - Azure Application Insights
+    - A local collector (``errortrace serve``) that ships events for every
+      process on the host
     """
     
-    def __init__(self, provider=None, api_key=None, project_id=None):
+    def __init__(self, provider=None, api_key=None, project_id=None,
+                 async_delivery=None, queue_size=None, overflow_policy=None,
+                 block_timeout=0.1, batch_size=None, batch_bytes=None,
+                 batch_linger=None, connection_pool=None, spool_dir=None,
+                 spool_max_bytes=64 * 1024 * 1024, replay_on_start=True, forward_to=None,
+                 compression=None, max_event_bytes=None):
         """
         Initialize the cloud logger
         
         Args:
-            provider (str): Cloud provider ('gcp', 'aws', 'azure', 'http')
+            provider (str): Cloud provider ('gcp', 'aws', 'azure', 'http'), or
+                'local' to write events to a collector at ERRORTRACE_ENDPOINT
+                (default: a socket in the per-user runtime directory, see
+                forwarding.default_collector_address)
             api_key (str): API key for the cloud provider
             project_id (str): Project ID for the cloud provider
+            async_delivery (bool, optional): Queue events and ship them from a
+                background thread instead of blocking the caller
+            queue_size (int, optional): Maximum number of queued events (default: 1000)
+            overflow_policy (str, optional): What to do when the queue is full
+                ('drop_oldest', 'drop_newest' or 'block')
+            block_timeout (float): Seconds to wait for room under the 'block' policy
+            batch_size (int, optional): Maximum events per request when batching
+                (default: provider limit). Set to 1 to disable batching.
+            batch_bytes (int, optional): Maximum request size in bytes when batching
+            batch_linger (float, optional): Seconds to wait for a batch to fill (default: 1.0)
+            connection_pool (ConnectionPool, optional): Keep-alive pool to send
+                requests through; a private pool is created if not given
+            spool_dir (str, optional): Directory where events that can't be
+                delivered (or are dropped from a full queue) are persisted
+            spool_max_bytes (int): Size cap of the spool directory
+            replay_on_start (bool): Replay events left in the spool by earlier
+                processes from a background thread
+            forward_to (str, optional): Address of an EventCollector to hand
+                events to instead of sending them (a Unix socket path, or a
+                unix://, tcp:// or udp:// URL); events are sent directly if
+                the collector can't be reached. Defaults to
+                ERRORTRACE_FORWARD_TO; False never forwards, which is what a
+                collector's own logger needs.
+            compression (str, optional): Compress request bodies with 'gzip'
+                or 'deflate' (Content-Encoding) if the provider accepts it
+            max_event_bytes (int, optional): Size budget per event; larger
+                events lose their visual traceback, locals, middle frames and
+                context, in that order (default and cap: the provider's limit)
         """
         self.provider = provider or os.getenv("ERRORTRACE_PROVIDER", "http")
         self.api_key = api_key or os.getenv("ERRORTRACE_API_KEY")
@@ -44,15 +89,128 @@ class CloudLogger:
         # Get endpoint from environment if needed
         self.endpoint = os.getenv("ERRORTRACE_ENDPOINT")
         
+        self.compression = compression or os.getenv("ERRORTRACE_COMPRESSION") or None
+        if max_event_bytes is None and os.getenv("ERRORTRACE_MAX_EVENT_BYTES"):
+            max_event_bytes = int(os.getenv("ERRORTRACE_MAX_EVENT_BYTES"))
+        self.max_event_bytes = max_event_bytes
+        self._payload_lock = threading.Lock()
+        self._payload_counters = {"truncated": 0, "compressed": 0, "raw_bytes": 0, "sent_bytes": 0}
+        
+        # Worker processes can hand events to a collecting process; children
+        # forked from a process running an EventCollector do so automatically
+        if forward_to is False:
+            self.forward_address = None
+        else:
+            self.forward_address = forward_to or os.getenv("ERRORTRACE_FORWARD_TO")
+        if self.provider == "local":
+            # A collector on this host does the network I/O; handing it an
+            # event is one socket write that never blocks
+            from .forwarding import default_collector_address
+            self.forward_address = self.endpoint or self.forward_address or default_collector_address()
+        self._forwarder = None
+        if self.forward_address:
+            from .forwarding import EventForwarder
+            self._forwarder = EventForwarder(
+                self.forward_address,
+                timeout=0 if self.provider == "local" else 1.0
+            )
+        
         # Validate configuration
         self._validate_config()
+        
+        # Warm the host metadata snapshot off the exception path
+        metadata.prefetch()
+        
+        # Reuse connections across events instead of a handshake per request
+        if connection_pool is None:
+            # http.client and ssl are only imported once a logger is created
+            from .connection_pool import ConnectionPool
+            connection_pool = ConnectionPool()
+        self._pool = connection_pool
+        
+        # Persist undeliverable events to disk if a spool directory is configured
+        spool_dir = spool_dir or os.getenv("ERRORTRACE_SPOOL_DIR")
+        self._spool = Spool(spool_dir, max_bytes=spool_max_bytes) if spool_dir else None
+        
+        # Set up background delivery if requested
+        if async_delivery is None:
+            async_delivery = os.getenv("ERRORTRACE_ASYNC", "").lower() in ("1", "true", "yes")
+        
+        queue_size = queue_size or int(os.getenv("ERRORTRACE_QUEUE_SIZE", "1000"))
+        overflow_policy = overflow_policy or os.getenv("ERRORTRACE_OVERFLOW_POLICY", "drop_oldest")
+        if batch_size is None and os.getenv("ERRORTRACE_BATCH_SIZE"):
+            batch_size = int(os.getenv("ERRORTRACE_BATCH_SIZE"))
+        
+        # Coroutines log through a queue and connection pool per event loop,
+        # created on first use (see alog_exception)
+        self._batch_size = batch_size
+        self._batch_bytes = batch_bytes
+        self._async_options = {
+            "maxsize": queue_size,
+            "overflow_policy": overflow_policy,
+            "block_timeout": block_timeout
+        }
+        self._async_queues = weakref.WeakKeyDictionary()
+        
+        self._queue = None
+        if async_delivery:
+            # Batch events for providers that accept many events per request
+            batcher = None
+            if batch_linger is None:
+                batch_linger = float(os.getenv("ERRORTRACE_BATCH_LINGER", "1.0"))
+            if self.provider in ("gcp", "aws", "azure") and batch_size != 1:
+                batcher = EventBatcher(
+                    self.provider,
+                    max_events=batch_size,
+                    max_bytes=batch_bytes,
+                    linger=batch_linger
+                )
+                
+            self._queue = DeliveryQueue(
+                self._send_batch if batcher else self._send,
+                maxsize=queue_size,
+                overflow_policy=overflow_policy,
+                block_timeout=block_timeout,
+                batcher=batcher,
+                on_drop=self._spool_event if self._spool else None
+            )
+        
+        forking.register(self)
+        
+        # Ship events that earlier processes could not deliver
+        if self._spool is not None and replay_on_start:
+            threading.Thread(
+                target=self.replay_spool,
+                name="errortrace-spool-replay",
+                daemon=True
+            ).start()
     
     def _validate_config(self):
         """Validate cloud logger configuration"""
-        if self.provider not in ["gcp", "aws", "azure", "http"]:
+        if self.provider not in ["gcp", "aws", "azure", "http", "local"]:
             logger.warning(f"Unsupported cloud provider: {self.provider}. Falling back to 'http'")
             self.provider = "http"
             
+        # Keep events within what the provider accepts
+        limit = provider_event_limit(self.provider)
+        if limit and (not self.max_event_bytes or self.max_event_bytes > limit):
+            self.max_event_bytes = limit
+        if self.provider == "local" and self._forwarder.kind == "udp":
+            # The collector only gets events that fit in one datagram,
+            # together with the newline that ends the line
+            from .forwarding import MAX_DATAGRAM
+            if not self.max_event_bytes or self.max_event_bytes > MAX_DATAGRAM - 1:
+                self.max_event_bytes = MAX_DATAGRAM - 1
+            
+        if self.compression and self.compression not in PROVIDER_ENCODINGS.get(self.provider, ()):
+            if self.provider != "local":
+                logger.warning(f"{self.provider} doesn't accept {self.compression} request bodies. "
+                               "Sending them uncompressed.")
+            self.compression = None
+            
+        if self._forwarder is not None:
+            return
+            
         if self.provider != "http" and not self.api_key:
             logger.warning(f"No API key provided for {self.provider}. Cloud logging may not work.")
             
@@ -62,20 +220,152 @@ class CloudLogger:
         if self.provider == "http" and not self.endpoint:
             logger.warning("No HTTP endpoint provided. Cloud logging will be disabled.")
     
-    def log_exception(self, exc_type, exc_value, traceback_str, context=None, visual_traceback=None):
+    def log_exception(self, exc_type, exc_value, traceback_str, context=None, visual_traceback=None,
+                      fingerprint=None, traceback_data=None):
         """
         Log an exception to the configured cloud service
         
         Args:
             exc_type (type): Exception type
-            exc_value (Exception): Exception value
+            exc_value (Exception or str): Exception value, or its message
             traceback_str (list): Traceback string lines
             context (dict): Additional context information
             visual_traceback (str): Visual representation of the traceback
+            fingerprint (str, optional): Exception fingerprint for grouping
+            traceback_data (dict, optional): Structured traceback (frames, chained
+                exceptions, locals and suggestions), sent in place of a visual one
+            
+        Returns:
+            bool: True if logging was successful, False otherwise
+        """
+        if not self._can_log():
+            return False
+        
+        # Prepare the error data
+        error_data = self._prepare_error_data(
+            exc_type, exc_value, traceback_str, context, visual_traceback, traceback_data
+        )
+        if fingerprint:
+            error_data["fingerprint"] = fingerprint
+        
+        return self._dispatch(error_data)
+    
+    def log_summary(self, summary):
+        """
+        Log a duplicate-occurrence summary ("seen N times since T")
+        
+        Args:
+            summary (dict): Summary from DuplicateAggregator
+            
+        Returns:
+            bool: True if logging was successful, False otherwise
+        """
+        if not self._can_log():
+            return False
+        
+        return self._dispatch(self._prepare_summary_data(summary))
+    
+    async def alog_exception(self, exc_type, exc_value, traceback_str, context=None, visual_traceback=None,
+                             fingerprint=None, traceback_data=None):
+        """
+        Log an exception from a coroutine without waiting for the provider
+        
+        The event is queued for a task on the running event loop, which
+        sends everything that queued up while its previous request was in
+        flight, batched for GCP, AWS and Azure and pipelined on one
+        keep-alive connection for HTTP endpoints. A slow endpoint therefore
+        delays delivery, not the caller. Await aflush() before the loop
+        stops; events still queued when the loop cancels the task are
+        spooled if a spool directory is configured. Like log_exception(),
+        the event goes to the collector instead when forwarding is set up.
+        
+        Args:
+            exc_type (type): Exception type
+            exc_value (Exception or str): Exception value, or its message
+            traceback_str (list): Traceback string lines
+            context (dict): Additional context information
+            visual_traceback (str): Visual representation of the traceback
+            fingerprint (str, optional): Exception fingerprint for grouping
+            traceback_data (dict, optional): Structured traceback
+            
+        Returns:
+            bool: True if the event was queued, False otherwise
+        """
+        if not self._can_log():
+            return False
+        
+        error_data = self._prepare_error_data(
+            exc_type, exc_value, traceback_str, context, visual_traceback, traceback_data
+        )
+        if fingerprint:
+            error_data["fingerprint"] = fingerprint
+        
+        return await self._adispatch(error_data)
+    
+    async def alog_summary(self, summary):
+        """
+        Log a duplicate-occurrence summary from a coroutine (see alog_exception)
+        
+        Args:
+            summary (dict): Summary from DuplicateAggregator
+            
+        Returns:
+            bool: True if the summary was queued, False otherwise
+        """
+        if not self._can_log():
+            return False
+        
+        return await self._adispatch(self._prepare_summary_data(summary))
+    
+    def _prepare_summary_data(self, summary):
+        """
+        Prepare a duplicate-occurrence summary for logging
+        
+        Args:
+            summary (dict): Summary from DuplicateAggregator
+            
+        Returns:
+            dict: Formatted summary data
+        """
+        system_info = metadata.get_metadata()
+        error_data = dict(summary)
+        error_data.update({
+            "error_id": str(uuid.uuid4()),
+            "event_type": "summary",
+            "timestamp": datetime.datetime.now().isoformat(),
+            "traceback": [],
+            "system": {
+                "hostname": system_info["hostname"],
+                "ip_address": system_info["ip_address"],
+                "pid": system_info["pid"],
+                "python_version": system_info["python_version"],
+                "platform": system_info["platform"],
+                "system": system_info["system"],
+                "processor": system_info["processor"]
+            }
+        })
+        return error_data
+    
+    def log_event(self, error_data):
+        """
+        Log error data that was already prepared, e.g. by a worker process
+        that forwarded it to an EventCollector
+        
+        Args:
+            error_data (dict): Prepared error data
             
         Returns:
             bool: True if logging was successful, False otherwise
         """
+        if not self._can_log():
+            return False
+        return self._dispatch(self._cap_event(error_data))
+    
+    def _can_log(self):
+        """Check that the provider is configured well enough to send events"""
+        if self._forwarder is not None:
+            return True
+        
         if not self.api_key and self.provider != "http":
             logger.warning("No API key provided. Skipping cloud logging.")
             return False
@@ -84,29 +374,387 @@ class CloudLogger:
             logger.warning("No HTTP endpoint provided. Skipping cloud logging.")
             return False
         
-        # Prepare the error data
-        error_data = self._prepare_error_data(exc_type, exc_value, traceback_str, context, visual_traceback)
+        return True
+    
+    def _dispatch(self, error_data):
+        """
+        Send prepared error data now, or queue it when async delivery is enabled
+        
+        Args:
+            error_data (dict): Error data to log
+            
+        Returns:
+            bool: True if sent (or queued), False otherwise
+        """
+        if self._forwarder is not None:
+            if self._forwarder.send(error_data):
+                return True
+            if self.provider == "local":
+                # There is nothing to send to but the collector
+                self._spool_event(error_data)
+                return False
+        
+        if self._queue is not None:
+            return self._queue.put(error_data)
+            
+        return self._send(error_data)
+    
+    async def _adispatch(self, error_data):
+        """
+        Forward prepared error data to a collector, or queue it on the running
+        event loop (the coroutine counterpart of _dispatch)
         
-        # Log to the appropriate provider
+        Args:
+            error_data (dict): Error data to log
+            
+        Returns:
+            bool: True if forwarded (or queued), False otherwise
+        """
+        if self._forwarder is not None:
+            if self._forwarder.timeout:
+                # Connecting or writing may block, which mustn't stall the loop
+                import asyncio
+                sent = await asyncio.get_running_loop().run_in_executor(
+                    None, self._forwarder.send, error_data
+                )
+            else:
+                sent = self._forwarder.send(error_data)
+            if sent:
+                return True
+            if self.provider == "local":
+                # There is nothing to send to but the collector
+                self._spool_event(error_data)
+                return False
+        
+        return await self._async_queue().put(error_data)
+    
+    def flush(self, timeout=None):
+        """
+        Wait for queued events to be delivered
+        
+        Args:
+            timeout (float, optional): Maximum seconds to wait
+            
+        Returns:
+            bool: True if nothing is left pending
+        """
+        if self._queue is None:
+            return True
+        return self._queue.flush(timeout)
+    
+    def close(self, timeout=None):
+        """
+        Deliver pending events and stop the background worker
+        
+        Args:
+            timeout (float, optional): Maximum seconds to wait
+        """
+        if self._queue is not None:
+            self._queue.close(timeout)
+        if self._spool is not None:
+            self._spool.close()
+        if self._forwarder is not None:
+            self._forwarder.close()
+        self._pool.close()
+    
+    async def aflush(self, timeout=None):
+        """
+        Wait for events queued by coroutines on the running loop to be delivered
+        
+        Args:
+            timeout (float, optional): Maximum seconds to wait
+            
+        Returns:
+            bool: True if nothing is left pending
+        """
+        import asyncio
+        queue = self._async_queues.get(asyncio.get_running_loop())
+        if queue is None:
+            return True
+        return await queue.flush(timeout)
+    
+    async def aclose(self, timeout=None):
+        """
+        Deliver events queued on the running loop, stop its delivery task and
+        close its connections
+        
+        Args:
+            timeout (float, optional): Maximum seconds to wait
+        """
+        import asyncio
+        queue = self._async_queues.pop(asyncio.get_running_loop(), None)
+        if queue is not None:
+            await queue.close(timeout)
+            queue.pool.close()
+    
+    def replay_spool(self):
+        """
+        Send events persisted in the spool directory
+        
+        Replayed events are not spooled again if delivery fails; they stay
+        in the spool for the next attempt.
+        
+        Returns:
+            int: Number of events delivered
+        """
+        if self._spool is None:
+            return 0
+        try:
+            return self._spool.replay(self._deliver_replayed)
+        except Exception as e:
+            logger.error(f"Error replaying spooled events: {e}")
+            return 0
+    
+    def get_stats(self):
+        """
+        Get delivery statistics
+        
+        Returns:
+            dict: Queue counters (enqueued, delivered, failed, dropped_*, pending)
+                when async delivery is enabled, plus spool counters under 'spool'
+                and truncation and compression counters under 'payload'
+        """
+        stats = self._queue.stats() if self._queue is not None else {}
+        if self._async_queues:
+            # Totals over the event loops coroutines have logged from
+            async_stats = {}
+            for queue in list(self._async_queues.values()):
+                counters = queue.stats()
+                counters["connections"] = queue.pool.stats()
+                for name, value in counters.items():
+                    if isinstance(value, dict):
+                        totals = async_stats.setdefault(name, {})
+                        for key, count in value.items():
+                            totals[key] = totals.get(key, 0) + count
+                    else:
+                        async_stats[name] = async_stats.get(name, 0) + value
+            stats["async"] = async_stats
+        if self._forwarder is not None:
+            stats["forwarding"] = self._forwarder.stats()
+        if self._spool is not None:
+            stats["spool"] = self._spool.stats()
+        with self._payload_lock:
+            stats["payload"] = dict(self._payload_counters)
+        return stats
+    
+    def _after_fork(self):
+        """
+        Drop the parent's event loop queues in a forked child, and forward
+        to the parent if it runs an EventCollector
+        """
+        self._async_queues = weakref.WeakKeyDictionary()
+        self._payload_lock = threading.Lock()
+        self._payload_counters = dict.fromkeys(self._payload_counters, 0)
+        if self.forward_address and self._forwarder is None:
+            from .forwarding import EventForwarder
+            self._forwarder = EventForwarder(self.forward_address)
+    
+    def _send(self, error_data):
+        """
+        Deliver an event, spooling it to disk if delivery fails
+        
+        Args:
+            error_data (dict): Error data to log
+            
+        Returns:
+            bool: True if delivered, False otherwise
+        """
+        success = self._deliver(error_data)
+        if not success:
+            self._spool_event(error_data)
+        return success
+    
+    def _send_batch(self, events):
+        """
+        Deliver a batch of events, spooling them to disk if delivery fails
+        
+        Args:
+            events (list): Error data dicts to log
+            
+        Returns:
+            bool: True if delivered, False otherwise
+        """
+        success = self._deliver_batch(events)
+        if not success:
+            for error_data in events:
+                self._spool_event(error_data)
+        return success
+    
+    def _spool_event(self, error_data):
+        """
+        Persist an undeliverable event to the spool directory
+        
+        Args:
+            error_data (dict): Error data to persist
+        """
+        if self._spool is not None:
+            self._spool.append(error_data)
+    
+    def _deliver_replayed(self, events):
+        """
+        Deliver events read back from the spool within the provider's request limits
+        
+        Args:
+            events (list): Error data dicts to log
+            
+        Returns:
+            bool: True if every event was delivered
+        """
+        for batch in self._provider_batches(events):
+            if not self._deliver_batch(batch):
+                return False
+        return True
+    
+    def _provider_batches(self, events, max_events=None, max_bytes=None):
+        """
+        Split events into batches within the provider's request limits
+        
+        Args:
+            events (list): Error data dicts to log
+            max_events (int, optional): Maximum events per batch
+            max_bytes (int, optional): Maximum bytes per batch
+            
+        Returns:
+            list: Lists of error data dicts, one per request
+        """
+        batcher = EventBatcher(self.provider, max_events=max_events, max_bytes=max_bytes, linger=0)
+        batches = []
+        for error_data in events:
+            batches.extend(batcher.add(error_data))
+        if batcher.pending:
+            batches.append(batcher.drain())
+        return batches
+    
+    def _async_queue(self):
+        """
+        Get the delivery queue of the running event loop, creating it and its
+        connection pool on first use
+        
+        Returns:
+            AsyncDeliveryQueue: Queue drained by a task on the running loop
+        """
+        # asyncio and the transport are only imported once a coroutine logs
+        import asyncio
+        from .async_transport import AsyncConnectionPool, AsyncDeliveryQueue
+        
+        loop = asyncio.get_running_loop()
+        queue = self._async_queues.get(loop)
+        if queue is None:
+            if self.provider == "http":
+                max_batch = PIPELINE_DEPTH
+            else:
+                max_batch = EventBatcher(self.provider, max_events=self._batch_size).max_events
+            pool = AsyncConnectionPool(timeout=self._pool.timeout)
+            queue = AsyncDeliveryQueue(
+                functools.partial(self._asend_batch, pool),
+                max_batch=max_batch,
+                on_drop=self._spool_event if self._spool else None,
+                **self._async_options
+            )
+            queue.pool = pool
+            self._async_queues[loop] = queue
+        return queue
+    
+    async def _asend_batch(self, pool, events):
+        """
+        Deliver events from a coroutine, spooling the ones that fail
+        
+        GCP, AWS and Azure get one request per provider-sized batch; HTTP
+        endpoints one per event. The requests are pipelined on one
+        connection.
+        
+        Args:
+            pool (AsyncConnectionPool): Connections of the running loop
+            events (list): Error data dicts to log
+            
+        Returns:
+            bool: True if every event was delivered
+        """
+        batches = self._provider_batches(events, self._batch_size, self._batch_bytes)
+        
+        requests = []
+        success = True
+        for batch in batches:
+            try:
+                label, request = self._provider_request(batch if self.provider != "http" else batch[0])
+            except Exception as e:
+                logger.error(f"Error preparing cloud log request: {e}")
+                request = None
+            if request is None:
+                success = False
+                for error_data in batch:
+                    self._spool_event(error_data)
+            else:
+                requests.append((batch, self._compress_request(request)))
+        if not requests:
+            return success
+        
+        scheme, host = requests[0][1][:2]
+        try:
+            responses = await pool.pipeline(scheme, host, [
+                ("POST", path, body, headers) for _, (_, _, path, body, headers) in requests
+            ])
+        except Exception as e:
+            logger.error(f"Error logging to {label}: {e!r}")
+            responses = [None] * len(requests)
+        
+        for (batch, _), response in zip(requests, responses):
+            if response is None or not self._check_response(label, response):
+                success = False
+                for error_data in batch:
+                    self._spool_event(error_data)
+        return success
+    
+    def _deliver(self, error_data):
+        """
+        Send prepared error data to the configured provider
+        
+        Args:
+            error_data (dict): Error data to log
+            
+        Returns:
+            bool: True if successful, False otherwise
+        """
         if self.provider == "gcp":
             return self._log_to_gcp(error_data)
         elif self.provider == "aws":
             return self._log_to_aws(error_data)
         elif self.provider == "azure":
             return self._log_to_azure(error_data)
+        elif self.provider == "local":
+            return self._forwarder.send(error_data)
         else:  # http
             return self._log_to_http(error_data)
     
-    def _prepare_error_data(self, exc_type, exc_value, traceback_str, context=None, visual_traceback=None):
+    def _deliver_batch(self, events):
+        """
+        Send a batch of prepared error data in as few requests as possible
+        
+        Args:
+            events (list): Error data dicts to log
+            
+        Returns:
+            bool: True if successful, False otherwise
+        """
+        if self.provider in ("gcp", "aws", "azure"):
+            return self._deliver(events)
+        
+        # Generic HTTP endpoints take one event per request
+        results = [self._deliver(error_data) for error_data in events]
+        return all(results)
+    
+    def _prepare_error_data(self, exc_type, exc_value, traceback_str, context=None, visual_traceback=None,
+                            traceback_data=None):
         """
         Prepare the error data for logging
         
         Args:
             exc_type (type): Exception type
-            exc_value (Exception): Exception value
+            exc_value (Exception or str): Exception value, or its message
             traceback_str (list): Traceback string lines
             context (dict): Additional context information
             visual_traceback (str): Visual representation of the traceback
+            traceback_data (dict, optional): Structured traceback
             
         Returns:
             dict: Formatted error data
@@ -114,9 +762,8 @@ class CloudLogger:
         # Generate a unique error ID
         error_id = str(uuid.uuid4())
         
-        # Get basic system information
-        hostname = socket.gethostname()
-        ip_address = socket.gethostbyname(hostname)
+        # Get basic system information from the cached snapshot (no DNS lookup here)
+        system_info = metadata.get_metadata()
         
         # Create the error data structure
         error_data = {
@@ -129,16 +776,19 @@ class CloudLogger:
             },
             "traceback": traceback_str if isinstance(traceback_str, list) else traceback_str.split("\n"),
             "system": {
-                "hostname": hostname,
-                "ip_address": ip_address,
-                "python_version": platform.python_version(),
-                "platform": platform.platform(),
-                "system": platform.system(),
-                "processor": platform.processor()
+                "hostname": system_info["hostname"],
+                "ip_address": system_info["ip_address"],
+                "pid": system_info["pid"],
+                "python_version": system_info["python_version"],
+                "platform": system_info["platform"],
+                "system": system_info["system"],
+                "processor": system_info["processor"]
             }
         }
         
-        # Add the visual traceback if provided
+        # Add the structured and visual tracebacks if provided
+        if traceback_data:
+            error_data["traceback_data"] = traceback_data
         if visual_traceback:
             error_data["visual_traceback"] = visual_traceback
             
@@ -146,7 +796,50 @@ class CloudLogger:
         if context:
             error_data["context"] = context
             
-        return error_data
+        return self._cap_event(error_data)
+    
+    def _cap_event(self, error_data):
+        """
+        Truncate an event that is over the size budget
+        
+        Args:
+            error_data (dict): Error data to log
+            
+        Returns:
+            dict: The error data, or a truncated copy recording what was removed
+        """
+        capped = cap_event(error_data, self.max_event_bytes)
+        if capped is not error_data:
+            with self._payload_lock:
+                self._payload_counters["truncated"] += 1
+        return capped
+    
+    def _compress_request(self, request):
+        """
+        Compress a request body if compression is enabled
+        
+        Args:
+            request (tuple): (scheme, host, path, body, headers)
+            
+        Returns:
+            tuple: The request with a compressed body and Content-Encoding
+                header, or unchanged
+        """
+        if self.compression is None:
+            return request
+        
+        scheme, host, path, body, headers = request
+        if isinstance(body, str):
+            body = body.encode("utf-8")
+        if len(body) < COMPRESSION_MIN_BYTES:
+            return scheme, host, path, body, headers
+        
+        compressed = compress_body(body, self.compression)
+        with self._payload_lock:
+            self._payload_counters["compressed"] += 1
+            self._payload_counters["raw_bytes"] += len(body)
+            self._payload_counters["sent_bytes"] += len(compressed)
+        return scheme, host, path, compressed, dict(headers, **{"Content-Encoding": self.compression})
     
     def _log_to_http(self, error_data):
         """
@@ -158,249 +851,286 @@ class CloudLogger:
         Returns:
             bool: True if successful, False otherwise
         """
-        if not self.endpoint:
-            return False
-            
-        try:
-            # Parse the endpoint URL
-            url = urlparse(self.endpoint)
-            
-            # Determine whether to use HTTPS
-            use_https = url.scheme == "https"
-            
-            # Create the appropriate connection
-            if use_https:
-                conn = http.client.HTTPSConnection(url.netloc)
-            else:
-                conn = http.client.HTTPConnection(url.netloc)
-                
-            # Prepare headers
-            headers = {
-                "Content-Type": "application/json"
-            }
-            
-            # Add authorization if API key is provided
-            if self.api_key:
-                headers["Authorization"] = f"Bearer {self.api_key}"
-                
-            # Send the request
-            conn.request(
-                "POST",
-                url.path or "/",
-                body=json.dumps(error_data),
-                headers=headers
-            )
-            
-            # Get the response
-            response = conn.getresponse()
-            
-            # Check if it was successful
-            success = 200 <= response.status < 300
-            
-            if not success:
-                logger.warning(f"Failed to log to HTTP endpoint: {response.status} {response.reason}")
-                
-            conn.close()
-            return success
-            
-        except Exception as e:
-            logger.error(f"Error logging to HTTP endpoint: {e}")
-            return False
+        return self._post("HTTP endpoint", self._http_request, error_data)
     
     def _log_to_gcp(self, error_data):
         """
         Log error to Google Cloud Logging
         
         Args:
-            error_data (dict): Error data to log
+            error_data (dict or list): Error data to log, or a batch of them
             
         Returns:
             bool: True if successful, False otherwise
         """
-        if not self.api_key or not self.project_id:
-            return False
-            
-        try:
-            # GCP Cloud Logging API endpoint
-            endpoint = f"logging.googleapis.com"
+        return self._post("GCP", self._gcp_request, error_data)
+    
+    def _log_to_aws(self, error_data):
+        """
+        Log error to AWS CloudWatch
+        
+        Args:
+            error_data (dict or list): Error data to log, or a batch of them
             
-            # Create HTTPS connection
-            conn = http.client.HTTPSConnection(endpoint)
+        Returns:
+            bool: True if successful, False otherwise
+        """
+        return self._post("AWS", self._aws_request, error_data)
+    
+    def _log_to_azure(self, error_data):
+        """
+        Log error to Azure Application Insights
+        
+        Args:
+            error_data (dict or list): Error data to log, or a batch of them
             
-            # Format the data for Cloud Logging
-            log_entry = {
-                "entries": [{
-                    "logName": f"projects/{self.project_id}/logs/errortrace-pro",
-                    "severity": "ERROR",
-                    "jsonPayload": error_data
-                }]
-            }
+        Returns:
+            bool: True if successful, False otherwise
+        """
+        return self._post("Azure", self._azure_request, error_data)
+    
+    def _post(self, label, build_request, error_data):
+        """
+        Send one provider request over a pooled connection
+        
+        Args:
+            label (str): Provider name used in log messages
+            build_request (callable): Builds the request for the error data
+            error_data (dict or list): Error data to log, or a batch of them
             
-            # Prepare headers
-            headers = {
-                "Content-Type": "application/json",
-                "Authorization": f"Bearer {self.api_key}"
-            }
+        Returns:
+            bool: True if successful, False otherwise
+        """
+        try:
+            request = build_request(error_data)
+            if request is None:
+                return False
             
-            # Send the request
-            conn.request(
-                "POST",
-                f"/v2/entries:write",
-                body=json.dumps(log_entry),
-                headers=headers
-            )
+            scheme, host, path, body, headers = self._compress_request(request)
+            response = self._pool.request(scheme, host, "POST", path, body=body, headers=headers)
+            return self._check_response(label, response)
             
-            # Get the response
-            response = conn.getresponse()
+        except Exception as e:
+            logger.error(f"Error logging to {label}: {e}")
+            return False
+    
+    def _check_response(self, label, response):
+        """
+        Check whether a provider accepted a request
+        
+        Args:
+            label (str): Provider name used in log messages
+            response (PooledResponse): Provider response
             
-            # Check if it was successful
-            success = 200 <= response.status < 300
+        Returns:
+            bool: True if the status is 2xx
+        """
+        success = 200 <= response.status < 300
+        
+        if not success:
+            logger.warning(f"Failed to log to {label}: {response.status} {response.reason}")
             
-            if not success:
-                logger.warning(f"Failed to log to GCP: {response.status} {response.reason}")
-                
-            conn.close()
-            return success
+        return success
+    
+    def _provider_request(self, error_data):
+        """
+        Build the request for the configured provider
+        
+        Args:
+            error_data (dict or list): Error data to log, or a batch of them
             
-        except Exception as e:
-            logger.error(f"Error logging to GCP: {e}")
-            return False
+        Returns:
+            tuple: (label, request) where request is (scheme, host, path,
+                body, headers), or None if the provider isn't configured
+        """
+        if self.provider == "gcp":
+            return "GCP", self._gcp_request(error_data)
+        elif self.provider == "aws":
+            return "AWS", self._aws_request(error_data)
+        elif self.provider == "azure":
+            return "Azure", self._azure_request(error_data)
+        else:  # http
+            return "HTTP endpoint", self._http_request(error_data)
     
-    def _log_to_aws(self, error_data):
+    def _http_request(self, error_data):
         """
-        Log error to AWS CloudWatch
+        Build the request for a generic HTTP endpoint
         
         Args:
             error_data (dict): Error data to log
             
         Returns:
-            bool: True if successful, False otherwise
+            tuple: (scheme, host, path, body, headers), or None without an endpoint
         """
-        if not self.api_key:
-            return False
+        if not self.endpoint:
+            return None
             
-        try:
-            # AWS CloudWatch Logs endpoint
-            endpoint = "logs.amazonaws.com"
-            
-            # Create HTTPS connection
-            conn = http.client.HTTPSConnection(endpoint)
-            
-            # Format the data for CloudWatch
-            log_event = {
-                "logGroupName": "errortrace-pro",
-                "logStreamName": f"errors-{datetime.datetime.now().strftime('%Y-%m-%d')}",
-                "logEvents": [
-                    {
-                        "timestamp": int(datetime.datetime.now().timestamp() * 1000),
-                        "message": json.dumps(error_data)
-                    }
-                ]
-            }
+        # Parse the endpoint URL
+        url = urlparse(self.endpoint)
+        
+        # Determine whether to use HTTPS
+        scheme = "https" if url.scheme == "https" else "http"
             
-            # Prepare headers
-            headers = {
-                "Content-Type": "application/json",
-                "X-Amz-Target": "Logs_20140328.PutLogEvents",
-                "Authorization": f"Bearer {self.api_key}"
-            }
+        # Prepare headers
+        headers = {
+            "Content-Type": "application/json"
+        }
+        
+        # Add authorization if API key is provided
+        if self.api_key:
+            headers["Authorization"] = f"Bearer {self.api_key}"
             
-            # Send the request
-            conn.request(
-                "POST",
-                "/",
-                body=json.dumps(log_event),
-                headers=headers
-            )
+        return scheme, url.netloc, url.path or "/", json.dumps(error_data), headers
+    
+    def _gcp_request(self, error_data):
+        """
+        Build the request for Google Cloud Logging
+        
+        Args:
+            error_data (dict or list): Error data to log, or a batch of them
             
-            # Get the response
-            response = conn.getresponse()
+        Returns:
+            tuple: (scheme, host, path, body, headers), or None without credentials
+        """
+        if not self.api_key or not self.project_id:
+            return None
             
-            # Check if it was successful
-            success = 200 <= response.status < 300
+        # Format the data for Cloud Logging
+        events = error_data if isinstance(error_data, list) else [error_data]
+        log_entry = {
+            "logName": f"projects/{self.project_id}/logs/errortrace-pro",
+            "entries": [
+                {
+                    "severity": "ERROR",
+                    "jsonPayload": event
+                }
+                for event in events
+            ]
+        }
+        
+        # Prepare headers
+        headers = {
+            "Content-Type": "application/json",
+            "Authorization": f"Bearer {self.api_key}"
+        }
+        
+        # GCP Cloud Logging API endpoint
+        return "https", "logging.googleapis.com", "/v2/entries:write", json.dumps(log_entry), headers
+    
+    def _aws_request(self, error_data):
+        """
+        Build the request for AWS CloudWatch
+        
+        Args:
+            error_data (dict or list): Error data to log, or a batch of them
             
-            if not success:
-                logger.warning(f"Failed to log to AWS: {response.status} {response.reason}")
-                
-            conn.close()
-            return success
+        Returns:
+            tuple: (scheme, host, path, body, headers), or None without an API key
+        """
+        if not self.api_key:
+            return None
             
-        except Exception as e:
-            logger.error(f"Error logging to AWS: {e}")
-            return False
+        # Format the data for CloudWatch (events must be in chronological order)
+        events = error_data if isinstance(error_data, list) else [error_data]
+        log_events = sorted(
+            (
+                {
+                    "timestamp": self._timestamp_millis(event),
+                    "message": json.dumps(event)
+                }
+                for event in events
+            ),
+            key=lambda log_event: log_event["timestamp"]
+        )
+        log_event = {
+            "logGroupName": "errortrace-pro",
+            "logStreamName": f"errors-{datetime.datetime.now().strftime('%Y-%m-%d')}",
+            "logEvents": log_events
+        }
+        
+        # Prepare headers
+        headers = {
+            "Content-Type": "application/json",
+            "X-Amz-Target": "Logs_20140328.PutLogEvents",
+            "Authorization": f"Bearer {self.api_key}"
+        }
+        
+        # AWS CloudWatch Logs endpoint
+        return "https", "logs.amazonaws.com", "/", json.dumps(log_event), headers
     
-    def _log_to_azure(self, error_data):
+    def _azure_request(self, error_data):
         """
-        Log error to Azure Application Insights
+        Build the request for Azure Application Insights
         
         Args:
-            error_data (dict): Error data to log
+            error_data (dict or list): Error data to log, or a batch of them
             
         Returns:
-            bool: True if successful, False otherwise
+            tuple: (scheme, host, path, body, headers), or None without an API key
         """
         if not self.api_key:
-            return False
+            return None
             
-        try:
-            # Azure Application Insights endpoint
-            endpoint = "dc.services.visualstudio.com"
-            
-            # Create HTTPS connection
-            conn = http.client.HTTPSConnection(endpoint)
-            
-            # Format the data for Application Insights
-            app_insights_data = {
-                "name": "Microsoft.ApplicationInsights.Exception",
-                "time": datetime.datetime.now().isoformat(),
-                "iKey": self.api_key,
-                "data": {
-                    "baseType": "ExceptionData",
-                    "baseData": {
-                        "ver": 2,
-                        "exceptions": [
-                            {
-                                "typeName": error_data["exception"]["type"],
-                                "message": error_data["exception"]["message"],
-                                "hasFullStack": True,
-                                "stack": "\n".join(error_data["traceback"]) if isinstance(error_data["traceback"], list) else error_data["traceback"]
-                            }
-                        ],
-                        "properties": {
-                            "error_id": error_data["error_id"],
-                            "python_version": error_data["system"]["python_version"],
-                            "platform": error_data["system"]["platform"]
+        # Format the data for Application Insights (the track endpoint accepts an array)
+        events = error_data if isinstance(error_data, list) else [error_data]
+        app_insights_data = [self._azure_envelope(event) for event in events]
+        
+        # Prepare headers
+        headers = {
+            "Content-Type": "application/json",
+            "Accept": "application/json"
+        }
+        
+        # Azure Application Insights endpoint
+        return "https", "dc.services.visualstudio.com", "/v2/track", json.dumps(app_insights_data), headers
+    
+    def _azure_envelope(self, event):
+        """
+        Build an Application Insights exception envelope for an event
+        
+        Args:
+            event (dict): Error data to log
+            
+        Returns:
+            dict: Telemetry envelope
+        """
+        return {
+            "name": "Microsoft.ApplicationInsights.Exception",
+            "time": event.get("timestamp") or datetime.datetime.now().isoformat(),
+            "iKey": self.api_key,
+            "data": {
+                "baseType": "ExceptionData",
+                "baseData": {
+                    "ver": 2,
+                    "exceptions": [
+                        {
+                            "typeName": event["exception"]["type"],
+                            "message": event["exception"]["message"],
+                            "hasFullStack": True,
+                            "stack": "\n".join(event["traceback"]) if isinstance(event["traceback"], list) else event["traceback"]
                         }
+                    ],
+                    "properties": {
+                        "error_id": event["error_id"],
+                        "python_version": event["system"]["python_version"],
+                        "platform": event["system"]["platform"]
                     }
                 }
             }
+        }
+    
+    def _timestamp_millis(self, event):
+        """
+        Get an event's timestamp in epoch milliseconds
+        
+        Args:
+            event (dict): Error data with an ISO 'timestamp' field
             
-            # Prepare headers
-            headers = {
-                "Content-Type": "application/json",
-                "Accept": "application/json"
-            }
-            
-            # Send the request
-            conn.request(
-                "POST",
-                f"/v2/track",
-                body=json.dumps(app_insights_data),
-                headers=headers
-            )
-            
-            # Get the response
-            response = conn.getresponse()
-            
-            # Check if it was successful
-            success = 200 <= response.status < 300
-            
-            if not success:
-                logger.warning(f"Failed to log to Azure: {response.status} {response.reason}")
-                
-            conn.close()
-            return success
-            
-        except Exception as e:
-            logger.error(f"Error logging to Azure: {e}")
-            return False
+        Returns:
+            int: Milliseconds since the epoch
+        """
+        try:
+            timestamp = datetime.datetime.fromisoformat(event["timestamp"])
+        except (KeyError, TypeError, ValueError):
+            timestamp = datetime.datetime.now()
+        return int(timestamp.timestamp() * 1000)
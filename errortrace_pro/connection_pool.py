@@ -0,0 +1,197 @@
+"""
+Keep-alive HTTP connection pool for ErrorTrace Pro
+"""
+import collections
+import http.client
+import logging
+import os
+import ssl
+import threading
+import time
+
+from . import forking
+
+logger = logging.getLogger(__name__)
+
+# Response data returned by the pool; the body is fully read so the
+# connection can go back to the pool
+PooledResponse = collections.namedtuple("PooledResponse", ["status", "reason", "body"])
+
+# Errors that mean a reused keep-alive socket was closed by the server
+_STALE_CONNECTION_ERRORS = (
+    ConnectionError,
+    http.client.BadStatusLine,
+    http.client.CannotSendRequest,
+)
+
+_ssl_context = None
+_ssl_context_lock = threading.Lock()
+
+
+def get_ssl_context():
+    """
+    Get the process-wide SSL context
+
+    Loading the default CA bundle is expensive, so the context is created
+    once and shared by every HTTPS connection.
+
+    Returns:
+        ssl.SSLContext: Default client SSL context
+    """
+    global _ssl_context
+    if _ssl_context is None:
+        with _ssl_context_lock:
+            if _ssl_context is None:
+                _ssl_context = ssl.create_default_context()
+    return _ssl_context
+
+
+class ConnectionPool:
+    """
+    Thread-safe pool of persistent HTTP/HTTPS connections
+
+    Idle connections are kept per (scheme, host) and reused for later
+    requests, so a burst of events costs one TCP+TLS handshake instead of
+    one per event. A request that fails on a reused socket because the
+    server dropped it is retried once on a fresh connection.
+    """
+
+    def __init__(self, max_idle_per_host=4, idle_timeout=30.0, timeout=10.0):
+        """
+        Initialize the connection pool
+
+        Args:
+            max_idle_per_host (int): Idle connections kept per host
+            idle_timeout (float): Seconds an idle connection may be reused for
+            timeout (float): Socket timeout for new connections
+        """
+        self.max_idle_per_host = max_idle_per_host
+        self.idle_timeout = idle_timeout
+        self.timeout = timeout
+
+        self._idle = {}
+        self._lock = threading.Lock()
+        self._counters = {"created": 0, "reused": 0, "reconnects": 0}
+        forking.register(self)
+
+    def request(self, scheme, host, method, path, body=None, headers=None):
+        """
+        Send a request over a pooled connection
+
+        Args:
+            scheme (str): 'http' or 'https'
+            host (str): Host with optional port (URL netloc)
+            method (str): HTTP method
+            path (str): Request path
+            body (str or bytes, optional): Request body
+            headers (dict, optional): Request headers
+
+        Returns:
+            PooledResponse: Status, reason and body of the response
+        """
+        key = (scheme, host)
+        while True:
+            conn, reused = self._acquire(key)
+            try:
+                conn.request(method, path, body=body, headers=headers or {})
+                response = conn.getresponse()
+                data = response.read()
+            except _STALE_CONNECTION_ERRORS:
+                conn.close()
+                if reused:
+                    # The server closed the idle socket; retry on a new one
+                    with self._lock:
+                        self._counters["reconnects"] += 1
+                    continue
+                raise
+            except Exception:
+                conn.close()
+                raise
+
+            if response.will_close:
+                conn.close()
+            else:
+                self._release(key, conn)
+            return PooledResponse(response.status, response.reason, data)
+
+    def stats(self):
+        """
+        Get pool counters
+
+        Returns:
+            dict: Connections created, requests on reused connections,
+                reconnects after stale sockets and currently idle connections
+        """
+        with self._lock:
+            stats = dict(self._counters)
+            stats["idle"] = sum(len(conns) for conns in self._idle.values())
+        return stats
+
+    def close(self):
+        """Close every idle connection"""
+        with self._lock:
+            idle, self._idle = self._idle, {}
+        for conns in idle.values():
+            for conn, _ in conns:
+                conn.close()
+
+    def _after_fork(self):
+        """Forget the parent's connections in a forked child"""
+        # Their sockets are shared with the parent; requests from both
+        # processes on one socket would interleave
+        self._idle = {}
+        self._lock = threading.Lock()
+        self._counters = dict.fromkeys(self._counters, 0)
+
+    def _acquire(self, key):
+        """
+        Take an idle connection for the host or open a new one
+
+        Returns:
+            tuple: (connection, reused)
+        """
+        now = time.monotonic()
+        expired = []
+        conn = None
+        with self._lock:
+            conns = self._idle.get(key)
+            while conns:
+                candidate, last_used = conns.pop()
+                if now - last_used <= self.idle_timeout:
+                    conn = candidate
+                    break
+                expired.append(candidate)
+            if conn is not None:
+                self._counters["reused"] += 1
+            else:
+                self._counters["created"] += 1
+
+        for stale in expired:
+            stale.close()
+
+        if conn is not None:
+            return conn, True
+
+        scheme, host = key
+        if scheme == "https":
+            return http.client.HTTPSConnection(host, timeout=self.timeout, context=get_ssl_context()), False
+        return http.client.HTTPConnection(host, timeout=self.timeout), False
+
+    def _release(self, key, conn):
+        """Return a healthy connection to the idle list"""
+        with self._lock:
+            conns = self._idle.setdefault(key, [])
+            if len(conns) < self.max_idle_per_host:
+                conns.append((conn, time.monotonic()))
+                return
+        conn.close()
+
+
+def _reset_after_fork():
+    """Replace the module lock in a forked child"""
+    global _ssl_context_lock
+    _ssl_context_lock = threading.Lock()
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_reset_after_fork)
@@ -0,0 +1,299 @@
+"""
+Exception fingerprinting and duplicate aggregation for ErrorTrace Pro
+"""
+import collections
+import datetime
+import hashlib
+import heapq
+import re
+import threading
+import time
+import traceback
+
+from . import forking
+
+# Message parts that vary between occurrences of the same error, replaced
+# in order (addresses before numbers, quoted values before paths)
+_MESSAGE_NORMALIZERS = [
+    (re.compile(r"0x[0-9a-fA-F]+"), "<addr>"),
+    (re.compile(r"'[^']*'|\"[^\"]*\""), "<str>"),
+    (re.compile(r"(?:[A-Za-z]:)?(?:[\\/][\w.\-]+){2,}[\\/]?"), "<path>"),
+    (re.compile(r"\b\d+(?:\.\d+)?\b"), "<num>"),
+]
+
+
+def normalize_message(message):
+    """
+    Reduce an exception message to a template
+
+    Memory addresses, quoted values, file paths and numbers are replaced
+    with placeholders, so "KeyError: 'user_1'" and "KeyError: 'user_2'"
+    normalize to the same template.
+
+    Args:
+        message (str): Exception message
+
+    Returns:
+        str: Normalized message template
+    """
+    for pattern, placeholder in _MESSAGE_NORMALIZERS:
+        message = pattern.sub(placeholder, message)
+    return message
+
+
+def fingerprint(exc_type, exc_value, exc_traceback):
+    """
+    Compute a stable fingerprint for an exception
+
+    The fingerprint covers the exception type, the normalized message and
+    the (filename, function, line) chain of the traceback. Source lines are
+    never read.
+
+    Args:
+        exc_type (type): Exception type
+        exc_value (Exception): Exception value
+        exc_traceback (traceback): Exception traceback
+
+    Returns:
+        str: Hex digest identifying the error
+    """
+    digest = hashlib.sha1()
+    digest.update(f"{exc_type.__module__}.{exc_type.__qualname__}\n".encode("utf-8"))
+    digest.update(normalize_message(str(exc_value)).encode("utf-8", "replace"))
+    for frame, lineno in traceback.walk_tb(exc_traceback):
+        code = frame.f_code
+        digest.update(f"\n{code.co_filename}:{code.co_name}:{lineno}".encode("utf-8", "replace"))
+    return digest.hexdigest()
+
+
+def event_fingerprint(event):
+    """
+    Compute a fingerprint for prepared error data, e.g. an event received
+    from another process without one
+
+    The fingerprint covers the exception type, the normalized message and
+    the formatted traceback lines.
+
+    Args:
+        event (dict): Error data with 'exception' and 'traceback' fields
+
+    Returns:
+        str: Hex digest identifying the error
+    """
+    exception = event.get("exception") or {}
+    digest = hashlib.sha1()
+    digest.update(f"{exception.get('module')}.{exception.get('type')}\n".encode("utf-8"))
+    digest.update(normalize_message(str(exception.get("message", ""))).encode("utf-8", "replace"))
+    for line in event.get("traceback") or ():
+        digest.update(f"\n{line}".encode("utf-8", "replace"))
+    return digest.hexdigest()
+
+
+# Outcome of recording an occurrence
+Occurrence = collections.namedtuple("Occurrence", ["first", "count", "show_console"])
+
+
+class _Entry:
+    """Occurrence counters for one fingerprint"""
+
+    __slots__ = ("exc_type", "message", "module", "count", "suppressed",
+                 "first_seen", "window_start", "last_seen")
+
+    def __init__(self, exc_type, module, message, now):
+        self.exc_type = exc_type
+        self.module = module
+        self.message = message
+        self.count = 1
+        self.suppressed = 0
+        self.first_seen = now
+        self.window_start = now
+        self.last_seen = now
+
+
+class DuplicateAggregator:
+    """
+    Time-windowed aggregation of repeated exceptions
+
+    The first occurrence of a fingerprint is handled in full. Later
+    occurrences are only counted and rolled up into a summary once per
+    window ("seen N times since T"). Console output is shown for the first
+    ``console_threshold`` occurrences only. A fingerprint that isn't seen
+    for a whole window is forgotten, so its next occurrence is a first
+    occurrence again.
+    """
+
+    def __init__(self, window=60.0, console_threshold=5, max_fingerprints=10000):
+        """
+        Initialize the aggregator
+
+        Args:
+            window (float): Seconds between summaries for a fingerprint
+            console_threshold (int): Occurrences printed to the console before suppression
+            max_fingerprints (int): Maximum number of fingerprints tracked
+        """
+        self.window = window
+        self.console_threshold = console_threshold
+        self.max_fingerprints = max_fingerprints
+
+        self._entries = collections.OrderedDict()
+        # (window_start, key) of fingerprints with suppressed duplicates,
+        # earliest window first; entries whose window was summarized since
+        # are skipped when they come up
+        self._windows = []
+        self._lock = threading.Lock()
+        forking.register(self)
+
+    def record(self, key, exc_type, exc_value, now=None):
+        """
+        Record an occurrence of a fingerprint
+
+        Args:
+            key (str): Exception fingerprint
+            exc_type (type): Exception type
+            exc_value (Exception): Exception value
+            now (float, optional): Current time.time() value
+
+        Returns:
+            Occurrence: Whether this is the first occurrence, the count so far,
+                and whether it should still be printed to the console
+        """
+        return self._record(key, exc_type.__name__, exc_type.__module__, str(exc_value), now)
+
+    def record_event(self, key, event, now=None):
+        """
+        Record an occurrence from prepared error data (see record())
+
+        Args:
+            key (str): Exception fingerprint
+            event (dict): Error data with an 'exception' field
+            now (float, optional): Current time.time() value
+
+        Returns:
+            Occurrence: Whether this is the first occurrence, the count so far,
+                and whether it should still be printed to the console
+        """
+        exception = event.get("exception") or {}
+        return self._record(key, exception.get("type"), exception.get("module"),
+                            exception.get("message", ""), now)
+
+    def _record(self, key, exc_type, module, message, now):
+        """Record an occurrence of a fingerprint by exception name"""
+        now = time.time() if now is None else now
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry.suppressed == 0 and now - entry.last_seen > self.window:
+                # Quiet for a whole window: start over
+                del self._entries[key]
+                entry = None
+
+            if entry is None:
+                self._entries[key] = _Entry(exc_type, module, message, now)
+                while len(self._entries) > self.max_fingerprints:
+                    self._entries.popitem(last=False)
+                return Occurrence(True, 1, True)
+
+            self._entries.move_to_end(key)
+            if not entry.suppressed:
+                heapq.heappush(self._windows, (entry.window_start, key))
+            entry.count += 1
+            entry.suppressed += 1
+            entry.last_seen = now
+            return Occurrence(False, entry.count, entry.count <= self.console_threshold)
+
+    def due_summaries(self, now=None):
+        """
+        Collect summaries for fingerprints whose window has elapsed
+
+        Args:
+            now (float, optional): Current time.time() value
+
+        Returns:
+            list: Summary dicts for duplicates suppressed during the window
+        """
+        now = time.time() if now is None else now
+        summaries = []
+        with self._lock:
+            while self._windows and now - self._windows[0][0] >= self.window:
+                entry = self._pending_entry(*heapq.heappop(self._windows))
+                if entry is not None:
+                    summaries.append(self._take_summary(entry[0], entry[1], now))
+        return summaries
+
+    def next_due(self, now=None):
+        """
+        Get the time until the next summary is due
+
+        Args:
+            now (float, optional): Current time.time() value
+
+        Returns:
+            float or None: Seconds until the earliest window with suppressed
+                duplicates ends (0 if one already has), or None if there is none
+        """
+        now = time.time() if now is None else now
+        with self._lock:
+            while self._windows:
+                window_start, key = self._windows[0]
+                if self._pending_entry(window_start, key) is not None:
+                    return max(0.0, window_start + self.window - now)
+                heapq.heappop(self._windows)
+        return None
+
+    def flush(self, now=None):
+        """
+        Collect summaries for every fingerprint with suppressed duplicates
+
+        Args:
+            now (float, optional): Current time.time() value
+
+        Returns:
+            list: Summary dicts
+        """
+        now = time.time() if now is None else now
+        summaries = []
+        with self._lock:
+            while self._windows:
+                entry = self._pending_entry(*heapq.heappop(self._windows))
+                if entry is not None:
+                    summaries.append(self._take_summary(entry[0], entry[1], now))
+        return summaries
+
+    def _after_fork(self):
+        """Start with no occurrences in a forked child; the parent summarizes its own"""
+        self._entries = collections.OrderedDict()
+        self._windows = []
+        self._lock = threading.Lock()
+
+    def _pending_entry(self, window_start, key):
+        """
+        Look up the entry a window belongs to (lock held)
+
+        Returns:
+            tuple or None: (key, entry) if the window still has suppressed
+                duplicates, None if it was summarized or the entry evicted
+        """
+        entry = self._entries.get(key)
+        if entry is None or not entry.suppressed or entry.window_start != window_start:
+            return None
+        return key, entry
+
+    def _take_summary(self, key, entry, now):
+        """Build a summary and start a new window (lock held)"""
+        since = datetime.datetime.fromtimestamp(entry.window_start).isoformat()
+        summary = {
+            "fingerprint": key,
+            "exception": {
+                "type": entry.exc_type,
+                "message": entry.message,
+                "module": entry.module
+            },
+            "occurrences": entry.suppressed,
+            "total_occurrences": entry.count,
+            "since": since,
+            "first_seen": datetime.datetime.fromtimestamp(entry.first_seen).isoformat(),
+            "last_seen": datetime.datetime.fromtimestamp(entry.last_seen).isoformat(),
+            "summary": f"{entry.exc_type} seen {entry.suppressed} times since {since}"
+        }
+        entry.suppressed = 0
+        entry.window_start = now
+        return summary
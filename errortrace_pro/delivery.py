@@ -0,0 +1,291 @@
+"""
+Background delivery queue for ErrorTrace Pro
+"""
+import atexit
+import collections
+import logging
+import threading
+import time
+import weakref
+
+from . import forking
+
+logger = logging.getLogger(__name__)
+
+# Supported behaviours when the queue is full
+OVERFLOW_POLICIES = ("drop_oldest", "drop_newest", "block")
+
+# Queues whose worker has started; flushed at exit without keeping them alive
+_started_queues = weakref.WeakSet()
+
+
+def _flush_at_exit():
+    """Give every started queue its flush timeout to deliver pending payloads"""
+    for queue in list(_started_queues):
+        queue.flush(queue.flush_timeout)
+
+
+atexit.register(_flush_at_exit)
+
+
+class DeliveryQueue:
+    """
+    Bounded in-memory queue drained by a daemon worker thread
+
+    Producers call put() and return immediately; the worker thread hands
+    each payload to the ``send`` callable. When the queue is full the
+    configured overflow policy decides what gets dropped.
+
+    With a batcher the worker groups payloads and ``send`` receives a
+    list of payloads per call instead of a single one.
+    """
+
+    def __init__(self, send, maxsize=1000, overflow_policy="drop_oldest",
+                 block_timeout=0.1, flush_timeout=2.0, batcher=None, on_drop=None,
+                 name="errortrace-delivery"):
+        """
+        Initialize the delivery queue
+
+        Args:
+            send (callable): Called by the worker with each payload, returns bool
+            maxsize (int): Maximum number of pending payloads
+            overflow_policy (str): 'drop_oldest', 'drop_newest' or 'block'
+            block_timeout (float): Seconds put() may wait under the 'block' policy
+            flush_timeout (float): Seconds to wait for pending payloads at exit
+            batcher (EventBatcher, optional): Groups payloads into batches
+            on_drop (callable, optional): Called with each payload the overflow
+                policy discards, e.g. to spool it to disk
+            name (str): Name of the worker thread
+        """
+        if overflow_policy not in OVERFLOW_POLICIES:
+            logger.warning(f"Unsupported overflow policy: {overflow_policy}. Falling back to 'drop_oldest'")
+            overflow_policy = "drop_oldest"
+
+        self.send = send
+        self.maxsize = max(1, int(maxsize))
+        self.overflow_policy = overflow_policy
+        self.block_timeout = block_timeout
+        self.flush_timeout = flush_timeout
+        self.batcher = batcher
+        self.on_drop = on_drop
+        self.name = name
+
+        self._items = collections.deque()
+        self._lock = threading.Lock()
+        self._not_empty = threading.Condition(self._lock)
+        self._not_full = threading.Condition(self._lock)
+        self._idle = threading.Condition(self._lock)
+        self._in_flight = 0
+        self._flushing = 0
+        self._worker = None
+        self._closed = False
+
+        self._counters = {
+            "enqueued": 0,
+            "delivered": 0,
+            "failed": 0,
+            "dropped_oldest": 0,
+            "dropped_newest": 0,
+            "dropped_timeout": 0,
+        }
+        forking.register(self)
+
+    def put(self, payload):
+        """
+        Queue a payload for background delivery
+
+        Args:
+            payload: Payload to hand to the send callable
+
+        Returns:
+            bool: True if the payload was queued, False if it was dropped
+        """
+        accepted, dropped = self._put(payload)
+        if dropped is not None and self.on_drop is not None:
+            try:
+                self.on_drop(dropped)
+            except Exception as e:
+                logger.error(f"Error handling dropped event: {e}")
+        return accepted
+
+    def _put(self, payload):
+        """
+        Queue a payload under the lock
+
+        Returns:
+            tuple: (whether the payload was queued, the payload that was dropped or None)
+        """
+        with self._lock:
+            if self._closed:
+                self._counters["dropped_newest"] += 1
+                return False, payload
+
+            dropped = None
+            if len(self._items) >= self.maxsize:
+                if self.overflow_policy == "drop_newest":
+                    self._counters["dropped_newest"] += 1
+                    return False, payload
+                elif self.overflow_policy == "block":
+                    deadline = time.monotonic() + (self.block_timeout or 0)
+                    while len(self._items) >= self.maxsize:
+                        remaining = deadline - time.monotonic()
+                        if remaining <= 0:
+                            self._counters["dropped_timeout"] += 1
+                            return False, payload
+                        self._not_full.wait(remaining)
+                else:  # drop_oldest
+                    dropped = self._items.popleft()
+                    self._counters["dropped_oldest"] += 1
+
+            self._items.append(payload)
+            self._counters["enqueued"] += 1
+            self._ensure_worker()
+            self._not_empty.notify()
+            return True, dropped
+
+    @property
+    def dropped(self):
+        """int: Total number of payloads dropped by the overflow policy"""
+        with self._lock:
+            return (self._counters["dropped_oldest"] + self._counters["dropped_newest"]
+                    + self._counters["dropped_timeout"])
+
+    def stats(self):
+        """
+        Get delivery counters
+
+        Returns:
+            dict: Counter values plus the current queue depth
+        """
+        with self._lock:
+            stats = dict(self._counters)
+            stats["pending"] = len(self._items) + self._in_flight
+        return stats
+
+    def flush(self, timeout=None):
+        """
+        Wait until every queued payload has been handed to the send callable
+
+        Args:
+            timeout (float, optional): Maximum seconds to wait
+
+        Returns:
+            bool: True if the queue drained, False on timeout
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._lock:
+            # Ask the worker to send partial batches without waiting for linger
+            self._flushing += 1
+            self._not_empty.notify()
+            try:
+                while self._items or self._in_flight:
+                    if self._worker is None:
+                        return False
+                    remaining = None if deadline is None else deadline - time.monotonic()
+                    if remaining is not None and remaining <= 0:
+                        return False
+                    self._idle.wait(remaining)
+            finally:
+                self._flushing -= 1
+        return True
+
+    def close(self, timeout=None):
+        """
+        Stop accepting payloads, drain the queue and stop the worker
+
+        Args:
+            timeout (float, optional): Maximum seconds to wait for the drain
+        """
+        self.flush(timeout if timeout is not None else self.flush_timeout)
+        with self._lock:
+            self._closed = True
+            self._not_empty.notify_all()
+            worker = self._worker
+        if worker is not None and worker is not threading.current_thread():
+            worker.join(timeout)
+
+    def _after_fork(self):
+        """Start empty in a forked child; the parent delivers what it had queued"""
+        self._items = collections.deque()
+        self._lock = threading.Lock()
+        self._not_empty = threading.Condition(self._lock)
+        self._not_full = threading.Condition(self._lock)
+        self._idle = threading.Condition(self._lock)
+        self._in_flight = 0
+        self._flushing = 0
+        self._worker = None
+        if self.batcher is not None:
+            self.batcher.drain()
+        self._counters = dict.fromkeys(self._counters, 0)
+
+    def _ensure_worker(self):
+        """Start the worker thread on first use (called with the lock held)"""
+        if self._worker is not None and self._worker.is_alive():
+            return
+        self._worker = threading.Thread(
+            target=self._run,
+            name=self.name,
+            daemon=True
+        )
+        self._worker.start()
+        _started_queues.add(self)
+
+    def _batch_ready(self):
+        """Check whether the worker should send its partial batch (lock held)"""
+        if self.batcher is None or not self.batcher.pending:
+            return False
+        return self._flushing > 0 or self._closed or self.batcher.due()
+
+    def _run(self):
+        """Worker loop: deliver payloads until the queue is closed"""
+        take = 1 if self.batcher is None else self.batcher.max_events
+        while True:
+            with self._lock:
+                while not self._items and not self._closed and not self._batch_ready():
+                    wait = self.batcher.time_until_due() if self.batcher is not None else None
+                    self._not_empty.wait(wait)
+
+                items = []
+                while self._items and len(items) < take:
+                    items.append(self._items.popleft())
+                self._in_flight += len(items)
+                if items:
+                    self._not_full.notify(len(items))
+                elif self._closed and not self._batch_ready():
+                    return
+
+            if self.batcher is None:
+                batches = [[item] for item in items]
+            else:
+                batches = []
+                for item in items:
+                    batches.extend(self.batcher.add(item))
+                with self._lock:
+                    send_partial = self._batch_ready()
+                if send_partial:
+                    batches.append(self.batcher.drain())
+
+            for batch in batches:
+                self._send_batch(batch)
+
+            # Payloads the batcher rejected outright never reach send()
+            if self.batcher is not None and not self.batcher.pending:
+                with self._lock:
+                    if self._in_flight:
+                        self._counters["failed"] += self._in_flight
+                        self._in_flight = 0
+                        self._idle.notify_all()
+
+    def _send_batch(self, batch):
+        """Hand a batch to the send callable and update the counters"""
+        try:
+            success = self.send(batch if self.batcher is not None else batch[0])
+        except Exception as e:
+            logger.error(f"Error delivering queued event: {e}")
+            success = False
+
+        with self._lock:
+            self._in_flight -= len(batch)
+            self._counters["delivered" if success else "failed"] += len(batch)
+            if not self._items and not self._in_flight:
+                self._idle.notify_all()
@@ -0,0 +1,39 @@
+"""
+Fork handling for ErrorTrace Pro
+"""
+import os
+import logging
+import weakref
+
+logger = logging.getLogger(__name__)
+
+# Objects whose _after_fork() runs in a forked child
+_instances = weakref.WeakSet()
+
+
+def register(obj):
+    """
+    Reset an object's per-process state in children forked after this call
+
+    A forked child gets a copy of the parent's memory but only the thread
+    that called fork(). Locks another thread held at that moment stay
+    locked, worker threads are gone and inherited sockets are shared with
+    the parent, so the object's ``_after_fork()`` method replaces them.
+
+    Args:
+        obj: Object with an ``_after_fork()`` method
+    """
+    _instances.add(obj)
+
+
+def _reset_after_fork():
+    """Reset every registered object in a forked child"""
+    for obj in list(_instances):
+        try:
+            obj._after_fork()
+        except Exception as e:
+            logger.debug(f"Error resetting {type(obj).__name__} after fork: {e}")
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_reset_after_fork)
@@ -0,0 +1,498 @@
+"""
+Forwarding events from worker processes to one collecting process
+"""
+import os
+import json
+import stat
+import errno
+import logging
+import select
+import shutil
+import socket
+import socketserver
+import tempfile
+import threading
+from urllib.parse import urlsplit
+
+from . import forking
+from .cache import LRUCache
+from .dedup import DuplicateAggregator, event_fingerprint
+
+logger = logging.getLogger(__name__)
+
+# Socket name in the per-user directory (see default_collector_address)
+COLLECTOR_SOCKET_NAME = "errortrace.sock"
+
+# Largest UDP payload; bigger events can't be sent as one datagram
+MAX_DATAGRAM = 65507
+
+# Seconds stale-socket probes wait for a stream connection
+_CONNECT_TIMEOUT = 1.0
+
+
+def default_collector_address():
+    """
+    Get the address `errortrace serve` listens on and provider="local" sends
+    to by default
+
+    The socket is in $XDG_RUNTIME_DIR, or else in an errortrace-<uid>
+    directory in the temporary directory that only the current user can
+    access, so other users can neither read events nor stand in for the
+    collector.
+
+    Returns:
+        str: 'unix://' address of the socket
+
+    Raises:
+        PermissionError: If the per-user directory exists but belongs to
+            another user or is accessible to other users
+    """
+    directory = os.getenv("XDG_RUNTIME_DIR")
+    if not directory:
+        directory = os.path.join(tempfile.gettempdir(), f"errortrace-{os.getuid()}")
+        _private_directory(directory)
+    return "unix://" + os.path.join(directory, COLLECTOR_SOCKET_NAME)
+
+
+def _private_directory(path):
+    """Create a directory only the current user can access, or check an existing one"""
+    try:
+        os.mkdir(path, 0o700)
+    except FileExistsError:
+        pass
+    # lstat, so a symlink planted by another user isn't followed
+    info = os.lstat(path)
+    if (not stat.S_ISDIR(info.st_mode) or info.st_uid != os.getuid()
+            or stat.S_IMODE(info.st_mode) & 0o077):
+        raise PermissionError(f"{path} must be a directory owned by the current user "
+                              f"and not accessible to others")
+
+
+def parse_address(address):
+    """
+    Parse a collector address
+
+    Args:
+        address (str): 'unix:///path/to.sock' (or a bare path),
+            'tcp://host:port' or 'udp://host:port' (IPv4)
+
+    Returns:
+        tuple: (kind, target) where kind is 'unix', 'tcp' or 'udp' and
+            target is a path or a (host, port) tuple
+    """
+    if "://" not in address:
+        return "unix", address
+    url = urlsplit(address)
+    if url.scheme == "unix":
+        return "unix", url.path
+    if url.scheme in ("tcp", "udp"):
+        if url.port is None:
+            raise ValueError(f"Collector address needs a port: {address}")
+        return url.scheme, (url.hostname or "127.0.0.1", url.port)
+    raise ValueError(f"Unsupported collector address: {address}")
+
+
+class EventForwarder:
+    """
+    Send prepared events to an EventCollector as NDJSON
+
+    Unix and TCP addresses use a stream connection, opened on first use and
+    reopened after an error or in a forked child; UDP addresses send one
+    datagram per event.
+
+    With a timeout of 0 the forwarder never waits, not even to connect. A
+    Unix socket connects at once or fails; a TCP connection that isn't
+    established at once fails the current event and is used for later
+    events once it is.
+    """
+
+    def __init__(self, address, timeout=1.0):
+        """
+        Initialize the forwarder
+
+        Args:
+            address (str): Collector address (see parse_address)
+            timeout (float): Seconds to wait for the collector to accept an
+                event; 0 never blocks, and an event the socket can't take
+                at once is not sent
+        """
+        self.address = address
+        self.kind, self.target = parse_address(address)
+        self.timeout = timeout
+        self._sock = None
+        self._connecting = False
+        self._lock = threading.Lock()
+        self._counters = {"forwarded": 0, "failed": 0}
+        forking.register(self)
+
+    def send(self, event):
+        """
+        Forward one event
+
+        Args:
+            event (dict): Prepared error data
+
+        Returns:
+            bool: True if the collector received the event
+        """
+        try:
+            line = (json.dumps(event, default=str) + "\n").encode("utf-8")
+        except (TypeError, ValueError) as e:
+            logger.error(f"Cannot forward event: {e}")
+            return False
+
+        with self._lock:
+            # One retry on a new connection if the collector dropped the old one
+            for _ in range(1 if self.kind == "udp" else 2):
+                try:
+                    if self._sock is None:
+                        self._sock = self._connect()
+                    if self._connecting and not self._connected():
+                        # Not waiting for it; a later event will use it
+                        error = BlockingIOError(errno.EINPROGRESS, "Still connecting")
+                        break
+                    if self.kind == "udp":
+                        self._sock.sendto(line, self.target)
+                    else:
+                        self._sock.sendall(line)
+                    self._counters["forwarded"] += 1
+                    return True
+                except OSError as e:
+                    # A partly written line is discarded by the collector
+                    # when the connection closes
+                    self._close()
+                    error = e
+            self._counters["failed"] += 1
+        logger.warning(f"Could not forward event to {self.address}: {error}")
+        return False
+
+    def stats(self):
+        """
+        Get forwarding counters
+
+        Returns:
+            dict: Events forwarded and events the collector didn't receive
+        """
+        with self._lock:
+            return dict(self._counters)
+
+    def close(self):
+        """Close the connection to the collector"""
+        with self._lock:
+            self._close()
+
+    def _connect(self):
+        """Open the socket (lock held)"""
+        if self.kind == "udp":
+            sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+            sock.settimeout(self.timeout)
+            return sock
+
+        family = socket.AF_UNIX if self.kind == "unix" else socket.AF_INET
+        sock = socket.socket(family, socket.SOCK_STREAM)
+        try:
+            sock.settimeout(self.timeout)
+            if self.timeout:
+                sock.connect(self.target)
+                return sock
+            result = sock.connect_ex(self.target)
+            if result == errno.EINPROGRESS:
+                self._connecting = True
+            elif result:
+                raise OSError(result, os.strerror(result), self.address)
+        except OSError:
+            sock.close()
+            raise
+        return sock
+
+    def _connected(self):
+        """Check without waiting whether a non-blocking connect finished (lock held)"""
+        _, writable, _ = select.select([], [self._sock], [], 0)
+        if not writable:
+            return False
+        result = self._sock.getsockopt(socket.SOL_SOCKET, socket.SO_ERROR)
+        if result:
+            raise OSError(result, os.strerror(result), self.address)
+        self._connecting = False
+        return True
+
+    def _close(self):
+        """Close the connection (lock held)"""
+        if self._sock is not None:
+            self._sock.close()
+            self._sock = None
+        self._connecting = False
+
+    def _after_fork(self):
+        """Open a connection of its own in a forked child"""
+        if self._sock is not None:
+            # Closes only the child's copy of the parent's connection
+            self._sock.close()
+            self._sock = None
+        self._connecting = False
+        self._lock = threading.Lock()
+        self._counters = dict.fromkeys(self._counters, 0)
+
+
+def _remove_stale_socket(path):
+    """
+    Remove a socket left behind by a collector that is no longer running
+
+    Raises:
+        FileExistsError: If the path exists and isn't a socket
+        OSError: If a collector is still listening on the socket
+    """
+    try:
+        info = os.lstat(path)
+    except FileNotFoundError:
+        return
+    if not stat.S_ISSOCK(info.st_mode):
+        raise FileExistsError(errno.EEXIST, "Not a socket; refusing to replace it", path)
+
+    probe = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        probe.settimeout(_CONNECT_TIMEOUT)
+        probe.connect(path)
+    except ConnectionRefusedError:
+        # Nothing accepts connections on it any more
+        os.unlink(path)
+        return
+    except FileNotFoundError:
+        return
+    finally:
+        probe.close()
+    raise OSError(errno.EADDRINUSE, "A collector is already listening", path)
+
+
+class _StreamHandler(socketserver.StreamRequestHandler):
+    """Read NDJSON events from one connection"""
+
+    def handle(self):
+        collector = self.server.collector
+        collector._count("connections")
+        for line in self.rfile:
+            if not line.endswith(b"\n"):
+                # The sender went away mid-write
+                break
+            collector._receive_line(line)
+
+
+class _DatagramHandler(socketserver.BaseRequestHandler):
+    """Read NDJSON events from one datagram"""
+
+    def handle(self):
+        for line in self.request[0].splitlines():
+            if line.strip():
+                self.server.collector._receive_line(line)
+
+
+class _CollectorMixin:
+    """Runs the collector's periodic work between requests"""
+
+    def service_actions(self):
+        self.collector._service()
+
+
+class _UnixServer(_CollectorMixin, socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+
+class _TCPServer(_CollectorMixin, socketserver.ThreadingMixIn, socketserver.TCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+
+class _UDPServer(_CollectorMixin, socketserver.UDPServer):
+    max_packet_size = MAX_DATAGRAM
+    allow_reuse_address = True
+
+
+class EventCollector:
+    """
+    Receive events from other processes and deliver them through one logger
+
+    Listens on a Unix socket, or a TCP or UDP port. Processes forked after
+    start(), such as gunicorn or multiprocessing.Pool workers, forward
+    their cloud log events to it instead of opening their own connections,
+    so one process does the network I/O for the whole fleet and batches
+    across workers. Other processes send to it with provider="local" or by
+    passing its address as ``forward_to`` to their CloudLogger.
+
+    Events that arrive twice (same error_id) are dropped, and with a dedup
+    window repeats of the same fingerprint from any process are rolled up
+    into one summary per window.
+    """
+
+    def __init__(self, cloud_logger, address=None, dedup_window=None, max_fingerprints=10000):
+        """
+        Initialize the collector
+
+        Args:
+            cloud_logger (CloudLogger): Logger that delivers the collected events
+            address (str, optional): Address to listen on (see parse_address;
+                default: a socket in a new temporary directory)
+            dedup_window (float, optional): Seconds between summaries of a
+                repeated fingerprint; repeats are forwarded as they come if not set
+            max_fingerprints (int): Fingerprints and event IDs remembered
+        """
+        self.cloud_logger = cloud_logger
+        self.address = address
+        self.aggregator = None
+        if dedup_window:
+            self.aggregator = DuplicateAggregator(window=dedup_window, max_fingerprints=max_fingerprints)
+        self._seen = LRUCache(maxsize=max_fingerprints)
+        self._directory = None
+        self._server = None
+        self._thread = None
+        self._lock = threading.Lock()
+        self._counters = {"received": 0, "delivered": 0, "duplicates": 0, "suppressed": 0,
+                          "summaries": 0, "invalid": 0, "connections": 0}
+        forking.register(self)
+
+    def start(self):
+        """
+        Start listening and have children forked from now on forward to this process
+
+        Returns:
+            EventCollector: self
+        """
+        if self._server is not None:
+            return self
+        if self.address is None:
+            self._directory = tempfile.mkdtemp(prefix="errortrace-")
+            self.address = os.path.join(self._directory, "collector.sock")
+
+        kind, target = parse_address(self.address)
+        if kind == "unix":
+            _remove_stale_socket(target)
+            self._server = _UnixServer(target, _StreamHandler)
+            # Only processes of the same user may send events
+            os.chmod(target, 0o600)
+        else:
+            if kind == "tcp":
+                self._server = _TCPServer(target, _StreamHandler)
+            else:
+                self._server = _UDPServer(target, _DatagramHandler)
+            # Report the port actually bound when asked for port 0
+            host, port = self._server.server_address
+            self.address = f"{kind}://{host}:{port}"
+        self._server.collector = self
+
+        self._thread = threading.Thread(
+            target=self._server.serve_forever,
+            name="errortrace-collector",
+            daemon=True
+        )
+        self._thread.start()
+        # This process delivers what it collects; a forwarder set up from
+        # ERRORTRACE_FORWARD_TO could send every event back to itself,
+        # where the copy would be dropped as a duplicate
+        if self.cloud_logger._forwarder is not None:
+            self.cloud_logger._forwarder.close()
+            self.cloud_logger._forwarder = None
+        self.cloud_logger.forward_address = self.address
+        return self
+
+    def close(self):
+        """Stop listening, remove the socket and send pending duplicate summaries"""
+        if self._server is None:
+            return
+        if self.cloud_logger.forward_address == self.address:
+            self.cloud_logger.forward_address = None
+        self._server.shutdown()
+        self._server.server_close()
+        self._server = None
+        self._thread = None
+
+        kind, target = parse_address(self.address)
+        if kind == "unix":
+            try:
+                os.unlink(target)
+            except OSError:
+                pass
+        if self._directory is not None:
+            shutil.rmtree(self._directory, ignore_errors=True)
+
+        if self.aggregator is not None:
+            self._log_summaries(self.aggregator.flush())
+
+    def stats(self):
+        """
+        Get collector counters
+
+        Returns:
+            dict: Events received and handed to the logger, events dropped as
+                exact duplicates or suppressed as repeats, summaries sent,
+                lines that weren't valid JSON and stream connections accepted
+        """
+        with self._lock:
+            return dict(self._counters)
+
+    def _receive_line(self, line):
+        """Parse one NDJSON line"""
+        try:
+            event = json.loads(line)
+        except ValueError:
+            self._count("invalid")
+            return
+        if not isinstance(event, dict):
+            self._count("invalid")
+            return
+        self._receive(event)
+
+    def _receive(self, event):
+        """Deduplicate an event and hand it to the logger"""
+        self._count("received")
+
+        # The same event can arrive twice when a sender retries
+        error_id = event.get("error_id")
+        if error_id is not None:
+            with self._lock:
+                duplicate = self._seen.get(error_id) is not None
+                if duplicate:
+                    self._counters["duplicates"] += 1
+                else:
+                    self._seen.put(error_id, True)
+            if duplicate:
+                return
+
+        if self.aggregator is not None and event.get("event_type") != "summary":
+            key = event.get("fingerprint") or event_fingerprint(event)
+            if not self.aggregator.record_event(key, event).first:
+                self._count("suppressed")
+                return
+
+        try:
+            if self.cloud_logger.log_event(event):
+                self._count("delivered")
+        except Exception as e:
+            logger.error(f"Error delivering forwarded event: {e}")
+
+    def _service(self):
+        """Periodic work on the serving thread: send due duplicate summaries"""
+        if self.aggregator is not None:
+            self._log_summaries(self.aggregator.due_summaries())
+
+    def _log_summaries(self, summaries):
+        """Send duplicate-occurrence summaries through the logger"""
+        for summary in summaries:
+            try:
+                self.cloud_logger.log_summary(summary)
+                self._count("summaries")
+            except Exception as e:
+                logger.error(f"Error logging duplicate summary: {e}")
+
+    def _count(self, counter):
+        with self._lock:
+            self._counters[counter] += 1
+
+    def _after_fork(self):
+        """Leave listening to the parent in a forked child"""
+        if self._server is not None:
+            # Closes only the child's copy of the listening socket
+            self._server.socket.close()
+        self._server = None
+        self._thread = None
+        self._directory = None
+        self._lock = threading.Lock()
+        self._counters = dict.fromkeys(self._counters, 0)
@@ -0,0 +1,490 @@
+"""
+Frame extraction and collapsing for ErrorTrace Pro tracebacks
+"""
+import sys
+import itertools
+import linecache
+import traceback
+from collections import namedtuple
+
+from .sources import source_cache
+
+# Default number of frames kept at the start and end of a long stack
+HEAD_FRAMES = 50
+TAIL_FRAMES = 50
+
+# Longest cycle of frames detected as recursion, and the number of
+# consecutive repeats needed before a cycle is collapsed
+MAX_CYCLE_LENGTH = 16
+MIN_REPEATS = 3
+
+# Code flag of function frames, whose locals dict is built on demand
+_CO_OPTIMIZED = 0x0001
+
+# Separators printed between chained exceptions, keyed by link type
+CHAIN_MESSAGES = {
+    "cause": "\nThe above exception was the direct cause of the following exception:\n\n",
+    "context": "\nDuring handling of the above exception, another exception occurred:\n\n",
+}
+
+ChainedException = namedtuple("ChainedException", "exc_type exc_value traceback link")
+ChainedException.__doc__ = """An exception in a chain, with how it led to the next one ('cause', 'context' or None)"""
+
+SyntaxDetails = namedtuple("SyntaxDetails", "offset filename lineno line msg")
+SyntaxDetails.__doc__ = """Location of a SyntaxError, copied off the exception for rendering"""
+
+
+class FrameGap(namedtuple("FrameGap", "start end repeats")):
+    """
+    Frames left out of a rendered stack
+
+    start and end are 0-based, inclusive positions in the full stack.
+    repeats is the number of times a recursion cycle repeats over that
+    range, or 0 for frames omitted by the head/tail limits.
+    """
+
+    __slots__ = ()
+
+    def describe(self):
+        """
+        Human readable marker for the gap
+
+        Returns:
+            str: e.g. "[frames 12–987 repeated 325×]"
+        """
+        if self.repeats:
+            return f"[frames {self.start + 1}–{self.end + 1} repeated {self.repeats}×]"
+        return f"[frames {self.start + 1}–{self.end + 1} omitted]"
+
+
+def frame_key(frame):
+    """Identity of a frame summary for cycle detection"""
+    return (frame.filename, frame.lineno, frame.name)
+
+
+def collapse_frames(frames, key=frame_key, head=HEAD_FRAMES, tail=TAIL_FRAMES,
+                    collapse_recursion=True, max_cycle=MAX_CYCLE_LENGTH, min_repeats=MIN_REPEATS):
+    """
+    Collapse recursion cycles and cap the number of frames in a stack
+
+    A run of at least min_repeats consecutive repeats of a cycle of up to
+    max_cycle frames is shown once, followed by a FrameGap covering the
+    whole run. If more than head + tail frames remain, the middle ones
+    are replaced by a single FrameGap.
+
+    Args:
+        frames (list): Frames, outermost first
+        key (callable): Function returning a comparable identity for a frame
+        head (int, optional): Frames kept at the start (None for no limit)
+        tail (int, optional): Frames kept at the end (None for no limit)
+        collapse_recursion (bool): Detect and collapse repeated cycles
+        max_cycle (int): Longest cycle detected
+        min_repeats (int): Repeats needed before a cycle is collapsed
+
+    Returns:
+        list: Frames and FrameGap markers in display order
+    """
+    count = len(frames)
+    # (position, item) pairs, where item is a frame or a FrameGap
+    entries = []
+    if collapse_recursion and count >= min_repeats:
+        keys = [key(frame) for frame in frames]
+        i = 0
+        while i < count:
+            best_repeats, best_period = 0, 0
+            for period in range(1, min(max_cycle, (count - i) // min_repeats) + 1):
+                cycle = keys[i:i + period]
+                repeats = 1
+                j = i + period
+                while j + period <= count and keys[j] == cycle[0] and keys[j:j + period] == cycle:
+                    repeats += 1
+                    j += period
+                if repeats >= min_repeats and repeats * period > best_repeats * best_period:
+                    best_repeats, best_period = repeats, period
+            if best_repeats:
+                entries.extend((i + offset, frames[i + offset]) for offset in range(best_period))
+                end = i + best_repeats * best_period - 1
+                entries.append((i, FrameGap(i, end, best_repeats)))
+                i = end + 1
+            else:
+                entries.append((i, frames[i]))
+                i += 1
+    else:
+        entries = list(enumerate(frames))
+
+    shown = [index for index, (_, item) in enumerate(entries) if not isinstance(item, FrameGap)]
+    if head is not None and tail is not None and len(shown) > head + tail:
+        cut_start = shown[head]
+        cut_end = shown[len(shown) - tail] if tail else len(entries)
+        start = max((_last_position(entry) + 1 for entry in entries[:cut_start]), default=0)
+        end = entries[cut_end][0] - 1 if cut_end < len(entries) else count - 1
+        entries = entries[:cut_start] + [(start, FrameGap(start, end, 0))] + entries[cut_end:]
+
+    return [item for _, item in entries]
+
+
+def _last_position(entry):
+    """Last stack position covered by a (position, item) entry"""
+    position, item = entry
+    return item.end if isinstance(item, FrameGap) else position
+
+
+def extract_stack(exc_traceback):
+    """
+    Extract the frames of a traceback without reading source lines
+
+    Source lines are looked up lazily, so frames dropped by
+    collapse_frames never touch the file system.
+
+    Args:
+        exc_traceback (traceback): Traceback object
+
+    Returns:
+        traceback.StackSummary: Frames, outermost first
+    """
+    return traceback.StackSummary.extract(traceback.walk_tb(exc_traceback), lookup_lines=False)
+
+
+def exception_chain(exc_type, exc_value, exc_traceback):
+    """
+    List an exception and the exceptions it was raised from
+
+    Follows __cause__, then __context__ unless it is suppressed, the same
+    way the standard traceback module does.
+
+    Args:
+        exc_type (type): Exception type
+        exc_value (Exception): Exception value
+        exc_traceback (traceback): Exception traceback
+
+    Returns:
+        list: ChainedException entries, earliest first and the handled exception last
+    """
+    chain = [ChainedException(exc_type, exc_value, exc_traceback, None)]
+    seen = {id(exc_value)}
+    current = exc_value
+    while current is not None:
+        if current.__cause__ is not None:
+            nested, link = current.__cause__, "cause"
+        elif current.__context__ is not None and not current.__suppress_context__:
+            nested, link = current.__context__, "context"
+        else:
+            break
+        if id(nested) in seen:
+            break
+        seen.add(id(nested))
+        chain.append(ChainedException(type(nested), nested, nested.__traceback__, link))
+        current = nested
+    chain.reverse()
+    return chain
+
+
+def safe_str(value):
+    """str() that doesn't let a failing __str__ escape"""
+    try:
+        return str(value)
+    except Exception:
+        return "<exception str() failed>"
+
+
+def _frame_flag(frame, name):
+    """Read a marker variable such as _rich_traceback_omit from a frame"""
+    code = frame.f_code
+    # Only touch f_locals when the name can be a local, since building the
+    # locals dict of an optimized frame isn't free
+    if name in code.co_varnames or not code.co_flags & _CO_OPTIMIZED:
+        return frame.f_locals.get(name, False)
+    return False
+
+
+def _frame_summary(frame, tb, line=None):
+    """FrameSummary for a traceback entry, with column positions where available"""
+    code = frame.f_code
+    positions = {}
+    if sys.version_info >= (3, 11):
+        position = next(itertools.islice(code.co_positions(), tb.tb_lasti // 2, None), None)
+        if position is not None:
+            positions = {"end_lineno": position[1], "colno": position[2], "end_colno": position[3]}
+    return traceback.FrameSummary(
+        code.co_filename, tb.tb_lineno, code.co_name,
+        lookup_line=False, locals=None, line=line, **positions
+    )
+
+
+def _walk_frames(exc_traceback):
+    """
+    Frame objects and traceback entries of a traceback
+
+    Returns:
+        tuple: (frame, traceback) pairs, outermost first, and the indexes
+            of those Rich leaves out: frames setting _rich_traceback_omit,
+            and every frame up to the last one setting _rich_traceback_guard
+    """
+    entries = []
+    rich_hidden = set()
+    tb = exc_traceback
+    while tb is not None:
+        frame = tb.tb_frame
+        if _frame_flag(frame, "_rich_traceback_omit"):
+            rich_hidden.add(len(entries))
+        elif _frame_flag(frame, "_rich_traceback_guard"):
+            rich_hidden.update(range(len(entries) + 1))
+        entries.append((frame, tb))
+        tb = tb.tb_next
+    return entries, rich_hidden
+
+
+def _read_shown_lines(frames, entries, layout):
+    """
+    Fill in the source lines of the displayed frames
+
+    Each file is read once from the source cache. Frames hidden by the
+    layout keep looking their line up lazily, so their files aren't touched.
+
+    Args:
+        frames (traceback.StackSummary): Summaries without lines, replaced in place
+        entries (list): (frame, traceback) pairs matching frames
+        layout (list): Indexes into frames and FrameGap markers
+    """
+    linenos = {}
+    for index in layout:
+        if isinstance(index, FrameGap):
+            continue
+        frame, tb = entries[index]
+        if tb.tb_lineno is not None:
+            linenos.setdefault(frame.f_code.co_filename, (frame.f_globals, []))[1].append(index)
+    for filename, (module_globals, indexes) in linenos.items():
+        # Rich reads the source through linecache, so drop stale entries there too
+        linecache.checkcache(filename)
+        lines = source_cache.lines_at(filename, {entries[index][1].tb_lineno for index in indexes},
+                                      module_globals)
+        for index in indexes:
+            frame, tb = entries[index]
+            frames[index] = _frame_summary(frame, tb, lines.get(tb.tb_lineno))
+
+
+class StackRecord:
+    """
+    One exception of a chain with its frames
+
+    Attributes:
+        exc_type (type): Exception type
+        frames (traceback.StackSummary): Every frame, outermost first, with
+            source lines read lazily
+        layout (list): Indexes into frames and FrameGap markers, in display order
+        locals (dict): Frame index to {name: bounded repr} for frames with locals
+        link (str): How this exception led to the next one in the chain
+            ('cause', 'context' or None for the last)
+        exceptions (list): TracebackRecord for each member of an exception group
+        message (str): str() of the exception when it was extracted
+        exception_lines (list): traceback.format_exception_only() lines
+        notes (list): str() of each of the exception's __notes__
+        syntax_error (SyntaxDetails): Location details of a SyntaxError, or None
+        rich_hidden (frozenset): Indexes of frames the Rich renderer leaves
+            out, as marked by _rich_traceback_omit and _rich_traceback_guard
+
+    The strings are taken at extraction and the exception itself is not
+    kept, so a record can be rendered later or on another thread without
+    keeping the exception's frames and their locals alive.
+    """
+
+    __slots__ = ("exc_type", "frames", "layout", "locals", "link", "exceptions",
+                 "message", "exception_lines", "notes", "syntax_error", "rich_hidden")
+
+    def __init__(self, exc_type, exc_value, frames, layout, link=None, exceptions=()):
+        self.exc_type = exc_type
+        self.frames = frames
+        self.layout = layout
+        self.locals = {}
+        self.link = link
+        self.exceptions = list(exceptions)
+        self.message = safe_str(exc_value)
+        self.exception_lines = traceback.format_exception_only(exc_type, exc_value)
+        self.notes = [safe_str(note) for note in getattr(exc_value, "__notes__", None) or []]
+        self.syntax_error = None
+        self.rich_hidden = frozenset()
+        if isinstance(exc_value, SyntaxError):
+            self.syntax_error = SyntaxDetails(
+                exc_value.offset or 0, exc_value.filename or "?", exc_value.lineno or 0,
+                exc_value.text or "", safe_str(exc_value.msg)
+            )
+
+    def shown_frames(self):
+        """
+        Frames that are displayed, outermost first
+
+        Returns:
+            list: (index, FrameSummary) pairs
+        """
+        return [(item, self.frames[item]) for item in self.layout if not isinstance(item, FrameGap)]
+
+    def to_dict(self, context_lines=0):
+        """
+        JSON-serializable form of the exception and its displayed frames
+
+        Args:
+            context_lines (int): Source lines included before and after each
+                frame's line
+
+        Returns:
+            dict: type, module, message, link, frames and group members.
+                Collapsed frames appear as {"gap": {"start", "end", "repeats"}}.
+        """
+        frames = []
+        for item in self.layout:
+            if isinstance(item, FrameGap):
+                frames.append({"gap": item._asdict()})
+                continue
+            summary = self.frames[item]
+            frame = {
+                "filename": summary.filename,
+                "lineno": summary.lineno,
+                "name": summary.name,
+                "line": summary.line,
+            }
+            if context_lines and summary.lineno:
+                start = max(summary.lineno - context_lines, 1)
+                code = [line.rstrip() for line in
+                        source_cache.getlines(summary.filename, start, summary.lineno + context_lines)]
+                while code and not code[-1]:
+                    code.pop()
+                frame["code"] = {"start": start, "lines": code}
+            if item in self.locals:
+                frame["locals"] = self.locals[item]
+            frames.append(frame)
+
+        data = {
+            "type": self.exc_type.__name__,
+            "module": self.exc_type.__module__,
+            "message": self.message,
+            "link": self.link,
+            "frames": frames,
+        }
+        if self.exceptions:
+            data["exceptions"] = [member.to_dict(context_lines) for member in self.exceptions]
+        return data
+
+
+class TracebackRecord:
+    """
+    An exception and its chain, extracted once and shared by every consumer
+
+    The renderers, the error context and the cloud payload all read the
+    same record, so each traceback is walked only once.
+
+    Attributes:
+        stacks (list): StackRecord entries, earliest cause first and the
+            handled exception last
+    """
+
+    def __init__(self, stacks):
+        self.stacks = stacks
+
+    @property
+    def exc_type(self):
+        """type: Type of the handled exception"""
+        return self.stacks[-1].exc_type
+
+    @property
+    def message(self):
+        """str: Message of the handled exception"""
+        return self.stacks[-1].message
+
+    @property
+    def frames(self):
+        """traceback.StackSummary: Frames of the handled exception"""
+        return self.stacks[-1].frames
+
+    def format_tb(self):
+        """
+        Format the handled exception's frames like traceback.format_tb
+
+        Returns:
+            list: Formatted frame strings
+        """
+        return self.frames.format()
+
+    def to_dict(self, context_lines=0):
+        """
+        JSON-serializable form of the record
+
+        Args:
+            context_lines (int): Source lines included around each frame's line
+
+        Returns:
+            dict: "exception" with the handled exception's type, module and
+                message, and "stacks" with every chained exception, earliest first
+        """
+        return {
+            "exception": {
+                "type": self.exc_type.__name__,
+                "module": self.exc_type.__module__,
+                "message": self.message,
+            },
+            "stacks": [stack.to_dict(context_lines) for stack in self.stacks],
+        }
+
+
+def extract_traceback(exc_type, exc_value, exc_traceback, locals_policy=None,
+                      frame_limits=(HEAD_FRAMES, TAIL_FRAMES), collapse_recursion=True,
+                      _visited=None):
+    """
+    Extract an exception, its chain and their frames into a TracebackRecord
+
+    Each traceback is walked once. Frames are collapsed for display, and
+    locals allowed by the policy are captured for the displayed frames,
+    innermost first, so no frame objects are kept in the record.
+
+    Args:
+        exc_type (type): Exception type
+        exc_value (Exception): Exception value
+        exc_traceback (traceback): Exception traceback
+        locals_policy (LocalsPolicy, optional): Policy for capturing locals
+            (default: no locals)
+        frame_limits (tuple, optional): (head, tail) frames kept at each end
+            of a long stack, or None for no limit
+        collapse_recursion (bool): Collapse repeated cycles of frames
+
+    Returns:
+        TracebackRecord: Extracted traceback
+    """
+    head, tail = frame_limits if frame_limits else (None, None)
+    visited = set() if _visited is None else _visited
+    stacks = []
+    frame_objects = []
+    for entry in exception_chain(exc_type, exc_value, exc_traceback):
+        walked, rich_hidden = _walk_frames(entry.traceback)
+        frames = traceback.StackSummary.from_list([_frame_summary(frame, tb) for frame, tb in walked])
+        layout = collapse_frames(
+            range(len(frames)), key=lambda index: frame_key(frames[index]),
+            head=head, tail=tail, collapse_recursion=collapse_recursion
+        )
+        _read_shown_lines(frames, walked, layout)
+
+        members = []
+        if sys.version_info >= (3, 11) and isinstance(entry.exc_value, BaseExceptionGroup):  # noqa: F821
+            for member in entry.exc_value.exceptions:
+                if id(member) in visited:
+                    continue
+                visited.add(id(member))
+                members.append(extract_traceback(
+                    type(member), member, member.__traceback__, locals_policy,
+                    frame_limits, collapse_recursion, _visited=visited
+                ))
+
+        stack = StackRecord(entry.exc_type, entry.exc_value, frames, layout, entry.link, members)
+        stack.rich_hidden = frozenset(rich_hidden)
+        stacks.append(stack)
+        frame_objects.append([frame for frame, _ in walked])
+
+    if locals_policy is not None and locals_policy.applies_to(exc_type):
+        capture = locals_policy.start()
+        # Spend the budget on the handled exception's innermost frames first
+        for stack, objects in zip(reversed(stacks), reversed(frame_objects)):
+            for index, _ in reversed(stack.shown_frames()):
+                captured = capture.frame_locals(objects[index])
+                if captured is None:
+                    break
+                stack.locals[index] = captured
+
+    return TracebackRecord(stacks)
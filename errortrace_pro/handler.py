@@ -3,18 +3,50 @@ Exception handler module for ErrorTrace Pro
 """
 import os
 import sys
-import traceback
 import logging
-import platform
 import datetime
 import json
+import atexit
+import threading
+import functools
+import weakref
+from io import StringIO
 
-from .visualizer import TracebackVisualizer
-from .solutions import SolutionProvider
 from .cloud_logger import CloudLogger
+from . import forking, metadata
+from .dedup import DuplicateAggregator, fingerprint
+from .sampling import RateLimiter, Sampler, STAGES
+from .frames import HEAD_FRAMES, TAIL_FRAMES, extract_traceback
+from .locals_capture import LocalsPolicy
+from .sources import source_cache
+from .render_pool import RenderPool
 
 logger = logging.getLogger(__name__)
 
+# Formats ExceptionHandler can write handled exceptions in
+OUTPUT_FORMATS = ("console", "json")
+
+# Seconds a handler may spend flushing at interpreter exit
+EXIT_FLUSH_TIMEOUT = 2.0
+
+# Handlers with work to finish at exit, held weakly so they can be collected
+_exit_handlers = weakref.WeakSet()
+
+
+def _flush_at_exit():
+    """Write pending output and send pending duplicate summaries of live handlers at interpreter exit"""
+    for handler in list(_exit_handlers):
+        timeout = EXIT_FLUSH_TIMEOUT
+        if handler._render_pool is not None:
+            timeout = handler._render_pool.flush_timeout
+        try:
+            handler.flush(timeout)
+        except Exception as e:
+            logger.debug(f"Error flushing exception handler at exit: {e}")
+
+
+atexit.register(_flush_at_exit)
+
 class ExceptionHandler:
     """
     Main exception handler class for ErrorTrace Pro
@@ -25,28 +57,98 @@ class ExceptionHandler:
     
     def __init__(self, solutions_path=None, cloud_logging=False, 
                  cloud_provider=None, api_key=None, project_id=None,
-                 enable_suggestions=True, colored_output=True, verbose=True):
+                 enable_suggestions=True, colored_output=True, verbose=True,
+                 cloud_options=None, dedup_window=None, console_threshold=5,
+                 rate_limits=None, sample_rates=None, locals_policy=None,
+                 frame_limits=(HEAD_FRAMES, TAIL_FRAMES), output_format="console",
+                 stream_output=False, render_workers=None):
         """
         Initialize the exception handler
         
         Args:
             solutions_path (str, optional): Path to custom solutions JSON file
             cloud_logging (bool): Enable cloud logging
-            cloud_provider (str, optional): Cloud provider name ('gcp', 'aws', 'azure')
+            cloud_provider (str, optional): Cloud provider name ('gcp', 'aws', 'azure', 'http', 'local')
             api_key (str, optional): API key for cloud provider
             project_id (str, optional): Project ID for cloud provider
             enable_suggestions (bool): Enable solution suggestions
             colored_output (bool): Enable colored console output
             verbose (bool): Enable verbose output
+            cloud_options (dict, optional): Extra CloudLogger options, e.g.
+                {"async_delivery": True, "queue_size": 500}
+            dedup_window (float, optional): Enable duplicate aggregation. Repeats of
+                an exception are rolled up into one summary per window (seconds)
+                instead of being rendered and logged each time.
+            console_threshold (int): With dedup enabled, occurrences of the same
+                exception printed to the console before output is suppressed
+            rate_limits (dict, optional): Token-bucket limits per stage ('render',
+                'suggestions', 'cloud'), e.g. {"cloud": {"*": (10, 50), "TimeoutError": 1}}.
+                See RateLimiter for the format.
+            sample_rates (dict, optional): Head-based sampling rates by exception
+                name, e.g. {"TimeoutError": 0.01, "*": 1.0}
+            locals_policy (LocalsPolicy or dict, optional): Limits for the local
+                variables shown in tracebacks, e.g. {"max_frames": 3}; False
+                hides locals. See LocalsPolicy for the options.
+            frame_limits (tuple, optional): (head, tail) numbers of frames shown
+                at each end of a long stack, or None to show every frame.
+                Recursion cycles are always collapsed.
+            output_format (str): 'console' for the visual traceback and suggestions,
+                or 'json' to write each exception to stderr as one line of compact
+                JSON (NDJSON) instead
+            stream_output (bool): Write tracebacks to stderr while they are
+                rendered, keeping at most one frame or chained exception in
+                memory, instead of building the whole output string first
+            render_workers (int, optional): Hand suggestions, rendering and cloud
+                logging to this many background threads, so handle() returns
+                once the traceback is extracted. Output from one thread stays
+                in order; call flush() to wait for pending output.
         """
+        if output_format not in OUTPUT_FORMATS:
+            raise ValueError(f"output_format must be one of {', '.join(OUTPUT_FORMATS)}")
+        self.output_format = output_format
+        self.stream_output = stream_output
         self.enable_suggestions = enable_suggestions
         self.verbose = verbose
         
-        # Initialize visualizer
-        self.visualizer = TracebackVisualizer(colored_output=colored_output)
+        # Warm the host metadata snapshot off the exception path
+        metadata.prefetch()
+        
+        # The visualizer and solution provider are built on first use, so
+        # creating a handler doesn't import Rich or read the solutions database
+        self.colored_output = colored_output
+        self.solutions_path = solutions_path
+        self.locals_policy = LocalsPolicy.from_option(locals_policy)
+        self.frame_limits = frame_limits
+        self._visualizer = None
+        self._solution_provider = None
+        self._init_lock = threading.Lock()
+        self._output_lock = threading.Lock()
+        self._local = threading.local()
+        self._render_pool = None
+        if render_workers:
+            self._render_pool = RenderPool(workers=render_workers)
+            # Rendered events reach the cloud queue late, so flush both at
+            # exit in order rather than relying on the queues' own hooks
+            _exit_handlers.add(self)
+        
+        # Aggregate repeated exceptions if requested
+        self.aggregator = None
+        if dedup_window:
+            self.aggregator = DuplicateAggregator(
+                window=dedup_window,
+                console_threshold=console_threshold
+            )
+            # The last window's summary is sent at exit
+            _exit_handlers.add(self)
+        self._summary_lock = threading.Lock()
+        self._summary_timer = None
         
-        # Initialize solution provider
-        self.solution_provider = SolutionProvider(custom_path=solutions_path)
+        # Load shedding: sampling and per-stage rate limits
+        self.sampler = Sampler(sample_rates) if sample_rates else None
+        self.rate_limiter = RateLimiter(rate_limits) if rate_limits else None
+        self._stats_lock = threading.Lock()
+        self._stats = self._empty_stats()
+        forking.register(self)
         
         # Initialize cloud logger if requested
         self.cloud_logging = cloud_logging
@@ -64,9 +166,42 @@ class ExceptionHandler:
             self.cloud_logger = CloudLogger(
                 provider=cloud_provider,
                 api_key=api_key,
-                project_id=project_id
+                project_id=project_id,
+                **(cloud_options or {})
             )
     
+    @property
+    def visualizer(self):
+        """TracebackVisualizer: Traceback renderer, created on first access"""
+        if self._visualizer is None:
+            with self._init_lock:
+                if self._visualizer is None:
+                    from .visualizer import TracebackVisualizer
+                    self._visualizer = TracebackVisualizer(
+                        colored_output=self.colored_output,
+                        locals_policy=self.locals_policy,
+                        frame_limits=self.frame_limits
+                    )
+        return self._visualizer
+    
+    @visualizer.setter
+    def visualizer(self, value):
+        self._visualizer = value
+    
+    @property
+    def solution_provider(self):
+        """SolutionProvider: Solution database, loaded on first access"""
+        if self._solution_provider is None:
+            with self._init_lock:
+                if self._solution_provider is None:
+                    from .solutions import SolutionProvider
+                    self._solution_provider = SolutionProvider(custom_path=self.solutions_path)
+        return self._solution_provider
+    
+    @solution_provider.setter
+    def solution_provider(self, value):
+        self._solution_provider = value
+    
     def handle(self, exc_type=None, exc_value=None, exc_traceback=None):
         """
         Handle an exception
@@ -77,58 +212,496 @@ class ExceptionHandler:
             exc_traceback (traceback): Exception traceback
         
         If called without arguments, will use sys.exc_info()
+        
+        Returns:
+            dict: Error context, or None if the exception was suppressed as a duplicate
         """
         # If no exception info is provided, get it from sys.exc_info()
-        if exc_type is None or exc_value is None or exc_traceback is None:
+        if exc_type is None or exc_value is None:
+            exc_type, exc_value, exc_traceback = sys.exc_info()
+        elif exc_traceback is None:
+            exc_traceback = exc_value.__traceback__
+            
+        if exc_type is None:
+            logger.warning("No exception to handle")
+            return
+        
+        return self._guarded((exc_type, exc_value, exc_traceback), self._handle,
+                             exc_type, exc_value, exc_traceback)
+    
+    async def ahandle(self, exc_type=None, exc_value=None, exc_traceback=None):
+        """
+        Handle an exception from a coroutine without blocking the event loop
+        
+        The traceback is extracted on the loop, while it is still intact;
+        suggestions and rendering run in the loop's default executor, and
+        the cloud event is queued for a task on the loop (see
+        CloudLogger.alog_exception), so neither a slow render nor a slow
+        logging endpoint holds up other coroutines. Await aflush() before
+        the loop stops to wait for queued cloud events.
+        
+        Args:
+            exc_type (type): Exception type
+            exc_value (Exception): Exception value
+            exc_traceback (traceback): Exception traceback
+        
+        If called without arguments, will use sys.exc_info()
+        
+        Returns:
+            dict: Error context, or None if the exception was suppressed as a duplicate
+        """
+        import asyncio
+        
+        if exc_type is None or exc_value is None:
             exc_type, exc_value, exc_traceback = sys.exc_info()
+        elif exc_traceback is None:
+            exc_traceback = exc_value.__traceback__
             
         if exc_type is None:
             logger.warning("No exception to handle")
             return
+        
+        # Only the synchronous steps are guarded: the flag is per thread, and
+        # other coroutines on this loop may handle exceptions across awaits
+        exc_info = (exc_type, exc_value, exc_traceback)
+        plan = self._guarded(exc_info, self._prepare, exc_type, exc_value, exc_traceback)
+        if self.aggregator is not None:
+            await self._alog_summaries(self.aggregator.due_summaries())
+        if plan is None:
+            return None
+        record, context, render, suggest, log_to_cloud, error_fingerprint, show_tip = plan
+        
+        # The executor thread works from the record's message rather than
+        # reading the exception
+        loop = asyncio.get_running_loop()
+        suggestions = await loop.run_in_executor(None, functools.partial(
+            self._guarded, exc_info, self._render,
+            exc_type, record.message, None, record, context, render, suggest, show_tip
+        ))
+        
+        if log_to_cloud:
+            try:
+                await self.cloud_logger.alog_exception(**self._cloud_event(
+                    exc_type, record.message, record, context, suggestions, error_fingerprint
+                ))
+                status = "\n☁️ Error logged to cloud service"
+            except Exception as e:
+                logger.error(f"Failed to log to cloud: {e}")
+                status = f"\n⚠️ Failed to log to cloud: {e}"
+            if self.output_format == "console":
+                # The output lock may be held by a render on another thread
+                await loop.run_in_executor(None, self._print_line, status)
+        return context
+    
+    def _guarded(self, exc_info, func, *args):
+        """
+        Call func(*args) unless this thread is already handling an exception
+        
+        An exception raised while handling one on the same thread (e.g. from
+        a hook routed back here) gets the standard traceback instead of
+        recursing. The flag is thread-local, so no lock is taken.
+        
+        Args:
+            exc_info (tuple): The exception being handled
+            func (callable): Handling step to run
+            *args: Arguments for func
+        
+        Returns:
+            The result of func, or None for a reentrant call
+        """
+        if getattr(self._local, "handling", False):
+            self._count("reentrant")
+            sys.__excepthook__(*exc_info)
+            return None
+        self._local.handling = True
+        try:
+            return func(*args)
+        finally:
+            self._local.handling = False
+    
+    def _handle(self, exc_type, exc_value, exc_traceback):
+        """Handle one exception (see handle())"""
+        plan = self._prepare(exc_type, exc_value, exc_traceback)
+        if self.aggregator is not None:
+            self._log_summaries(self.aggregator.due_summaries())
+        if plan is None:
+            return None
+        record, context, render, suggest, log_to_cloud, error_fingerprint, show_tip = plan
+        
+        # The record holds everything output needs, so suggestions, rendering
+        # and the cloud call can run on a render worker. The job carries the
+        # message instead of the exception, whose traceback would keep every
+        # frame and its locals alive until the job runs. A full pool drops
+        # the job instead of handing it back, since rendering it here would
+        # overtake this thread's output still queued; only a closed pool (at
+        # exit) leaves it to this thread.
+        if self._render_pool is not None:
+            job = functools.partial(
+                self._emit, exc_type, record.message, None, record, context,
+                render, suggest, log_to_cloud, error_fingerprint, show_tip
+            )
+            if self._render_pool.submit(job):
+                return context
+        
+        self._emit(exc_type, exc_value, exc_traceback, record, context,
+                   render, suggest, log_to_cloud, error_fingerprint, show_tip)
+        return context
+    
+    def _prepare(self, exc_type, exc_value, exc_traceback):
+        """
+        Apply sampling, duplicate aggregation and rate limits, then extract
+        the traceback
+        
+        Returns:
+            tuple: (record, context, render, suggest, log_to_cloud, fingerprint,
+                show_tip), or None if the exception needs no further work
+        """
+        # Head-based sampling is decided before any other work
+        if self.sampler is not None and not self.sampler.keep(exc_type):
+            self._count("sampled_out", exc_type.__name__)
+            return None
+        
+        error_fingerprint = None
+        if self.aggregator is not None or (self.rate_limiter is not None
+                                           and self.rate_limiter.uses_fingerprints()):
+            error_fingerprint = fingerprint(exc_type, exc_value, exc_traceback)
+        
+        # Collapse repeats of the same exception before doing any formatting work
+        log_to_cloud = self.cloud_logging and self.cloud_logger
+        if self.aggregator is not None:
+            occurrence = self.aggregator.record(error_fingerprint, exc_type, exc_value)
             
+            if not occurrence.first:
+                log_to_cloud = False
+                self._schedule_summaries()
+                if not occurrence.show_console:
+                    self._count("duplicates_suppressed")
+                    return None
+                if occurrence.count == self.aggregator.console_threshold:
+                    self._print_line(f"\n🔁 {exc_type.__name__} occurred {occurrence.count} times; "
+                                     f"further occurrences will be summarized")
+        
+        # Rate limits for each stage
+        render = True
+        suggest = self.enable_suggestions
+        if self.rate_limiter is not None:
+            render = self._allow("render", exc_type, error_fingerprint)
+            suggest = suggest and self._allow("suggestions", exc_type, error_fingerprint)
+            log_to_cloud = log_to_cloud and self._allow("cloud", exc_type, error_fingerprint)
+            if not (render or suggest or log_to_cloud):
+                return None
+        
+        self._count("handled")
+        
         # Log the exception
         logger.error(f"Exception occurred: {exc_type.__name__}: {exc_value}")
         
+        # Walk the traceback once; the context, renderer and cloud payload share it
+        console_output = self.output_format == "console"
+        capture_locals = (render and (self.colored_output or not console_output)) or log_to_cloud
+        record = extract_traceback(
+            exc_type, exc_value, exc_traceback,
+            locals_policy=self.locals_policy if capture_locals else None,
+            frame_limits=self.frame_limits
+        )
+        
         # Generate error context
-        context = self._get_error_context(exc_type, exc_value, exc_traceback)
+        context = self._get_error_context(exc_type, exc_value, exc_traceback, record)
         
         # Check if handler is already installed (sys.excepthook is not the default)
         is_installed = sys.excepthook is not sys.__excepthook__
         
-        # Visualize the traceback
-        visual_traceback = self.visualizer.format_traceback(exc_type, exc_value, exc_traceback, show_tip=not is_installed)
+        return record, context, render, suggest, log_to_cloud, error_fingerprint, not is_installed
+    
+    def _emit(self, exc_type, exc_value, exc_traceback, record, context, render, suggest,
+              log_to_cloud, error_fingerprint, show_tip):
+        """Get suggestions, write the output and log to the cloud for one handled exception"""
+        console_output = self.output_format == "console"
         
-        # Print the visual traceback
-        print(visual_traceback, file=sys.stderr)
+        suggestions = self._render(exc_type, exc_value, exc_traceback, record, context,
+                                   render, suggest, show_tip)
         
+        # Log to cloud if enabled, with the structured traceback rather than the
+        # console rendering
+        if log_to_cloud:
+            try:
+                self.cloud_logger.log_exception(**self._cloud_event(
+                    exc_type, exc_value, record, context, suggestions, error_fingerprint
+                ))
+                if console_output:
+                    self._print_line("\n☁️ Error logged to cloud service")
+            except Exception as e:
+                logger.error(f"Failed to log to cloud: {e}")
+                if console_output:
+                    self._print_line(f"\n⚠️ Failed to log to cloud: {e}")
+    
+    def _render(self, exc_type, exc_value, exc_traceback, record, context, render, suggest, show_tip):
+        """
+        Get suggestions and write the output for one handled exception
+        
+        Returns:
+            list: Solution suggestions, or None if suggestions are disabled
+        """
         # Get solution suggestions if enabled
-        if self.enable_suggestions:
+        suggestions = None
+        if suggest:
             suggestions = self.solution_provider.get_solutions(exc_type, exc_value, context)
-            if suggestions:
-                print("\n🔍 Suggested Solutions:", file=sys.stderr)
-                for i, suggestion in enumerate(suggestions, 1):
-                    print(f"  {i}. {suggestion}", file=sys.stderr)
+        
+        self._write_output(exc_type, exc_value, exc_traceback, record, render,
+                           suggest, suggestions, show_tip)
+        return suggestions
+    
+    def _cloud_event(self, exc_type, exc_value, record, context, suggestions, error_fingerprint):
+        """
+        Build the CloudLogger.log_exception arguments for one handled exception
+        
+        Returns:
+            dict: Keyword arguments with the structured traceback
+        """
+        traceback_data = record.to_dict()
+        del traceback_data["exception"]  # already at the top of the payload
+        if suggestions is not None:
+            traceback_data["suggestions"] = suggestions
+        return {
+            "exc_type": exc_type,
+            "exc_value": exc_value,
+            "traceback_str": record.format_tb(),
+            "context": context,
+            "fingerprint": error_fingerprint,
+            "traceback_data": traceback_data
+        }
+    
+    def _write_output(self, exc_type, exc_value, exc_traceback, record, render, suggest,
+                      suggestions, show_tip):
+        """
+        Write the traceback and suggestions to stderr
+        
+        One exception's output is written as a whole even when several
+        threads handle exceptions at once. Buffered output is rendered
+        before taking the output lock, which is then only held for a single
+        write; streamed output holds it while rendering.
+        """
+        console_output = self.output_format == "console"
+        
+        if self.stream_output:
+            with self._output_lock:
+                if render and console_output:
+                    self.visualizer.write_traceback(
+                        sys.stderr, exc_type, exc_value, exc_traceback, show_tip=show_tip, record=record
+                    )
+                    print(file=sys.stderr)
+                elif render:
+                    # One structured record per line for log pipelines
+                    self.visualizer.write_json(
+                        sys.stderr, exc_type, exc_value, exc_traceback, suggestions=suggestions, record=record
+                    )
+                if suggest and console_output:
+                    self._print_suggestions(suggestions, sys.stderr)
+            return
+        
+        output = StringIO()
+        
+        # Visualize the traceback
+        if render and console_output:
+            visual_traceback = self.visualizer.format_traceback(
+                exc_type, exc_value, exc_traceback, show_tip=show_tip, record=record
+            )
+            
+            # Print the visual traceback
+            print(visual_traceback, file=output)
+        elif render:
+            output.write(self.visualizer.format_json(
+                exc_type, exc_value, exc_traceback, suggestions=suggestions, record=record, ndjson=True
+            ))
+        
+        # Print the suggestions
+        if suggest and console_output:
+            self._print_suggestions(suggestions, output)
+        
+        text = output.getvalue()
+        if text:
+            with self._output_lock:
+                sys.stderr.write(text)
+                sys.stderr.flush()
+    
+    def _print_suggestions(self, suggestions, file):
+        """Print solution suggestions"""
+        if suggestions:
+            print("\n🔍 Suggested Solutions:", file=file)
+            for i, suggestion in enumerate(suggestions, 1):
+                print(f"  {i}. {suggestion}", file=file)
+        else:
+            print("\n❓ No specific solutions found for this error.", file=file)
+    
+    def _print_line(self, text):
+        """Print one status line to stderr without interleaving with other output"""
+        with self._output_lock:
+            print(text, file=sys.stderr)
+    
+    def flush(self, timeout=None):
+        """
+        Wait for pending output, send pending duplicate summaries and wait for
+        cloud log events to be delivered
+        
+        Args:
+            timeout (float, optional): Maximum seconds to wait
+            
+        Returns:
+            bool: True if nothing is left pending
+        """
+        drained = True
+        if self._render_pool is not None:
+            drained = self._render_pool.flush(timeout)
+        if self.aggregator is not None:
+            self._log_summaries(self.aggregator.flush())
+        if self.cloud_logger:
+            drained = self.cloud_logger.flush(timeout) and drained
+        return drained
+    
+    async def aflush(self, timeout=None):
+        """
+        Send pending duplicate summaries and wait for cloud log events queued
+        by ahandle() on the running loop to be delivered
+        
+        Args:
+            timeout (float, optional): Maximum seconds to wait
+            
+        Returns:
+            bool: True if nothing is left pending
+        """
+        if self.aggregator is not None:
+            await self._alog_summaries(self.aggregator.flush())
+        if self.cloud_logger:
+            return await self.cloud_logger.aflush(timeout)
+        return True
+    
+    def get_stats(self):
+        """
+        Get handling statistics
+        
+        Returns:
+            dict: Counts of handled exceptions, suppressed duplicates, exceptions
+                sampled out (by type), stages skipped by rate limits (by stage and type),
+                and solution and source cache statistics
+        """
+        with self._stats_lock:
+            stats = {
+                "handled": self._stats["handled"],
+                "duplicates_suppressed": self._stats["duplicates_suppressed"],
+                "reentrant": self._stats["reentrant"],
+                "sampled_out": dict(self._stats["sampled_out"]),
+                "rate_limited": {
+                    stage: dict(counts) for stage, counts in self._stats["rate_limited"].items()
+                }
+            }
+        if self._solution_provider is not None:
+            stats["solutions_cache"] = self._solution_provider.get_cache_stats()
+        if self._render_pool is not None:
+            stats["render_pool"] = self._render_pool.stats()
+        stats["source_cache"] = source_cache.stats()
+        return stats
+    
+    def _after_fork(self):
+        """
+        Replace the locks and reset the counters in a forked child
+        
+        Queues, pools and caches reset themselves, so each worker process
+        starts with nothing pending and reports only its own statistics.
+        """
+        self._init_lock = threading.Lock()
+        self._output_lock = threading.Lock()
+        self._local = threading.local()
+        self._stats_lock = threading.Lock()
+        self._stats = self._empty_stats()
+        self._summary_lock = threading.Lock()
+        self._summary_timer = None
+    
+    @staticmethod
+    def _empty_stats():
+        """Zeroed handling counters"""
+        return {
+            "handled": 0,
+            "duplicates_suppressed": 0,
+            "reentrant": 0,
+            "sampled_out": {},
+            "rate_limited": {stage: {} for stage in STAGES}
+        }
+    
+    def _count(self, counter, exc_name=None, stage=None):
+        """Increment a statistics counter"""
+        with self._stats_lock:
+            if counter == "rate_limited":
+                counts = self._stats["rate_limited"][stage]
+                counts[exc_name] = counts.get(exc_name, 0) + 1
+            elif exc_name is not None:
+                counts = self._stats[counter]
+                counts[exc_name] = counts.get(exc_name, 0) + 1
             else:
-                print("\n❓ No specific solutions found for this error.", file=sys.stderr)
-                
-        # Log to cloud if enabled
-        if self.cloud_logging and self.cloud_logger:
+                self._stats[counter] += 1
+    
+    def _allow(self, stage, exc_type, error_fingerprint):
+        """Check a stage's rate limit and count it if the stage is skipped"""
+        if self.rate_limiter.allow(stage, exc_type, error_fingerprint):
+            return True
+        self._count("rate_limited", exc_type.__name__, stage)
+        return False
+    
+    def _schedule_summaries(self):
+        """
+        Start a timer that sends duplicate summaries when the earliest window
+        ends, so they go out even if no other exception is handled
+        """
+        if not (self.cloud_logging and self.cloud_logger):
+            return
+        with self._summary_lock:
+            if self._summary_timer is not None:
+                return
+            delay = self.aggregator.next_due()
+            if delay is None:
+                return
+            timer = threading.Timer(delay, self._send_due_summaries)
+            timer.daemon = True
+            self._summary_timer = timer
+        timer.start()
+    
+    def _send_due_summaries(self):
+        """Timer callback: send due summaries and wait for the next window"""
+        with self._summary_lock:
+            self._summary_timer = None
+        self._log_summaries(self.aggregator.due_summaries())
+        self._schedule_summaries()
+    
+    def _log_summaries(self, summaries):
+        """
+        Send duplicate-occurrence summaries to the cloud logger
+        
+        Args:
+            summaries (list): Summary dicts from the aggregator
+        """
+        if not summaries or not (self.cloud_logging and self.cloud_logger):
+            return
+        for summary in summaries:
             try:
-                self.cloud_logger.log_exception(
-                    exc_type=exc_type,
-                    exc_value=exc_value,
-                    traceback_str=traceback.format_tb(exc_traceback),
-                    context=context,
-                    visual_traceback=visual_traceback
-                )
-                print("\n☁️ Error logged to cloud service", file=sys.stderr)
+                self.cloud_logger.log_summary(summary)
             except Exception as e:
-                logger.error(f"Failed to log to cloud: {e}")
-                print(f"\n⚠️ Failed to log to cloud: {e}", file=sys.stderr)
-                
-        return context
+                logger.error(f"Failed to log duplicate summary to cloud: {e}")
+    
+    async def _alog_summaries(self, summaries):
+        """
+        Queue duplicate-occurrence summaries on the running loop's cloud queue
+        
+        Args:
+            summaries (list): Summary dicts from the aggregator
+        """
+        if not summaries or not (self.cloud_logging and self.cloud_logger):
+            return
+        for summary in summaries:
+            try:
+                await self.cloud_logger.alog_summary(summary)
+            except Exception as e:
+                logger.error(f"Failed to log duplicate summary to cloud: {e}")
     
-    def _get_error_context(self, exc_type, exc_value, exc_traceback):
+    def _get_error_context(self, exc_type, exc_value, exc_traceback, record=None):
         """
         Collect contextual information about the error
         
@@ -136,11 +709,15 @@ class ExceptionHandler:
             exc_type (type): Exception type
             exc_value (Exception): Exception value
             exc_traceback (traceback): Exception traceback
+            record (TracebackRecord, optional): Already extracted frames of the exception
             
         Returns:
             dict: Context information about the error
         """
-        frames = traceback.extract_tb(exc_traceback)
+        if record is None:
+            record = extract_traceback(exc_type, exc_value, exc_traceback)
+        frames = record.frames
+        system_info = metadata.get_metadata()
         
         # Get the most recent frame
         last_frame = frames[-1] if frames else None
@@ -153,10 +730,10 @@ class ExceptionHandler:
                 "module": exc_type.__module__
             },
             "system": {
-                "python_version": platform.python_version(),
-                "platform": platform.platform(),
-                "system": platform.system(),
-                "processor": platform.processor()
+                "python_version": system_info["python_version"],
+                "platform": system_info["platform"],
+                "system": system_info["system"],
+                "processor": system_info["processor"]
             },
             "traceback": {
                 "frames_count": len(frames),
@@ -0,0 +1,208 @@
+"""
+Bounded capture of local variables for ErrorTrace Pro tracebacks
+"""
+import time
+import types
+import reprlib
+
+# Types rendered as a summary instead of a repr, matched by class name
+# anywhere in the MRO (large array and frame types from common libraries)
+SUMMARIZED_TYPES = ("DataFrame", "Series", "ndarray", "Tensor")
+
+# Name under which truncation notes are shown among a frame's locals
+TRUNCATED_KEY = "…"
+
+
+class LocalsPolicy:
+    """
+    Limits for capturing local variables in tracebacks
+
+    Variable reprs are bounded in length, container items and nesting.
+    Large containers and array-like objects are summarized by type and
+    size, and a whole capture stops once its time or byte budget runs out,
+    so a frame holding a huge object can't stall the exception handler.
+    """
+
+    def __init__(self, enabled=True, max_frames=10, max_variables=20, max_repr=200,
+                 max_items=10, max_depth=3, summary_threshold=10000, time_budget=0.1,
+                 byte_budget=64 * 1024, skip_exceptions=(), summarize_types=SUMMARIZED_TYPES,
+                 hide_dunder=True):
+        """
+        Initialize the policy
+
+        Args:
+            enabled (bool): Capture locals at all
+            max_frames (int): Frames with locals, counted from the innermost
+            max_variables (int): Variables shown per frame
+            max_repr (int): Maximum length of a variable's repr
+            max_items (int): Container items shown before abbreviating
+            max_depth (int): Nesting levels shown before abbreviating
+            summary_threshold (int): Containers longer than this are shown as
+                a type/length summary
+            time_budget (float): Seconds a capture may take before the
+                remaining locals are skipped
+            byte_budget (int): Characters of reprs a capture may produce
+            skip_exceptions (tuple): Exception names (matched through the MRO)
+                whose tracebacks are shown without locals
+            summarize_types (tuple): Class names always shown as a summary
+            hide_dunder (bool): Hide variables named like __dunder__
+        """
+        self.enabled = enabled
+        self.max_frames = max_frames
+        self.max_variables = max_variables
+        self.max_repr = max_repr
+        self.max_items = max_items
+        self.max_depth = max_depth
+        self.summary_threshold = summary_threshold
+        self.time_budget = time_budget
+        self.byte_budget = byte_budget
+        self.skip_exceptions = frozenset(skip_exceptions)
+        self.summarize_types = frozenset(summarize_types)
+        self.hide_dunder = hide_dunder
+
+        self._repr = reprlib.Repr()
+        self._repr.maxlevel = max_depth
+        for attribute in ("maxtuple", "maxlist", "maxarray", "maxdict", "maxset",
+                          "maxfrozenset", "maxdeque"):
+            setattr(self._repr, attribute, max_items)
+        self._repr.maxstring = max_repr
+        self._repr.maxother = max_repr
+        self._repr.maxlong = max_repr
+
+    @classmethod
+    def from_option(cls, option):
+        """
+        Build a policy from a handler option
+
+        Args:
+            option: A LocalsPolicy, a dict of LocalsPolicy arguments,
+                False to disable locals, or None for the defaults
+
+        Returns:
+            LocalsPolicy: Policy instance
+        """
+        if isinstance(option, cls):
+            return option
+        if option is False:
+            return cls(enabled=False)
+        return cls(**(option or {}))
+
+    def applies_to(self, exc_type):
+        """
+        Check whether locals should be captured for an exception type
+
+        Args:
+            exc_type (type): Exception type
+
+        Returns:
+            bool: False if locals are disabled or the type is skipped
+        """
+        if not self.enabled or self.max_frames == 0:
+            return False
+        if self.skip_exceptions:
+            for cls in exc_type.__mro__:
+                if cls.__name__ in self.skip_exceptions or \
+                        f"{cls.__module__}.{cls.__qualname__}" in self.skip_exceptions:
+                    return False
+        return True
+
+    def start(self):
+        """
+        Begin a capture for one traceback
+
+        Returns:
+            LocalsCapture: Capture sharing this policy's budgets across frames
+        """
+        return LocalsCapture(self)
+
+    def safe_repr(self, value):
+        """
+        Bounded repr of a value, or a summary for large values
+
+        Args:
+            value: Any object
+
+        Returns:
+            str: Representation of at most max_repr characters
+        """
+        try:
+            summary = self._summary(value)
+            if summary is not None:
+                return summary
+            text = self._repr.repr(value)
+        except Exception as e:
+            return f"<repr failed: {type(e).__name__}>"
+        if len(text) > self.max_repr:
+            text = text[:self.max_repr - 1] + "…"
+        return text
+
+    def _summary(self, value):
+        """Summary for array-like or oversized values, or None"""
+        value_type = type(value)
+        type_name = value_type.__name__
+        if any(cls.__name__ in self.summarize_types for cls in value_type.__mro__):
+            shape = getattr(value, "shape", None)
+            if isinstance(shape, tuple):
+                return f"<{type_name} shape={shape}>"
+            return f"<{type_name}>"
+        if isinstance(value, str) or not hasattr(value_type, "__len__"):
+            return None
+        size = len(value)
+        if size > self.summary_threshold:
+            return f"<{type_name} len={size}>"
+        return None
+
+
+class LocalsCapture:
+    """One traceback's locals capture, sharing the policy budgets across frames"""
+
+    def __init__(self, policy):
+        self.policy = policy
+        self.deadline = time.perf_counter() + policy.time_budget if policy.time_budget else None
+        self.bytes_left = policy.byte_budget
+        self.frames_left = policy.max_frames
+        self.exhausted = None
+
+    def frame_locals(self, frame):
+        """
+        Capture the locals of one frame
+
+        Frames should be passed innermost first, so the budgets are spent
+        on the frames closest to the error.
+
+        Args:
+            frame (frame): Frame object
+
+        Returns:
+            dict: Variable names to bounded reprs, or None once the frame
+                limit or a budget is exhausted
+        """
+        if self.exhausted or (self.frames_left is not None and self.frames_left <= 0):
+            return None
+        if self.frames_left is not None:
+            self.frames_left -= 1
+
+        policy = self.policy
+        captured = {}
+        names = [
+            name for name, value in frame.f_locals.items()
+            if not (policy.hide_dunder and name.startswith("__"))
+            and not isinstance(value, (types.FunctionType, type))
+        ]
+        for index, name in enumerate(names):
+            if policy.max_variables is not None and index >= policy.max_variables:
+                captured[TRUNCATED_KEY] = f"<{len(names) - index} more variables>"
+                break
+            if self.deadline is not None and time.perf_counter() > self.deadline:
+                self.exhausted = "time budget exhausted"
+            elif self.bytes_left is not None and self.bytes_left <= 0:
+                self.exhausted = "byte budget exhausted"
+            if self.exhausted:
+                captured[TRUNCATED_KEY] = f"<{len(names) - index} variables skipped: {self.exhausted}>"
+                break
+
+            text = policy.safe_repr(frame.f_locals[name])
+            captured[name] = text
+            if self.bytes_left is not None:
+                self.bytes_left -= len(name) + len(text)
+        return captured
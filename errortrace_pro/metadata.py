@@ -0,0 +1,107 @@
+"""
+Process-level host and platform metadata for ErrorTrace Pro
+"""
+import os
+import socket
+import logging
+import platform
+import threading
+
+logger = logging.getLogger(__name__)
+
+# Platform details, computed once per process tree
+_static = None
+
+# Resolved IP address of the host; only ever looked up off the exception path
+_ip_address = None
+_resolver = None
+
+_lock = threading.Lock()
+
+
+def _collect_static():
+    """Collect the platform fields that don't change during the process lifetime"""
+    return {
+        "hostname": socket.gethostname(),
+        "python_version": platform.python_version(),
+        "platform": platform.platform(),
+        "system": platform.system(),
+        "processor": platform.processor()
+    }
+
+
+def _resolve_ip_address():
+    """Resolve the host's IP address (blocking DNS lookup, run in the background)"""
+    global _ip_address
+    try:
+        hostname = _static["hostname"] if _static else socket.gethostname()
+        _ip_address = socket.gethostbyname(hostname)
+    except OSError as e:
+        logger.debug(f"Could not resolve host IP address: {e}")
+
+
+def _prefetch_worker():
+    """Compute the full snapshot, including the DNS lookup"""
+    _ensure_static()
+    _resolve_ip_address()
+
+
+def _ensure_static():
+    """Compute the platform fields if nobody has yet"""
+    global _static
+    if _static is None:
+        with _lock:
+            if _static is None:
+                _static = _collect_static()
+    return _static
+
+
+def prefetch():
+    """
+    Start computing the metadata snapshot in a background thread
+
+    Safe to call repeatedly; only the first call per process starts a thread.
+    """
+    global _resolver
+    if _resolver is not None:
+        return
+    with _lock:
+        if _resolver is not None:
+            return
+        _resolver = threading.Thread(
+            target=_prefetch_worker,
+            name="errortrace-metadata",
+            daemon=True
+        )
+        _resolver.start()
+
+
+def get_metadata():
+    """
+    Get the host and platform metadata snapshot
+
+    Platform fields are computed once and reused. The IP address is resolved
+    in the background and is None until the lookup has finished, so this
+    never blocks on DNS.
+
+    Returns:
+        dict: hostname, ip_address, pid, python_version, platform, system, processor
+    """
+    prefetch()
+    metadata = dict(_ensure_static())
+    metadata["ip_address"] = _ip_address
+    metadata["pid"] = os.getpid()
+    return metadata
+
+
+def _reset_after_fork():
+    """Drop per-process state in a forked child"""
+    global _lock, _resolver
+    # The parent's lock may have been held at fork time and its resolver
+    # thread does not exist in the child
+    _lock = threading.Lock()
+    _resolver = None
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_reset_after_fork)
@@ -0,0 +1,257 @@
+"""
+Payload size capping and compression for ErrorTrace Pro cloud uploads
+"""
+import gzip
+import zlib
+import marshal
+import logging
+
+from .batching import PROVIDER_LIMITS, _json_size
+
+logger = logging.getLogger(__name__)
+
+# Content-Encoding values each provider accepts on request bodies
+PROVIDER_ENCODINGS = {
+    # Google APIs accept gzip-encoded request bodies
+    "gcp": ("gzip",),
+    # The Application Insights track endpoint accepts gzip
+    "azure": ("gzip",),
+    # PutLogEvents doesn't take compressed bodies
+    "aws": (),
+    # Generic endpoints: whatever the receiving server decodes
+    "http": ("gzip", "deflate"),
+}
+
+# Bodies smaller than this are sent as is; compressing them saves little
+COMPRESSION_MIN_BYTES = 1024
+
+# Frames kept at each end of a stack when middle frames are cut
+HEAD_FRAMES = 3
+TAIL_FRAMES = 5
+
+# Traceback lines kept at each end when middle frames are cut (two per frame)
+HEAD_LINES = 2 * HEAD_FRAMES + 1
+TAIL_LINES = 2 * TAIL_FRAMES + 1
+
+# Characters kept of exception messages and of each traceback line when
+# nothing else is left to remove
+MAX_MESSAGE_CHARS = 2000
+MAX_LINE_CHARS = 500
+
+# JSON takes at most this many bytes for each byte marshal encodes the same
+# data in (False in a list is one byte, "false, " seven)
+_MARSHAL_JSON_RATIO = 7
+
+
+def provider_event_limit(provider):
+    """
+    Get the largest event a provider accepts
+
+    Args:
+        provider (str): Provider name ('gcp', 'aws', 'azure', 'http')
+
+    Returns:
+        int or None: Bytes of JSON per event, or None if there is no limit
+    """
+    limits = PROVIDER_LIMITS.get(provider, PROVIDER_LIMITS["http"])
+    return limits.get("max_event_bytes")
+
+
+def cap_event(event, max_bytes, sizeof=_json_size):
+    """
+    Shrink an event to a size budget by dropping its least useful parts
+
+    The visual traceback goes first, then captured locals, then the middle
+    frames of each stack, then the context, and finally long exception
+    messages and traceback lines are shortened. Each step is only taken
+    while the event is still over budget. The removed parts are recorded
+    under "truncated" so the receiving side knows the event is incomplete.
+
+    Encoding an event to measure it costs about as much as sending it, so
+    events whose cheap size bound (see _json_size_bound) fits aren't measured.
+
+    Args:
+        event (dict): Prepared error data; it is not modified
+        max_bytes (int): Budget for the event's JSON in bytes, or None
+        sizeof (callable): Returns the size of an event in bytes
+
+    Returns:
+        dict: The event itself if it fits, otherwise a truncated copy
+    """
+    if not max_bytes:
+        return event
+    bound = _json_size_bound(event)
+    if bound is not None and bound <= max_bytes:
+        return event
+    size = sizeof(event)
+    if size <= max_bytes:
+        return event
+
+    event = dict(event)
+    removed = []
+    for name, step in _TRUNCATION_STEPS:
+        if step(event):
+            removed.append(name)
+            event["truncated"] = {"original_bytes": size, "removed": removed}
+            if sizeof(event) <= max_bytes:
+                break
+
+    if not removed or sizeof(event) > max_bytes:
+        logger.warning(f"Event of {size} bytes is still over the {max_bytes} byte budget")
+    return event
+
+
+def compress_body(body, encoding):
+    """
+    Compress a request body
+
+    Args:
+        body (str or bytes): Request body
+        encoding (str): 'gzip' or 'deflate'
+
+    Returns:
+        bytes: Compressed body
+    """
+    if isinstance(body, str):
+        body = body.encode("utf-8")
+    if encoding == "gzip":
+        # Level 6 compresses JSON almost as well as 9 in a fraction of the time
+        return gzip.compress(body, compresslevel=6)
+    if encoding == "deflate":
+        # HTTP's deflate is the zlib format
+        return zlib.compress(body, 6)
+    raise ValueError(f"Unsupported content encoding: {encoding}")
+
+
+def _json_size_bound(event):
+    """
+    Get an upper bound of an event's JSON size without encoding it as JSON
+
+    marshal encodes the same data several times faster than json does.
+
+    Returns:
+        int or None: Bytes, or None if the event holds values marshal
+            can't encode (JSON encodes those with str())
+    """
+    try:
+        return _MARSHAL_JSON_RATIO * len(marshal.dumps(event, 2))
+    except ValueError:
+        return None
+
+
+def _drop_visual_traceback(event):
+    """Remove the rendered (ANSI) traceback"""
+    return event.pop("visual_traceback", None) is not None
+
+
+def _drop_locals(event):
+    """Remove captured local variables from every frame"""
+    def strip(frame):
+        if "locals" not in frame:
+            return frame
+        frame = dict(frame)
+        del frame["locals"]
+        return frame
+
+    def strip_all(frames):
+        if not any("locals" in frame for frame in frames):
+            return frames
+        return [strip(frame) for frame in frames]
+
+    return _map_stacks(event, strip_all)
+
+
+def _drop_middle_frames(event):
+    """Replace the middle of long stacks and traceback lines with a marker"""
+    def cut(frames):
+        if len(frames) <= HEAD_FRAMES + TAIL_FRAMES + 1:
+            return frames
+        omitted = len(frames) - HEAD_FRAMES - TAIL_FRAMES
+        return frames[:HEAD_FRAMES] + [{"omitted": omitted}] + frames[-TAIL_FRAMES:]
+
+    changed = _map_stacks(event, cut)
+
+    lines = event.get("traceback")
+    if isinstance(lines, list) and len(lines) > HEAD_LINES + TAIL_LINES + 1:
+        omitted = len(lines) - HEAD_LINES - TAIL_LINES
+        event["traceback"] = (lines[:HEAD_LINES] + [f"... {omitted} lines omitted ..."]
+                              + lines[-TAIL_LINES:])
+        changed = True
+    return changed
+
+
+def _drop_context(event):
+    """Remove the handler context (environment, system details)"""
+    return event.pop("context", None) is not None
+
+
+def _shorten_text(event):
+    """Shorten long exception messages and traceback lines"""
+    changed = False
+    exception = event.get("exception")
+    if isinstance(exception, dict):
+        message = _shorten(exception.get("message"), MAX_MESSAGE_CHARS)
+        if message is not exception.get("message"):
+            event["exception"] = dict(exception, message=message)
+            changed = True
+
+    traceback_data = event.get("traceback_data")
+    if isinstance(traceback_data, dict) and traceback_data.get("stacks"):
+        stacks = []
+        for stack in traceback_data["stacks"]:
+            message = _shorten(stack.get("message"), MAX_MESSAGE_CHARS)
+            if message is not stack.get("message"):
+                stack = dict(stack, message=message)
+            stacks.append(stack)
+        if any(new is not old for new, old in zip(stacks, traceback_data["stacks"])):
+            event["traceback_data"] = dict(traceback_data, stacks=stacks)
+            changed = True
+
+    lines = event.get("traceback")
+    if isinstance(lines, list) and any(len(line) > MAX_LINE_CHARS for line in lines
+                                       if isinstance(line, str)):
+        event["traceback"] = [_shorten(line, MAX_LINE_CHARS) for line in lines]
+        changed = True
+    return changed
+
+
+def _shorten(text, limit):
+    """Cut a string to limit characters, saying how many were left out"""
+    if not isinstance(text, str) or len(text) <= limit:
+        return text
+    return f"{text[:limit]}... ({len(text) - limit} characters omitted)"
+
+
+def _map_stacks(event, transform):
+    """
+    Apply transform to the frame list of each stack in traceback_data
+
+    Returns:
+        bool: True if any frame list changed
+    """
+    traceback_data = event.get("traceback_data")
+    if not isinstance(traceback_data, dict) or not traceback_data.get("stacks"):
+        return False
+
+    changed = False
+    stacks = []
+    for stack in traceback_data["stacks"]:
+        frames = stack.get("frames") or []
+        new_frames = transform(frames)
+        if new_frames is not frames:
+            stack = dict(stack, frames=new_frames)
+            changed = True
+        stacks.append(stack)
+    if changed:
+        event["traceback_data"] = dict(traceback_data, stacks=stacks)
+    return changed
+
+
+# Lowest-value fields first
+_TRUNCATION_STEPS = (
+    ("visual_traceback", _drop_visual_traceback),
+    ("locals", _drop_locals),
+    ("frames", _drop_middle_frames),
+    ("context", _drop_context),
+    ("message", _shorten_text),
+)
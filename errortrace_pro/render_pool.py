@@ -0,0 +1,136 @@
+"""
+Background rendering workers for ErrorTrace Pro
+"""
+import logging
+import threading
+
+from . import forking
+from .delivery import DeliveryQueue
+
+logger = logging.getLogger(__name__)
+
+
+class RenderPool:
+    """
+    Worker threads that format and write handled exceptions
+
+    Each submitting thread is assigned one worker, round robin on its first
+    submission, and every worker runs its jobs in order, so output from one
+    thread keeps its order while different threads render in parallel.
+    A job that can't be queued because its worker stays busy is dropped
+    rather than run elsewhere, where it would overtake the thread's
+    earlier output.
+    """
+
+    def __init__(self, workers=1, queue_size=1000, block_timeout=1.0, flush_timeout=5.0):
+        """
+        Initialize the pool
+
+        Args:
+            workers (int): Number of worker threads
+            queue_size (int): Maximum pending jobs per worker
+            block_timeout (float): Seconds submit() waits for room in a full
+                queue before dropping the job
+            flush_timeout (float): Seconds to wait for pending output at exit
+        """
+        self.workers = max(1, int(workers))
+        self.flush_timeout = flush_timeout
+        self._queues = [
+            DeliveryQueue(
+                self._run,
+                maxsize=queue_size,
+                overflow_policy="block",
+                block_timeout=block_timeout,
+                flush_timeout=flush_timeout,
+                name=f"errortrace-render-{index}"
+            )
+            for index in range(self.workers)
+        ]
+        self._assigned = threading.local()
+        self._next = 0
+        self._lock = threading.Lock()
+        self._closed = False
+        forking.register(self)
+
+    def submit(self, job):
+        """
+        Queue a job on the calling thread's worker
+
+        Args:
+            job (callable): Renders and writes one exception
+
+        Returns:
+            bool: True if the job was queued or dropped from a full queue,
+                False if the pool is closed and the caller should run it itself
+        """
+        if self._closed:
+            return False
+        queue = getattr(self._assigned, "queue", None)
+        if queue is None:
+            with self._lock:
+                queue = self._queues[self._next % self.workers]
+                self._next += 1
+            self._assigned.queue = queue
+        if queue.put(job):
+            return True
+        if self._closed:
+            return False
+        logger.warning("Render queue full; dropped the output of a handled exception")
+        return True
+
+    def flush(self, timeout=None):
+        """
+        Wait until every queued job has run
+
+        Args:
+            timeout (float, optional): Maximum seconds to wait
+
+        Returns:
+            bool: True if nothing is left pending
+        """
+        return all([queue.flush(timeout) for queue in self._queues])
+
+    def close(self, timeout=None):
+        """
+        Run the pending jobs and stop the workers
+
+        Args:
+            timeout (float, optional): Maximum seconds to wait per worker
+        """
+        self._closed = True
+        for queue in self._queues:
+            queue.close(timeout)
+
+    def stats(self):
+        """
+        Get pool counters
+
+        Returns:
+            dict: Jobs submitted, completed and failed, jobs dropped because
+                the queue was full, and jobs pending
+        """
+        stats = {"submitted": 0, "completed": 0, "failed": 0, "dropped": 0, "pending": 0}
+        for queue in self._queues:
+            counters = queue.stats()
+            stats["submitted"] += counters["enqueued"]
+            stats["completed"] += counters["delivered"]
+            stats["failed"] += counters["failed"]
+            stats["dropped"] += counters["dropped_timeout"]
+            stats["pending"] += counters["pending"]
+        return stats
+
+    def _after_fork(self):
+        """Reassign threads to workers in a forked child (the queues reset themselves)"""
+        self._assigned = threading.local()
+        self._next = 0
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _run(job):
+        """Run one job on a worker"""
+        try:
+            job()
+        except Exception as e:
+            logger.error(f"Error rendering exception: {e}")
+            return False
+        return True
@@ -0,0 +1,251 @@
+"""
+Rate limiting and sampling for ErrorTrace Pro
+"""
+import collections
+import random
+import threading
+import time
+import weakref
+
+from . import forking
+
+# Handling stages that can be rate limited separately
+STAGES = ("render", "suggestions", "cloud")
+
+# Key for limits/rates that apply to every exception type
+GLOBAL_KEY = "*"
+
+# Key for limits applied to each fingerprint separately
+FINGERPRINT_KEY = "per_fingerprint"
+
+
+def _type_keys(exc_type):
+    """Yield the names an exception type can be configured under, most specific first"""
+    for cls in exc_type.__mro__:
+        if cls is object:
+            break
+        yield f"{cls.__module__}.{cls.__qualname__}"
+        yield cls.__name__
+
+
+def resolve_type_key(config, exc_type):
+    """
+    Find the configuration entry for an exception type
+
+    The exception's class and its base classes are tried in MRO order,
+    each by qualified name ('module.Class') and by bare name.
+
+    Args:
+        config (dict): Mapping of exception names to settings
+        exc_type (type): Exception type
+
+    Returns:
+        str: Matching key, or None
+    """
+    for key in _type_keys(exc_type):
+        if key in config:
+            return key
+    return None
+
+
+class TokenBucket:
+    """
+    Token bucket rate limiter
+
+    Tokens are added at ``rate`` per second up to ``burst``; each allowed
+    event takes one token.
+    """
+
+    __slots__ = ("rate", "burst", "tokens", "updated")
+
+    def __init__(self, rate, burst=None):
+        """
+        Initialize the token bucket
+
+        Args:
+            rate (float): Tokens added per second
+            burst (float, optional): Bucket capacity (default: max(1, rate))
+        """
+        self.rate = float(rate)
+        self.burst = float(burst if burst is not None else max(1.0, self.rate))
+        self.tokens = self.burst
+        self.updated = time.monotonic()
+
+    def available(self, now=None):
+        """
+        Get the number of tokens available without taking any
+
+        Args:
+            now (float, optional): Current time.monotonic() value
+
+        Returns:
+            float: Available tokens
+        """
+        now = time.monotonic() if now is None else now
+        return min(self.burst, self.tokens + (now - self.updated) * self.rate)
+
+    def consume(self, now=None):
+        """
+        Take a token if one is available
+
+        Args:
+            now (float, optional): Current time.monotonic() value
+
+        Returns:
+            bool: True if the event is allowed
+        """
+        now = time.monotonic() if now is None else now
+        self.tokens = self.available(now)
+        self.updated = now
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return True
+        return False
+
+
+def _make_bucket(spec):
+    """Create a bucket from a rate or a (rate, burst) tuple"""
+    if isinstance(spec, (tuple, list)):
+        return TokenBucket(*spec)
+    return TokenBucket(spec)
+
+
+class RateLimiter:
+    """
+    Token-bucket limits for the render, suggestions and cloud stages
+
+    Each stage is configured independently with a mapping of keys to a
+    rate (events per second) or a (rate, burst) tuple::
+
+        {
+            "cloud": {"*": (10, 50), "TimeoutError": 1},
+            "render": {"per_fingerprint": (1, 5)}
+        }
+
+    "*" is a global bucket shared by every exception, exception names get
+    their own bucket (matched through the MRO), and "per_fingerprint" gives
+    each fingerprint a separate bucket. An event must pass every bucket
+    that applies to it.
+    """
+
+    def __init__(self, limits, max_fingerprints=10000):
+        """
+        Initialize the rate limiter
+
+        Args:
+            limits (dict): Per-stage limit configuration
+            max_fingerprints (int): Maximum per-fingerprint buckets kept per stage
+        """
+        unknown = set(limits) - set(STAGES)
+        if unknown:
+            raise ValueError(f"Unknown rate limit stage(s): {', '.join(sorted(unknown))}")
+
+        self.limits = limits
+        self.max_fingerprints = max_fingerprints
+        self._buckets = {}
+        self._fingerprint_buckets = {stage: collections.OrderedDict() for stage in limits}
+        self._lock = threading.Lock()
+        forking.register(self)
+
+    def uses_fingerprints(self):
+        """bool: True if any stage has per-fingerprint limits"""
+        return any(FINGERPRINT_KEY in config for config in self.limits.values())
+
+    def allow(self, stage, exc_type, fingerprint=None):
+        """
+        Check whether a stage may run for an exception
+
+        Args:
+            stage (str): 'render', 'suggestions' or 'cloud'
+            exc_type (type): Exception type
+            fingerprint (str, optional): Exception fingerprint
+
+        Returns:
+            bool: True if every applicable bucket had a token
+        """
+        config = self.limits.get(stage)
+        if not config:
+            return True
+
+        buckets = []
+        with self._lock:
+            if GLOBAL_KEY in config:
+                buckets.append(self._bucket(stage, GLOBAL_KEY, config[GLOBAL_KEY]))
+
+            type_key = resolve_type_key(config, exc_type)
+            if type_key is not None:
+                buckets.append(self._bucket(stage, type_key, config[type_key]))
+
+            if fingerprint is not None and FINGERPRINT_KEY in config:
+                per_fingerprint = self._fingerprint_buckets[stage]
+                bucket = per_fingerprint.get(fingerprint)
+                if bucket is None:
+                    bucket = per_fingerprint[fingerprint] = _make_bucket(config[FINGERPRINT_KEY])
+                    while len(per_fingerprint) > self.max_fingerprints:
+                        per_fingerprint.popitem(last=False)
+                else:
+                    per_fingerprint.move_to_end(fingerprint)
+                buckets.append(bucket)
+
+            now = time.monotonic()
+            # Check all buckets first so a denied event doesn't spend tokens elsewhere
+            allowed = all(bucket.available(now) >= 1 for bucket in buckets)
+            if allowed:
+                for bucket in buckets:
+                    bucket.consume(now)
+            return allowed
+
+    def _after_fork(self):
+        """Replace the lock in a forked child"""
+        self._lock = threading.Lock()
+
+    def _bucket(self, stage, key, spec):
+        """Get or create the bucket for a stage and key (lock held)"""
+        bucket = self._buckets.get((stage, key))
+        if bucket is None:
+            bucket = self._buckets[(stage, key)] = _make_bucket(spec)
+        return bucket
+
+
+class Sampler:
+    """
+    Head-based probabilistic sampling by exception type
+
+    Rates are keyed by exception name (matched through the MRO) with "*"
+    as the default, e.g. {"TimeoutError": 0.01, "*": 1.0} keeps 1% of
+    timeouts and every other exception.
+    """
+
+    def __init__(self, rates, rng=None):
+        """
+        Initialize the sampler
+
+        Args:
+            rates (dict): Mapping of exception names to keep rates between 0 and 1
+            rng (random.Random, optional): Random source
+        """
+        self.rates = rates
+        self._rng = rng or random.Random()
+        # Resolved rate per type; weak so classes created at runtime can be freed
+        self._cache = weakref.WeakKeyDictionary()
+
+    def keep(self, exc_type):
+        """
+        Decide whether to keep an exception
+
+        Args:
+            exc_type (type): Exception type
+
+        Returns:
+            bool: True if the exception is sampled in
+        """
+        rate = self._cache.get(exc_type)
+        if rate is None:
+            key = resolve_type_key(self.rates, exc_type)
+            rate = self.rates.get(key if key is not None else GLOBAL_KEY, 1.0)
+            self._cache[exc_type] = rate
+        if rate >= 1:
+            return True
+        if rate <= 0:
+            return False
+        return self._rng.random() < rate
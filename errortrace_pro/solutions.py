@@ -5,12 +5,279 @@ import os
 import json
 import logging
 import re
-import importlib.resources as pkg_resources
-from difflib import get_close_matches
+import functools
+import threading
+import weakref
+from difflib import SequenceMatcher
 import traceback
 
+from . import forking
+from .cache import LRUCache
+from .dedup import normalize_message
+
 logger = logging.getLogger(__name__)
 
+# Built-in message rules: exception name -> {pattern: guidance template}.
+# Rules are tried in order and templates are formatted with the captured groups.
+MESSAGE_PATTERNS = {
+    "ImportError": {
+        r"No module named '([^']+)'": "Install the module with: pip install {0}",
+        r"cannot import name '([^']+)'": "Check if {0} exists in the imported module"
+    },
+    "AttributeError": {
+        r"'([^']+)' object has no attribute '([^']+)'":
+        "The {0} object doesn't have a {1} attribute. Check the object type and documentation."
+    },
+    "TypeError": {
+        r"'([^']+)' object is not callable": "The {0} variable is not a function but you're trying to call it",
+        r"([^(]+)\(\) takes (\d+) positional arguments? but (\d+) were given":
+        "The function takes {1} arguments but you provided {2}"
+    },
+    "KeyError": {
+        r"'([^']+)'": "The key '{0}' doesn't exist in the dictionary. Use .get() or check if key exists first."
+    },
+    "SyntaxError": {
+        r"invalid syntax": "Check for missing colons, parentheses, or brackets",
+        r"unexpected EOF": "Check for unclosed parentheses, brackets, or quotes"
+    }
+}
+
+# Key of a custom solutions database that holds extra message rules
+# in the same {exception name: {pattern: template}} form
+MESSAGE_PATTERNS_KEY = "_message_patterns"
+
+
+class MessageRule:
+    """A compiled message pattern and its guidance template"""
+    
+    __slots__ = ("pattern", "template", "regex")
+    
+    def __init__(self, pattern, template):
+        self.pattern = pattern
+        self.template = template
+        self.regex = re.compile(pattern)
+    
+    def format(self, groups):
+        """Format the guidance with the captured groups"""
+        return self.template.format(*groups)
+
+
+class MessagePatternIndex:
+    """
+    Message rules compiled once and indexed by exception name
+    
+    The rules of each exception are merged into a single alternation, so
+    one scan finds the leftmost match of any rule. Rules keep their order
+    of precedence: only rules listed before the matching one are checked
+    again, past the match position. Rules that can't be merged (e.g.
+    numbered backreferences or global inline flags) are scanned one by one
+    instead.
+    """
+    
+    def __init__(self, patterns=None):
+        """
+        Initialize the index
+        
+        Args:
+            patterns (dict, optional): {exception name: {pattern: template}} rules
+        """
+        self._rules = {}
+        self._combined = {}
+        if patterns:
+            self.update(patterns)
+    
+    def update(self, patterns, prepend=False):
+        """
+        Add rules to the index
+        
+        Args:
+            patterns (dict): {exception name: {pattern: template}} rules
+            prepend (bool): Try the new rules before the existing ones
+            
+        Raises:
+            re.error: If a pattern doesn't compile
+        """
+        for exc_name, rules in patterns.items():
+            compiled = [MessageRule(pattern, template) for pattern, template in rules.items()]
+            existing = self._rules.get(exc_name, [])
+            self._rules[exc_name] = compiled + existing if prepend else existing + compiled
+            self._combined[exc_name] = self._combine(self._rules[exc_name])
+    
+    def __contains__(self, exc_name):
+        return exc_name in self._rules
+    
+    def rules(self, exc_name):
+        """
+        Get the rules for an exception name
+        
+        Args:
+            exc_name (str): Exception name
+            
+        Returns:
+            list: MessageRule objects in match order
+        """
+        return list(self._rules.get(exc_name, ()))
+    
+    def match(self, exc_name, message):
+        """
+        Find the first rule matching a message
+        
+        Args:
+            exc_name (str): Exception name
+            message (str): Exception message
+            
+        Returns:
+            tuple: (MessageRule, captured groups), or None
+        """
+        combined = self._combined.get(exc_name)
+        if combined is not None:
+            regex, groups = combined
+            match = regex.search(message)
+            if match is None:
+                return None
+            rule, start, end, position = groups[match.lastindex]
+            # A rule listed earlier can only match further right than the
+            # leftmost match; it still takes precedence if it does
+            for earlier in self._rules[exc_name][:position]:
+                earlier_match = earlier.regex.search(message, match.start() + 1)
+                if earlier_match:
+                    return earlier, earlier_match.groups()
+            return rule, match.groups()[start:end]
+        
+        for rule in self._rules.get(exc_name, ()):
+            match = rule.regex.search(message)
+            if match:
+                return rule, match.groups()
+        return None
+    
+    @staticmethod
+    def _combine(rules):
+        """
+        Merge rules into one alternation
+        
+        The outer group of the matching alternative is the last group to
+        close, so ``match.lastindex`` identifies the rule.
+        
+        Returns:
+            tuple: (compiled regex, {outer group index: (rule, start, end, position)}),
+                or None if the rules can't be merged
+        """
+        alternatives = []
+        groups = {}
+        index = 1
+        for position, rule in enumerate(rules):
+            if re.search(r"\\[1-9]", rule.pattern):
+                # Numbered backreferences would point at the wrong group
+                return None
+            alternatives.append(f"({rule.pattern})")
+            # Captured groups of the rule, as a slice of match.groups()
+            groups[index] = (rule, index, index + rule.regex.groups, position)
+            index += rule.regex.groups + 1
+        try:
+            regex = re.compile("|".join(alternatives))
+        except re.error:
+            return None
+        if regex.groups != index - 1:
+            return None
+        return regex, groups
+
+
+class ExceptionNameIndex:
+    """
+    Precomputed index for fuzzy matching of exception names
+    
+    Gives the same result as ``difflib.get_close_matches(name, names, n=1)``
+    without scoring every name. Names are bucketed by length and store
+    their character counts, which give the exact upper bounds difflib uses
+    for filtering (real_quick_ratio and quick_ratio). Buckets and candidates
+    are visited best bound first and scored with SequenceMatcher.ratio(),
+    stopping once no remaining bound can beat the best score.
+    """
+    
+    def __init__(self, names, cutoff=0.7):
+        """
+        Build the index
+        
+        Args:
+            names (iterable): Exception names
+            cutoff (float): Minimum similarity ratio for a match
+        """
+        self.cutoff = cutoff
+        self._by_length = {}
+        for name in names:
+            self._by_length.setdefault(len(name), []).append((name, _char_counts(name)))
+        self.size = sum(len(bucket) for bucket in self._by_length.values())
+    
+    def best_match(self, word):
+        """
+        Find the most similar name
+        
+        Args:
+            word (str): Name to match
+            
+        Returns:
+            str: Most similar name with a ratio of at least cutoff, or None
+        """
+        word_counts = _char_counts(word)
+        matcher = SequenceMatcher()
+        matcher.set_seq2(word)
+        best = None
+        
+        # Lengths closest to the word's have the highest real_quick_ratio
+        # bound; once the best score beats a bucket's bound, the remaining
+        # (more distant) buckets can't contain a better match
+        buckets = sorted(
+            ((_ratio(min(length, len(word)), length + len(word)), length)
+             for length in self._by_length),
+            reverse=True
+        )
+        for length_bound, length in buckets:
+            if length_bound < self.cutoff or (best is not None and length_bound < best[0]):
+                break
+            
+            total = length + len(word)
+            threshold = self.cutoff if best is None else max(self.cutoff, best[0])
+            candidates = []
+            for name, counts in self._by_length[length]:
+                # quick_ratio: matches can't exceed the shared characters
+                shared = sum(min(n, word_counts.get(c, 0)) for c, n in counts.items())
+                bound = _ratio(shared, total)
+                if bound >= threshold:
+                    candidates.append((bound, name))
+            
+            candidates.sort(reverse=True)
+            for bound, name in candidates:
+                if best is not None and bound < best[0]:
+                    break
+                matcher.set_seq1(name)
+                score = matcher.ratio()
+                # Ties go to the greater name, as with get_close_matches
+                if score >= self.cutoff and (best is None or (score, name) > best):
+                    best = (score, name)
+        return best[1] if best else None
+
+
+def _char_counts(text):
+    """Count the characters of a string"""
+    counts = {}
+    for char in text:
+        counts[char] = counts.get(char, 0) + 1
+    return counts
+
+
+def _ratio(matches, length):
+    """Similarity ratio as computed by difflib"""
+    return 2.0 * matches / length if length else 1.0
+
+
+# Message templates for the get_solutions() cache key; repeated messages
+# skip the normalization regexes
+_message_template = functools.lru_cache(maxsize=1024)(normalize_message)
+
+# Bases shared by nearly every exception; too generic to inherit solutions from
+_GENERIC_BASES = (Exception, BaseException, object)
+
+
 class SolutionProvider:
     """
     Provides solution suggestions for common exceptions
@@ -19,47 +286,59 @@ class SolutionProvider:
     and finds the most relevant solutions for a given exception.
     """
     
-    def __init__(self, custom_path=None):
+    def __init__(self, custom_path=None, cache_size=1024, cache_ttl=None):
         """
         Initialize the solution provider
         
         Args:
             custom_path (str, optional): Path to custom solutions JSON file
+            cache_size (int): Maximum number of memoized get_solutions() results
+                (0 disables the cache)
+            cache_ttl (float, optional): Seconds a memoized result stays valid
         """
         self.solutions_db = {}
         self.custom_path = custom_path
         
+        # Memoized results keyed by (type, message template, last-frame location)
+        self._solutions_cache = LRUCache(maxsize=cache_size, ttl=cache_ttl) if cache_size else None
+        
+        # Message rules are compiled once here rather than on every lookup
+        self.message_index = MessagePatternIndex(MESSAGE_PATTERNS)
+        
+        # Fuzzy name matching: an index over the database keys and a memo
+        # of results per unknown exception name
+        self._name_index = None
+        self._similar_cache = LRUCache(maxsize=1024)
+        
+        # Database key each exception type resolves to
+        self._type_cache = weakref.WeakKeyDictionary()
+        self._type_cache_lock = threading.Lock()
+        forking.register(self)
+        
         # Load the built-in solutions database
         self._load_builtin_solutions()
         
         # Load custom solutions if provided
         if custom_path:
             self._load_custom_solutions(custom_path)
+        
+        self._build_indexes()
     
     def _load_builtin_solutions(self):
         """Load the built-in solutions database"""
         try:
-            # Try to load from package data using importlib.resources
-            solution_file = "data/solutions.json"
-            
-            # First check if the file exists in the current directory
+            # The database ships as package data next to this module
             current_dir = os.path.dirname(os.path.abspath(__file__))
-            file_path = os.path.join(current_dir, solution_file)
+            file_path = os.path.join(current_dir, "data", "solutions.json")
             
             if os.path.exists(file_path):
                 with open(file_path, 'r', encoding='utf-8') as f:
                     self.solutions_db = json.load(f)
             else:
-                # Fall back to a default set of solutions
+                # Fall back to a default set of solutions; the package
+                # directory may be read-only, so nothing is written back
                 self.solutions_db = self._get_default_solutions()
                 
-                # Create the directory if it doesn't exist
-                os.makedirs(os.path.dirname(file_path), exist_ok=True)
-                
-                # Write the default solutions to the file
-                with open(file_path, 'w', encoding='utf-8') as f:
-                    json.dump(self.solutions_db, f, indent=2)
-                
         except Exception as e:
             logger.error(f"Failed to load built-in solutions: {e}")
             # Fall back to a default set of solutions
@@ -188,6 +467,11 @@ class SolutionProvider:
             with open(path, 'r', encoding='utf-8') as f:
                 custom_solutions = json.load(f)
                 
+            # Custom message rules are tried before the built-in ones
+            message_patterns = custom_solutions.pop(MESSAGE_PATTERNS_KEY, None)
+            if message_patterns:
+                self.message_index.update(message_patterns, prepend=True)
+            
             # Merge with existing solutions
             for exc_name, solutions in custom_solutions.items():
                 if exc_name in self.solutions_db:
@@ -208,32 +492,99 @@ class SolutionProvider:
         """
         Get solution suggestions for an exception
         
+        Results are memoized by exception type, normalized message template
+        and last-frame location, so repeats of the same failure are answered
+        from the cache.
+        
         Args:
             exc_type (type): Exception type
-            exc_value (Exception): Exception value
+            exc_value (Exception or str): Exception value, or its message
             context (dict, optional): Additional context about the error
             
         Returns:
             list: List of solution suggestions
         """
-        # Initialize solutions list
-        solutions = []
+        message = str(exc_value)
+        self._check_indexes()
         
-        # Get exception name
-        exc_name = exc_type.__name__
+        if self._solutions_cache is None:
+            return self._build_solutions(exc_type, exc_value, message, context)[1]
         
-        # Check if we have specific solutions for this exception type
-        if exc_name in self.solutions_db:
-            solutions.extend(self.solutions_db[exc_name])
+        last_frame = (context or {}).get("traceback", {}).get("last_frame", {})
+        key = (exc_type, _message_template(message),
+               last_frame.get("filename"), last_frame.get("lineno"))
+        cached = self._solutions_cache.get(key)
+        if cached is not None:
+            cached_message, base, solutions = cached
+            if cached_message == message:
+                return list(solutions)
+            # Same template with different values: only the message-dependent
+            # parts are rebuilt
+            base, solutions = self._build_solutions(exc_type, exc_value, message, context, base)
         else:
-            # Try to find similar exception types
-            similar_exc = self._find_similar_exception(exc_name)
-            if similar_exc:
-                solutions.extend(self.solutions_db[similar_exc])
-                solutions.insert(0, f"This appears similar to a {similar_exc}. Consider these solutions:")
+            base, solutions = self._build_solutions(exc_type, exc_value, message, context)
+        
+        self._solutions_cache.put(key, (message, base, tuple(solutions)))
+        return solutions
+    
+    def reload(self):
+        """
+        Reload the built-in and custom solutions databases
+        
+        Message rules are recompiled and every cached lookup is invalidated.
+        """
+        self.message_index = MessagePatternIndex(MESSAGE_PATTERNS)
+        self._load_builtin_solutions()
+        if self.custom_path:
+            self._load_custom_solutions(self.custom_path)
+        self._build_indexes()
+    
+    def clear_cache(self):
+        """Invalidate memoized get_solutions() results"""
+        if self._solutions_cache is not None:
+            self._solutions_cache.clear()
+    
+    def get_cache_stats(self):
+        """
+        Get statistics for the get_solutions() cache
+        
+        Returns:
+            dict: hits, misses, evictions, expirations and size (empty if disabled)
+        """
+        return self._solutions_cache.stats() if self._solutions_cache is not None else {}
+    
+    def _after_fork(self):
+        """Replace the lock in a forked child"""
+        self._type_cache_lock = threading.Lock()
+    
+    def _build_solutions(self, exc_type, exc_value, message, context, base=None):
+        """
+        Compute the solutions for an exception
+        
+        Args:
+            exc_type (type): Exception type
+            exc_value (Exception): Exception value
+            message (str): Exception message
+            context (dict, optional): Additional context about the error
+            base (tuple, optional): Previously resolved type solutions to reuse
+            
+        Returns:
+            tuple: (type solutions, full solutions list)
+        """
+        if base is None:
+            # Use the solutions of this exception type or the closest base class
+            base = []
+            solutions_key, similar = self._resolve_solutions_key(exc_type)
+            if solutions_key is not None:
+                base.extend(self.solutions_db[solutions_key])
+                if similar:
+                    base.insert(0, f"This appears similar to a {solutions_key}. Consider these solutions:")
+            base = tuple(base)
+        
+        solutions = list(base)
         
         # Add specific guidance based on the exception message
-        message_guidance = self._get_message_specific_guidance(exc_name, str(exc_value))
+        message_guidance = self._get_message_specific_guidance(self._resolve_message_key(exc_type), message)
         if message_guidance:
             solutions.insert(0, message_guidance)
         
@@ -243,7 +594,70 @@ class SolutionProvider:
             if contextual_solutions:
                 solutions.extend(contextual_solutions)
         
-        return solutions
+        return base, solutions
+    
+    def _resolve_solutions_key(self, exc_type):
+        """
+        Find the database entry for an exception type
+        
+        The type's MRO is walked, trying each class by qualified name
+        ('module.Class') and by bare name, so library exceptions inherit
+        the solutions of their base classes. Only when no class matches is
+        the name fuzzy-matched. Results are cached per type object.
+        
+        Args:
+            exc_type (type): Exception type
+            
+        Returns:
+            tuple: (database key or None, whether the key is a fuzzy match)
+        """
+        self._check_indexes()
+        resolved = self._type_cache.get(exc_type)
+        if resolved is not None:
+            return resolved
+        
+        resolved = (None, False)
+        for cls in exc_type.__mro__:
+            if cls in _GENERIC_BASES:
+                break
+            qualified_name = f"{cls.__module__}.{cls.__qualname__}"
+            if qualified_name in self.solutions_db:
+                resolved = (qualified_name, False)
+                break
+            if cls.__name__ in self.solutions_db:
+                resolved = (cls.__name__, False)
+                break
+        
+        if resolved[0] is None:
+            similar_exc = self._find_similar_exception(exc_type.__name__)
+            if similar_exc:
+                resolved = (similar_exc, True)
+        
+        with self._type_cache_lock:
+            self._type_cache[exc_type] = resolved
+        return resolved
+    
+    def _resolve_message_key(self, exc_type):
+        """
+        Find the message rules for an exception type
+        
+        Like the solutions lookup, the type's MRO is walked by qualified
+        and bare name, so subclasses get the message guidance of their
+        base classes.
+        
+        Args:
+            exc_type (type): Exception type
+            
+        Returns:
+            str: Name the message rules are indexed by
+        """
+        for cls in exc_type.__mro__:
+            if cls in _GENERIC_BASES:
+                break
+            for name in (f"{cls.__module__}.{cls.__qualname__}", cls.__name__):
+                if name in self.message_index:
+                    return name
+        return exc_type.__name__
     
     def _find_similar_exception(self, exc_name):
         """
@@ -255,9 +669,27 @@ class SolutionProvider:
         Returns:
             str: Similar exception name or None
         """
-        matches = get_close_matches(exc_name, self.solutions_db.keys(), n=1, cutoff=0.7)
-        return matches[0] if matches else None
+        self._check_indexes()
+        
+        similar = self._similar_cache.get(exc_name, False)
+        if similar is False:
+            similar = self._name_index.best_match(exc_name)
+            self._similar_cache.put(exc_name, similar)
+        return similar
     
+    def _check_indexes(self):
+        """Rebuild the lookup indexes if solutions were added since they were built"""
+        if self._name_index is None or self._name_index.size != len(self.solutions_db):
+            self._build_indexes()
+    
+    def _build_indexes(self):
+        """Index the database keys and reset cached lookups"""
+        self._name_index = ExceptionNameIndex(self.solutions_db.keys(), cutoff=0.7)
+        self._similar_cache.clear()
+        with self._type_cache_lock:
+            self._type_cache.clear()
+        self.clear_cache()
+
     def _get_message_specific_guidance(self, exc_name, message):
         """
         Provide specific guidance based on the exception message pattern
@@ -269,40 +701,13 @@ class SolutionProvider:
         Returns:
             str: Specific guidance or None
         """
-        # Common patterns and their solutions
-        patterns = {
-            "ImportError": {
-                r"No module named '([^']+)'": "Install the module with: pip install {0}",
-                r"cannot import name '([^']+)'": "Check if {0} exists in the imported module"
-            },
-            "AttributeError": {
-                r"'([^']+)' object has no attribute '([^']+)'": 
-                "The {0} object doesn't have a {1} attribute. Check the object type and documentation."
-            },
-            "TypeError": {
-                r"'([^']+)' object is not callable": "The {0} variable is not a function but you're trying to call it",
-                r"([^(]+)\(\) takes (\d+) positional arguments? but (\d+) were given":
-                "The function takes {1} arguments but you provided {2}"
-            },
-            "KeyError": {
-                r"'([^']+)'": "The key '{0}' doesn't exist in the dictionary. Use .get() or check if key exists first."
-            },
-            "SyntaxError": {
-                r"invalid syntax": "Check for missing colons, parentheses, or brackets",
-                r"unexpected EOF": "Check for unclosed parentheses, brackets, or quotes"
-            }
-        }
-        
-        # Check if we have patterns for this exception
-        if exc_name in patterns:
-            for pattern, template in patterns[exc_name].items():
-                match = re.search(pattern, message)
-                if match:
-                    # Format the guidance with captured groups
-                    groups = match.groups()
-                    return template.format(*groups)
+        result = self.message_index.match(exc_name, message)
+        if result is None:
+            return None
         
-        return None
+        # Format the guidance with captured groups
+        rule, groups = result
+        return rule.format(groups)
     
     def _get_contextual_solutions(self, exc_type, exc_value, context):
         """
@@ -327,23 +732,26 @@ class SolutionProvider:
         if not (filename and lineno and line):
             return solutions
         
+        # Names along the MRO, so subclasses match their built-in bases
+        type_names = " ".join(cls.__name__ for cls in exc_type.__mro__)
+        
         # Add specific solutions based on file type
         if filename.endswith(".py"):
-            if "IndentationError" in exc_type.__name__:
+            if "IndentationError" in type_names:
                 solutions.append(f"Check line {lineno} in {filename} for inconsistent indentation")
-            elif "SyntaxError" in exc_type.__name__:
+            elif "SyntaxError" in type_names:
                 solutions.append(f"Syntax error near line {lineno} in {filename}")
-            elif "ImportError" in exc_type.__name__ or "ModuleNotFoundError" in exc_type.__name__:
+            elif "ImportError" in type_names or "ModuleNotFoundError" in type_names:
                 module_name = str(exc_value).split("'")[1] if "'" in str(exc_value) else ""
                 if module_name:
                     solutions.append(f"Try installing the module with: pip install {module_name}")
-            elif "AttributeError" in exc_type.__name__ and line:
+            elif "AttributeError" in type_names and line:
                 # Try to extract the attribute name from the error
                 attr_match = re.search(r"'([^']+)'", str(exc_value))
                 if attr_match:
                     attr_name = attr_match.group(1)
                     solutions.append(f"Check if the attribute '{attr_name}' exists or is spelled correctly at line {lineno}")
-            elif "FileNotFoundError" in exc_type.__name__:
+            elif "FileNotFoundError" in type_names:
                 # Extract the file path
                 path_match = re.search(r"'([^']+)'", str(exc_value))
                 if path_match:
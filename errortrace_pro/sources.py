@@ -0,0 +1,288 @@
+"""
+Source line cache for ErrorTrace Pro frame snippets
+"""
+import io
+import re
+import bisect
+import os
+import linecache
+import threading
+import collections
+import tokenize
+
+from . import forking
+
+# Files at least this large aren't kept in memory; their lines are read
+# from disk in bounded chunks, only as far as the lines that are asked for
+STREAM_THRESHOLD = 1024 * 1024
+
+# Bytes of a streamed file read at a time when looking for a line
+_CHUNK = 16 * 1024
+
+# Line endings, split the same way as universal newlines
+_NEWLINE = re.compile(rb"\r\n|\r|\n")
+
+
+def _count_newlines(data):
+    """Number of line endings in a byte string"""
+    newlines = data.count(b"\n")
+    if b"\r" in data:
+        newlines += data.count(b"\r") - data.count(b"\r\n")
+    return newlines
+
+
+class _SourceFile:
+    """Lines of one version of a source file"""
+
+    __slots__ = ("key", "encoding", "lines", "offsets", "size")
+
+    def __init__(self, key, data, streamed=False):
+        """
+        Args:
+            key (tuple): (path, mtime, size) of the file
+            data (bytes): Contents of the file, or only its head if streamed
+            streamed (bool): Read lines from disk on demand instead of keeping them
+        """
+        self.key = key
+        self.size = key[2]
+        self.lines = None
+        self.offsets = None
+        try:
+            self.encoding = tokenize.detect_encoding(io.BytesIO(data[:4096]).readline)[0]
+        except SyntaxError:
+            self.encoding = "utf-8"
+        if streamed:
+            # (line number, offset) of line starts at least a chunk apart
+            self.offsets = [(1, 0)]
+        else:
+            text = data.decode(self.encoding, errors="replace")
+            self.lines = text.replace("\r\n", "\n").replace("\r", "\n").split("\n")
+            if not self.lines[-1]:
+                self.lines.pop()
+
+    @property
+    def memory(self):
+        """Bytes of file contents held in memory"""
+        return self.size if self.lines is not None else 0
+
+    def getlines(self, start, end):
+        """Lines start..end (1-based, inclusive) without line endings"""
+        start = max(start, 1)
+        if self.lines is not None:
+            return self.lines[start - 1:max(end, 0)]
+
+        # Resume from the last checkpoint at or before the first line, then
+        # skip whole chunks by counting their line endings. Reads stop at the
+        # size the file had when it was stat-ed; a file truncated since then
+        # just ends early.
+        checkpoints = self.offsets
+        index = bisect.bisect_right(checkpoints, (start, self.size)) - 1
+        lineno, position = checkpoints[index]
+        lines = []
+        pending = b""
+        with open(self.key[0], "rb") as f:
+            f.seek(position)
+            while lineno <= end:
+                chunk = f.read(min(_CHUNK, self.size - position)) if position < self.size else b""
+                if not chunk:
+                    if pending and lineno >= start:
+                        lines.append(pending.decode(self.encoding, errors="replace"))
+                    break
+                position += len(chunk)
+                data = pending + chunk
+                # A trailing \r may be the first half of a \r\n in the next chunk
+                limit = len(data) - 1 if data.endswith(b"\r") and position < self.size else len(data)
+                count = _count_newlines(data[:limit])
+                if lineno + count < start:
+                    lineno += count
+                    pending = data[max(data.rfind(b"\n", 0, limit), data.rfind(b"\r", 0, limit)) + 1:]
+                else:
+                    offset = 0
+                    for match in _NEWLINE.finditer(data, 0, limit):
+                        if lineno >= start:
+                            lines.append(data[offset:match.start()].decode(self.encoding, errors="replace"))
+                        offset = match.end()
+                        lineno += 1
+                        if lineno > end:
+                            break
+                    pending = data[offset:]
+                line_start = position - len(pending)
+                if line_start - checkpoints[-1][1] >= _CHUNK:
+                    checkpoints.append((lineno, line_start))
+        return lines
+
+
+class SourceCache:
+    """
+    Cache of source files for reading frame lines
+
+    Files are keyed by (path, mtime, size), so an edited file is reloaded
+    on its next use. Small files are read once and split into lines. Large
+    files aren't held in memory: each read reopens the file and reads it in
+    bounded chunks as far as the lines asked for, remembering line offsets
+    so later reads can seek past what was already scanned. That costs an
+    open and a few reads per lookup, but unlike memory-mapping it can't
+    crash the process when the file is truncated while it's in use.
+    Sources that aren't plain files (zip imports, <stdin>) are read through
+    linecache.
+    """
+
+    def __init__(self, max_files=64, max_bytes=16 * 1024 * 1024, stream_threshold=STREAM_THRESHOLD):
+        """
+        Initialize the cache
+
+        Args:
+            max_files (int): Maximum number of files kept
+            max_bytes (int): Maximum bytes of file contents kept in memory
+            stream_threshold (int): Files at least this size are read from disk on demand
+        """
+        self.max_files = max_files
+        self.max_bytes = max_bytes
+        self.stream_threshold = stream_threshold
+        self._files = collections.OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self._counters = {"hits": 0, "misses": 0, "fallbacks": 0, "evictions": 0,
+                          "bytes_read": 0, "streamed_files": 0}
+        forking.register(self)
+
+    def getlines(self, filename, start, end, module_globals=None):
+        """
+        Read a window of lines from a source file
+
+        Args:
+            filename (str): Source path
+            start (int): First line, 1-based
+            end (int): Last line, inclusive
+            module_globals (dict, optional): Globals of the module, used to
+                read sources from import loaders
+
+        Returns:
+            list: Lines without line endings; shorter than the window when
+                the file ends first, and empty if the source can't be read
+        """
+        with self._lock:
+            source = self._get(filename)
+            if source is not None:
+                return source.getlines(start, end)
+
+        # Not a plain file: let linecache ask the module's loader
+        self._count("fallbacks")
+        if module_globals is not None:
+            linecache.lazycache(filename, module_globals)
+        lines = linecache.getlines(filename, module_globals)
+        return [line.rstrip("\r\n") for line in lines[max(start, 1) - 1:max(end, 0)]]
+
+    def getline(self, filename, lineno, module_globals=None):
+        """
+        Read one line from a source file
+
+        Args:
+            filename (str): Source path
+            lineno (int): Line number, 1-based
+            module_globals (dict, optional): Globals of the module
+
+        Returns:
+            str: The line without its line ending, or '' if it can't be read
+        """
+        lines = self.getlines(filename, lineno, lineno, module_globals)
+        return lines[0] if lines else ""
+
+    def lines_at(self, filename, linenos, module_globals=None):
+        """
+        Read several single lines from one file, checking the file only once
+
+        Args:
+            filename (str): Source path
+            linenos (iterable): Line numbers, 1-based
+            module_globals (dict, optional): Globals of the module
+
+        Returns:
+            dict: Line number to the line without its line ending
+        """
+        linenos = set(linenos)
+        with self._lock:
+            source = self._get(filename)
+            if source is not None:
+                return {lineno: (source.getlines(lineno, lineno) or [""])[0] for lineno in linenos}
+        return {lineno: self.getline(filename, lineno, module_globals) for lineno in linenos}
+
+    def clear(self):
+        """Drop every cached file"""
+        with self._lock:
+            self._files.clear()
+            self._bytes = 0
+
+    def stats(self):
+        """
+        Get cache counters
+
+        Returns:
+            dict: hits and misses by file, linecache fallbacks, evictions,
+                bytes read from disk, files streamed, and the files and bytes
+                currently held
+        """
+        with self._lock:
+            stats = dict(self._counters)
+            stats["files"] = len(self._files)
+            stats["bytes"] = self._bytes
+        return stats
+
+    def _after_fork(self):
+        """Replace the lock in a forked child; the cached files stay valid"""
+        self._lock = threading.Lock()
+
+    def _count(self, counter, amount=1):
+        with self._lock:
+            self._counters[counter] += amount
+
+    def _get(self, filename):
+        """Current version of a file, loading it if needed (lock held)"""
+        if not filename or filename.startswith("<"):
+            return None
+        try:
+            stat = os.stat(filename)
+        except (OSError, ValueError):
+            return None
+        key = (filename, stat.st_mtime_ns, stat.st_size)
+
+        source = self._files.get(filename)
+        if source is not None and source.key == key:
+            self._files.move_to_end(filename)
+            self._counters["hits"] += 1
+            return source
+        if source is not None:
+            self._evict(filename)
+
+        self._counters["misses"] += 1
+        try:
+            source = self._load(key)
+        except (OSError, ValueError):
+            return None
+        self._files[filename] = source
+        self._bytes += source.memory
+        while len(self._files) > self.max_files or \
+                (self._bytes > self.max_bytes and len(self._files) > 1):
+            self._evict(next(iter(self._files)))
+            self._counters["evictions"] += 1
+        return source
+
+    def _load(self, key):
+        """Read one file, or only its head if it's streamed"""
+        filename, _, size = key
+        with open(filename, "rb") as f:
+            if size >= self.stream_threshold:
+                self._counters["streamed_files"] += 1
+                return _SourceFile(key, f.read(4096), streamed=True)
+            data = f.read()
+        self._counters["bytes_read"] += len(data)
+        return _SourceFile(key, data)
+
+    def _evict(self, filename):
+        """Drop one file (lock held)"""
+        source = self._files.pop(filename)
+        self._bytes -= source.memory
+
+
+# Shared by every renderer in the process
+source_cache = SourceCache()
@@ -0,0 +1,405 @@
+"""
+Durable on-disk spool for undeliverable ErrorTrace Pro events
+"""
+import os
+import json
+import logging
+import threading
+import time
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+from . import forking
+
+logger = logging.getLogger(__name__)
+
+SEGMENT_PREFIX = "segment-"
+SEGMENT_SUFFIX = ".ndjson"
+
+
+class Spool:
+    """
+    Append-only, segment-rotated event log
+
+    Events are written as NDJSON lines to the active segment. Segments are
+    rotated at a fixed size, fsync calls are batched, and the oldest
+    segments are evicted once the directory exceeds its size cap. Each
+    process writes to a fresh segment, so segments left behind by a crashed
+    process are complete files that can be replayed on the next start.
+    """
+
+    def __init__(self, directory, segment_bytes=1024 * 1024, max_bytes=64 * 1024 * 1024,
+                 fsync_every=100, fsync_interval=1.0):
+        """
+        Initialize the spool
+
+        Args:
+            directory (str): Spool directory (created if missing)
+            segment_bytes (int): Size at which the active segment is rotated
+            max_bytes (int): Total size cap; the oldest segments are evicted beyond it
+            fsync_every (int): fsync after this many appends
+            fsync_interval (float): fsync when this many seconds passed since the last one
+        """
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.segment_bytes = min(segment_bytes, max_bytes)
+        self.fsync_every = fsync_every
+        self.fsync_interval = fsync_interval
+
+        os.makedirs(directory, exist_ok=True)
+
+        self._lock = threading.Lock()
+        self._fd = None
+        self._active_path = None
+        self._active_bytes = 0
+        self._unsynced = 0
+        self._last_sync = time.monotonic()
+        self._counters = {"appended": 0, "evicted_segments": 0, "replayed": 0, "fsyncs": 0}
+        self._undelivered_segments = 0
+
+        self._total_bytes = self._directory_bytes()
+        self._next_seq = self._last_seq() + 1
+        forking.register(self)
+
+    def append(self, event):
+        """
+        Append an event to the spool
+
+        Args:
+            event (dict): Event to persist
+
+        Returns:
+            bool: True if the event was written
+        """
+        try:
+            line = (json.dumps(event, default=str) + "\n").encode("utf-8")
+        except (TypeError, ValueError) as e:
+            logger.error(f"Cannot spool event: {e}")
+            return False
+
+        with self._lock:
+            try:
+                if self._fd is None or self._active_bytes + len(line) > self.segment_bytes:
+                    self._rotate()
+
+                # A single write() on an O_APPEND descriptor keeps lines whole
+                os.write(self._fd, line)
+                self._active_bytes += len(line)
+                self._total_bytes += len(line)
+                self._unsynced += 1
+                self._counters["appended"] += 1
+
+                if (self._unsynced >= self.fsync_every
+                        or time.monotonic() - self._last_sync >= self.fsync_interval):
+                    self._sync()
+
+                self._evict()
+                return True
+            except OSError as e:
+                logger.error(f"Error writing to spool {self.directory}: {e}")
+                return False
+
+    def sync(self):
+        """Flush pending appends to disk"""
+        with self._lock:
+            self._sync()
+
+    def close(self):
+        """Sync and close the active segment"""
+        with self._lock:
+            self._close_active()
+
+    def stats(self):
+        """
+        Get spool counters
+
+        Returns:
+            dict: Appended events, evicted segments, replayed events,
+                fsync calls, segment count and total bytes, and
+                "undelivered_segments": segments the last replay couldn't
+                deliver. Segments skipped because another process is still
+                writing them don't count as undelivered.
+        """
+        with self._lock:
+            stats = dict(self._counters)
+            stats["undelivered_segments"] = self._undelivered_segments
+            stats["segments"] = len(self._segment_paths())
+            stats["bytes"] = self._total_bytes
+        return stats
+
+    def replay(self, send, batch_size=100):
+        """
+        Send spooled events and remove them once delivered
+
+        Segments are replayed oldest first. The active segment of this
+        process, and segments locked by other live processes, are skipped.
+        When ``send`` fails, the undelivered remainder of the segment is
+        rewritten atomically and replay stops, so events are delivered at
+        least once.
+
+        Args:
+            send (callable): Called with a list of events, returns bool
+            batch_size (int): Maximum events per send call
+
+        Returns:
+            int: Number of events delivered
+        """
+        with self._lock:
+            # Start a new segment so the current one can be replayed too
+            self._close_active()
+            paths = self._segment_paths()
+            # Counted down as segments are delivered or skipped, so an
+            # error part way leaves the rest counted
+            self._undelivered_segments = len(paths)
+
+        delivered = 0
+        for path in paths:
+            sent, complete = self._replay_segment(path, send, batch_size)
+            delivered += sent
+            if not complete:
+                break
+            with self._lock:
+                self._undelivered_segments -= 1
+
+        with self._lock:
+            self._counters["replayed"] += delivered
+        return delivered
+
+    def _replay_segment(self, path, send, batch_size):
+        """
+        Replay one segment
+
+        Returns:
+            tuple: (events delivered, whether the whole segment was delivered)
+        """
+        try:
+            fd = os.open(path, os.O_RDWR)
+        except FileNotFoundError:
+            return 0, True
+
+        try:
+            if fcntl is not None:
+                try:
+                    fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                except OSError:
+                    # Another process is still writing to this segment
+                    return 0, True
+
+            if not os.fstat(fd).st_size:
+                # Just created by another process that hasn't locked it yet
+                return 0, True
+
+            with os.fdopen(os.dup(fd), "rb") as f:
+                lines = f.read().split(b"\n")
+
+            events = []
+            for line in lines:
+                if not line.strip():
+                    continue
+                try:
+                    events.append(json.loads(line.decode("utf-8")))
+                except (UnicodeDecodeError, ValueError):
+                    # Torn write from a crash; nothing to recover
+                    logger.warning(f"Skipping corrupt spool record in {path}")
+
+            for start in range(0, len(events), batch_size):
+                batch = events[start:start + batch_size]
+                if not send(batch):
+                    self._rewrite(path, events[start:])
+                    return start, False
+
+            self._remove(path)
+            return len(events), True
+        finally:
+            os.close(fd)
+
+    def _rewrite(self, path, events):
+        """Atomically replace a segment with its undelivered events"""
+        tmp_path = path + ".tmp"
+        data = b"".join((json.dumps(event, default=str) + "\n").encode("utf-8") for event in events)
+        with open(tmp_path, "wb") as f:
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+        with self._lock:
+            old_size = os.path.getsize(path) if os.path.exists(path) else 0
+            os.replace(tmp_path, path)
+            self._total_bytes += len(data) - old_size
+
+    def _remove(self, path):
+        """Delete a fully delivered segment"""
+        with self._lock:
+            try:
+                size = os.path.getsize(path)
+                os.remove(path)
+                self._total_bytes -= size
+            except FileNotFoundError:
+                pass
+
+    def _remove_unlocked(self, path):
+        """
+        Delete a segment unless another process holds it (lock held)
+
+        Returns:
+            int or None: Size of the deleted segment, or None if it was kept
+        """
+        try:
+            fd = os.open(path, os.O_RDONLY)
+        except OSError:
+            return None
+        try:
+            if fcntl is not None:
+                try:
+                    fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                except OSError:
+                    # Another process is still appending to this segment
+                    return None
+            size = os.fstat(fd).st_size
+            if not size:
+                # Just created by another process that hasn't locked it yet
+                return None
+            os.remove(path)
+            return size
+        except OSError:
+            return None
+        finally:
+            os.close(fd)
+
+    def _directory_bytes(self):
+        """Total size of the segments in the directory"""
+        total = 0
+        for path in self._segment_paths():
+            try:
+                total += os.path.getsize(path)
+            except FileNotFoundError:
+                pass
+        return total
+
+    def _segment_paths(self):
+        """List segment files, oldest first"""
+        try:
+            names = os.listdir(self.directory)
+        except FileNotFoundError:
+            return []
+        names = sorted(
+            name for name in names
+            if name.startswith(SEGMENT_PREFIX) and name.endswith(SEGMENT_SUFFIX)
+        )
+        return [os.path.join(self.directory, name) for name in names]
+
+    def _last_seq(self):
+        """Get the highest segment sequence number on disk"""
+        last = 0
+        for path in self._segment_paths():
+            name = os.path.basename(path)[len(SEGMENT_PREFIX):-len(SEGMENT_SUFFIX)]
+            try:
+                last = max(last, int(name))
+            except ValueError:
+                continue
+        return last
+
+    def _rotate(self):
+        """Close the active segment and open the next one (lock held)"""
+        self._close_active()
+        # Other processes sharing the directory may have taken the next
+        # number already
+        while True:
+            path = os.path.join(self.directory, f"{SEGMENT_PREFIX}{self._next_seq:020d}{SEGMENT_SUFFIX}")
+            self._next_seq += 1
+            try:
+                self._fd = self._create_segment(path)
+                break
+            except FileExistsError:
+                continue
+        self._active_path = path
+        self._active_bytes = 0
+        # Pick up what other processes sharing the directory have written
+        self._total_bytes = self._directory_bytes()
+
+    def _create_segment(self, path):
+        """
+        Create a segment that is already locked when it appears in the directory
+
+        The segment is created and locked under a name of this process's
+        own, then linked into place, so a replay or eviction in another
+        process never finds it unlocked. link() fails like O_EXCL if
+        another process took the name first.
+
+        Returns:
+            int: Descriptor of the new segment, open for appending
+
+        Raises:
+            FileExistsError: If the segment already exists
+        """
+        flags = os.O_WRONLY | os.O_CREAT | os.O_APPEND
+        if fcntl is None:
+            return os.open(path, flags | os.O_EXCL, 0o600)
+
+        tmp_path = f"{path}.{os.getpid()}.new"
+        fd = os.open(tmp_path, flags | os.O_TRUNC, 0o600)
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            os.link(tmp_path, path)
+        except BaseException:
+            os.close(fd)
+            raise
+        finally:
+            os.unlink(tmp_path)
+        return fd
+
+    def _after_fork(self):
+        """Write to a segment of its own in a forked child"""
+        if self._fd is not None:
+            # Only the child's copy of the descriptor is closed; the parent
+            # keeps the segment open and locked
+            os.close(self._fd)
+        self._fd = None
+        self._active_path = None
+        self._active_bytes = 0
+        self._unsynced = 0
+        self._lock = threading.Lock()
+        self._counters = dict.fromkeys(self._counters, 0)
+        self._undelivered_segments = 0
+
+    def _close_active(self):
+        """Sync and close the active segment (lock held)"""
+        if self._fd is None:
+            return
+        self._sync()
+        if not self._active_bytes:
+            # Nothing was written; leave no empty segment behind
+            try:
+                os.remove(self._active_path)
+            except OSError:
+                pass
+        os.close(self._fd)
+        self._fd = None
+        self._active_path = None
+        self._active_bytes = 0
+
+    def _sync(self):
+        """fsync the active segment if there are unsynced appends (lock held)"""
+        if self._fd is not None and self._unsynced:
+            os.fsync(self._fd)
+            self._counters["fsyncs"] += 1
+        self._unsynced = 0
+        self._last_sync = time.monotonic()
+
+    def _evict(self):
+        """Delete the oldest closed segments while over the size cap (lock held)"""
+        if self._total_bytes <= self.max_bytes:
+            return
+        for path in self._segment_paths():
+            if self._total_bytes <= self.max_bytes:
+                break
+            if path == self._active_path:
+                continue
+            size = self._remove_unlocked(path)
+            if size is None:
+                continue
+            self._total_bytes -= size
+            self._counters["evicted_segments"] += 1
+            logger.warning(f"Spool over {self.max_bytes} bytes; evicted {path}")
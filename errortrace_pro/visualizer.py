@@ -3,57 +3,265 @@ Traceback visualization module for ErrorTrace Pro
 """
 import os
 import sys
-import traceback
-import re
+import json
+import functools
+import importlib.util
+import threading
 from io import StringIO
 import logging
 
-# Check if Rich is available, otherwise fallback to colorama
-try:
-    from rich.console import Console
-    from rich.syntax import Syntax
-    from rich.panel import Panel
-    from rich.traceback import Traceback
-    RICH_AVAILABLE = True
-except ImportError:
-    RICH_AVAILABLE = False
+from .locals_capture import LocalsPolicy
+from .frames import HEAD_FRAMES, TAIL_FRAMES, CHAIN_MESSAGES, FrameGap, extract_traceback, safe_str
+
+# Check which rendering backends are installed without importing them;
+# Rich and Colorama are only imported the first time they're needed
+RICH_AVAILABLE = importlib.util.find_spec("rich") is not None
+COLORAMA_AVAILABLE = importlib.util.find_spec("colorama") is not None
+
+Console = Syntax = Panel = Traceback = Node = Text = None
+Fore = Back = Style = None
+
+logger = logging.getLogger(__name__)
+
+
+def _import_rich():
+    """Import the Rich classes used for rendering"""
+    global Console, Syntax, Panel, Traceback, Node, Text
+    if Console is None:
+        from rich.console import Console as _Console
+        from rich.syntax import Syntax as _Syntax
+        from rich.panel import Panel as _Panel
+        from rich.traceback import Traceback as _Traceback
+        from rich.pretty import Node as _Node
+        from rich.text import Text as _Text
+        Syntax, Panel, Node, Text = _Syntax, _Panel, _Node, _Text
+        Traceback = _collapsing_traceback_class(_Traceback)
+        Console = _Console
+
+
+# Per-thread consoles and render buffers, reused between renders
+_render_local = threading.local()
+
+# Width of rendered Rich tracebacks
+_TRACEBACK_WIDTH = 100
+
+# Buffers that grew past this size are discarded after a render
+_MAX_KEPT_BUFFER = 1024 * 1024
+
+
+class _RenderTarget:
+    """A Rich console writing into a reusable in-memory buffer"""
+    
+    __slots__ = ("console", "buffer", "busy")
+    
+    def __init__(self, width):
+        self.buffer = StringIO()
+        self.console = Console(file=self.buffer, width=width, highlight=True)
+        self.busy = False
+    
+    def reset(self):
+        """Empty the buffer for the next render"""
+        self.buffer.seek(0)
+        self.buffer.truncate()
+
+
+def _acquire_render_target(width=None):
+    """
+    Get this thread's console and buffer for a render width
+    
+    Console construction detects the terminal, environment and color
+    system, so each thread keeps one console per width and only the buffer
+    is emptied between renders. A nested render on the same thread (e.g.
+    from a __repr__ that raises) gets a temporary console instead.
+    """
+    _import_rich()
+    targets = getattr(_render_local, "targets", None)
+    if targets is None:
+        targets = _render_local.targets = {}
+    target = targets.get(width)
+    if target is None or target.busy:
+        fresh = _RenderTarget(width)
+        if target is None:
+            targets[width] = fresh
+        target = fresh
+    target.reset()
+    target.busy = True
+    return target
+
+
+def _release_render_target(target, width=None):
+    """Return a render target after reading its output"""
+    target.busy = False
+    if target.buffer.tell() > _MAX_KEPT_BUFFER:
+        # Don't keep a huge buffer alive for the life of the thread
+        targets = getattr(_render_local, "targets", {})
+        if targets.get(width) is target:
+            del targets[width]
+
+
+@functools.lru_cache(maxsize=16)
+def _get_syntax_theme(name):
+    """Get a Syntax theme object, loading each theme only once"""
+    _import_rich()
+    return Syntax.get_theme(name)
+
+
+def _collapsing_traceback_class(base):
+    """
+    Subclass Rich's Traceback to render FrameGap markers between frames
+    
+    Stacks whose frames were collapsed carry a "gaps" dict mapping the
+    index of the frame that follows each gap to its FrameGap.
+    """
+    import dataclasses
+    from rich.console import group
     
-    # Try to use colorama as fallback
-    try:
-        from colorama import init, Fore, Back, Style
+    class CollapsingTraceback(base):
+        @group()
+        def _render_stack(self, stack):
+            gaps = getattr(stack, "gaps", None)
+            if not gaps:
+                yield super()._render_stack(stack)
+                return
+            start = 0
+            for index in sorted(set(gaps) | {len(stack.frames)}):
+                if index > start:
+                    segment = dataclasses.replace(stack, frames=stack.frames[start:index])
+                    yield super()._render_stack(segment)
+                if index in gaps:
+                    yield Text(f"\n{gaps[index].describe()}", justify="center", style="traceback.error")
+                start = index
+    
+    CollapsingTraceback.__name__ = base.__name__
+    return CollapsingTraceback
+
+
+def _rich_trace(record):
+    """
+    Build a Rich Trace from a TracebackRecord
+    
+    Collapsed frames and frames hidden with _rich_traceback_omit or
+    _rich_traceback_guard are dropped, and each stack gets a "gaps" dict
+    for the CollapsingTraceback renderer. Fields missing from older Rich
+    versions are left out.
+    """
+    import dataclasses
+    import rich.traceback as rich_traceback
+    
+    frame_fields = {field.name for field in dataclasses.fields(rich_traceback.Frame)}
+    stack_fields = {field.name for field in dataclasses.fields(rich_traceback.Stack)}
+    syntax_error_class = getattr(rich_traceback, "_SyntaxError", None)
+    
+    stacks = []
+    for stack in reversed(record.stacks):
+        frames, gaps = [], {}
+        for item in stack.layout:
+            if isinstance(item, FrameGap):
+                gaps[len(frames)] = item
+                continue
+            if item in stack.rich_hidden:
+                continue
+            summary = stack.frames[item]
+            frame = {"filename": summary.filename or "?", "lineno": summary.lineno, "name": summary.name}
+            captured = stack.locals.get(item)
+            if captured is not None:
+                frame["locals"] = {name: Node(value_repr=text) for name, text in captured.items()}
+            positions = (getattr(summary, "colno", None), getattr(summary, "end_lineno", None),
+                         getattr(summary, "end_colno", None))
+            if "last_instruction" in frame_fields and None not in positions:
+                frame["last_instruction"] = ((summary.lineno, positions[0]), (positions[1], positions[2]))
+            frames.append(rich_traceback.Frame(**frame))
+        
+        fields = {
+            "exc_type": safe_str(stack.exc_type.__name__),
+            "exc_value": stack.message,
+            "is_cause": stack.link == "cause",
+            "frames": frames,
+            "notes": stack.notes,
+            "is_group": bool(stack.exceptions),
+            "exceptions": [_rich_trace(member) for member in stack.exceptions],
+        }
+        if stack.syntax_error is not None and syntax_error_class is not None:
+            fields["syntax_error"] = syntax_error_class(**stack.syntax_error._asdict())
+        rich_stack = rich_traceback.Stack(**{key: value for key, value in fields.items() if key in stack_fields})
+        if gaps:
+            rich_stack.gaps = gaps
+        stacks.append(rich_stack)
+    return rich_traceback.Trace(stacks=stacks)
+
+
+def _import_colorama():
+    """Import and initialize Colorama"""
+    global Fore, Back, Style
+    if Fore is None:
+        from colorama import init, Fore as _Fore, Back as _Back, Style as _Style
         init()
-        COLORAMA_AVAILABLE = True
-    except ImportError:
-        COLORAMA_AVAILABLE = False
+        Back, Style = _Back, _Style
+        Fore = _Fore
 
-logger = logging.getLogger(__name__)
 
 class TracebackVisualizer:
     """
     Visualize Python tracebacks with enhanced formatting and colors
     """
     
-    def __init__(self, colored_output=True, theme="monokai"):
+    def __init__(self, colored_output=True, theme="monokai", locals_policy=None,
+                 frame_limits=(HEAD_FRAMES, TAIL_FRAMES), collapse_recursion=True):
         """
         Initialize the traceback visualizer
         
         Args:
             colored_output (bool): Whether to use colors in output
             theme (str): Syntax highlighting theme (when using Rich)
+            locals_policy (LocalsPolicy, dict or bool, optional): Limits for the
+                local variables shown in Rich tracebacks; False disables them
+            frame_limits (tuple, optional): (head, tail) numbers of frames kept
+                at each end of a long stack, or None to show every frame
+            collapse_recursion (bool): Collapse repeated cycles of frames, as
+                in a RecursionError, into a single marker line
         """
         self.colored_output = colored_output
         self.theme = theme
+        self.locals_policy = LocalsPolicy.from_option(locals_policy)
+        self.frame_limits = frame_limits
+        self.collapse_recursion = collapse_recursion
         
-        # Initialize Rich console if available
+        # Rich consoles are created per thread on first render
         if RICH_AVAILABLE and colored_output:
-            self.console = Console(file=StringIO(), highlight=True)
+            _import_rich()
             self._use_rich = True
         else:
             self._use_rich = False
             if colored_output and not COLORAMA_AVAILABLE:
                 logger.warning("Colorama not available. Install with 'pip install colorama' for colored output.")
     
-    def format_traceback(self, exc_type, exc_value, exc_traceback, show_tip=True):
+    @property
+    def console(self):
+        """Console: This thread's Rich console for traceback rendering"""
+        target = _acquire_render_target(_TRACEBACK_WIDTH)
+        _release_render_target(target, _TRACEBACK_WIDTH)
+        return target.console
+    
+    def extract(self, exc_type, exc_value, exc_traceback):
+        """
+        Extract an exception's frames with this visualizer's limits
+        
+        Args:
+            exc_type (type): Exception type
+            exc_value (Exception): Exception value
+            exc_traceback (traceback): Exception traceback
+            
+        Returns:
+            TracebackRecord: Frames, chain and locals of the exception
+        """
+        return extract_traceback(
+            exc_type, exc_value, exc_traceback,
+            locals_policy=self.locals_policy if self._use_rich else None,
+            frame_limits=self.frame_limits,
+            collapse_recursion=self.collapse_recursion
+        )
+    
+    def format_traceback(self, exc_type, exc_value, exc_traceback, show_tip=True, record=None):
         """
         Format a traceback with visual enhancements
         
@@ -62,33 +270,148 @@ class TracebackVisualizer:
             exc_value (Exception): Exception value
             exc_traceback (traceback): Exception traceback
             show_tip (bool): Whether to show the installation tip
+            record (TracebackRecord, optional): Already extracted frames of the
+                exception, so the traceback isn't walked again
             
         Returns:
             str: Formatted traceback string
         """
         if self._use_rich:
-            return self._format_with_rich(exc_type, exc_value, exc_traceback, show_tip)
+            return self._format_with_rich(exc_type, exc_value, exc_traceback, show_tip, record)
         elif COLORAMA_AVAILABLE and self.colored_output:
-            return self._format_with_colorama(exc_type, exc_value, exc_traceback, show_tip)
+            return self._format_with_colorama(exc_type, exc_value, exc_traceback, show_tip, record)
         else:
-            return self._format_plain(exc_type, exc_value, exc_traceback, show_tip)
+            return self._format_plain(exc_type, exc_value, exc_traceback, show_tip, record)
     
-    def _format_with_rich(self, exc_type, exc_value, exc_traceback, show_tip=True):
+    def format_json(self, exc_type, exc_value, exc_traceback, suggestions=None, record=None,
+                    ndjson=False, context_lines=2):
+        """
+        Format a traceback as compact JSON for log pipelines
+        
+        The document holds the exception, every chained exception with its
+        frames, code lines and captured locals, and the suggested solutions.
+        
+        Args:
+            exc_type (type): Exception type
+            exc_value (Exception): Exception value
+            exc_traceback (traceback): Exception traceback
+            suggestions (list, optional): Solution suggestions to include
+            record (TracebackRecord, optional): Already extracted frames of the exception
+            ndjson (bool): End the document with a newline, as one NDJSON record
+            context_lines (int): Source lines included around each frame's line
+            
+        Returns:
+            str: JSON document on a single line
+        """
+        if record is None:
+            record = extract_traceback(
+                exc_type, exc_value, exc_traceback,
+                locals_policy=self.locals_policy,
+                frame_limits=self.frame_limits,
+                collapse_recursion=self.collapse_recursion
+            )
+        data = record.to_dict(context_lines)
+        if suggestions is not None:
+            data["suggestions"] = list(suggestions)
+        text = json.dumps(data, separators=(",", ":"), ensure_ascii=False, default=str)
+        return text + "\n" if ndjson else text
+    
+    def write_traceback(self, file, exc_type, exc_value, exc_traceback, show_tip=True, record=None):
+        """
+        Render a traceback directly to a writable as it is produced
+        
+        Writes the same text format_traceback returns, but never holds the
+        whole rendering in memory: the text renderers write one frame at a
+        time and Rich writes one chained exception at a time, so the first
+        output appears before rendering finishes.
+        
+        Args:
+            file: Writable text stream, e.g. sys.stderr, a file or socket.makefile("w")
+            exc_type (type): Exception type
+            exc_value (Exception): Exception value
+            exc_traceback (traceback): Exception traceback
+            show_tip (bool): Whether to show the installation tip
+            record (TracebackRecord, optional): Already extracted frames of the exception
+        """
+        if record is None:
+            record = self.extract(exc_type, exc_value, exc_traceback)
+        
+        if self._use_rich:
+            target = _acquire_render_target(_TRACEBACK_WIDTH)
+            console = target.console
+            console.file = file
+            try:
+                file.write("\n")
+                self._render_rich(console, exc_type, exc_value, record, show_tip)
+            finally:
+                console.file = target.buffer
+                _release_render_target(target, _TRACEBACK_WIDTH)
+            return
+        
+        if COLORAMA_AVAILABLE and self.colored_output:
+            _import_colorama()
+            chunks = self._iter_colorama(exc_type, exc_value, record, show_tip)
+        else:
+            chunks = self._iter_plain(exc_type, exc_value, record, show_tip)
+        for chunk in chunks:
+            file.write(chunk)
+        if hasattr(file, "flush"):
+            file.flush()
+    
+    def write_json(self, file, exc_type, exc_value, exc_traceback, suggestions=None, record=None,
+                   context_lines=2):
+        """
+        Write a traceback as one NDJSON line to a writable
+        
+        The document is the one format_json returns, encoded incrementally
+        so the full JSON string is never built.
+        
+        Args:
+            file: Writable text stream
+            exc_type (type): Exception type
+            exc_value (Exception): Exception value
+            exc_traceback (traceback): Exception traceback
+            suggestions (list, optional): Solution suggestions to include
+            record (TracebackRecord, optional): Already extracted frames of the exception
+            context_lines (int): Source lines included around each frame's line
+        """
+        if record is None:
+            record = extract_traceback(
+                exc_type, exc_value, exc_traceback,
+                locals_policy=self.locals_policy,
+                frame_limits=self.frame_limits,
+                collapse_recursion=self.collapse_recursion
+            )
+        data = record.to_dict(context_lines)
+        if suggestions is not None:
+            data["suggestions"] = list(suggestions)
+        encoder = json.JSONEncoder(separators=(",", ":"), ensure_ascii=False, default=str)
+        for chunk in encoder.iterencode(data):
+            file.write(chunk)
+        file.write("\n")
+        if hasattr(file, "flush"):
+            file.flush()
+    
+    def _format_with_rich(self, exc_type, exc_value, exc_traceback, show_tip=True, record=None):
         """Format traceback using Rich for beautiful output"""
-        output = StringIO()
-        console = Console(file=output, width=100, highlight=True)
+        if record is None:
+            record = self.extract(exc_type, exc_value, exc_traceback)
+        target = _acquire_render_target(_TRACEBACK_WIDTH)
+        try:
+            self._render_rich(target.console, exc_type, exc_value, record, show_tip)
+            return "\n" + target.buffer.getvalue()
+        finally:
+            _release_render_target(target, _TRACEBACK_WIDTH)
+    
+    def _render_rich(self, console, exc_type, exc_value, record, show_tip):
+        """Print the Rich traceback panels to a console"""
         
-        # Get the traceback object
-        rich_traceback = Traceback.from_exception(
-            exc_type, exc_value, exc_traceback,
-            show_locals=True,
-            word_wrap=True,
-            indent_guides=True,
-            theme=self.theme
-        )
+        import rich.traceback as rich_traceback_module
+        
+        trace = _rich_trace(record)
         
         # Create an error title
-        title = f"{exc_type.__name__}: {str(exc_value)}"
+        title = f"{exc_type.__name__}: {record.message}"
         
         # Print header with a stylish panel
         console.print()
@@ -102,8 +425,21 @@ class TracebackVisualizer:
             subtitle_align="right"
         ))
         
-        # Print traceback with enhanced styling
-        console.print(rich_traceback)
+        # Print traceback with enhanced styling, one chained exception per
+        # print so a streaming console writes each stack as it's rendered
+        stacks = list(reversed(trace.stacks))
+        for index, stack in enumerate(stacks):
+            rich_traceback = Traceback(
+                rich_traceback_module.Trace(stacks=[stack]),
+                show_locals=True,
+                word_wrap=True,
+                indent_guides=True,
+                theme=_get_syntax_theme(self.theme),
+                max_frames=0
+            )
+            console.print(rich_traceback)
+            if index < len(stacks) - 1:
+                console.print(Text.from_markup(f"\n[i]{CHAIN_MESSAGES['cause' if stack.is_cause else 'context'].strip()}\n"))
         
         # Add solution suggestions panel if available
         if hasattr(rich_traceback, 'locals') and rich_traceback.locals:
@@ -120,198 +456,140 @@ class TracebackVisualizer:
                 border_style="blue",
                 expand=False
             ))
-        
-        return "\n" + output.getvalue()
     
-    def _format_with_colorama(self, exc_type, exc_value, exc_traceback, show_tip=True):
+    def _format_with_colorama(self, exc_type, exc_value, exc_traceback, show_tip=True, record=None):
         """Format traceback using Colorama for colored output"""
-        tb_lines = traceback.format_exception(exc_type, exc_value, exc_traceback)
-        
-        # Process each line to add colors
-        formatted_lines = []
-        
+        _import_colorama()
+        if record is None:
+            record = self.extract(exc_type, exc_value, exc_traceback)
+        return "".join(self._iter_colorama(exc_type, exc_value, record, show_tip))
+    
+    def _iter_colorama(self, exc_type, exc_value, record, show_tip):
+        """Yield the Colorama traceback in chunks of at most one frame"""
         # Add header with a border
-        header = f"{exc_type.__name__}: {str(exc_value)}"
+        header = f"{exc_type.__name__}: {record.message}"
         border = "═" * (len(header) + 20)
         
         # Create a more visually appealing header
-        formatted_lines.append(f"\n{Fore.RED}{Style.BRIGHT}╭{border}╮{Style.RESET_ALL}")
-        formatted_lines.append(f"{Fore.RED}{Style.BRIGHT}│{Fore.WHITE} 💥 Exception Detected 💥 {' ' * (len(border) - 21)}│{Style.RESET_ALL}")
-        formatted_lines.append(f"{Fore.RED}{Style.BRIGHT}├{border}┤{Style.RESET_ALL}")
-        formatted_lines.append(f"{Fore.RED}{Style.BRIGHT}│{Fore.WHITE} ErrorTrace Pro - {header} {' ' * (len(border) - len(header) - 16)}│{Style.RESET_ALL}")
-        formatted_lines.append(f"{Fore.RED}{Style.BRIGHT}╰{border}╯{Style.RESET_ALL}\n")
+        yield f"\n{Fore.RED}{Style.BRIGHT}╭{border}╮{Style.RESET_ALL}"
+        yield f"{Fore.RED}{Style.BRIGHT}│{Fore.WHITE} 💥 Exception Detected 💥 {' ' * (len(border) - 21)}│{Style.RESET_ALL}"
+        yield f"{Fore.RED}{Style.BRIGHT}├{border}┤{Style.RESET_ALL}"
+        yield f"{Fore.RED}{Style.BRIGHT}│{Fore.WHITE} ErrorTrace Pro - {header} {' ' * (len(border) - len(header) - 16)}│{Style.RESET_ALL}"
+        yield f"{Fore.RED}{Style.BRIGHT}╰{border}╯{Style.RESET_ALL}\n"
         
         # Add traceback header
         tb_header = "Traceback (most recent call last)"
         tb_border = "─" * (len(tb_header) + 40)
-        formatted_lines.append(f"{Fore.BLUE}{Style.BRIGHT}╭{tb_border}╮{Style.RESET_ALL}")
-        formatted_lines.append(f"{Fore.BLUE}{Style.BRIGHT}│{Fore.CYAN} {tb_header} {' ' * (len(tb_border) - len(tb_header) - 2)}│{Style.RESET_ALL}")
-        formatted_lines.append(f"{Fore.BLUE}{Style.BRIGHT}╰{tb_border}╯{Style.RESET_ALL}\n")
+        yield f"{Fore.BLUE}{Style.BRIGHT}╭{tb_border}╮{Style.RESET_ALL}"
+        yield f"{Fore.BLUE}{Style.BRIGHT}│{Fore.CYAN} {tb_header} {' ' * (len(tb_border) - len(tb_header) - 2)}│{Style.RESET_ALL}"
+        yield f"{Fore.BLUE}{Style.BRIGHT}╰{tb_border}╯{Style.RESET_ALL}\n"
         
-        current_file = None
-        frame_num = 0
-        
-        for line in tb_lines:
-            # Special handling for the traceback frames
-            if line.strip().startswith("File "):
-                frame_num += 1
-                parts = line.strip().split(", ")
-                
-                if len(parts) >= 3:
-                    file_part = parts[0].replace('File "', '').replace('"', '')
-                    line_part = parts[1]
-                    func_part = ", ".join(parts[2:])
-                    
-                    # Extract just the filename from the path
-                    if "/" in file_part:
-                        file_name = file_part.split("/")[-1]
-                    else:
-                        file_name = file_part
-                    
-                    current_file = file_part
-                    
-                    # Format the frame with numbers and better layout
-                    formatted_lines.append(
-                        f"{Fore.BLUE}{Style.BRIGHT}│{Style.RESET_ALL} "
-                        f"{Fore.YELLOW}{Style.BRIGHT}[{frame_num}]{Style.RESET_ALL} "
-                        f"{Fore.MAGENTA}{Style.BRIGHT}{file_name}{Style.RESET_ALL} "
-                        f"({Fore.CYAN}{file_part}{Fore.RESET}), "
-                        f"{Fore.GREEN}{line_part}{Fore.RESET}, "
-                        f"{Fore.YELLOW}{func_part}{Fore.RESET}\n"
-                    )
-                    formatted_lines.append(f"{Fore.BLUE}{Style.BRIGHT}│{Style.RESET_ALL}\n")
-                else:
-                    # Fallback if the line doesn't match the expected format
-                    # Color file paths
-                    line = re.sub(r'File "([^"]+)"', f'File "{Fore.CYAN}\\1{Fore.RESET}"', line)
-                    # Color line numbers
-                    line = re.sub(r'line (\d+)', f'line {Fore.GREEN}\\1{Fore.RESET}', line)
-                    # Color function names
-                    line = re.sub(r'in ([^\n]+)', f'in {Fore.YELLOW}\\1{Fore.RESET}', line)
-                    formatted_lines.append(f"{Fore.BLUE}{Style.BRIGHT}│{Style.RESET_ALL} {line}")
-            
-            # Highlight code lines
-            elif line.strip().startswith("->"): 
-                if "->" in line:
-                    line = line.replace("->", f"{Fore.RED}{Style.BRIGHT}❱{Style.RESET_ALL}")
-                formatted_lines.append(f"{Fore.BLUE}{Style.BRIGHT}│{Style.RESET_ALL}  {Fore.WHITE}{Style.BRIGHT}{line.strip()}{Style.RESET_ALL}\n")
-                formatted_lines.append(f"{Fore.BLUE}{Style.BRIGHT}│{Style.RESET_ALL}\n")
-            elif current_file and line.strip() and not line.strip().startswith("Traceback"):
-                formatted_lines.append(f"{Fore.BLUE}{Style.BRIGHT}│{Style.RESET_ALL}  {Fore.WHITE}{line.strip()}{Style.RESET_ALL}\n")
-            
-            # Highlight the error type and message
-            elif exc_type.__name__ in line:
-                # Create a bottom border for the traceback
-                formatted_lines.append(f"{Fore.BLUE}{Style.BRIGHT}╰{tb_border}╯{Style.RESET_ALL}\n")
+        for stack in record.stacks:
+            frame_num = 0
+            for item in stack.layout:
+                if isinstance(item, FrameGap):
+                    yield f"{Fore.BLUE}{Style.BRIGHT}│{Style.RESET_ALL}  {Fore.MAGENTA}{item.describe()}{Style.RESET_ALL}\n"
+                    yield f"{Fore.BLUE}{Style.BRIGHT}│{Style.RESET_ALL}\n"
+                    continue
                 
-                # Format the exception line
-                line = line.replace(
-                    exc_type.__name__, 
-                    f"{Fore.RED}{Style.BRIGHT}{exc_type.__name__}{Style.RESET_ALL}"
+                # Format the frame with numbers and better layout
+                frame = stack.frames[item]
+                frame_num += 1
+                yield (
+                    f"{Fore.BLUE}{Style.BRIGHT}│{Style.RESET_ALL} "
+                    f"{Fore.YELLOW}{Style.BRIGHT}[{frame_num}]{Style.RESET_ALL} "
+                    f"{Fore.MAGENTA}{Style.BRIGHT}{os.path.basename(frame.filename)}{Style.RESET_ALL} "
+                    f"({Fore.CYAN}{frame.filename}{Fore.RESET}), "
+                    f"{Fore.GREEN}line {frame.lineno}{Fore.RESET}, "
+                    f"{Fore.YELLOW}in {frame.name}{Fore.RESET}\n"
                 )
-                # Try to color the error message too
-                message_part = str(exc_value)
-                if message_part and message_part in line:
-                    line = line.replace(
-                        message_part,
-                        f"{Fore.YELLOW}{message_part}{Fore.RESET}"
-                    )
-                formatted_lines.append(f"{line}\n")
+                yield f"{Fore.BLUE}{Style.BRIGHT}│{Style.RESET_ALL}\n"
+                if frame.line:
+                    yield f"{Fore.BLUE}{Style.BRIGHT}│{Style.RESET_ALL}  {Fore.WHITE}{frame.line}{Style.RESET_ALL}\n"
+            
+            # Create a bottom border for the traceback
+            if stack.frames:
+                yield f"{Fore.BLUE}{Style.BRIGHT}╰{tb_border}╯{Style.RESET_ALL}\n"
             
-            # Other lines
-            else:
-                formatted_lines.append(line)
+            # Format the exception line, coloring the type and message
+            name = stack.exc_type.__name__
+            message = stack.message
+            for line in stack.exception_lines:
+                if name in line and not line.startswith(" "):
+                    line = line.replace(name, f"{Fore.RED}{Style.BRIGHT}{name}{Style.RESET_ALL}", 1)
+                    if message and message in line:
+                        line = line.replace(message, f"{Fore.YELLOW}{message}{Fore.RESET}", 1)
+                yield line
+            if stack.link:
+                yield f"{Style.DIM}{CHAIN_MESSAGES[stack.link]}{Style.RESET_ALL}"
         
         # Add solution suggestions section
         if show_tip:
             tip_border = "─" * 65
-            formatted_lines.append(f"\n{Fore.BLUE}{Style.BRIGHT}╭{tip_border}╮{Style.RESET_ALL}")
-            formatted_lines.append(f"{Fore.BLUE}{Style.BRIGHT}│{Fore.CYAN} 💡 Tip: Use {Fore.GREEN}{Style.BRIGHT}errortrace_pro.install(){Style.RESET_ALL}{Fore.CYAN} to enable this handler globally. {' ' * 5}│{Style.RESET_ALL}")
-            formatted_lines.append(f"{Fore.BLUE}{Style.BRIGHT}╰{tip_border}╯{Style.RESET_ALL}\n")
-            
-        return "".join(formatted_lines)
+            yield f"\n{Fore.BLUE}{Style.BRIGHT}╭{tip_border}╮{Style.RESET_ALL}"
+            yield f"{Fore.BLUE}{Style.BRIGHT}│{Fore.CYAN} 💡 Tip: Use {Fore.GREEN}{Style.BRIGHT}errortrace_pro.install(){Style.RESET_ALL}{Fore.CYAN} to enable this handler globally. {' ' * 5}│{Style.RESET_ALL}"
+            yield f"{Fore.BLUE}{Style.BRIGHT}╰{tip_border}╯{Style.RESET_ALL}\n"
     
-    def _format_plain(self, exc_type, exc_value, exc_traceback, show_tip=True):
+    def _format_plain(self, exc_type, exc_value, exc_traceback, show_tip=True, record=None):
         """Format traceback without colors"""
-        tb_lines = traceback.format_exception(exc_type, exc_value, exc_traceback)
-        
-        # Create a more structured plain text output
-        formatted_lines = []
-        
+        if record is None:
+            record = self.extract(exc_type, exc_value, exc_traceback)
+        return "".join(self._iter_plain(exc_type, exc_value, record, show_tip))
+    
+    def _iter_plain(self, exc_type, exc_value, record, show_tip):
+        """Yield the plain traceback in chunks of at most one frame"""
         # Add header with ASCII art border
-        header = f"{exc_type.__name__}: {str(exc_value)}"
+        header = f"{exc_type.__name__}: {record.message}"
         border = "=" * (len(header) + 20)
         
         # Create a visually appealing header even without colors
-        formatted_lines.append(f"\n+{border}+")
-        formatted_lines.append(f"| ErrorTrace Pro - Exception Detected |")
-        formatted_lines.append(f"+{border}+")
-        formatted_lines.append(f"| {header} {' ' * (len(border) - len(header) - 2)}|")
-        formatted_lines.append(f"+{border}+\n")
+        yield f"\n+{border}+"
+        yield f"| ErrorTrace Pro - Exception Detected |"
+        yield f"+{border}+"
+        yield f"| {header} {' ' * (len(border) - len(header) - 2)}|"
+        yield f"+{border}+\n"
         
         # Add traceback header
         tb_header = "Traceback (most recent call last)"
         tb_border = "-" * (len(tb_header) + 40)
-        formatted_lines.append(f"+{tb_border}+")
-        formatted_lines.append(f"| {tb_header} {' ' * (len(tb_border) - len(tb_header) - 2)}|")
-        formatted_lines.append(f"+{tb_border}+\n")
-        
-        # Process each line of the traceback
-        frame_num = 0
-        current_file = None
+        yield f"+{tb_border}+"
+        yield f"| {tb_header} {' ' * (len(tb_border) - len(tb_header) - 2)}|"
+        yield f"+{tb_border}+\n"
         
-        for line in tb_lines:
-            # Format file lines
-            if line.strip().startswith("File "):
-                frame_num += 1
-                parts = line.strip().split(", ")
+        for stack in record.stacks:
+            frame_num = 0
+            for item in stack.layout:
+                if isinstance(item, FrameGap):
+                    yield f"|  {item.describe()}\n"
+                    yield f"|\n"
+                    continue
                 
-                if len(parts) >= 3:
-                    file_part = parts[0].replace('File "', '').replace('"', '')
-                    line_part = parts[1]
-                    func_part = ", ".join(parts[2:])
-                    
-                    # Extract just the filename from the path
-                    if "/" in file_part:
-                        file_name = file_part.split("/")[-1]
-                    else:
-                        file_name = file_part
-                    
-                    current_file = file_part
-                    
-                    # Format the frame with numbers and better layout
-                    formatted_lines.append(f"| [{frame_num}] {file_name} ({file_part}), {line_part}, {func_part}\n")
-                    formatted_lines.append(f"|\n")
-                else:
-                    formatted_lines.append(f"| {line}")
+                # Format the frame with numbers and better layout
+                frame = stack.frames[item]
+                frame_num += 1
+                yield (
+                    f"| [{frame_num}] {os.path.basename(frame.filename)} ({frame.filename}), "
+                    f"line {frame.lineno}, in {frame.name}\n"
+                )
+                yield f"|\n"
+                if frame.line:
+                    yield f"|  {frame.line}\n"
             
-            # Format code lines
-            elif line.strip().startswith("->"): 
-                if "->" in line:
-                    line = line.replace("->", ">>")
-                formatted_lines.append(f"|  {line.strip()}\n")
-                formatted_lines.append(f"|\n")
-            elif current_file and line.strip() and not line.strip().startswith("Traceback"):
-                formatted_lines.append(f"|  {line.strip()}\n")
+            # Create a bottom border for the traceback
+            if stack.frames:
+                yield f"+{tb_border}+\n"
             
             # Format the exception line
-            elif exc_type.__name__ in line:
-                # Create a bottom border for the traceback
-                formatted_lines.append(f"+{tb_border}+\n")
-                formatted_lines.append(f"{line}\n")
-            
-            # Other lines
-            else:
-                formatted_lines.append(line)
+            yield from stack.exception_lines
+            if stack.link:
+                yield CHAIN_MESSAGES[stack.link]
         
         # Add tip section if needed
         if show_tip:
             tip_border = "-" * 65
-            formatted_lines.append(f"\n+{tip_border}+")
-            formatted_lines.append(f"| Tip: Use errortrace_pro.install() to enable this handler globally. {' ' * 5}|")
-            formatted_lines.append(f"+{tip_border}+\n")
-        
-        return "".join(formatted_lines)
+            yield f"\n+{tip_border}+"
+            yield f"| Tip: Use errortrace_pro.install() to enable this handler globally. {' ' * 5}|"
+            yield f"+{tip_border}+\n"
     
     def highlight_code(self, code, filename):
         """
@@ -326,17 +604,20 @@ class TracebackVisualizer:
         """
         if not self._use_rich:
             return code
+        
+        _import_rich()
             
         # Determine lexer by filename extension
         extension = os.path.splitext(filename)[1].lower()
         lexer = "python" if extension == ".py" else "text"
         
         # Create syntax highlighted code
-        syntax = Syntax(code, lexer, theme=self.theme, line_numbers=True)
+        syntax = Syntax(code, lexer, theme=_get_syntax_theme(self.theme), line_numbers=True)
         
         # Render to string
-        output = StringIO()
-        console = Console(file=output)
-        console.print(syntax)
-        
-        return output.getvalue()
+        target = _acquire_render_target()
+        try:
+            target.console.print(syntax)
+            return target.buffer.getvalue()
+        finally:
+            _release_render_target(target)
@@ -0,0 +1,357 @@
+"""
+Unit tests for the asyncio transport and the async handler API
+"""
+import sys
+import os
+import json
+import time
+import asyncio
+import tempfile
+import threading
+import unittest
+from io import StringIO
+from unittest.mock import patch
+
+# Add the parent directory to sys.path to import the package in development
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from errortrace_pro.async_transport import AsyncConnectionPool, AsyncDeliveryQueue
+from errortrace_pro.cloud_logger import CloudLogger
+from errortrace_pro.forwarding import EventCollector
+from errortrace_pro.handler import ExceptionHandler
+
+
+class HTTPServer:
+    """Minimal asyncio HTTP/1.1 server that records requests"""
+
+    def __init__(self, delay=0, close_after=None, chunked=False):
+        self.delay = delay
+        self.close_after = close_after
+        self.chunked = chunked
+        self.connections = 0
+        self.bodies = []
+        self.tasks = set()
+
+    async def start(self):
+        self.server = await asyncio.start_server(self.serve, "127.0.0.1", 0)
+        self.host = "127.0.0.1:%d" % self.server.sockets[0].getsockname()[1]
+
+    async def stop(self):
+        self.server.close()
+        for task in self.tasks:
+            task.cancel()
+        await asyncio.gather(*self.tasks, return_exceptions=True)
+        await self.server.wait_closed()
+
+    async def serve(self, reader, writer):
+        self.connections += 1
+        self.tasks.add(asyncio.current_task())
+        served = 0
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                length = 0
+                while True:
+                    header = await reader.readline()
+                    if header in (b"\r\n", b""):
+                        break
+                    name, _, value = header.decode().partition(":")
+                    if name.lower() == "content-length":
+                        length = int(value)
+                self.bodies.append(json.loads(await reader.readexactly(length)))
+                if self.delay:
+                    await asyncio.sleep(self.delay)
+
+                served += 1
+                close = self.close_after is not None and served >= self.close_after
+                headers = "Connection: close\r\n" if close else ""
+                if self.chunked:
+                    writer.write(f"HTTP/1.1 200 OK\r\n{headers}Transfer-Encoding: chunked\r\n\r\n"
+                                 "2\r\nok\r\n0\r\n\r\n".encode())
+                else:
+                    writer.write(f"HTTP/1.1 200 OK\r\n{headers}Content-Length: 2\r\n\r\nok".encode())
+                await writer.drain()
+                if close:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+
+def run(coro):
+    """Run a coroutine on a new event loop"""
+    loop = asyncio.new_event_loop()
+    try:
+        return loop.run_until_complete(coro)
+    finally:
+        # Let closed transports finish before the loop goes away
+        loop.run_until_complete(asyncio.sleep(0.01))
+        loop.close()
+
+
+class TestAsyncConnectionPool(unittest.TestCase):
+    """Test cases for the AsyncConnectionPool class"""
+
+    def test_keep_alive_reuse(self):
+        """Test that sequential requests share one connection"""
+        async def scenario():
+            server = HTTPServer()
+            await server.start()
+            pool = AsyncConnectionPool()
+            try:
+                for n in range(10):
+                    response = await pool.request("http", server.host, "POST", "/", body=json.dumps({"n": n}))
+                    self.assertEqual(response.status, 200)
+                    self.assertEqual(response.body, b"ok")
+            finally:
+                pool.close()
+                await server.stop()
+            return server, pool.stats()
+
+        server, stats = run(scenario())
+        self.assertEqual(server.connections, 1)
+        self.assertEqual(stats["reused"], 9)
+
+    def test_pipeline(self):
+        """Test that pipelined requests are answered in order on one connection"""
+        async def scenario():
+            server = HTTPServer(chunked=True)
+            await server.start()
+            pool = AsyncConnectionPool()
+            try:
+                requests = [("POST", "/", json.dumps({"n": n}), None) for n in range(20)]
+                responses = await pool.pipeline("http", server.host, requests)
+            finally:
+                pool.close()
+                await server.stop()
+            return server, responses, pool.stats()
+
+        server, responses, stats = run(scenario())
+        self.assertEqual([r.body for r in responses], [b"ok"] * 20)
+        self.assertEqual([body["n"] for body in server.bodies], list(range(20)))
+        self.assertEqual(server.connections, 1)
+        self.assertEqual(stats["pipelined"], 19)
+
+    def test_pipeline_resends_after_close(self):
+        """Test that requests left unanswered by a closing server are resent"""
+        async def scenario():
+            server = HTTPServer(close_after=3)
+            await server.start()
+            pool = AsyncConnectionPool()
+            try:
+                requests = [("POST", "/", json.dumps({"n": n}), None) for n in range(10)]
+                responses = await pool.pipeline("http", server.host, requests)
+            finally:
+                pool.close()
+                await server.stop()
+            return server, responses
+
+        server, responses = run(scenario())
+        self.assertEqual(len(responses), 10)
+        self.assertEqual(server.connections, 4)
+        self.assertEqual(sorted({body["n"] for body in server.bodies}), list(range(10)))
+
+    def test_timeout(self):
+        """Test that a slow server raises instead of hanging"""
+        async def scenario():
+            server = HTTPServer(delay=1)
+            await server.start()
+            pool = AsyncConnectionPool(timeout=0.1)
+            try:
+                with self.assertRaises(asyncio.TimeoutError):
+                    await pool.request("http", server.host, "POST", "/", body="{}")
+            finally:
+                pool.close()
+                await server.stop()
+
+        run(scenario())
+
+
+class TestAsyncDeliveryQueue(unittest.TestCase):
+    """Test cases for the AsyncDeliveryQueue class"""
+
+    def test_batches_while_sending(self):
+        """Test that payloads queued during a send are delivered together"""
+        batches = []
+
+        async def send(batch):
+            batches.append(list(batch))
+            await asyncio.sleep(0.05)
+            return True
+
+        async def scenario():
+            queue = AsyncDeliveryQueue(send, max_batch=100)
+            for n in range(10):
+                self.assertTrue(await queue.put(n))
+            self.assertTrue(await queue.flush(1))
+            await queue.close()
+            return queue.stats()
+
+        stats = run(scenario())
+        self.assertEqual(batches, [[0, 1, 2, 3, 4, 5, 6, 7, 8, 9]])
+        self.assertEqual(stats["delivered"], 10)
+        self.assertEqual(stats["pending"], 0)
+
+    def test_overflow_drop_oldest(self):
+        """Test that a full queue drops its oldest payload"""
+        dropped = []
+
+        async def send(batch):
+            await asyncio.sleep(1)
+            return True
+
+        async def scenario():
+            queue = AsyncDeliveryQueue(send, maxsize=2, on_drop=dropped.append)
+            for n in range(3):
+                await queue.put(n)
+            stats = queue.stats()
+            await queue.close(0)
+            return stats
+
+        stats = run(scenario())
+        self.assertEqual(stats["dropped_oldest"], 1)
+        self.assertEqual(dropped[0], 0)
+
+
+class TestAsyncCloudLogging(unittest.TestCase):
+    """Test cases for CloudLogger's coroutine API"""
+
+    def make_logger(self, host, **options):
+        with patch.dict(os.environ, {"ERRORTRACE_ENDPOINT": f"http://{host}/logs"}):
+            return CloudLogger(provider="http", **options)
+
+    def test_alog_exception_pipelines(self):
+        """Test that events logged from coroutines share one connection"""
+        async def scenario():
+            server = HTTPServer()
+            await server.start()
+            cloud_logger = self.make_logger(server.host)
+            try:
+                for n in range(20):
+                    queued = await cloud_logger.alog_exception(
+                        ValueError, ValueError(str(n)), ["line"]
+                    )
+                    self.assertTrue(queued)
+                self.assertTrue(await cloud_logger.aflush(5))
+                stats = cloud_logger.get_stats()["async"]
+                await cloud_logger.aclose()
+            finally:
+                await server.stop()
+            return server, stats
+
+        server, stats = run(scenario())
+        self.assertEqual(sorted(body["exception"]["message"] for body in server.bodies),
+                         sorted(str(n) for n in range(20)))
+        self.assertEqual(server.connections, 1)
+        self.assertEqual(stats["delivered"], 20)
+
+    def test_slow_endpoint_does_not_block(self):
+        """Test that callers return while a slow endpoint is still responding"""
+        async def scenario():
+            server = HTTPServer(delay=0.5)
+            await server.start()
+            with tempfile.TemporaryDirectory() as spool_dir:
+                cloud_logger = self.make_logger(server.host, spool_dir=spool_dir, replay_on_start=False)
+                cloud_logger._pool.timeout = 0.1
+                try:
+                    started = time.monotonic()
+                    for n in range(5):
+                        await cloud_logger.alog_exception(ValueError, ValueError(str(n)), ["line"])
+                    elapsed = time.monotonic() - started
+                    await cloud_logger.aflush(5)
+                    stats = cloud_logger.get_stats()
+                finally:
+                    await cloud_logger.aclose()
+                    cloud_logger.close()
+                    await server.stop()
+            return elapsed, stats
+
+        elapsed, stats = run(scenario())
+        self.assertLess(elapsed, 0.1)
+        self.assertEqual(stats["async"]["failed"], 5)
+        self.assertEqual(stats["spool"]["appended"], 5)
+
+    def test_alog_exception_forwards(self):
+        """Test that coroutines hand events to a collector when one is configured"""
+        with tempfile.TemporaryDirectory() as directory:
+            address = os.path.join(directory, "collector.sock")
+            collector_logger = self.make_logger("127.0.0.1:9")
+            received = []
+            collector_logger.log_event = lambda event: received.append(event) or True
+            collector = EventCollector(collector_logger, address=address).start()
+            try:
+                cloud_logger = self.make_logger("127.0.0.1:9", forward_to=address)
+                logged = run(cloud_logger.alog_exception(ValueError, ValueError("forwarded"), ["line"]))
+                deadline = time.monotonic() + 5
+                while not received and time.monotonic() < deadline:
+                    time.sleep(0.01)
+            finally:
+                collector.close()
+
+        self.assertTrue(logged)
+        self.assertEqual(received[0]["exception"]["message"], "forwarded")
+        stats = cloud_logger.get_stats()
+        self.assertEqual(stats["forwarding"]["forwarded"], 1)
+        self.assertNotIn("async", stats)
+
+
+class TestAsyncHandler(unittest.TestCase):
+    """Test cases for ExceptionHandler.ahandle"""
+
+    def test_ahandle_renders_off_the_loop(self):
+        """Test that rendering runs on an executor thread"""
+        handler = ExceptionHandler(colored_output=False)
+        threads = []
+        original = handler._write_output
+
+        def write_output(*args):
+            threads.append(threading.current_thread())
+            return original(*args)
+
+        async def scenario():
+            try:
+                raise ValueError("async failure")
+            except ValueError:
+                return await handler.ahandle()
+
+        with patch.object(handler, "_write_output", write_output), \
+                patch("sys.stderr", new_callable=StringIO) as stderr:
+            context = run(scenario())
+
+        self.assertEqual(context["exception"]["type"], "ValueError")
+        self.assertIn("async failure", stderr.getvalue())
+        self.assertEqual(len(threads), 1)
+        self.assertIsNot(threads[0], threading.current_thread())
+
+    def test_ahandle_logs_to_cloud(self):
+        """Test that ahandle queues the structured event for the cloud"""
+        async def scenario():
+            server = HTTPServer()
+            await server.start()
+            with patch.dict(os.environ, {"ERRORTRACE_ENDPOINT": f"http://{server.host}/logs"}):
+                handler = ExceptionHandler(cloud_logging=True, cloud_provider="http",
+                                           enable_suggestions=False, colored_output=False)
+            try:
+                try:
+                    raise KeyError("missing")
+                except KeyError as e:
+                    await handler.ahandle(type(e), e, e.__traceback__)
+                self.assertTrue(await handler.aflush(5))
+            finally:
+                await handler.cloud_logger.aclose()
+                await server.stop()
+            return server
+
+        with patch("sys.stderr", new_callable=StringIO) as stderr:
+            server = run(scenario())
+        self.assertEqual(len(server.bodies), 1)
+        self.assertEqual(server.bodies[0]["exception"]["type"], "KeyError")
+        self.assertIn("traceback_data", server.bodies[0])
+        self.assertIn("Error logged to cloud service", stderr.getvalue())
+
+
+if __name__ == "__main__":
+    unittest.main()
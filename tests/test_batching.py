@@ -0,0 +1,85 @@
+"""
+Unit tests for the event batching layer
+"""
+import sys
+import os
+import json
+import unittest
+from unittest.mock import patch, MagicMock
+
+# Add the parent directory to sys.path to import the package in development
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from errortrace_pro.batching import EventBatcher, PROVIDER_LIMITS
+from errortrace_pro.cloud_logger import CloudLogger
+
+
+class TestEventBatcher(unittest.TestCase):
+    """Test cases for the EventBatcher class"""
+
+    def test_flush_on_max_events(self):
+        """Test that a batch is released once it reaches the event limit"""
+        batcher = EventBatcher("gcp", max_events=3, linger=60)
+        self.assertEqual(batcher.add({"n": 1}), [])
+        self.assertEqual(batcher.add({"n": 2}), [])
+
+        ready = batcher.add({"n": 3})
+        self.assertEqual(ready, [[{"n": 1}, {"n": 2}, {"n": 3}]])
+        self.assertEqual(batcher.pending, 0)
+
+    def test_flush_on_max_bytes(self):
+        """Test that an event that would overflow the byte limit starts a new batch"""
+        batcher = EventBatcher("aws", max_bytes=100, linger=60, sizeof=lambda event: 40)
+        batcher.add("a")
+        ready = batcher.add("b")
+        self.assertEqual(ready, [["a"]])
+        self.assertEqual(batcher.pending, 1)
+
+    def test_provider_limits_cap_configuration(self):
+        """Test that configured sizes can't exceed the provider's request limits"""
+        batcher = EventBatcher("aws", max_events=50000, max_bytes=10 * 1024 * 1024)
+        self.assertEqual(batcher.max_events, PROVIDER_LIMITS["aws"]["max_events"])
+        self.assertEqual(batcher.max_bytes, PROVIDER_LIMITS["aws"]["max_bytes"])
+
+        oversized = EventBatcher("aws", sizeof=lambda event: 2 * 1024 * 1024)
+        self.assertEqual(oversized.add("huge"), [])
+        self.assertEqual(oversized.pending, 0)
+
+    def test_linger(self):
+        """Test that a partial batch becomes due after the linger time"""
+        batcher = EventBatcher("azure", linger=0.5)
+        self.assertIsNone(batcher.time_until_due())
+
+        with patch("errortrace_pro.batching.time.monotonic", return_value=100.0):
+            batcher.add({"n": 1})
+        self.assertFalse(batcher.due(now=100.2))
+        self.assertTrue(batcher.due(now=100.6))
+        self.assertEqual(batcher.drain(), [{"n": 1}])
+
+
+class TestCloudLoggerBatching(unittest.TestCase):
+    """Test cases for batched shipping through CloudLogger"""
+
+    def test_aws_batches_share_one_request(self):
+        """Test that queued AWS events are sent in a single PutLogEvents call"""
+        cloud_logger = CloudLogger(provider="aws", api_key="key", async_delivery=True,
+                                   batch_linger=60)
+        bodies = []
+
+        def fake_request(scheme, host, method, path, body=None, headers=None):
+            bodies.append(json.loads(body))
+            return MagicMock(status=200)
+
+        with patch.object(cloud_logger._pool, "request", fake_request):
+            for i in range(25):
+                cloud_logger.log_exception(ValueError, ValueError(f"error {i}"), ["tb"])
+            self.assertTrue(cloud_logger.flush(timeout=5))
+
+        self.assertEqual(len(bodies), 1)
+        self.assertEqual(len(bodies[0]["logEvents"]), 25)
+        self.assertEqual(cloud_logger.get_stats()["delivered"], 25)
+        cloud_logger.close()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,148 @@
+"""
+Unit tests for the keep-alive connection pool
+"""
+import sys
+import os
+import json
+import threading
+import unittest
+from unittest.mock import patch
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Add the parent directory to sys.path to import the package in development
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from errortrace_pro.connection_pool import ConnectionPool, get_ssl_context
+from errortrace_pro.cloud_logger import CloudLogger
+
+
+class CountingServer(ThreadingHTTPServer):
+    """HTTP server that counts accepted connections and received events"""
+
+    daemon_threads = True
+
+    def __init__(self, handler_class):
+        super().__init__(("127.0.0.1", 0), handler_class)
+        self.connections = 0
+        self.events = []
+        self.lock = threading.Lock()
+
+    def get_request(self):
+        request = super().get_request()
+        with self.lock:
+            self.connections += 1
+        return request
+
+
+class KeepAliveHandler(BaseHTTPRequestHandler):
+    """Handler that keeps connections open between requests"""
+
+    protocol_version = "HTTP/1.1"
+
+    def do_POST(self):
+        body = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        with self.server.lock:
+            self.server.events.append(json.loads(body))
+        self.send_response(200)
+        self.send_header("Content-Length", "2")
+        self.end_headers()
+        self.wfile.write(b"ok")
+
+    def log_message(self, format, *args):
+        pass
+
+
+class DroppingHandler(KeepAliveHandler):
+    """Handler that silently closes the socket after every response"""
+
+    def do_POST(self):
+        super().do_POST()
+        self.close_connection = True
+
+
+class TestConnectionPool(unittest.TestCase):
+    """Test cases for the ConnectionPool class"""
+
+    def start_server(self, handler_class):
+        server = CountingServer(handler_class)
+        thread = threading.Thread(target=server.serve_forever, args=(0.05,), daemon=True)
+        thread.start()
+        self.addCleanup(server.server_close)
+        self.addCleanup(server.shutdown)
+        return server
+
+    def test_ssl_context_is_cached(self):
+        """Test that HTTPS connections share one SSL context"""
+        self.assertIs(get_ssl_context(), get_ssl_context())
+
+    def test_keep_alive_reuse(self):
+        """Test that many events are sent over far fewer connections"""
+        server = self.start_server(KeepAliveHandler)
+        host = f"127.0.0.1:{server.server_address[1]}"
+        with patch.dict(os.environ, {"ERRORTRACE_ENDPOINT": f"http://{host}/log"}):
+            cloud_logger = CloudLogger(provider="http", async_delivery=False)
+
+        for i in range(50):
+            self.assertTrue(cloud_logger.log_exception(ValueError, ValueError(str(i)), ["tb"]))
+
+        self.assertEqual(len(server.events), 50)
+        self.assertEqual(server.connections, 1)
+        self.assertEqual(cloud_logger._pool.stats()["reused"], 49)
+        cloud_logger.close()
+
+    def test_concurrent_requests(self):
+        """Test that the pool can be shared across threads"""
+        server = self.start_server(KeepAliveHandler)
+        host = f"127.0.0.1:{server.server_address[1]}"
+        pool = ConnectionPool(max_idle_per_host=4)
+        errors = []
+
+        def worker():
+            try:
+                for i in range(20):
+                    response = pool.request("http", host, "POST", "/", body="{}")
+                    self.assertEqual(response.status, 200)
+            except Exception as e:
+                errors.append(e)
+
+        threads = [threading.Thread(target=worker) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(errors, [])
+        self.assertEqual(len(server.events), 80)
+        self.assertLessEqual(server.connections, 8)
+        pool.close()
+
+    def test_reconnect_on_stale_socket(self):
+        """Test that a socket closed by the server is replaced transparently"""
+        server = self.start_server(DroppingHandler)
+        host = f"127.0.0.1:{server.server_address[1]}"
+        pool = ConnectionPool()
+
+        for i in range(5):
+            response = pool.request("http", host, "POST", "/", body="{}")
+            self.assertEqual(response.status, 200)
+            self.assertEqual(response.body, b"ok")
+
+        self.assertEqual(len(server.events), 5)
+        self.assertEqual(pool.stats()["reconnects"], 4)
+        pool.close()
+
+    def test_idle_timeout(self):
+        """Test that connections idle for too long are not reused"""
+        server = self.start_server(KeepAliveHandler)
+        host = f"127.0.0.1:{server.server_address[1]}"
+        pool = ConnectionPool(idle_timeout=0)
+
+        pool.request("http", host, "POST", "/", body="{}")
+        pool.request("http", host, "POST", "/", body="{}")
+
+        self.assertEqual(server.connections, 2)
+        pool.close()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,168 @@
+"""
+Unit tests for exception fingerprinting and duplicate aggregation
+"""
+import sys
+import os
+import time
+import unittest
+from unittest.mock import patch, MagicMock
+
+# Add the parent directory to sys.path to import the package in development
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from errortrace_pro.dedup import DuplicateAggregator, fingerprint, normalize_message
+from errortrace_pro import handler as handler_module
+from errortrace_pro.handler import ExceptionHandler
+
+
+def raise_key_error(key):
+    """Raise a KeyError from a fixed location"""
+    return {}[key]
+
+
+def capture(func, *args):
+    """Call func and return the exc_info it raises"""
+    try:
+        func(*args)
+    except Exception:
+        return sys.exc_info()
+
+
+class TestFingerprint(unittest.TestCase):
+    """Test cases for fingerprint() and normalize_message()"""
+
+    def test_normalize_message(self):
+        """Test that variable message parts are replaced with placeholders"""
+        self.assertEqual(normalize_message("'user_42'"), "<str>")
+        self.assertEqual(
+            normalize_message("object at 0x7f3a2b1c has 3 items in /srv/app/data.json"),
+            "object at <addr> has <num> items in <path>"
+        )
+
+    def test_same_location_same_fingerprint(self):
+        """Test that repeats of an error from one place share a fingerprint"""
+        first = fingerprint(*capture(raise_key_error, "a"))
+        second = fingerprint(*capture(raise_key_error, "b"))
+        self.assertEqual(first, second)
+
+    def test_different_location_different_fingerprint(self):
+        """Test that the frame chain is part of the fingerprint"""
+        first = fingerprint(*capture(raise_key_error, "a"))
+        second = fingerprint(*capture(lambda: {}["a"]))
+        self.assertNotEqual(first, second)
+
+
+class TestDuplicateAggregator(unittest.TestCase):
+    """Test cases for the DuplicateAggregator class"""
+
+    def test_first_then_duplicates(self):
+        """Test that only the first occurrence is reported as first"""
+        aggregator = DuplicateAggregator(window=60, console_threshold=2)
+        self.assertTrue(aggregator.record("fp", KeyError, KeyError("a"), now=0).first)
+
+        second = aggregator.record("fp", KeyError, KeyError("a"), now=1)
+        third = aggregator.record("fp", KeyError, KeyError("a"), now=2)
+        self.assertFalse(second.first)
+        self.assertTrue(second.show_console)
+        self.assertFalse(third.show_console)
+        self.assertEqual(third.count, 3)
+
+    def test_summary_after_window(self):
+        """Test that duplicates are rolled up once the window elapses"""
+        aggregator = DuplicateAggregator(window=10)
+        for t in range(5):
+            aggregator.record("fp", KeyError, KeyError("a"), now=t)
+
+        self.assertEqual(aggregator.due_summaries(now=5), [])
+
+        summaries = aggregator.due_summaries(now=10)
+        self.assertEqual(len(summaries), 1)
+        self.assertEqual(summaries[0]["occurrences"], 4)
+        self.assertEqual(summaries[0]["exception"]["type"], "KeyError")
+        self.assertIn("seen 4 times since", summaries[0]["summary"])
+
+        # The window restarted and nothing new was suppressed
+        self.assertEqual(aggregator.due_summaries(now=30), [])
+
+    def test_quiet_fingerprint_starts_over(self):
+        """Test that a fingerprint unseen for a window is first again"""
+        aggregator = DuplicateAggregator(window=10)
+        aggregator.record("fp", KeyError, KeyError("a"), now=0)
+        self.assertTrue(aggregator.record("fp", KeyError, KeyError("a"), now=20).first)
+
+    def test_next_due(self):
+        """Test that the earliest window with suppressed duplicates is reported"""
+        aggregator = DuplicateAggregator(window=10)
+        aggregator.record("a", KeyError, KeyError("a"), now=0)
+        self.assertIsNone(aggregator.next_due(now=1))
+
+        aggregator.record("b", ValueError, ValueError("b"), now=3)
+        aggregator.record("b", ValueError, ValueError("b"), now=4)
+        aggregator.record("a", KeyError, KeyError("a"), now=5)
+        self.assertEqual(aggregator.next_due(now=6), 4)
+
+        summaries = aggregator.due_summaries(now=10)
+        self.assertEqual([summary["fingerprint"] for summary in summaries], ["a"])
+        self.assertEqual(aggregator.next_due(now=10), 3)
+        self.assertEqual([summary["fingerprint"] for summary in aggregator.flush(now=11)], ["b"])
+        self.assertIsNone(aggregator.next_due(now=11))
+
+
+class TestHandlerDedup(unittest.TestCase):
+    """Test cases for duplicate aggregation in ExceptionHandler"""
+
+    @patch('errortrace_pro.handler.print')
+    def test_repeats_logged_once(self, mock_print):
+        """Test that a hot loop produces one full event and one summary"""
+        handler = ExceptionHandler(colored_output=False, dedup_window=60, console_threshold=3)
+        handler.cloud_logging = True
+        handler.cloud_logger = MagicMock()
+        handler.visualizer = MagicMock()
+        handler.visualizer.format_traceback.return_value = "Formatted traceback"
+
+        for i in range(100):
+            handler.handle(*capture(raise_key_error, f"key-{i}"))
+
+        handler.cloud_logger.log_exception.assert_called_once()
+        self.assertEqual(handler.visualizer.format_traceback.call_count, 3)
+
+        handler.flush()
+        handler.cloud_logger.log_summary.assert_called_once()
+        summary = handler.cloud_logger.log_summary.call_args[0][0]
+        self.assertEqual(summary["occurrences"], 99)
+
+    @patch('errortrace_pro.handler.print')
+    def test_summary_sent_without_further_exceptions(self, mock_print):
+        """Test that a window's summary is sent when no other exception follows"""
+        handler = ExceptionHandler(colored_output=False, enable_suggestions=False,
+                                   dedup_window=0.1)
+        handler.cloud_logging = True
+        handler.cloud_logger = MagicMock()
+        with patch("sys.stderr"):
+            for i in range(3):
+                handler.handle(*capture(raise_key_error, f"key-{i}"))
+
+        deadline = time.monotonic() + 5
+        while not handler.cloud_logger.log_summary.called and time.monotonic() < deadline:
+            time.sleep(0.01)
+        summary = handler.cloud_logger.log_summary.call_args[0][0]
+        self.assertEqual(summary["occurrences"], 2)
+
+    @patch('errortrace_pro.handler.print')
+    def test_summary_sent_at_exit(self, mock_print):
+        """Test that pending summaries are sent by the exit hook"""
+        handler = ExceptionHandler(colored_output=False, enable_suggestions=False,
+                                   dedup_window=60)
+        handler.cloud_logging = True
+        handler.cloud_logger = MagicMock()
+        with patch("sys.stderr"):
+            for i in range(3):
+                handler.handle(*capture(raise_key_error, f"key-{i}"))
+        handler.cloud_logger.log_summary.assert_not_called()
+
+        handler_module._flush_at_exit()
+        handler.cloud_logger.log_summary.assert_called_once()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,163 @@
+"""
+Unit tests for the background delivery queue
+"""
+import sys
+import os
+import gc
+import weakref
+import threading
+import time
+import unittest
+from unittest.mock import patch
+
+# Add the parent directory to sys.path to import the package in development
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from errortrace_pro import delivery
+from errortrace_pro.delivery import DeliveryQueue
+from errortrace_pro.cloud_logger import CloudLogger
+
+
+class TestDeliveryQueue(unittest.TestCase):
+    """Test cases for the DeliveryQueue class"""
+
+    def setUp(self):
+        """Set up a send callable that can be held back by the test"""
+        self.sent = []
+        self.gate = threading.Event()
+        self.gate.set()
+
+        def send(payload):
+            self.gate.wait(5)
+            self.sent.append(payload)
+            return True
+
+        self.send = send
+
+    def test_put_and_flush(self):
+        """Test that queued payloads are delivered by the worker"""
+        queue = DeliveryQueue(self.send, maxsize=10)
+        for i in range(5):
+            self.assertTrue(queue.put(i))
+
+        self.assertTrue(queue.flush(timeout=5))
+        self.assertEqual(self.sent, [0, 1, 2, 3, 4])
+        self.assertEqual(queue.stats()["delivered"], 5)
+        self.assertEqual(queue.stats()["pending"], 0)
+        queue.close()
+
+    def _fill_blocked_queue(self, queue):
+        """Park the worker on the first payload and fill the queue behind it"""
+        self.gate.clear()
+        queue.put("in-flight")
+        deadline = time.monotonic() + 5
+        while queue.stats()["pending"] != 1 or queue._items:
+            if time.monotonic() > deadline:
+                self.fail("worker did not pick up the first payload")
+            time.sleep(0.001)
+        queue.put("a")
+        queue.put("b")
+
+    def test_drop_oldest(self):
+        """Test that the oldest queued payload is discarded on overflow"""
+        queue = DeliveryQueue(self.send, maxsize=2, overflow_policy="drop_oldest")
+        self._fill_blocked_queue(queue)
+
+        self.assertTrue(queue.put("c"))
+        self.assertEqual(queue.dropped, 1)
+
+        self.gate.set()
+        queue.flush(timeout=5)
+        self.assertEqual(self.sent, ["in-flight", "b", "c"])
+        self.assertEqual(queue.stats()["dropped_oldest"], 1)
+
+    def test_drop_newest(self):
+        """Test that the incoming payload is discarded on overflow"""
+        queue = DeliveryQueue(self.send, maxsize=2, overflow_policy="drop_newest")
+        self._fill_blocked_queue(queue)
+
+        self.assertFalse(queue.put("c"))
+
+        self.gate.set()
+        queue.flush(timeout=5)
+        self.assertEqual(self.sent, ["in-flight", "a", "b"])
+        self.assertEqual(queue.stats()["dropped_newest"], 1)
+
+    def test_block_with_timeout(self):
+        """Test that the block policy gives up after the timeout"""
+        queue = DeliveryQueue(self.send, maxsize=2, overflow_policy="block", block_timeout=0.05)
+        self._fill_blocked_queue(queue)
+
+        start = time.monotonic()
+        self.assertFalse(queue.put("c"))
+        self.assertGreaterEqual(time.monotonic() - start, 0.04)
+        self.assertEqual(queue.stats()["dropped_timeout"], 1)
+
+        self.gate.set()
+        queue.flush(timeout=5)
+
+    def test_send_failure_is_counted(self):
+        """Test that exceptions in the send callable don't kill the worker"""
+        def send(payload):
+            if payload == "bad":
+                raise RuntimeError("boom")
+            self.sent.append(payload)
+            return True
+
+        queue = DeliveryQueue(send, maxsize=10)
+        queue.put("bad")
+        queue.put("good")
+        queue.flush(timeout=5)
+
+        self.assertEqual(self.sent, ["good"])
+        self.assertEqual(queue.stats()["failed"], 1)
+
+    def test_exit_flush_does_not_keep_queue_alive(self):
+        """Test that restarted workers don't pile up exit hooks or pin the queue"""
+        queue = DeliveryQueue(lambda payload: True, maxsize=10)
+        queue.put("first")
+        queue.close(timeout=5)
+        # Restart the worker
+        queue._closed = False
+        queue.put("second")
+        queue.close(timeout=5)
+        self.assertIn(queue, delivery._started_queues)
+
+        ref = weakref.ref(queue)
+        del queue
+        gc.collect()
+        self.assertIsNone(ref())
+
+
+class TestCloudLoggerAsync(unittest.TestCase):
+    """Test cases for CloudLogger async delivery"""
+
+    def test_log_exception_returns_before_delivery(self):
+        """Test that log_exception only enqueues when async delivery is on"""
+        with patch.dict(os.environ, {"ERRORTRACE_ENDPOINT": "http://localhost:9/"}):
+            cloud_logger = CloudLogger(provider="http", async_delivery=True)
+
+        gate = threading.Event()
+        delivered = []
+
+        def slow_send(error_data):
+            gate.wait(5)
+            delivered.append(error_data)
+            return True
+
+        with patch.object(cloud_logger._queue, "send", slow_send):
+            result = cloud_logger.log_exception(ValueError, ValueError("x"), ["tb"])
+            self.assertTrue(result)
+            self.assertEqual(delivered, [])
+
+            gate.set()
+            self.assertTrue(cloud_logger.flush(timeout=5))
+
+        self.assertEqual(len(delivered), 1)
+        self.assertEqual(delivered[0]["exception"]["type"], "ValueError")
+        self.assertEqual(cloud_logger.get_stats()["enqueued"], 1)
+        cloud_logger.close()
+
+
+if __name__ == '__main__':
+    unittest.main()
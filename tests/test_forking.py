@@ -0,0 +1,379 @@
+"""
+Unit tests for fork safety and forwarding events between processes
+"""
+import sys
+import os
+import time
+import socket
+import tempfile
+import threading
+import unittest
+from unittest.mock import patch, MagicMock
+
+# Add the parent directory to sys.path to import the package in development
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from errortrace_pro.cloud_logger import CloudLogger
+from errortrace_pro.delivery import DeliveryQueue
+from errortrace_pro.forwarding import (EventCollector, EventForwarder, MAX_DATAGRAM,
+                                       default_collector_address, parse_address)
+from errortrace_pro.handler import ExceptionHandler
+
+
+def run_in_child(check):
+    """
+    Fork, run check() in the child and return its exit status
+
+    The child exits with 0 if check() returns True, 1 if it returns False
+    and 2 if it raises or doesn't finish within five seconds.
+    """
+    pid = os.fork()
+    if pid == 0:
+        status = 2
+        try:
+            watchdog = threading.Timer(5, os._exit, args=(2,))
+            watchdog.daemon = True
+            watchdog.start()
+            status = 0 if check() else 1
+        finally:
+            os._exit(status)
+    _, status = os.waitpid(pid, 0)
+    return os.WEXITSTATUS(status), pid
+
+
+@unittest.skipUnless(hasattr(os, "fork"), "requires os.fork")
+class TestForkSafety(unittest.TestCase):
+    """Test that inherited state is reset in forked children"""
+
+    def test_queue_usable_when_lock_held_at_fork(self):
+        """Test that a queue whose lock another thread held at fork time works in the child"""
+        delivered = threading.Event()
+        release = threading.Event()
+
+        def send(payload):
+            delivered.set()
+            release.wait(5)
+            return True
+
+        queue = DeliveryQueue(send, maxsize=10)
+        self.addCleanup(release.set)
+        queue.put("parent-1")
+        delivered.wait(5)
+        queue.put("parent-2")
+
+        holding = threading.Event()
+
+        def hold_lock():
+            with queue._lock:
+                holding.set()
+                release.wait(5)
+
+        holder = threading.Thread(target=hold_lock, daemon=True)
+        holder.start()
+        holding.wait(5)
+
+        def check():
+            sent = []
+            queue.send = lambda payload: sent.append(payload) or True
+            if queue.stats()["pending"] != 0:
+                return False
+            queue.put("child")
+            return queue.flush(2) and sent == ["child"]
+
+        status, _ = run_in_child(check)
+        release.set()
+        self.assertEqual(status, 0)
+        self.assertTrue(queue.flush(2))
+        self.assertEqual(queue.stats()["delivered"], 2)
+
+    def test_handler_state_reset(self):
+        """Test that a child starts with its own locks and counters"""
+        handler = ExceptionHandler(colored_output=False, enable_suggestions=False)
+        with patch("sys.stderr"):
+            try:
+                raise ValueError("in parent")
+            except ValueError:
+                handler.handle()
+        self.assertEqual(handler.get_stats()["handled"], 1)
+
+        output_lock = handler._output_lock
+        output_lock.acquire()
+        try:
+            def check():
+                return (handler.get_stats()["handled"] == 0
+                        and handler._output_lock is not output_lock
+                        and handler._output_lock.acquire(timeout=1))
+
+            status, _ = run_in_child(check)
+        finally:
+            output_lock.release()
+        self.assertEqual(status, 0)
+
+
+@unittest.skipUnless(hasattr(os, "fork") and hasattr(os, "register_at_fork"), "requires os.fork")
+class TestEventCollector(unittest.TestCase):
+    """Test cases for forwarding events to a collecting process"""
+
+    def make_logger(self, **options):
+        with patch.dict(os.environ, {"ERRORTRACE_ENDPOINT": "http://127.0.0.1:9/logs"}):
+            return CloudLogger(provider="http", **options)
+
+    def test_forked_children_forward_to_parent(self):
+        """Test that events from forked children are delivered by the parent"""
+        cloud_logger = self.make_logger()
+        received = []
+        cloud_logger.log_event = lambda event: received.append(event) or True
+        collector = EventCollector(cloud_logger).start()
+        self.addCleanup(collector.close)
+
+        def check():
+            logged = cloud_logger.log_exception(ValueError, ValueError("from child"), ["line"])
+            return logged and cloud_logger.get_stats()["forwarding"]["forwarded"] == 1
+
+        children = []
+        for _ in range(3):
+            status, pid = run_in_child(check)
+            self.assertEqual(status, 0)
+            children.append(pid)
+
+        deadline = time.monotonic() + 5
+        while len(received) < 3 and time.monotonic() < deadline:
+            time.sleep(0.01)
+        self.assertEqual(sorted(event["system"]["pid"] for event in received), sorted(children))
+        self.assertEqual(received[0]["exception"]["message"], "from child")
+        self.assertEqual(collector.stats()["received"], 3)
+
+    def test_parent_sends_directly(self):
+        """Test that the collecting process itself doesn't forward"""
+        cloud_logger = self.make_logger()
+        collector = EventCollector(cloud_logger).start()
+        self.addCleanup(collector.close)
+        with patch.object(cloud_logger, "_send", return_value=True) as send:
+            self.assertTrue(cloud_logger.log_exception(ValueError, ValueError("parent"), ["line"]))
+        send.assert_called_once()
+        self.assertEqual(collector.stats()["received"], 0)
+
+    def test_unreachable_collector_falls_back(self):
+        """Test that events are sent directly when the collector can't be reached"""
+        cloud_logger = self.make_logger(forward_to="/nonexistent/errortrace.sock")
+        with patch.object(cloud_logger, "_send", return_value=True) as send, \
+                self.assertLogs("errortrace_pro.forwarding", "WARNING"):
+            self.assertTrue(cloud_logger.log_exception(ValueError, ValueError("x"), ["line"]))
+        send.assert_called_once()
+        self.assertEqual(cloud_logger.get_stats()["forwarding"]["failed"], 1)
+
+
+class TestLocalCollector(unittest.TestCase):
+    """Test cases for the local collector and the local provider"""
+
+    def make_collector(self, address, **options):
+        with patch.dict(os.environ, {"ERRORTRACE_ENDPOINT": "http://127.0.0.1:9/logs"}):
+            cloud_logger = CloudLogger(provider="http")
+        received = []
+        cloud_logger.log_event = lambda event: received.append(event) or True
+        cloud_logger.log_summary = lambda summary: received.append(summary) or True
+        collector = EventCollector(cloud_logger, address=address, **options).start()
+        self.addCleanup(collector.close)
+        return collector, received
+
+    def wait_for(self, received, count):
+        deadline = time.monotonic() + 5
+        while len(received) < count and time.monotonic() < deadline:
+            time.sleep(0.01)
+
+    def test_parse_address(self):
+        """Test collector address parsing"""
+        self.assertEqual(parse_address("/tmp/x.sock"), ("unix", "/tmp/x.sock"))
+        self.assertEqual(parse_address("unix:///tmp/x.sock"), ("unix", "/tmp/x.sock"))
+        self.assertEqual(parse_address("udp://127.0.0.1:5140"), ("udp", ("127.0.0.1", 5140)))
+        with self.assertRaises(ValueError):
+            parse_address("tcp://127.0.0.1")
+
+    def test_tcp_and_udp(self):
+        """Test that events arrive over localhost TCP and UDP"""
+        for scheme in ("tcp", "udp"):
+            collector, received = self.make_collector(f"{scheme}://127.0.0.1:0")
+            forwarder = EventForwarder(collector.address)
+            self.addCleanup(forwarder.close)
+            for n in range(3):
+                self.assertTrue(forwarder.send({"error_id": f"{scheme}-{n}"}))
+            self.wait_for(received, 3)
+            self.assertEqual(sorted(event["error_id"] for event in received),
+                             [f"{scheme}-{n}" for n in range(3)])
+
+    def test_local_provider(self):
+        """Test that provider="local" hands events to the collector"""
+        collector, received = self.make_collector("udp://127.0.0.1:0")
+        with patch.dict(os.environ, {"ERRORTRACE_ENDPOINT": collector.address}):
+            cloud_logger = CloudLogger(provider="local", async_delivery=False)
+        self.addCleanup(cloud_logger.close)
+        self.assertEqual(cloud_logger._forwarder.timeout, 0)
+        self.assertTrue(cloud_logger.log_exception(ValueError, ValueError("local"), ["line"]))
+        self.wait_for(received, 1)
+        self.assertEqual(received[0]["exception"]["message"], "local")
+
+    @unittest.skipUnless(hasattr(socket, "AF_UNIX"), "requires Unix sockets")
+    def test_serve_ignores_forward_to(self):
+        """Test that `errortrace serve` delivers events when ERRORTRACE_FORWARD_TO names it"""
+        from errortrace_pro.cli import _serve
+
+        sent = []
+        lines = []
+        with tempfile.TemporaryDirectory() as temp_dir:
+            path = os.path.join(temp_dir, "collector.sock")
+
+            def sleep(seconds):
+                # Send one event as a worker would, then stop the collector
+                forwarder = EventForwarder(path)
+                self.assertTrue(forwarder.send({"error_id": "from-worker"}))
+                forwarder.close()
+                deadline = time.monotonic() + 5
+                while not sent and time.monotonic() < deadline:
+                    time.sleep(0.01)
+                raise KeyboardInterrupt
+
+            environ = {"ERRORTRACE_FORWARD_TO": path, "ERRORTRACE_ENDPOINT": "http://127.0.0.1:9/logs"}
+            with patch.dict(os.environ, environ), \
+                    patch("errortrace_pro.cli.time", MagicMock(sleep=sleep)), \
+                    patch("errortrace_pro.cli.signal.signal"), \
+                    patch.object(CloudLogger, "_send", lambda self, event: sent.append(event) or True):
+                _serve(path, "http", None, None, None, None, None, lines.append)
+
+        self.assertEqual([event["error_id"] for event in sent], ["from-worker"])
+        self.assertIn("delivered 1", lines[-1])
+
+    def test_forward_to_false(self):
+        """Test that forward_to=False ignores ERRORTRACE_FORWARD_TO"""
+        environ = {"ERRORTRACE_FORWARD_TO": "/tmp/elsewhere.sock", "ERRORTRACE_ENDPOINT": "http://127.0.0.1:9/logs"}
+        with patch.dict(os.environ, environ):
+            self.assertIsNotNone(CloudLogger(provider="http")._forwarder)
+            cloud_logger = CloudLogger(provider="http", forward_to=False)
+        self.assertIsNone(cloud_logger._forwarder)
+        self.assertIsNone(cloud_logger.forward_address)
+
+    def test_local_provider_udp_budget(self):
+        """Test that events sent over UDP are kept within one datagram"""
+        with patch.dict(os.environ, {"ERRORTRACE_ENDPOINT": "udp://127.0.0.1:5140"}):
+            cloud_logger = CloudLogger(provider="local", async_delivery=False, max_event_bytes=10 ** 6)
+        self.addCleanup(cloud_logger.close)
+        self.assertEqual(cloud_logger.max_event_bytes, MAX_DATAGRAM - 1)
+
+    def test_non_blocking_connect(self):
+        """Test that a forwarder with timeout 0 doesn't wait for a busy collector"""
+        server = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        self.addCleanup(server.close)
+        server.bind(("127.0.0.1", 0))
+        server.listen(0)
+        host, port = server.getsockname()
+        # Fill the backlog of a collector that doesn't accept
+        for _ in range(4):
+            client = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+            self.addCleanup(client.close)
+            client.setblocking(False)
+            client.connect_ex((host, port))
+        time.sleep(0.1)
+
+        forwarder = EventForwarder(f"tcp://{host}:{port}", timeout=0)
+        self.addCleanup(forwarder.close)
+        started = time.monotonic()
+        with self.assertLogs("errortrace_pro.forwarding", "WARNING"):
+            self.assertFalse(forwarder.send({"error_id": "busy"}))
+        self.assertLess(time.monotonic() - started, 0.5)
+
+    def test_non_blocking_tcp_connect(self):
+        """Test that a TCP connection still being set up is used once it is"""
+        collector, received = self.make_collector("tcp://127.0.0.1:0")
+        forwarder = EventForwarder(collector.address, timeout=0)
+        self.addCleanup(forwarder.close)
+        deadline = time.monotonic() + 5
+        with patch("errortrace_pro.forwarding.logger"):
+            while not forwarder.send({"error_id": "tcp"}) and time.monotonic() < deadline:
+                time.sleep(0.01)
+        self.wait_for(received, 1)
+        self.assertEqual(received[0]["error_id"], "tcp")
+
+    def test_default_address(self):
+        """Test that the default socket is in a directory only this user can access"""
+        with tempfile.TemporaryDirectory() as temp_dir:
+            environ = {key: value for key, value in os.environ.items() if key != "XDG_RUNTIME_DIR"}
+            with patch.dict(os.environ, environ, clear=True), \
+                    patch("tempfile.gettempdir", return_value=temp_dir):
+                address = default_collector_address()
+                directory = os.path.join(temp_dir, f"errortrace-{os.getuid()}")
+                self.assertEqual(address, f"unix://{directory}/errortrace.sock")
+                self.assertEqual(os.stat(directory).st_mode & 0o777, 0o700)
+
+                os.chmod(directory, 0o755)
+                with self.assertRaises(PermissionError):
+                    default_collector_address()
+
+            with patch.dict(os.environ, {"XDG_RUNTIME_DIR": temp_dir}):
+                self.assertEqual(default_collector_address(), f"unix://{temp_dir}/errortrace.sock")
+
+    @unittest.skipUnless(hasattr(socket, "AF_UNIX"), "requires Unix sockets")
+    def test_unix_socket(self):
+        """Test the socket mode and that only stale sockets are replaced"""
+        with tempfile.TemporaryDirectory() as temp_dir:
+            path = os.path.join(temp_dir, "collector.sock")
+
+            # A socket nothing listens on any more
+            stale = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            stale.bind(path)
+            stale.close()
+            collector, received = self.make_collector(path)
+            self.assertEqual(os.stat(path).st_mode & 0o777, 0o600)
+
+            # A running collector isn't replaced
+            with patch.dict(os.environ, {"ERRORTRACE_ENDPOINT": "http://127.0.0.1:9/logs"}):
+                second = EventCollector(CloudLogger(provider="http"), address=path)
+            with self.assertRaises(OSError):
+                second.start()
+            forwarder = EventForwarder(path)
+            self.addCleanup(forwarder.close)
+            self.assertTrue(forwarder.send({"error_id": "still-running"}))
+            self.wait_for(received, 1)
+            self.assertEqual(received[0]["error_id"], "still-running")
+            collector.close()
+
+            # Nor is a file that isn't a socket
+            with open(path, "w") as f:
+                f.write("data")
+            with self.assertRaises(FileExistsError):
+                second.start()
+            with open(path) as f:
+                self.assertEqual(f.read(), "data")
+
+    def test_local_provider_spools_when_collector_down(self):
+        """Test that events are spooled when no collector is listening"""
+        with tempfile.TemporaryDirectory() as spool_dir:
+            cloud_logger = CloudLogger(provider="local", forward_to="/nonexistent/errortrace.sock",
+                                       async_delivery=False, spool_dir=spool_dir,
+                                       replay_on_start=False)
+            self.assertFalse(cloud_logger.log_exception(ValueError, ValueError("x"), ["line"]))
+            self.assertEqual(cloud_logger.get_stats()["spool"]["appended"], 1)
+            cloud_logger.close()
+
+    def test_deduplication(self):
+        """Test that resent events are dropped and repeats are rolled up"""
+        collector, received = self.make_collector("udp://127.0.0.1:0", dedup_window=60)
+        forwarder = EventForwarder(collector.address)
+        self.addCleanup(forwarder.close)
+        event = {"error_id": "a", "fingerprint": "f1", "exception": {"type": "ValueError"}}
+        forwarder.send(event)
+        forwarder.send(event)
+        forwarder.send(dict(event, error_id="b"))
+        forwarder.send({"error_id": "c", "fingerprint": "f2"})
+        deadline = time.monotonic() + 5
+        while collector.stats()["received"] < 4 and time.monotonic() < deadline:
+            time.sleep(0.01)
+        stats = collector.stats()
+        self.assertEqual(stats["duplicates"], 1)
+        self.assertEqual(stats["suppressed"], 1)
+        self.assertEqual([event["error_id"] for event in received], ["a", "c"])
+
+        collector.close()
+        self.assertEqual(collector.stats()["summaries"], 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
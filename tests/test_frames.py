@@ -0,0 +1,167 @@
+"""
+Unit tests for the frames module
+"""
+import sys
+import os
+import unittest
+import traceback
+from unittest.mock import patch
+
+# Add the parent directory to sys.path to import the package in development
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from errortrace_pro.frames import (
+    FrameGap, collapse_frames, exception_chain, extract_stack, extract_traceback
+)
+from errortrace_pro.locals_capture import LocalsPolicy
+from errortrace_pro.sources import source_cache
+
+
+def _describe(items):
+    return [item.describe() if isinstance(item, FrameGap) else item for item in items]
+
+
+def _identity(item):
+    return item
+
+
+class TestCollapseFrames(unittest.TestCase):
+    """Test cases for collapse_frames"""
+
+    def test_recursion_cycle(self):
+        """Test that a repeated cycle is shown once followed by a marker"""
+        frames = ["main", "run"] + ["a", "b", "c"] * 325 + ["fail"]
+        result = collapse_frames(frames, key=_identity)
+        self.assertEqual(_describe(result),
+                         ["main", "run", "a", "b", "c", "[frames 3–977 repeated 325×]", "fail"])
+
+    def test_short_repeats_kept(self):
+        """Test that cycles below the repeat threshold are left alone"""
+        frames = ["main", "a", "a", "b"]
+        self.assertEqual(collapse_frames(frames, key=_identity), frames)
+
+    def test_head_tail_limits(self):
+        """Test that frames beyond the head and tail limits are omitted"""
+        result = collapse_frames(list(range(10)), key=_identity, head=2, tail=3,
+                                 collapse_recursion=False)
+        self.assertEqual(_describe(result), [0, 1, "[frames 3–7 omitted]", 7, 8, 9])
+        self.assertEqual(len(collapse_frames(list(range(10)), key=_identity, head=None, tail=None)), 10)
+
+    def test_output_size_constant(self):
+        """Test that deeper recursion doesn't produce more entries"""
+        sizes = {len(collapse_frames(["main"] + ["f"] * depth, key=_identity)) for depth in (50, 500, 5000)}
+        self.assertEqual(sizes, {3})
+
+
+class TestExceptionChain(unittest.TestCase):
+    """Test cases for exception_chain and extract_stack"""
+
+    def test_chain_order(self):
+        """Test that causes come first and links are recorded"""
+        try:
+            try:
+                raise KeyError("inner")
+            except KeyError as e:
+                raise ValueError("outer") from e
+        except ValueError:
+            exc_info = sys.exc_info()
+        chain = exception_chain(*exc_info)
+        self.assertEqual([entry.exc_type for entry in chain], [KeyError, ValueError])
+        self.assertEqual([entry.link for entry in chain], ["cause", None])
+        self.assertEqual(extract_stack(exc_info[2])[-1].name, "test_chain_order")
+
+
+
+class TestExtractTraceback(unittest.TestCase):
+    """Test cases for extract_traceback"""
+
+    def _chained_error(self):
+        def lookup(mapping):
+            return mapping["key"]
+        try:
+            try:
+                lookup({})
+            except KeyError as e:
+                raise ValueError("bad, value") from e
+        except ValueError:
+            return sys.exc_info()
+
+    def test_record(self):
+        """Test that the record holds the chain, frames and locals"""
+        exc_info = self._chained_error()
+        record = extract_traceback(*exc_info, locals_policy=LocalsPolicy())
+        self.assertEqual(record.message, "bad, value")
+        self.assertFalse(hasattr(record.stacks[-1], "exc_value"))
+        self.assertEqual([stack.exc_type for stack in record.stacks], [KeyError, ValueError])
+        self.assertEqual(record.stacks[0].link, "cause")
+
+        cause = record.stacks[0]
+        innermost = len(cause.frames) - 1
+        self.assertEqual(cause.frames[innermost].name, "lookup")
+        self.assertEqual(cause.locals[innermost], {"mapping": "{}"})
+
+    def test_format_tb(self):
+        """Test that format_tb matches the traceback module"""
+        exc_info = self._chained_error()
+        record = extract_traceback(*exc_info)
+        self.assertEqual(record.format_tb(), traceback.format_tb(exc_info[2]))
+        self.assertEqual(record.stacks[0].locals, {})
+
+    def test_lines_read_for_shown_frames_only(self):
+        """Test that source lines of collapsed frames aren't looked up"""
+        def recurse(depth):
+            if depth == 0:
+                raise RuntimeError("deep")
+            recurse(depth - 1)
+
+        try:
+            recurse(30)
+        except RuntimeError:
+            exc_info = sys.exc_info()
+
+        lookups = []
+        original = source_cache.lines_at
+
+        def lines_at(filename, linenos, module_globals=None):
+            lookups.append(set(linenos))
+            return original(filename, linenos, module_globals)
+
+        with patch.object(source_cache, "lines_at", lines_at):
+            record = extract_traceback(*exc_info, frame_limits=(1, 2), collapse_recursion=False)
+
+        stack = record.stacks[0]
+        shown = [summary.lineno for _, summary in stack.shown_frames()]
+        self.assertEqual(len(shown), 3)
+        self.assertEqual(lookups, [set(shown)])
+        self.assertEqual(stack.shown_frames()[-1][1].line, 'raise RuntimeError("deep")')
+
+    def test_rich_markers_only_hide_frames_from_rich(self):
+        """Test that _rich_traceback_omit/_guard frames are kept in the record but not in Rich's trace"""
+        from errortrace_pro.visualizer import _rich_trace
+
+        def omitted():
+            _rich_traceback_omit = True
+            raise RuntimeError("marked")
+
+        def guarded():
+            _rich_traceback_guard = True
+            omitted()
+
+        def outer():
+            guarded()
+
+        try:
+            outer()
+        except RuntimeError:
+            exc_info = sys.exc_info()
+
+        record = extract_traceback(*exc_info)
+        self.assertEqual(record.format_tb(), traceback.format_tb(exc_info[2]))
+        self.assertEqual([summary.name for summary in record.frames][-3:], ["outer", "guarded", "omitted"])
+        self.assertEqual(record.to_dict()["stacks"][0]["frames"][-1]["name"], "omitted")
+
+        self.assertEqual(_rich_trace(record).stacks[0].frames, [])
+
+
+if __name__ == '__main__':
+    unittest.main()
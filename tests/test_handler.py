@@ -4,9 +4,10 @@ Unit tests for the exception handler module
 import sys
 import os
 import unittest
-from unittest.mock import patch, MagicMock
+from unittest.mock import patch, MagicMock, AsyncMock
 import tempfile
 import json
+import threading
 
 # Add the parent directory to sys.path to import the package in development
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
@@ -138,5 +139,241 @@ class TestExceptionHandler(unittest.TestCase):
                 if args and isinstance(args[0], str):
                     self.assertNotIn("Suggested Solutions", args[0])
 
+    def test_handle_json_output(self):
+        """Test that json output writes one NDJSON record and sends frames to the cloud"""
+        handler = ExceptionHandler(
+            cloud_logging=False,
+            enable_suggestions=False,
+            colored_output=False,
+            output_format="json"
+        )
+        handler.cloud_logging = True
+        handler.cloud_logger = MagicMock()
+        handler.cloud_logger.log_exception.return_value = True
+        
+        try:
+            1 / 0
+        except Exception:
+            exc_type, exc_value, exc_traceback = sys.exc_info()
+            with patch('sys.stderr') as mock_stderr:
+                handler.handle(exc_type, exc_value, exc_traceback)
+        
+        output = "".join(args[0] for args, _ in mock_stderr.write.call_args_list)
+        data = json.loads(output)
+        self.assertEqual(data["exception"]["type"], "ZeroDivisionError")
+        self.assertEqual(data["stacks"][-1]["frames"][-1]["name"], "test_handle_json_output")
+        
+        kwargs = handler.cloud_logger.log_exception.call_args.kwargs
+        frames = kwargs["traceback_data"]["stacks"][-1]["frames"]
+        self.assertEqual(frames[-1]["name"], "test_handle_json_output")
+        self.assertIn("self", frames[-1]["locals"])
+        self.assertNotIn("visual_traceback", kwargs)
+    
+    def test_handle_stream_output(self):
+        """Test that streaming writes the traceback without building the full string"""
+        import io
+        handler = ExceptionHandler(enable_suggestions=False, colored_output=False, stream_output=True)
+        
+        try:
+            1 / 0
+        except Exception:
+            exc_type, exc_value, exc_traceback = sys.exc_info()
+            stream = io.StringIO()
+            with patch('sys.stderr', stream), \
+                    patch.object(handler.visualizer, 'format_traceback') as format_traceback:
+                handler.handle(exc_type, exc_value, exc_traceback)
+        
+        format_traceback.assert_not_called()
+        self.assertIn("ZeroDivisionError: division by zero", stream.getvalue())
+        self.assertIn("in test_handle_stream_output", stream.getvalue())
+    
+    def test_invalid_output_format(self):
+        """Test that an unknown output format is rejected"""
+        with self.assertRaises(ValueError):
+            ExceptionHandler(output_format="xml")
+
+class TestInstallHooks(unittest.TestCase):
+    """Test cases for the hooks set by install()"""
+    
+    def setUp(self):
+        """Install a mock handler"""
+        import errortrace_pro
+        self.errortrace_pro = errortrace_pro
+        # Other test modules may have left the hooks installed
+        errortrace_pro.uninstall()
+        self.hooks = (sys.excepthook, threading.excepthook, sys.unraisablehook)
+        self.handler = MagicMock()
+        errortrace_pro.install(self.handler)
+    
+    def tearDown(self):
+        """Restore the hooks"""
+        self.errortrace_pro.uninstall()
+        self.assertEqual((sys.excepthook, threading.excepthook, sys.unraisablehook), self.hooks)
+    
+    def test_install_twice(self):
+        """Test that uninstall() restores the original hooks after repeated installs"""
+        self.errortrace_pro.install(MagicMock())
+        self.errortrace_pro.install(self.handler)
+        # tearDown checks that the hooks from before the first install are back
+    
+    def test_thread_hook_falls_back_to_original(self):
+        """Test that a failing handler falls back to the original thread hook after repeated installs"""
+        self.errortrace_pro.uninstall()
+        original = MagicMock()
+        threading.excepthook = original
+        handler = MagicMock()
+        handler.handle.side_effect = RuntimeError("handler failed")
+        self.errortrace_pro.install(handler)
+        self.errortrace_pro.install(handler)
+        
+        thread = threading.Thread(target=lambda: 1 / 0)
+        thread.start()
+        thread.join()
+        
+        handler.handle.assert_called_once()
+        original.assert_called_once()
+        self.errortrace_pro.uninstall()
+        threading.excepthook = self.hooks[1]
+        self.errortrace_pro.install(self.handler)
+    
+    def test_asyncio_install_twice(self):
+        """Test that the loop's original exception handler is restored"""
+        import asyncio
+        
+        def original(loop, context):
+            pass
+        
+        async def main():
+            loop = asyncio.get_running_loop()
+            loop.set_exception_handler(original)
+            self.errortrace_pro.install_asyncio(self.handler)
+            self.errortrace_pro.install_asyncio(self.handler)
+            self.errortrace_pro.uninstall()
+            restored = loop.get_exception_handler()
+            self.errortrace_pro.install(self.handler)
+            return restored
+        
+        self.assertIs(asyncio.run(main()), original)
+    
+    def test_thread_exception(self):
+        """Test that uncaught thread exceptions reach the handler"""
+        def fail():
+            raise ValueError("in thread")
+        thread = threading.Thread(target=fail)
+        thread.start()
+        thread.join()
+        
+        exc_type, exc_value, exc_traceback = self.handler.handle.call_args.args
+        self.assertIs(exc_type, ValueError)
+        self.assertEqual(str(exc_value), "in thread")
+        self.assertIsNotNone(exc_traceback)
+    
+    def test_unraisable_exception(self):
+        """Test that exceptions Python can't raise reach the handler"""
+        class Broken:
+            def __del__(self):
+                raise KeyError("in __del__")
+        with patch('errortrace_pro.logger'):
+            Broken()
+        self.assertIs(self.handler.handle.call_args.args[0], KeyError)
+    
+    def test_asyncio_exception(self):
+        """Test that unhandled asyncio errors of the running loop reach the handler"""
+        import asyncio
+        
+        self.handler.ahandle = AsyncMock()
+        
+        async def main():
+            self.errortrace_pro.install_asyncio(self.handler)
+            loop = asyncio.get_running_loop()
+            loop.call_exception_handler({"message": "boom", "exception": RuntimeError("in task")})
+            # The handler runs as a task instead of blocking the loop
+            self.handler.ahandle.assert_not_awaited()
+            await asyncio.sleep(0)
+        
+        asyncio.run(main())
+        self.handler.ahandle.assert_awaited_once()
+        self.assertIs(self.handler.ahandle.call_args.args[0], RuntimeError)
+        self.handler.handle.assert_not_called()
+
+
+class TestHandlerConcurrency(unittest.TestCase):
+    """Test cases for concurrent and reentrant handle() calls"""
+    
+    def test_reentrant_handle(self):
+        """Test that an exception raised inside handle() isn't handled recursively"""
+        handler = ExceptionHandler(colored_output=False)
+        handler.solution_provider = MagicMock()
+        
+        def nested(*args):
+            try:
+                raise KeyError("nested")
+            except KeyError:
+                self.assertIsNone(handler.handle(*sys.exc_info()))
+            return []
+        handler.solution_provider.get_solutions.side_effect = nested
+        
+        with patch('sys.__excepthook__') as default_hook, patch('sys.stderr'):
+            try:
+                raise ValueError("outer")
+            except ValueError:
+                self.assertIsNotNone(handler.handle(*sys.exc_info()))
+        
+        self.assertIs(default_hook.call_args.args[0], KeyError)
+        self.assertEqual(handler.get_stats()["reentrant"], 1)
+        self.assertEqual(handler.get_stats()["handled"], 1)
+    
+    def test_reentrant_ahandle(self):
+        """Test that an exception raised inside ahandle()'s render isn't handled recursively"""
+        import asyncio
+        
+        handler = ExceptionHandler(colored_output=False)
+        handler.solution_provider = MagicMock()
+        
+        def nested(*args):
+            try:
+                raise KeyError("nested")
+            except KeyError:
+                self.assertIsNone(handler.handle(*sys.exc_info()))
+            return []
+        handler.solution_provider.get_solutions.side_effect = nested
+        
+        async def main():
+            try:
+                raise ValueError("outer")
+            except ValueError as e:
+                return await handler.ahandle(type(e), e, e.__traceback__)
+        
+        with patch('sys.__excepthook__') as default_hook, patch('sys.stderr'):
+            self.assertIsNotNone(asyncio.run(main()))
+        
+        self.assertIs(default_hook.call_args.args[0], KeyError)
+        self.assertEqual(handler.get_stats()["reentrant"], 1)
+        self.assertEqual(handler.get_stats()["handled"], 1)
+    
+    def test_output_not_interleaved(self):
+        """Test that each exception's output is written in one piece"""
+        handler = ExceptionHandler(enable_suggestions=False, colored_output=False)
+        writes = []
+        stderr = MagicMock()
+        stderr.write.side_effect = writes.append
+        
+        def fail(n):
+            try:
+                raise ValueError(f"error {n}")
+            except ValueError:
+                handler.handle(*sys.exc_info())
+        
+        with patch('sys.stderr', stderr):
+            threads = [threading.Thread(target=fail, args=(n,)) for n in range(8)]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+        
+        self.assertEqual(len(writes), 8)
+        for text in writes:
+            self.assertEqual(text.count("ErrorTrace Pro - Exception Detected"), 1)
+
 if __name__ == '__main__':
     unittest.main()
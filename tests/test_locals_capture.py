@@ -0,0 +1,105 @@
+"""
+Unit tests for the locals capture module
+"""
+import sys
+import os
+import unittest
+from types import SimpleNamespace
+from unittest.mock import patch
+
+# Add the parent directory to sys.path to import the package in development
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from errortrace_pro.locals_capture import LocalsPolicy, TRUNCATED_KEY
+from errortrace_pro.visualizer import TracebackVisualizer, RICH_AVAILABLE
+
+
+class BrokenRepr:
+    def __repr__(self):
+        raise RuntimeError("no repr")
+
+
+class ndarray:
+    """Stand-in for numpy.ndarray, summarized by class name"""
+    shape = (1000, 3)
+
+
+def _frame_with(**variables):
+    """Return a frame stand-in whose locals are the given variables"""
+    return SimpleNamespace(f_locals=variables)
+
+
+class TestLocalsPolicy(unittest.TestCase):
+    """Test cases for the LocalsPolicy class"""
+
+    def test_safe_repr_bounds(self):
+        """Test that reprs are bounded in length and items"""
+        policy = LocalsPolicy(max_repr=50, max_items=3)
+        self.assertEqual(policy.safe_repr([1, 2, 3, 4, 5]), "[1, 2, 3, ...]")
+        self.assertLessEqual(len(policy.safe_repr("x" * 10000)), 50)
+        self.assertIn("BrokenRepr instance", policy.safe_repr(BrokenRepr()))
+
+    def test_summaries(self):
+        """Test that large containers and array types are summarized"""
+        policy = LocalsPolicy(summary_threshold=100)
+        self.assertEqual(policy.safe_repr(list(range(1000))), "<list len=1000>")
+        self.assertEqual(policy.safe_repr(b"x" * 1000), "<bytes len=1000>")
+        self.assertEqual(policy.safe_repr(ndarray()), "<ndarray shape=(1000, 3)>")
+
+    def test_applies_to(self):
+        """Test skipping locals by exception type through the MRO"""
+        policy = LocalsPolicy(skip_exceptions=("LookupError",))
+        self.assertFalse(policy.applies_to(KeyError))
+        self.assertTrue(policy.applies_to(ValueError))
+        self.assertFalse(LocalsPolicy.from_option(False).applies_to(ValueError))
+
+    def test_frame_limits(self):
+        """Test per-frame variable and frame limits"""
+        capture = LocalsPolicy(max_frames=1, max_variables=2).start()
+        captured = capture.frame_locals(_frame_with(a=1, b=2, c=3, d=4))
+        self.assertEqual(captured, {"a": "1", "b": "2", TRUNCATED_KEY: "<2 more variables>"})
+        self.assertIsNone(capture.frame_locals(_frame_with(a=1)))
+
+    def test_budget_exhausted(self):
+        """Test that capture stops once the byte or time budget runs out"""
+        capture = LocalsPolicy(byte_budget=10).start()
+        captured = capture.frame_locals(_frame_with(a="x" * 20, b=2))
+        self.assertIn("byte budget exhausted", captured[TRUNCATED_KEY])
+        self.assertIsNone(capture.frame_locals(_frame_with(a=1)))
+
+        capture = LocalsPolicy(time_budget=0.01).start()
+        with patch("errortrace_pro.locals_capture.time.perf_counter", return_value=float("inf")):
+            captured = capture.frame_locals(_frame_with(a=1))
+        self.assertIn("time budget exhausted", captured[TRUNCATED_KEY])
+
+
+@unittest.skipIf(not RICH_AVAILABLE, "Rich not available")
+class TestRichLocals(unittest.TestCase):
+    """Test cases for locals in the Rich renderer"""
+
+    def _render(self, policy, exc_class=ValueError):
+        def fail():
+            huge_list = list(range(100000))
+            raise exc_class("boom")
+        try:
+            fail()
+        except Exception:
+            exc_info = sys.exc_info()
+        visualizer = TracebackVisualizer(colored_output=True, locals_policy=policy)
+        return visualizer.format_traceback(*exc_info, show_tip=False)
+
+    def test_summarized_locals(self):
+        """Test that large locals are rendered as summaries"""
+        output = self._render(None)
+        self.assertIn("huge_list", output)
+        self.assertIn("<list len=100000>", output)
+
+    def test_skipped_locals(self):
+        """Test that skipped exception types render without locals"""
+        output = self._render({"skip_exceptions": ["ValueError"]})
+        self.assertIn("boom", output)
+        self.assertNotIn("<list len=100000>", output)
+
+
+if __name__ == '__main__':
+    unittest.main()
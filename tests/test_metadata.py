@@ -0,0 +1,65 @@
+"""
+Unit tests for the host metadata snapshot
+"""
+import sys
+import os
+import unittest
+from unittest.mock import patch
+
+# Add the parent directory to sys.path to import the package in development
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from errortrace_pro import metadata
+
+
+class TestMetadata(unittest.TestCase):
+    """Test cases for the metadata module"""
+
+    def setUp(self):
+        """Start each test from an empty snapshot"""
+        patcher = patch.multiple(metadata, _static=None, _ip_address=None, _resolver=None)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_platform_computed_once(self):
+        """Test that platform details are only collected on first use"""
+        with patch("errortrace_pro.metadata.platform.platform", return_value="TestOS") as mock_platform, \
+                patch.object(metadata, "prefetch"):
+            first = metadata.get_metadata()
+            second = metadata.get_metadata()
+
+        self.assertEqual(first["platform"], "TestOS")
+        self.assertEqual(second["platform"], "TestOS")
+        mock_platform.assert_called_once()
+        self.assertEqual(first["pid"], os.getpid())
+
+    def test_no_dns_lookup_on_caller_thread(self):
+        """Test that get_metadata never resolves the IP address synchronously"""
+        with patch("errortrace_pro.metadata.socket.gethostbyname") as mock_lookup, \
+                patch.object(metadata, "prefetch"):
+            result = metadata.get_metadata()
+
+        mock_lookup.assert_not_called()
+        self.assertIsNone(result["ip_address"])
+
+    def test_background_resolution(self):
+        """Test that prefetch resolves the IP address in the background"""
+        with patch("errortrace_pro.metadata.socket.gethostbyname", return_value="10.0.0.1"):
+            metadata.prefetch()
+            metadata._resolver.join(5)
+            self.assertEqual(metadata.get_metadata()["ip_address"], "10.0.0.1")
+
+    def test_reset_after_fork(self):
+        """Test that the child process gets a fresh lock and resolver"""
+        old_lock = metadata._lock
+        metadata._resolver = object()
+        try:
+            metadata._reset_after_fork()
+            self.assertIsNone(metadata._resolver)
+            self.assertIsNot(metadata._lock, old_lock)
+        finally:
+            metadata._lock = old_lock
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -2,6 +2,7 @@
 Test that the package can be imported and basic functionality works.
 """
 import sys
+import subprocess
 import unittest
 import importlib.util
 
@@ -24,6 +25,18 @@ class TestPackaging(unittest.TestCase):
         handler = errortrace_pro.init()
         self.assertIsNotNone(handler)
         
+    def test_lazy_import(self):
+        """Test that importing the package doesn't build a handler or import Rich."""
+        code = (
+            "import sys, logging, errortrace_pro\n"
+            "assert 'errortrace_pro.handler' not in sys.modules\n"
+            "assert 'rich' not in sys.modules and 'colorama' not in sys.modules\n"
+            "assert not logging.getLogger().handlers\n"
+            "assert errortrace_pro.default_handler is errortrace_pro.default_handler\n"
+        )
+        result = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True)
+        self.assertEqual(result.returncode, 0, result.stderr)
+        
     def test_install(self):
         """Test that install function works."""
         import errortrace_pro
@@ -0,0 +1,212 @@
+"""
+Unit tests for payload size capping and request compression
+"""
+import sys
+import os
+import gzip
+import json
+import zlib
+import asyncio
+import unittest
+from unittest.mock import patch, MagicMock
+
+# Add the parent directory to sys.path to import the package in development
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from errortrace_pro.batching import _json_size
+from errortrace_pro.cloud_logger import CloudLogger
+from errortrace_pro.payload import MAX_MESSAGE_CHARS, MAX_LINE_CHARS, _json_size_bound, cap_event, compress_body
+
+
+def make_event(frames=40, locals_size=200, visual_size=5000, context_size=2000):
+    """Build an event with the parts cap_event removes"""
+    return {
+        "error_id": "id",
+        "exception": {"type": "ValueError", "message": "boom", "module": "builtins"},
+        "traceback": [f"line {n}" for n in range(2 * frames)],
+        "traceback_data": {"stacks": [{
+            "type": "ValueError",
+            "frames": [
+                {"filename": "app.py", "lineno": n, "name": f"f{n}", "line": "x",
+                 "locals": {"value": "v" * locals_size}}
+                for n in range(frames)
+            ],
+        }]},
+        "visual_traceback": "\x1b[31m" + "t" * visual_size,
+        "context": {"environment": {"PATH": "p" * context_size}},
+    }
+
+
+class TestCapEvent(unittest.TestCase):
+    """Test cases for cap_event"""
+
+    def test_small_event_unchanged(self):
+        """Test that an event within budget is returned as is"""
+        event = make_event(frames=2, locals_size=1, visual_size=1, context_size=1)
+        self.assertIs(cap_event(event, 100000), event)
+        self.assertIs(cap_event(event, None), event)
+
+    def test_visual_traceback_removed_first(self):
+        """Test that dropping the visual traceback is enough for a slightly large event"""
+        event = make_event()
+        capped = cap_event(event, _json_size(event) - 1000)
+        self.assertNotIn("visual_traceback", capped)
+        self.assertIn("locals", capped["traceback_data"]["stacks"][0]["frames"][0])
+        self.assertEqual(capped["truncated"]["removed"], ["visual_traceback"])
+        self.assertEqual(capped["truncated"]["original_bytes"], _json_size(event))
+        # The original event is left alone
+        self.assertIn("visual_traceback", event)
+
+    def test_truncation_order(self):
+        """Test that locals, then middle frames, then context are removed"""
+        event = make_event()
+        without_locals = _json_size(event) - 5000 - 40 * 200
+
+        capped = cap_event(event, without_locals)
+        self.assertEqual(capped["truncated"]["removed"], ["visual_traceback", "locals"])
+        self.assertEqual(len(capped["traceback_data"]["stacks"][0]["frames"]), 40)
+        self.assertIn("locals", event["traceback_data"]["stacks"][0]["frames"][0])
+
+        capped = cap_event(event, 4000)
+        self.assertEqual(capped["truncated"]["removed"], ["visual_traceback", "locals", "frames"])
+        frames = capped["traceback_data"]["stacks"][0]["frames"]
+        self.assertEqual(frames[3], {"omitted": 32})
+        self.assertEqual(frames[-1]["name"], "f39")
+        self.assertIn("lines omitted", " ".join(capped["traceback"]))
+        self.assertIn("context", capped)
+        self.assertLessEqual(_json_size(capped), 4000)
+
+        capped = cap_event(event, 1000)
+        self.assertEqual(capped["truncated"]["removed"][-1], "context")
+        self.assertNotIn("context", capped)
+
+    def test_long_message_shortened(self):
+        """Test that long messages and traceback lines are cut as a last resort"""
+        event = make_event(frames=2, locals_size=1, visual_size=1, context_size=1)
+        event["exception"]["message"] = "m" * 50000
+        event["traceback_data"]["stacks"][0]["message"] = "m" * 50000
+        event["traceback"] = ["l" * 20000, "short"]
+        capped = cap_event(event, 8000)
+        self.assertEqual(capped["truncated"]["removed"][-1], "message")
+        message = capped["exception"]["message"]
+        self.assertTrue(message.startswith("m" * MAX_MESSAGE_CHARS))
+        self.assertIn("48000 characters omitted", message)
+        self.assertEqual(capped["traceback_data"]["stacks"][0]["message"], message)
+        self.assertLess(len(capped["traceback"][0]), MAX_LINE_CHARS + 50)
+        self.assertEqual(capped["traceback"][1], "short")
+        self.assertLessEqual(_json_size(capped), 8000)
+        self.assertEqual(len(event["exception"]["message"]), 50000)
+
+    def test_size_bound(self):
+        """Test that the cheap bound is never below the JSON size and skips measuring"""
+        events = [make_event(), {"flags": [False] * 100, "empty": [None] * 50},
+                  {"text": "\x1b[31m\u00e9\U0001F600\n\"" * 100}, {str(n): [] for n in range(50)}]
+        for event in events:
+            self.assertGreaterEqual(_json_size_bound(event), _json_size(event))
+        self.assertIsNone(_json_size_bound({"value": object()}))
+
+        sizeof = MagicMock(side_effect=_json_size)
+        event = make_event(frames=2, locals_size=1, visual_size=1, context_size=1)
+        self.assertIs(cap_event(event, 100000, sizeof=sizeof), event)
+        sizeof.assert_not_called()
+        with self.assertLogs("errortrace_pro.payload", "WARNING"):
+            cap_event(event, 100, sizeof=sizeof)
+        sizeof.assert_called()
+
+
+class TestCompression(unittest.TestCase):
+    """Test cases for compressed request bodies"""
+
+    def capture(self, cloud_logger):
+        requests = []
+
+        def fake_request(scheme, host, method, path, body=None, headers=None):
+            requests.append((body, headers))
+            return MagicMock(status=200)
+
+        return requests, patch.object(cloud_logger._pool, "request", fake_request)
+
+    def test_compress_body(self):
+        """Test that both encodings round-trip"""
+        body = json.dumps(make_event())
+        self.assertEqual(gzip.decompress(compress_body(body, "gzip")).decode(), body)
+        self.assertEqual(zlib.decompress(compress_body(body, "deflate")).decode(), body)
+        with self.assertRaises(ValueError):
+            compress_body(body, "br")
+
+    def test_gzip_request(self):
+        """Test that large bodies are sent gzip-encoded with Content-Encoding"""
+        cloud_logger = CloudLogger(provider="gcp", api_key="key", project_id="p",
+                                   async_delivery=False, compression="gzip")
+        requests, patcher = self.capture(cloud_logger)
+        with patcher:
+            self.assertTrue(cloud_logger.log_exception(ValueError, ValueError("x"), ["tb"] * 500))
+        body, headers = requests[0]
+        self.assertEqual(headers["Content-Encoding"], "gzip")
+        entry = json.loads(gzip.decompress(body))["entries"][0]
+        self.assertEqual(entry["jsonPayload"]["exception"]["message"], "x")
+
+        stats = cloud_logger.get_stats()["payload"]
+        self.assertEqual(stats["compressed"], 1)
+        self.assertLess(stats["sent_bytes"], stats["raw_bytes"])
+
+    def test_small_body_uncompressed(self):
+        """Test that bodies below the threshold are sent as is"""
+        with patch.dict(os.environ, {"ERRORTRACE_ENDPOINT": "http://127.0.0.1:9/logs"}):
+            cloud_logger = CloudLogger(provider="http", async_delivery=False, compression="deflate")
+        requests, patcher = self.capture(cloud_logger)
+        with patcher:
+            cloud_logger.log_summary({"fingerprint": "f", "count": 2})
+        self.assertNotIn("Content-Encoding", requests[0][1])
+
+    def test_unsupported_provider(self):
+        """Test that compression is turned off for providers that don't accept it"""
+        cloud_logger = CloudLogger(provider="aws", api_key="key", async_delivery=False,
+                                   compression="gzip")
+        self.assertIsNone(cloud_logger.compression)
+
+    def test_async_requests_compressed(self):
+        """Test that pipelined coroutine requests are compressed too"""
+        with patch.dict(os.environ, {"ERRORTRACE_ENDPOINT": "http://127.0.0.1:9/logs"}):
+            cloud_logger = CloudLogger(provider="http", compression="gzip")
+        sent = []
+
+        class Pool:
+            async def pipeline(self, scheme, host, requests):
+                sent.extend(requests)
+                return [MagicMock(status=200) for _ in requests]
+
+        event = cloud_logger._prepare_error_data(ValueError, ValueError("x"), ["tb"] * 500)
+        loop = asyncio.new_event_loop()
+        try:
+            self.assertTrue(loop.run_until_complete(cloud_logger._asend_batch(Pool(), [event])))
+        finally:
+            loop.close()
+        _, _, body, headers = sent[0]
+        self.assertEqual(headers["Content-Encoding"], "gzip")
+        self.assertEqual(json.loads(gzip.decompress(body))["error_id"], event["error_id"])
+
+
+class TestCloudLoggerBudget(unittest.TestCase):
+    """Test cases for the per-event size budget in CloudLogger"""
+
+    def test_provider_limit_caps_budget(self):
+        """Test that the budget can't exceed the provider's event limit"""
+        cloud_logger = CloudLogger(provider="azure", api_key="key", async_delivery=False,
+                                   max_event_bytes=10 * 1024 * 1024)
+        self.assertEqual(cloud_logger.max_event_bytes, 64 * 1024 - 512)
+
+    def test_oversized_event_truncated(self):
+        """Test that logged events are truncated and counted"""
+        with patch.dict(os.environ, {"ERRORTRACE_ENDPOINT": "http://127.0.0.1:9/logs"}):
+            cloud_logger = CloudLogger(provider="http", async_delivery=False, max_event_bytes=2000)
+        event = cloud_logger._prepare_error_data(
+            ValueError, ValueError("x"), ["tb"], visual_traceback="v" * 5000
+        )
+        self.assertNotIn("visual_traceback", event)
+        self.assertEqual(event["truncated"]["removed"], ["visual_traceback"])
+        self.assertEqual(cloud_logger.get_stats()["payload"]["truncated"], 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,128 @@
+"""
+Unit tests for the render pool module
+"""
+import sys
+import os
+import gc
+import unittest
+import weakref
+import threading
+from io import StringIO
+from unittest.mock import MagicMock, patch
+
+# Add the parent directory to sys.path to import the package in development
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from errortrace_pro.render_pool import RenderPool
+from errortrace_pro.handler import ExceptionHandler
+
+
+class TestRenderPool(unittest.TestCase):
+    """Test cases for the RenderPool class"""
+
+    def test_order_per_thread(self):
+        """Test that each thread's jobs run in submission order"""
+        pool = RenderPool(workers=3)
+        results = {}
+
+        def submit_many(name):
+            for n in range(50):
+                pool.submit(lambda n=n: results.setdefault(name, []).append(n))
+
+        threads = [threading.Thread(target=submit_many, args=(name,)) for name in "abcd"]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertTrue(pool.flush(5))
+        self.assertEqual(results, {name: list(range(50)) for name in "abcd"})
+        stats = pool.stats()
+        self.assertEqual(stats["completed"], 200)
+        self.assertEqual(stats["pending"], 0)
+        pool.close()
+
+    def test_dropped_when_full(self):
+        """Test that a full queue drops jobs instead of handing them back to run out of order"""
+        pool = RenderPool(workers=1, queue_size=1, block_timeout=0.01)
+        release = threading.Event()
+        started = threading.Event()
+        ran = []
+        pool.submit(lambda: (started.set(), release.wait(5)))
+        started.wait(5)
+        self.assertTrue(pool.submit(lambda: ran.append("queued")))
+        with self.assertLogs("errortrace_pro.render_pool", "WARNING"):
+            self.assertTrue(pool.submit(lambda: ran.append("dropped")))
+        release.set()
+        self.assertTrue(pool.flush(5))
+        self.assertEqual(ran, ["queued"])
+        self.assertEqual(pool.stats()["dropped"], 1)
+
+        pool.close()
+        self.assertFalse(pool.submit(lambda: None))
+
+
+class TestHandlerRenderWorkers(unittest.TestCase):
+    """Test cases for rendering on the pool from ExceptionHandler"""
+
+    def test_handle_returns_before_rendering(self):
+        """Test that handle() doesn't wait for the renderer"""
+        handler = ExceptionHandler(enable_suggestions=False, colored_output=False, render_workers=1)
+        release = threading.Event()
+        rendered = []
+        handler.visualizer = MagicMock()
+        handler.visualizer.format_traceback.side_effect = \
+            lambda *args, **kwargs: (release.wait(5), rendered.append(kwargs["record"]))[1] or ""
+
+        try:
+            raise ValueError("first")
+        except ValueError:
+            context = handler.handle(*sys.exc_info())
+        self.assertEqual(context["exception"]["type"], "ValueError")
+        self.assertEqual(rendered, [])
+
+        release.set()
+        self.assertTrue(handler.flush(5))
+        self.assertEqual(len(rendered), 1)
+        self.assertEqual(rendered[0].message, "first")
+        self.assertEqual(handler.get_stats()["render_pool"]["completed"], 1)
+
+    def test_queued_job_releases_frames(self):
+        """Test that a pending render doesn't keep the exception's locals alive"""
+        handler = ExceptionHandler(enable_suggestions=True, colored_output=False, render_workers=1)
+        release = threading.Event()
+        handler.visualizer = MagicMock()
+        handler.visualizer.format_traceback.side_effect = lambda *args, **kwargs: release.wait(5) and ""
+
+        class Payload:
+            pass
+
+        def fail():
+            payload = Payload()
+            fail.payload = weakref.ref(payload)
+            raise KeyError("missing")
+
+        with patch("sys.stderr", new_callable=StringIO) as stderr:
+            try:
+                fail()
+            except KeyError:
+                handler.handle(*sys.exc_info())
+            gc.collect()
+            self.assertIsNone(fail.payload())
+
+            release.set()
+            self.assertTrue(handler.flush(5))
+        self.assertIn("'missing'", stderr.getvalue())
+
+    def test_handler_not_kept_alive(self):
+        """Test that the exit hook doesn't keep handlers alive"""
+        handler = ExceptionHandler(enable_suggestions=False, render_workers=1)
+        handler._render_pool.close()
+        ref = weakref.ref(handler)
+        del handler
+        gc.collect()
+        self.assertIsNone(ref())
+
+
+if __name__ == '__main__':
+    unittest.main()
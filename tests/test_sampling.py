@@ -0,0 +1,157 @@
+"""
+Unit tests for rate limiting and sampling
+"""
+import sys
+import os
+import gc
+import random
+import unittest
+from unittest.mock import patch, MagicMock
+
+# Add the parent directory to sys.path to import the package in development
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from errortrace_pro.sampling import RateLimiter, Sampler, TokenBucket, resolve_type_key
+from errortrace_pro.handler import ExceptionHandler
+
+
+def capture(exc):
+    """Raise exc and return its exc_info"""
+    try:
+        raise exc
+    except Exception:
+        return sys.exc_info()
+
+
+class TestTokenBucket(unittest.TestCase):
+    """Test cases for the TokenBucket class"""
+
+    def test_burst_then_refill(self):
+        """Test that a bucket allows a burst and refills at its rate"""
+        bucket = TokenBucket(rate=1, burst=3)
+        start = bucket.updated
+        self.assertEqual([bucket.consume(start) for _ in range(4)], [True, True, True, False])
+        self.assertFalse(bucket.consume(start + 0.5))
+        self.assertTrue(bucket.consume(start + 1.5))
+
+
+class TestRateLimiter(unittest.TestCase):
+    """Test cases for the RateLimiter class"""
+
+    def test_type_matched_through_mro(self):
+        """Test that limits configured for a base class apply to subclasses"""
+        self.assertEqual(resolve_type_key({"OSError": 1}, ConnectionResetError), "OSError")
+        self.assertEqual(resolve_type_key({"builtins.LookupError": 1}, KeyError), "builtins.LookupError")
+        self.assertIsNone(resolve_type_key({"ValueError": 1}, KeyError))
+
+    def test_per_type_limit(self):
+        """Test that one type's limit doesn't affect other types"""
+        limiter = RateLimiter({"cloud": {"TimeoutError": (0, 2)}})
+        results = [limiter.allow("cloud", TimeoutError) for _ in range(5)]
+        self.assertEqual(results, [True, True, False, False, False])
+        self.assertTrue(limiter.allow("cloud", ValueError))
+        self.assertTrue(limiter.allow("render", TimeoutError))
+
+    def test_per_fingerprint_limit(self):
+        """Test that each fingerprint gets its own bucket"""
+        limiter = RateLimiter({"render": {"per_fingerprint": (0, 1)}})
+        self.assertTrue(limiter.uses_fingerprints())
+        self.assertTrue(limiter.allow("render", KeyError, "a"))
+        self.assertFalse(limiter.allow("render", KeyError, "a"))
+        self.assertTrue(limiter.allow("render", KeyError, "b"))
+
+    def test_denied_event_does_not_spend_tokens(self):
+        """Test that a denied event leaves the other buckets untouched"""
+        limiter = RateLimiter({"cloud": {"*": (0, 2), "KeyError": (0, 1)}})
+        self.assertTrue(limiter.allow("cloud", KeyError))
+        self.assertFalse(limiter.allow("cloud", KeyError))
+        self.assertTrue(limiter.allow("cloud", ValueError))
+        self.assertFalse(limiter.allow("cloud", ValueError))
+
+    def test_unknown_stage(self):
+        """Test that a misspelt stage is rejected"""
+        with self.assertRaises(ValueError):
+            RateLimiter({"clouds": {"*": 1}})
+
+
+class TestSampler(unittest.TestCase):
+    """Test cases for the Sampler class"""
+
+    def test_rates(self):
+        """Test that rates are applied per type with a default"""
+        sampler = Sampler({"TimeoutError": 0.1, "*": 0}, rng=random.Random(1))
+        kept = sum(sampler.keep(TimeoutError) for _ in range(10000))
+        self.assertAlmostEqual(kept / 10000, 0.1, delta=0.02)
+        self.assertFalse(sampler.keep(ValueError))
+
+    def test_unconfigured_types_are_kept(self):
+        """Test that types without a rate are always kept"""
+        sampler = Sampler({"TimeoutError": 0})
+        self.assertTrue(sampler.keep(ValueError))
+
+    def test_types_not_kept_alive(self):
+        """Test that the rate cache doesn't keep exception classes alive"""
+        sampler = Sampler({"*": 0.5})
+        for _ in range(3):
+            sampler.keep(type("Transient", (ValueError,), {}))
+        gc.collect()
+        self.assertEqual(len(sampler._cache), 0)
+
+
+class TestHandlerLoadShedding(unittest.TestCase):
+    """Test cases for sampling and rate limits in ExceptionHandler"""
+
+    def make_handler(self, **kwargs):
+        """Create a handler with mocked rendering and cloud logging"""
+        handler = ExceptionHandler(colored_output=False, **kwargs)
+        handler.cloud_logging = True
+        handler.cloud_logger = MagicMock()
+        handler.visualizer = MagicMock()
+        handler.visualizer.format_traceback.return_value = "Formatted traceback"
+        handler.solution_provider = MagicMock()
+        handler.solution_provider.get_solutions.return_value = []
+        return handler
+
+    @patch('errortrace_pro.handler.print')
+    def test_sampled_out_before_formatting(self, mock_print):
+        """Test that sampled-out exceptions do no formatting work"""
+        handler = self.make_handler(sample_rates={"TimeoutError": 0})
+
+        self.assertIsNone(handler.handle(*capture(TimeoutError("slow"))))
+        handler.visualizer.format_traceback.assert_not_called()
+        handler.cloud_logger.log_exception.assert_not_called()
+
+        handler.handle(*capture(ValueError("bad")))
+        stats = handler.get_stats()
+        self.assertEqual(stats["sampled_out"], {"TimeoutError": 1})
+        self.assertEqual(stats["handled"], 1)
+
+    @patch('errortrace_pro.handler.print')
+    def test_stages_limited_independently(self, mock_print):
+        """Test that a rate-limited cloud stage still renders locally"""
+        handler = self.make_handler(rate_limits={"cloud": {"ValueError": (0, 1)}})
+
+        for _ in range(3):
+            handler.handle(*capture(ValueError("bad")))
+
+        self.assertEqual(handler.visualizer.format_traceback.call_count, 3)
+        handler.cloud_logger.log_exception.assert_called_once()
+        self.assertEqual(handler.get_stats()["rate_limited"]["cloud"], {"ValueError": 2})
+
+    @patch('errortrace_pro.handler.print')
+    def test_all_stages_limited(self, mock_print):
+        """Test that nothing is formatted when every stage is limited"""
+        handler = self.make_handler(rate_limits={
+            "render": {"*": (0, 1)}, "suggestions": {"*": (0, 1)}, "cloud": {"*": (0, 1)}
+        })
+
+        handler.handle(*capture(ValueError("bad")))
+        handler.handle(*capture(ValueError("bad")))
+
+        handler.visualizer.format_traceback.assert_called_once()
+        handler.solution_provider.get_solutions.assert_called_once()
+        self.assertEqual(handler.get_stats()["handled"], 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
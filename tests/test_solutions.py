@@ -0,0 +1,222 @@
+"""
+Unit tests for the solutions module
+"""
+import sys
+import os
+import json
+import random
+import tempfile
+import unittest
+from difflib import get_close_matches
+
+# Add the parent directory to sys.path to import the package in development
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from errortrace_pro.solutions import SolutionProvider, MessagePatternIndex, ExceptionNameIndex
+from errortrace_pro.cache import LRUCache
+
+
+class TestMessagePatternIndex(unittest.TestCase):
+    """Test cases for the MessagePatternIndex class"""
+
+    def test_groups_of_matching_rule(self):
+        """Test that captured groups belong to the rule that matched"""
+        index = MessagePatternIndex({"X": {r"(a)(b)": "{0}{1}", r"c(d)": "{0}"}})
+        rule, groups = index.match("X", "zzcd")
+        self.assertEqual(rule.pattern, r"c(d)")
+        self.assertEqual(groups, ("d",))
+
+    def test_rule_order_takes_precedence(self):
+        """Test that an earlier rule wins even if a later one matches further left"""
+        index = MessagePatternIndex({"X": {"second": "s", "f(i)rst": "f"}})
+        rule, groups = index.match("X", "first then second")
+        self.assertEqual(rule.pattern, "second")
+        self.assertEqual(index.match("X", "first only")[1], ("i",))
+
+    def test_unmergeable_rules(self):
+        """Test that rules with backreferences are scanned one by one"""
+        index = MessagePatternIndex({"X": {r"(a)\1": "{0}", r"b(c)": "{0}"}})
+        self.assertIsNone(index._combined["X"])
+        self.assertEqual(index.match("X", "bc aa")[1], ("a",))
+        self.assertIsNone(index.match("X", "nothing"))
+        self.assertIsNone(index.match("Y", "aa"))
+
+
+class TestExceptionNameIndex(unittest.TestCase):
+    """Test cases for the ExceptionNameIndex class"""
+
+    def test_same_result_as_difflib(self):
+        """Test that the best match equals get_close_matches(n=1)"""
+        rng = random.Random(0)
+        parts = ["Connection", "Timeout", "Value", "Key", "Http", "Json", "Auth", "Lock", "File"]
+        names = sorted({"".join(rng.sample(parts, rng.randint(1, 3))) + rng.choice(["Error", "Exception"])
+                        for _ in range(500)})
+        words = [name.replace("Error", "Eror") for name in rng.sample(names, 50)]
+        words += ["".join(rng.choice("abcErorx") for _ in range(rng.randint(0, 8))) for _ in range(50)]
+
+        index = ExceptionNameIndex(names)
+        for word in words:
+            expected = get_close_matches(word, names, n=1, cutoff=0.7)
+            self.assertEqual(index.best_match(word), expected[0] if expected else None, word)
+
+    def test_ties_go_to_greater_name(self):
+        """Test difflib's tie-breaking between equally similar names"""
+        self.assertEqual(ExceptionNameIndex(["abcX", "abcY"]).best_match("abc"), "abcY")
+
+
+class TestLRUCache(unittest.TestCase):
+    """Test cases for the LRUCache class"""
+
+    def test_eviction_order(self):
+        """Test that the least recently used entry is evicted"""
+        cache = LRUCache(maxsize=2)
+        cache.put("a", 1)
+        cache.put("b", 2)
+        cache.get("a")
+        cache.put("c", 3)
+
+        self.assertIsNone(cache.get("b"))
+        self.assertEqual(cache.get("a"), 1)
+        self.assertEqual(cache.stats()["evictions"], 1)
+
+
+class TestSolutionProvider(unittest.TestCase):
+    """Test cases for the SolutionProvider class"""
+
+    def setUp(self):
+        """Set up the test environment"""
+        self.provider = SolutionProvider()
+
+    def test_message_guidance(self):
+        """Test guidance for built-in message rules"""
+        self.assertEqual(
+            self.provider._get_message_specific_guidance(
+                "TypeError", "handler() takes 2 positional arguments but 3 were given"),
+            "The function takes 2 arguments but you provided 3"
+        )
+        self.assertEqual(
+            self.provider._get_message_specific_guidance("ImportError", "No module named 'yaml'"),
+            "Install the module with: pip install yaml"
+        )
+        self.assertIsNone(self.provider._get_message_specific_guidance("ValueError", "'abc'"))
+
+    def test_similar_exception(self):
+        """Test fuzzy matching of unknown exception names"""
+        self.assertEqual(self.provider._find_similar_exception("KeyEror"), "KeyError")
+        self.assertIsNone(self.provider._find_similar_exception("CompletelyDifferent"))
+
+        # Repeated lookups are memoized, and new keys rebuild the index
+        self.provider._find_similar_exception("KeyEror")
+        self.assertEqual(self.provider._similar_cache.stats()["hits"], 1)
+        self.provider.solutions_db["KeyEror"] = []
+        self.assertEqual(self.provider._find_similar_exception("KeyEror"), "KeyEror")
+
+    def test_inherited_solutions(self):
+        """Test that subclasses inherit the solutions of their closest base"""
+        class ConnectTimeout(ConnectionError, TimeoutError):
+            pass
+
+        solutions = self.provider.get_solutions(ConnectTimeout, ConnectTimeout("timed out"))
+        self.assertEqual(solutions, self.provider.solutions_db["ConnectionError"])
+        self.assertIn(ConnectTimeout, self.provider._type_cache)
+
+    def test_inherited_message_guidance(self):
+        """Test that subclasses get the message guidance of their closest base"""
+        class MissingSetting(KeyError):
+            pass
+
+        solutions = self.provider.get_solutions(MissingSetting, MissingSetting("timeout"))
+        self.assertEqual(
+            solutions[0],
+            "The key 'timeout' doesn't exist in the dictionary. Use .get() or check if key exists first."
+        )
+
+    def test_qualified_name_preferred(self):
+        """Test that a 'module.Class' entry wins over a base class entry"""
+        class ConnectTimeout(TimeoutError):
+            pass
+
+        qualified_name = f"{__name__}.{ConnectTimeout.__qualname__}"
+        self.provider.solutions_db[qualified_name] = ["Raise the connect timeout"]
+        self.assertEqual(self.provider.get_solutions(ConnectTimeout, ConnectTimeout()),
+                         ["Raise the connect timeout"])
+
+    def test_generic_bases_not_inherited(self):
+        """Test that plain Exception subclasses don't match via Exception"""
+        class UnrelatedProblem(Exception):
+            pass
+
+        self.provider.solutions_db["Exception"] = ["Too generic"]
+        self.assertEqual(self.provider._resolve_solutions_key(UnrelatedProblem), (None, False))
+
+    def test_memoized_results(self):
+        """Test that repeats of a failure are served from the cache"""
+        context = {"traceback": {"last_frame": {"filename": "app.py", "lineno": 3, "line": "d[key]"}}}
+        first = self.provider.get_solutions(KeyError, KeyError("user_1"), context)
+        second = self.provider.get_solutions(KeyError, KeyError("user_2"), context)
+        third = self.provider.get_solutions(KeyError, KeyError("user_2"), context)
+
+        # The message template is shared, but values are still rendered per message
+        self.assertIn("'user_1'", first[0])
+        self.assertIn("'user_2'", second[0])
+        self.assertEqual(second, third)
+
+        stats = self.provider.get_cache_stats()
+        self.assertEqual((stats["hits"], stats["misses"], stats["size"]), (2, 1, 1))
+
+        # Returned lists can be modified without affecting the cache
+        third.clear()
+        self.assertEqual(self.provider.get_solutions(KeyError, KeyError("user_2"), context), second)
+
+    def test_cache_invalidation(self):
+        """Test that reloading or changing the database clears the cache"""
+        self.provider.get_solutions(ValueError, ValueError("bad"))
+        self.provider.solutions_db["ValueError"] = ["Replaced"]
+        self.provider.reload()
+        self.assertEqual(self.provider.get_cache_stats()["size"], 0)
+
+        self.provider.solutions_db["NewError"] = ["New"]
+        self.assertEqual(self.provider.get_solutions(ValueError, ValueError("bad")),
+                         self.provider.solutions_db["ValueError"])
+        self.assertEqual(self.provider.get_cache_stats()["misses"], 2)
+
+    def test_cache_eviction_and_ttl(self):
+        """Test the cache's size bound and expiry"""
+        provider = SolutionProvider(cache_size=1, cache_ttl=0)
+        provider.get_solutions(ValueError, ValueError("bad"))
+        provider.get_solutions(KeyError, KeyError("a"))
+        provider.get_solutions(KeyError, KeyError("a"))
+
+        stats = provider.get_cache_stats()
+        self.assertEqual(stats["evictions"], 1)
+        self.assertEqual(stats["expirations"], 1)
+        self.assertEqual(SolutionProvider(cache_size=0).get_cache_stats(), {})
+
+    def test_custom_message_rules(self):
+        """Test that custom databases can add message rules"""
+        custom = {
+            "ValueError": ["Check the input"],
+            "_message_patterns": {
+                "ValueError": {r"invalid literal for int\(\) with base \d+: '([^']*)'": "'{0}' is not an integer"},
+                "KeyError": {r"'(tmp_[^']+)'": "Temporary key {0} has expired"}
+            }
+        }
+        with tempfile.NamedTemporaryFile("w", suffix=".json", delete=False) as f:
+            json.dump(custom, f)
+        self.addCleanup(os.remove, f.name)
+
+        provider = SolutionProvider(custom_path=f.name)
+        self.assertNotIn("_message_patterns", provider.solutions_db)
+
+        solutions = provider.get_solutions(ValueError, ValueError("invalid literal for int() with base 10: 'x'"))
+        self.assertEqual(solutions[0], "'x' is not an integer")
+        self.assertIn("Check the input", solutions)
+
+        # Custom rules are tried before the built-in ones
+        self.assertEqual(provider._get_message_specific_guidance("KeyError", "'tmp_1'"),
+                         "Temporary key tmp_1 has expired")
+        self.assertIn("Use .get()", provider._get_message_specific_guidance("KeyError", "'user'"))
+
+
+if __name__ == '__main__':
+    unittest.main()
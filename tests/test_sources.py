@@ -0,0 +1,104 @@
+"""
+Unit tests for the source cache module
+"""
+import sys
+import os
+import unittest
+import tempfile
+from unittest import mock
+
+# Add the parent directory to sys.path to import the package in development
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from errortrace_pro import sources
+from errortrace_pro.sources import SourceCache
+
+
+class TestSourceCache(unittest.TestCase):
+    """Test cases for the SourceCache class"""
+
+    def setUp(self):
+        """Create a source file"""
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.directory.name, "module.py")
+        self._write("".join(f"line_{n} = {n}\r\n" for n in range(1, 101)))
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def _write(self, text, encoding="utf-8"):
+        with open(self.path, "w", encoding=encoding, newline="") as f:
+            f.write(text)
+
+    def test_windows(self):
+        """Test reading line windows from a file read whole and a streamed one"""
+        for threshold in (1024 * 1024, 1):
+            cache = SourceCache(stream_threshold=threshold)
+            self.assertEqual(cache.getlines(self.path, 9, 11), ["line_9 = 9", "line_10 = 10", "line_11 = 11"])
+            self.assertEqual(cache.getline(self.path, 100), "line_100 = 100")
+            self.assertEqual(cache.getlines(self.path, 99, 105), ["line_99 = 99", "line_100 = 100"])
+            self.assertEqual(cache.getline(self.path, 101), "")
+            self.assertEqual(cache.lines_at(self.path, [1, 50]), {1: "line_1 = 1", 50: "line_50 = 50"})
+
+            stats = cache.stats()
+            self.assertEqual(stats["misses"], 1)
+            self.assertEqual(stats["hits"], 4)
+            self.assertEqual(stats["streamed_files"], 1 if threshold == 1 else 0)
+            cache.clear()
+
+    def test_line_endings(self):
+        """Test that both paths split lines on \\r\\n, \\r and \\n alike"""
+        self._write("".join(f"a_{n} = {n}" + ("\r\n", "\r", "\n")[n % 3] for n in range(1, 201)) + "last")
+        expected = SourceCache().getlines(self.path, 1, 300)
+        self.assertEqual(len(expected), 201)
+        self.assertEqual(expected[-1], "last")
+
+        # Chunks small enough for a \r\n to straddle a chunk boundary
+        for chunk in (7, 8, 9, 64):
+            with mock.patch.object(sources, "_CHUNK", chunk):
+                cache = SourceCache(stream_threshold=1)
+                for start in (150, 1, 120, 199):
+                    self.assertEqual(cache.getlines(self.path, start, start + 5), expected[start - 1:start + 5])
+                self.assertEqual(cache.getlines(self.path, 1, 300), expected)
+
+    def test_truncated_while_cached(self):
+        """Test that a streamed file truncated in place just ends early"""
+        cache = SourceCache(stream_threshold=1)
+        self.assertEqual(cache.getline(self.path, 50), "line_50 = 50")
+        source = cache._files[self.path]
+        with open(self.path, "r+b") as f:
+            f.truncate(100)
+        self.assertEqual(source.getlines(90, 95), [])
+        self.assertEqual(len(source.getlines(1, 100)), 9)
+
+    def test_reload_on_change(self):
+        """Test that a changed file is read again"""
+        cache = SourceCache()
+        self.assertEqual(cache.getline(self.path, 1), "line_1 = 1")
+        self._write("# -*- coding: latin-1 -*-\nname = 'caf\xe9'\n", encoding="latin-1")
+        self.assertEqual(cache.getline(self.path, 2), "name = 'caf\xe9'")
+        self.assertEqual(cache.stats()["misses"], 2)
+
+    def test_byte_budget(self):
+        """Test that files beyond the byte budget are evicted"""
+        cache = SourceCache(max_bytes=2000)
+        other = os.path.join(self.directory.name, "other.py")
+        with open(other, "w") as f:
+            f.write("x = 1\n" * 300)
+        cache.getline(self.path, 1)
+        cache.getline(other, 1)
+
+        stats = cache.stats()
+        self.assertEqual(stats["files"], 1)
+        self.assertEqual(stats["evictions"], 1)
+        self.assertEqual(stats["bytes"], 1800)
+
+    def test_fallback(self):
+        """Test that sources that aren't files go through linecache"""
+        cache = SourceCache()
+        self.assertEqual(cache.getlines("<stdin>", 1, 3), [])
+        self.assertEqual(cache.stats()["fallbacks"], 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
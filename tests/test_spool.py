@@ -0,0 +1,184 @@
+"""
+Unit tests for the on-disk event spool
+"""
+import sys
+import os
+import tempfile
+import unittest
+from unittest.mock import patch
+
+# Add the parent directory to sys.path to import the package in development
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from errortrace_pro.spool import Spool
+from errortrace_pro.cloud_logger import CloudLogger
+
+
+class TestSpool(unittest.TestCase):
+    """Test cases for the Spool class"""
+
+    def setUp(self):
+        """Create a temporary spool directory"""
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmpdir.cleanup)
+        self.directory = self.tmpdir.name
+
+    def test_append_and_replay(self):
+        """Test that appended events are replayed in order and removed"""
+        spool = Spool(self.directory)
+        for i in range(5):
+            self.assertTrue(spool.append({"n": i}))
+
+        received = []
+        sent = spool.replay(lambda events: received.extend(events) or True, batch_size=2)
+
+        self.assertEqual(sent, 5)
+        self.assertEqual([event["n"] for event in received], [0, 1, 2, 3, 4])
+        self.assertEqual(spool.stats()["segments"], 0)
+
+    def test_segment_rotation(self):
+        """Test that segments are rotated at the configured size"""
+        spool = Spool(self.directory, segment_bytes=50)
+        for i in range(10):
+            spool.append({"n": i, "pad": "x" * 10})
+
+        self.assertGreater(spool.stats()["segments"], 1)
+
+    def test_eviction_of_oldest_segments(self):
+        """Test that the oldest segments are removed beyond the size cap"""
+        spool = Spool(self.directory, segment_bytes=100, max_bytes=300)
+        for i in range(50):
+            spool.append({"n": i, "pad": "x" * 20})
+
+        stats = spool.stats()
+        self.assertLessEqual(stats["bytes"], 300)
+        self.assertGreater(stats["evicted_segments"], 0)
+
+        received = []
+        spool.replay(lambda events: received.extend(events) or True)
+        self.assertEqual(received[-1]["n"], 49)
+        self.assertNotIn(0, [event["n"] for event in received])
+
+    def test_eviction_skips_segments_held_by_other_writers(self):
+        """Test that a segment another spool is still appending to isn't evicted"""
+        writer = Spool(self.directory, segment_bytes=10000, max_bytes=10000)
+        writer.append({"writer": True, "pad": "x" * 200})
+        held = writer._active_path
+
+        spool = Spool(self.directory, segment_bytes=100, max_bytes=300)
+        for i in range(20):
+            spool.append({"n": i, "pad": "x" * 20})
+
+        self.assertTrue(os.path.exists(held))
+        self.assertGreater(spool.stats()["evicted_segments"], 0)
+        writer.append({"writer": True})
+        writer.close()
+        spool.close()
+
+        received = []
+        Spool(self.directory).replay(lambda events: received.extend(events) or True)
+        self.assertEqual(sum(1 for event in received if event.get("writer")), 2)
+
+    def test_new_segment_is_never_unlocked(self):
+        """Test that replay elsewhere can't take a segment between its creation and first write"""
+        writer = Spool(self.directory)
+        with writer._lock:
+            writer._rotate()
+        segment = writer._active_path
+        self.assertEqual(os.listdir(self.directory), [os.path.basename(segment)])
+
+        self.assertEqual(Spool(self.directory).replay(lambda events: True), 0)
+        self.assertTrue(os.path.exists(segment))
+        self.assertTrue(writer.append({"after": True}))
+        writer.close()
+
+        received = []
+        Spool(self.directory).replay(lambda events: received.extend(events) or True)
+        self.assertEqual(received, [{"after": True}])
+
+    def test_empty_segment_not_replayed(self):
+        """Test that an empty, unlocked segment is left for its writer"""
+        path = os.path.join(self.directory, "segment-00000000000000000001.ndjson")
+        os.close(os.open(path, os.O_WRONLY | os.O_CREAT, 0o600))
+        Spool(self.directory).replay(lambda events: True)
+        self.assertTrue(os.path.exists(path))
+
+    def test_undelivered_segments(self):
+        """Test that segments held by other writers aren't reported as undelivered"""
+        writer = Spool(self.directory)
+        writer.append({"writer": True})
+        spool = Spool(self.directory, segment_bytes=20)
+        for i in range(3):
+            spool.append({"n": i})
+
+        self.assertEqual(spool.replay(lambda events: True), 3)
+        stats = spool.stats()
+        self.assertEqual(stats["segments"], 1)
+        self.assertEqual(stats["undelivered_segments"], 0)
+
+        writer.close()
+        spool.replay(lambda events: False)
+        self.assertEqual(spool.stats()["undelivered_segments"], 1)
+
+    def test_failed_replay_keeps_remaining_events(self):
+        """Test that undelivered events survive a failed replay"""
+        spool = Spool(self.directory)
+        for i in range(4):
+            spool.append({"n": i})
+
+        calls = []
+
+        def flaky_send(events):
+            calls.append(events)
+            return len(calls) == 1
+
+        self.assertEqual(spool.replay(flaky_send, batch_size=2), 2)
+
+        received = []
+        self.assertEqual(spool.replay(lambda events: received.extend(events) or True), 2)
+        self.assertEqual([event["n"] for event in received], [2, 3])
+
+    def test_replay_after_crash(self):
+        """Test that a new process replays segments, skipping torn records"""
+        spool = Spool(self.directory)
+        spool.append({"n": 1})
+        spool.close()
+
+        # Simulate a crash in the middle of writing a record
+        segment = os.path.join(self.directory, os.listdir(self.directory)[0])
+        with open(segment, "ab") as f:
+            f.write(b'{"n": 2, "trunc')
+
+        received = []
+        restarted = Spool(self.directory)
+        restarted.append({"n": 3})
+        restarted.replay(lambda events: received.extend(events) or True)
+
+        self.assertEqual([event["n"] for event in received], [1, 3])
+
+
+class TestCloudLoggerSpool(unittest.TestCase):
+    """Test cases for spooling through CloudLogger"""
+
+    def test_failed_delivery_is_spooled_and_replayed(self):
+        """Test that events survive an endpoint outage"""
+        with tempfile.TemporaryDirectory() as directory:
+            with patch.dict(os.environ, {"ERRORTRACE_ENDPOINT": "http://127.0.0.1:9/log"}):
+                cloud_logger = CloudLogger(provider="http", spool_dir=directory,
+                                           replay_on_start=False)
+
+            with patch.object(cloud_logger, "_log_to_http", return_value=False):
+                self.assertFalse(cloud_logger.log_exception(ValueError, ValueError("down"), ["tb"]))
+            self.assertEqual(cloud_logger.get_stats()["spool"]["appended"], 1)
+
+            delivered = []
+            with patch.object(cloud_logger, "_log_to_http",
+                              side_effect=lambda error_data: delivered.append(error_data) or True):
+                self.assertEqual(cloud_logger.replay_spool(), 1)
+
+            self.assertEqual(delivered[0]["exception"]["message"], "down")
+            cloud_logger.close()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -135,5 +135,216 @@ class TestTracebackVisualizer(unittest.TestCase):
                 self.assertEqual(result, "Plain format")
                 self.visualizer._format_plain.assert_called_once()
 
+class TestFrameCollapsing(unittest.TestCase):
+    """Test cases for recursion collapsing in the renderers"""
+    
+    def _recursion_error(self):
+        def recurse(n):
+            return recurse(n + 1)
+        try:
+            recurse(0)
+        except RecursionError:
+            return sys.exc_info()
+    
+    def test_plain_recursion(self):
+        """Test that recursion is collapsed in plain output"""
+        output = TracebackVisualizer(colored_output=False).format_traceback(*self._recursion_error())
+        self.assertIn("repeated", output)
+        self.assertLess(output.count("in recurse"), 5)
+    
+    @unittest.skipIf(not RICH_AVAILABLE, "Rich not available")
+    def test_rich_recursion(self):
+        """Test that recursion is collapsed in Rich output"""
+        visualizer = TracebackVisualizer(colored_output=True, locals_policy=False)
+        output = visualizer.format_traceback(*self._recursion_error(), show_tip=False)
+        self.assertEqual(output.count("repeated"), 1)
+        self.assertLess(output.count("in recurse"), 5)
+
+
+class TestStructuredFrames(unittest.TestCase):
+    """Test cases for rendering from extracted frame records"""
+    
+    def test_path_with_comma(self):
+        """Test that frames from paths containing commas render intact"""
+        import tempfile
+        import importlib
+        with tempfile.TemporaryDirectory(suffix=", copy") as directory:
+            with open(os.path.join(directory, "comma_module.py"), "w") as f:
+                f.write("def fail():\n    raise ValueError('a, b')\n")
+            sys.path.insert(0, directory)
+            try:
+                module = importlib.import_module("comma_module")
+                try:
+                    module.fail()
+                except ValueError:
+                    exc_info = sys.exc_info()
+            finally:
+                sys.path.remove(directory)
+                sys.modules.pop("comma_module", None)
+            
+            output = TracebackVisualizer(colored_output=False).format_traceback(*exc_info)
+        
+        path = os.path.join(directory, "comma_module.py")
+        self.assertIn(f"comma_module.py ({path}), line 2, in fail", output)
+        self.assertIn("raise ValueError('a, b')", output)
+        self.assertIn("ValueError: a, b", output)
+    
+    def test_record_reused(self):
+        """Test that a passed record is rendered without walking the traceback"""
+        visualizer = TracebackVisualizer(colored_output=False)
+        try:
+            1 / 0
+        except ZeroDivisionError:
+            exc_info = sys.exc_info()
+        record = visualizer.extract(*exc_info)
+        with patch('errortrace_pro.visualizer.extract_traceback') as extract:
+            output = visualizer.format_traceback(*exc_info, record=record)
+        extract.assert_not_called()
+        self.assertIn("ZeroDivisionError: division by zero", output)
+
+    def test_format_json(self):
+        """Test the structured JSON renderer"""
+        import json
+        visualizer = TracebackVisualizer(colored_output=False)
+        try:
+            try:
+                {}["missing"]
+            except KeyError as e:
+                raise ValueError("bad value") from e
+        except ValueError:
+            exc_info = sys.exc_info()
+        output = visualizer.format_json(*exc_info, suggestions=["Check the key"], ndjson=True)
+        self.assertTrue(output.endswith("\n"))
+        self.assertEqual(output.count("\n"), 1)
+        self.assertNotIn("\x1b[", output)
+        
+        data = json.loads(output)
+        self.assertEqual(data["exception"]["type"], "ValueError")
+        self.assertEqual(data["exception"]["message"], "bad value")
+        self.assertEqual([stack["type"] for stack in data["stacks"]], ["KeyError", "ValueError"])
+        self.assertEqual(data["stacks"][0]["link"], "cause")
+        frame = data["stacks"][-1]["frames"][-1]
+        self.assertEqual(frame["name"], "test_format_json")
+        self.assertIn('raise ValueError("bad value") from e', frame["line"])
+        self.assertIn(frame["lineno"], range(frame["code"]["start"], frame["code"]["start"] + 5))
+        self.assertEqual(data["suggestions"], ["Check the key"])
+
+
+
+class TestStreamingRender(unittest.TestCase):
+    """Test cases for rendering directly to a writable"""
+    
+    class Recorder:
+        """Writable that keeps each write separately"""
+        def __init__(self):
+            self.writes = []
+        
+        def write(self, text):
+            self.writes.append(text)
+        
+        def flush(self):
+            pass
+    
+    def _chained_error(self):
+        def inner(depth):
+            if depth:
+                return inner(depth - 1)
+            {}["missing"]
+        try:
+            try:
+                inner(20)
+            except KeyError as e:
+                raise ValueError("bad value") from e
+        except ValueError:
+            return sys.exc_info()
+    
+    def test_plain_streams_per_frame(self):
+        """Test that plain output is written in frame-sized chunks"""
+        visualizer = TracebackVisualizer(colored_output=False)
+        exc_info = self._chained_error()
+        record = visualizer.extract(*exc_info)
+        recorder = self.Recorder()
+        visualizer.write_traceback(recorder, *exc_info, record=record)
+        
+        self.assertEqual("".join(recorder.writes), visualizer.format_traceback(*exc_info, record=record))
+        self.assertGreater(len(recorder.writes), 20)
+        self.assertLess(max(len(chunk) for chunk in recorder.writes), 300)
+    
+    @unittest.skipIf(not RICH_AVAILABLE, "Rich not available")
+    def test_rich_streams_per_exception(self):
+        """Test that Rich output is written once per chained exception"""
+        visualizer = TracebackVisualizer(colored_output=True, locals_policy=False)
+        exc_info = self._chained_error()
+        record = visualizer.extract(*exc_info)
+        recorder = self.Recorder()
+        visualizer.write_traceback(recorder, *exc_info, show_tip=False, record=record)
+        
+        output = "".join(recorder.writes)
+        self.assertEqual(output, visualizer.format_traceback(*exc_info, show_tip=False, record=record))
+        self.assertIn("direct cause", output)
+        stack_counts = [chunk.count("most recent call last") for chunk in recorder.writes]
+        self.assertEqual(stack_counts.count(1), 2)
+        self.assertLessEqual(max(stack_counts), 1)
+        # The console goes back to its own buffer afterwards
+        self.assertNotIsInstance(visualizer.console.file, self.Recorder)
+    
+    def test_write_json(self):
+        """Test that streamed JSON matches the NDJSON document"""
+        visualizer = TracebackVisualizer(colored_output=False)
+        exc_info = self._chained_error()
+        record = visualizer.extract(*exc_info)
+        recorder = self.Recorder()
+        visualizer.write_json(recorder, *exc_info, suggestions=["Check the key"], record=record)
+        self.assertEqual(
+            "".join(recorder.writes),
+            visualizer.format_json(*exc_info, suggestions=["Check the key"], record=record, ndjson=True)
+        )
+
+
+class TestSourceCache(unittest.TestCase):
+    """Test cases for cached source reading"""
+    
+    def test_frame_lines_from_source_cache(self):
+        """Test that frame lines are read through the source cache"""
+        from errortrace_pro.sources import source_cache
+        lookups = source_cache.stats()["misses"] + source_cache.stats()["hits"]
+        try:
+            1 / 0
+        except ZeroDivisionError:
+            exc_info = sys.exc_info()
+        record = TracebackVisualizer(colored_output=False).extract(*exc_info)
+        self.assertEqual(record.frames[-1].line, "1 / 0")
+        self.assertGreater(source_cache.stats()["misses"] + source_cache.stats()["hits"], lookups)
+
+class TestRenderReuse(unittest.TestCase):
+    """Test cases for console and buffer reuse in the Rich renderer"""
+    
+    @unittest.skipIf(not RICH_AVAILABLE, "Rich not available")
+    def test_console_reused_per_thread(self):
+        """Test that renders on a thread share one console and don't leak output"""
+        import threading
+        visualizer = TracebackVisualizer(colored_output=True)
+        
+        def divide():
+            return 1 / 0
+        
+        try:
+            divide()
+        except Exception:
+            exc_info = sys.exc_info()
+        
+        # The test method's frame is part of the traceback, so its locals
+        # must not change between the renders
+        outputs = [visualizer.format_traceback(*exc_info, show_tip=False) for _ in range(2)]
+        self.assertEqual(outputs[0], outputs[1])
+        console = visualizer.console
+        self.assertIs(visualizer.console, console)
+        
+        other = []
+        thread = threading.Thread(target=lambda: other.append(visualizer.console))
+        thread.start()
+        thread.join()
+        self.assertIsNot(other[0], console)
+
 if __name__ == '__main__':
     unittest.main()